@@ -1,9 +1,13 @@
+from ._deadline import Deadline
+from ._deadline import current_deadline
+from ._deadline import deadline
 from ._result_set import Column
 from .connection import AsyncConnection
 from .connection import Connection
 from .cursor import AsyncCursor
 from .cursor import Cursor
 from .cursor import QueryStatistics
+from .cursor import TransferStatistics
 from .exceptions import DatabaseError
 from .exceptions import DataError
 from .exceptions import Error
@@ -13,6 +17,8 @@ from .exceptions import NotSupportedError
 from .exceptions import OperationalError
 from .exceptions import ProgrammingError
 from .options import ClientOptions
+from .options import CompressionOptions
+from .options import KeepAliveOptions
 from .options import QueryOptions
 from .options import RequestOptions
 
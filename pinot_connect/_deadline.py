@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import dataclasses
+import time
+import typing as t
+
+import httpx
+
+DEFAULT_NETWORK_MARGIN: t.Final[float] = 0.1
+
+_current_deadline: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar("pinot_deadline", default=None)
+
+
+@dataclasses.dataclass(frozen=True)
+class Deadline:
+    """A point in time by which a query (and every request made for it) must finish
+
+    When a deadline is in effect, each request's httpx timeout is set to the time remaining until the deadline, and
+    Pinot's `timeoutMs` query option is set to the time remaining minus `network_margin`, so servers stop working on
+    the query at about the time the client gives up on it.  Both are computed just before each request is sent, so
+    sub-queries of a fan-out (e.g. `execute_split`) share the same shrinking budget.
+
+    Attributes:
+        expires_at: the deadline, as a `time.monotonic()` timestamp
+        network_margin: seconds reserved for the network round trip and broker reduce, subtracted from the remaining
+            time to derive `timeoutMs`.  Default: `0.1`
+    """
+
+    expires_at: float
+    network_margin: float = DEFAULT_NETWORK_MARGIN
+
+    @classmethod
+    def after(cls, seconds: float, *, network_margin: float = DEFAULT_NETWORK_MARGIN) -> Deadline:
+        """Create a deadline `seconds` from now"""
+        return cls(time.monotonic() + seconds, network_margin)
+
+    def remaining(self) -> float:
+        """Seconds remaining until the deadline, negative once it has passed"""
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        """`True` once the deadline has passed"""
+        return self.remaining() <= 0
+
+    def timeout_ms(self) -> int:
+        """The `timeoutMs` to give Pinot for a request sent now"""
+        return max(int((self.remaining() - self.network_margin) * 1000), 1)
+
+    def earliest(self, other: Deadline | None) -> Deadline:
+        """Return whichever of two deadlines expires first"""
+        return other if other is not None and other.expires_at < self.expires_at else self
+
+
+def current_deadline() -> Deadline | None:
+    """The ambient deadline set by the innermost enclosing `deadline` block, if any"""
+    return _current_deadline.get()
+
+
+@contextlib.contextmanager
+def deadline(seconds: float, *, network_margin: float = DEFAULT_NETWORK_MARGIN) -> t.Iterator[Deadline]:
+    """Set an ambient deadline for every query executed in the block, in this thread or async task
+
+    Nested blocks can only shorten the deadline: the effective deadline is the earliest of all enclosing blocks.  Async
+    tasks created inside the block inherit the deadline.
+
+    Args:
+        seconds: time budget of the block, in seconds
+        network_margin: *(optional)* seconds subtracted from the remaining time to derive Pinot's `timeoutMs`.
+            Default: `0.1`
+    """
+    effective = Deadline.after(seconds, network_margin=network_margin).earliest(_current_deadline.get())
+    token = _current_deadline.set(effective)
+    try:
+        yield effective
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextlib.contextmanager
+def _use_deadline(deadline_: Deadline | None) -> t.Iterator[None]:
+    """Make an already resolved deadline ambient, e.g. in a worker thread that doesn't inherit the caller's context"""
+    if deadline_ is None:
+        yield
+        return
+    token = _current_deadline.set(deadline_)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def _resolve_deadline(seconds: float | None) -> Deadline | None:
+    """Combine a per-execute deadline, in seconds from now, with the ambient deadline"""
+    ambient = _current_deadline.get()
+    if seconds is None:
+        return ambient
+    return Deadline.after(seconds).earliest(ambient)
+
+
+def _apply_deadline(request: httpx.Request, deadline_: Deadline) -> None:
+    """Set the httpx timeout and Pinot `timeoutMs` of a request from the time remaining until `deadline_`"""
+    remaining = max(deadline_.remaining(), 0.0)
+    timeout = request.extensions.get("timeout", {})
+    request.extensions["timeout"] = {
+        key: min(timeout.get(key) or remaining, remaining) for key in ("connect", "read", "write", "pool")
+    }
+
+    timeout_ms = deadline_.timeout_ms()
+    options = dict(
+        option.split("=", 1) for option in request.url.params.get("queryOptions", "").split(";") if "=" in option
+    )
+    # an explicit timeoutMs shorter than the deadline still applies
+    if "timeoutMs" in options:
+        timeout_ms = min(int(options["timeoutMs"]), timeout_ms)
+    options["timeoutMs"] = str(timeout_ms)
+    request.url = request.url.copy_set_param("queryOptions", ";".join(f"{k}={v}" for k, v in options.items()))
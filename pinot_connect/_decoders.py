@@ -0,0 +1,85 @@
+"""Decoding of compressed response bodies
+
+Responses are read as sent when the connection negotiates compression, to account for their size and decoding time
+separately, so they are decoded here rather than by httpx.  `br` is only supported with the `brotli` (or `brotlicffi`)
+package installed and `zstd` with the `zstandard` package, as with httpx.
+"""
+
+from __future__ import annotations
+
+import typing as t
+import zlib
+
+import httpx
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+Decoder = t.Callable[[bytes], bytes]
+
+
+def _identity(data: bytes) -> bytes:
+    return data
+
+
+def _gzip(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def _deflate(data: bytes) -> bytes:
+    # servers send either zlib wrapped or raw deflate data for `deflate`
+    try:
+        return zlib.decompress(data)
+    except zlib.error:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.decompress(data)
+
+
+def _zstd(data: bytes) -> bytes:
+    # a body can be several frames, each of which needs its own decompressor
+    chunks = []
+    while data:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        chunks.append(decompressor.decompress(data))
+        data = decompressor.unused_data if decompressor.eof else b""
+    return b"".join(chunks)
+
+
+DECODERS: t.Final[dict[str, Decoder]] = {
+    "identity": _identity,
+    "gzip": _gzip,
+    "deflate": _deflate,
+    **({"br": _brotli} if brotli is not None else {}),
+    **({"zstd": _zstd} if zstandard is not None else {}),
+}
+
+
+def decode(headers: httpx.Headers, data: bytes) -> bytes:
+    """Decode a response body in its content encodings, applied in the reverse of the order they are listed in
+
+    Raises:
+        httpx.DecodingError: when the body isn't valid in its encoding
+    """
+    encodings = [encoding.strip().lower() for encoding in headers.get_list("Content-Encoding", split_commas=True)]
+    try:
+        for encoding in reversed(encodings):
+            decoder = DECODERS.get(encoding)
+            if decoder is not None:
+                data = decoder(data)
+    except Exception as e:
+        raise httpx.DecodingError(f"Failed to decode a {', '.join(encodings)} encoded response: {e}") from e
+    return data
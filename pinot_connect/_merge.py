@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import functools
+import heapq
+import itertools
+import operator
+import re
+import typing as t
+
+from ._sql import OrderByItem
+from ._sql import SelectItem
+from ._sql import find_group_by
+from ._sql import find_limit
+from ._sql import find_order_by
+from ._sql import find_select_list
+from ._sql import has_having
+from ._sql import mask
+from ._sql import normalize_identifier
+from ._sql import remove_order_by
+from ._sql import replace_limit
+from .exceptions import DataError
+from .exceptions import NotSupportedError
+from .exceptions import ProgrammingError
+
+if t.TYPE_CHECKING:
+    from .cursor import QueryStatistics
+
+# statistics that describe the slowest/largest sub-query rather than a total across sub-queries
+_MAX_STATISTICS: t.Final[frozenset[str]] = frozenset({"timeUsedMs", "brokerReduceTimeMs", "maxRowsInOperator"})
+_MIN_STATISTICS: t.Final[frozenset[str]] = frozenset({"minConsumingFreshnessTimeMs"})
+
+AggregationFunction = t.Literal["sum", "count", "min", "max", "avg"]
+_AGGREGATION_FUNCTIONS: t.Final[frozenset[str]] = frozenset(t.get_args(AggregationFunction))
+_AGGREGATION_TYPES: t.Final[dict[str, str]] = {"sum": "DOUBLE", "count": "LONG", "avg": "DOUBLE"}
+_FUNCTION_RE: t.Final[re.Pattern] = re.compile(r"^\s*(\w+)\s*\((.*)\)\s*$", re.DOTALL)
+_DISTINCT_RE: t.Final[re.Pattern] = re.compile(r"^\s*distinct\b", re.IGNORECASE)
+_IDENTIFIER_RE: t.Final[re.Pattern] = re.compile(r"^\s*(?:\"[^\"]+\"|`[^`]+`|[A-Za-z_][\w$.]*)\s*$")
+# functions pinot evaluates as aggregations, mergeable or not
+_PINOT_AGGREGATION_RE: t.Final[re.Pattern] = re.compile(
+    r"^(sum|count|min|max|avg|mode|minmaxrange|histogram|sumprecision|distinct\w*|percentile\w*|\w*hll\w*|"
+    r"\w*thetasketch\w*|\w*tuplesketch\w*|idset|variance\w*|var_\w*|stddev\w*|skewness|kurtosis|covar\w*|bool_?and|"
+    r"bool_?or|firstwithtime|lastwithtime|arg_?min|arg_?max|exprmin|exprmax|arrayagg|listagg|"
+    r"(sum|count|min|max|avg)mv)$",
+    re.IGNORECASE,
+)
+
+DEFAULT_GROUP_LIMIT: t.Final[int] = 100_000
+
+
+class SubQueryResult(t.NamedTuple):
+    """The decoded pieces of one sub-query response that are needed to build a combined result set"""
+
+    columns: list[str]
+    types: list[str]
+    rows: list[list]
+    statistics: QueryStatistics
+
+
+def merge_query_statistics(statistics: t.Sequence[QueryStatistics]) -> QueryStatistics:
+    """Combine the statistics of sub-queries into the statistics of the logical query they were split from
+
+    Counters are summed, timings report the slowest sub-query, flags are set if any sub-query set them and identifiers
+    are joined.
+    """
+    merged: dict[str, t.Any] = {}
+    for stats in statistics:
+        for key, value in stats.items():
+            if key not in merged:
+                merged[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, bool):
+                merged[key] = merged[key] or value
+            elif isinstance(value, (int, float)):
+                if key in _MAX_STATISTICS:
+                    merged[key] = max(merged[key], value)
+                elif key in _MIN_STATISTICS:
+                    merged[key] = min(merged[key], value)
+                else:
+                    merged[key] += value
+            elif isinstance(value, str):
+                if value not in merged[key].split(","):
+                    merged[key] = f"{merged[key]},{value}"
+            elif isinstance(value, list):
+                merged[key].extend(v for v in value if key != "tablesQueried" or v not in merged[key])
+            elif isinstance(value, dict):
+                merged[key] = {**merged[key], **value}
+    return t.cast("QueryStatistics", merged)
+
+
+@functools.total_ordering
+class _Descending:
+    """Sort key wrapper that inverts the order of the wrapped value"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: t.Any):
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.value == other.value
+
+    def __lt__(self, other: _Descending) -> bool:
+        return other.value < self.value
+
+
+def _sort_key(order_by: list[tuple[int, bool]]) -> t.Callable[[list], tuple]:
+    # nulls sort last when ascending and first when descending
+    def key(row: list) -> tuple:
+        return tuple(
+            _Descending((row[i] is None, row[i])) if descending else (row[i] is None, row[i])
+            for i, descending in order_by
+        )
+
+    return key
+
+
+def resolve_order_by(columns: list[str], order_by: list[OrderByItem]) -> list[tuple[int, bool]]:
+    """Map `ORDER BY` expressions to result column indexes, so rows can be compared client side"""
+    indexes = {normalize_identifier(column): i for i, column in enumerate(columns)}
+    resolved = []
+    for item in order_by:
+        index = indexes.get(normalize_identifier(item.expression))
+        if index is None:
+            raise NotSupportedError(
+                f"Cannot merge sub-query results ordered by {item.expression!r}: the expression must be a selected "
+                f"column."
+            )
+        resolved.append((index, item.descending))
+    return resolved
+
+
+def check_order_by(operation: str, order_by: list[OrderByItem]) -> None:
+    """Check that the `ORDER BY` expressions of a query are selected columns, which `resolve_order_by` needs to merge
+    sub-query results, before any sub-query is sent"""
+    select_list = find_select_list(operation)
+    if not order_by or select_list is None:
+        return
+    names = set()
+    wildcard = False
+    for item in select_list.items:
+        if item.expression == "*" or item.expression.endswith(".*"):
+            wildcard = True
+        elif item.alias:
+            names.add(normalize_identifier(item.alias))
+        else:
+            names.add(normalize_identifier(_output_name(item.expression, _match_function(item.expression))))
+    for item in order_by:
+        # a star selects plain columns, whatever their names
+        if normalize_identifier(item.expression) not in names and not (
+            wildcard and _IDENTIFIER_RE.match(item.expression)
+        ):
+            raise NotSupportedError(
+                f"Cannot merge sub-query results ordered by {item.expression!r}: the expression must be a selected "
+                f"column."
+            )
+
+
+def concat_results(results: t.Sequence[SubQueryResult]) -> t.Iterator[list]:
+    """Concatenate the rows of the sub-queries in sub-query order"""
+    return itertools.chain.from_iterable(result.rows for result in results)
+
+
+def merge_sorted_results(results: t.Sequence[SubQueryResult], order_by: list[OrderByItem]) -> t.Iterator[list]:
+    """k-way merge of sub-query rows that are each already sorted by `order_by`"""
+    key = _sort_key(resolve_order_by(results[0].columns, order_by))
+    return heapq.merge(*(result.rows for result in results), key=key)
+
+
+class MergePlan:
+    """Plan for splitting a logical query into sub-queries and combining the sub-query results
+
+    Rows are merged in `ORDER BY` order when the logical query is ordered, otherwise concatenated in sub-query order.
+    `ORDER BY` expressions must be selected columns, which is checked when the plan is built, before any sub-query runs.
+    The logical query's limit and offset are then applied to the combined rows.  Sub-queries cannot apply an offset on
+    their own, so the offset is folded into the limit of every sub-query.
+    """
+
+    def __init__(self, operation: str):
+        self.order_by = find_order_by(operation)
+        check_order_by(operation, self.order_by)
+        self.limit = find_limit(operation)
+        if self.limit and self.limit.offset:
+            operation = replace_limit(operation, self.limit.offset + self.limit.limit)
+        self.sub_query_operation = operation
+
+    def _apply_limit(self, rows: t.Iterable[list]) -> list[list]:
+        if self.limit is None:
+            return list(rows)
+        return list(itertools.islice(rows, self.limit.offset, self.limit.offset + self.limit.limit))
+
+    def combine(self, results: t.Sequence[SubQueryResult]) -> tuple[list[str], list[str], list[list]]:
+        """Combine sub-query results into the columns, types and rows of the logical query"""
+        rows = merge_sorted_results(results, self.order_by) if self.order_by else concat_results(results)
+        return results[0].columns, results[0].types, self._apply_limit(rows)
+
+
+class _Aggregate(t.NamedTuple):
+    function: AggregationFunction
+    # index of the sub-query column(s) holding the partial aggregate: (sum, count) for avg
+    indexes: tuple[int, ...]
+
+
+class AggregateMergePlan(MergePlan):
+    """Plan for splitting an aggregation query into sub-queries and re-aggregating their partial results
+
+    The output columns of the logical query are classified as group keys or aggregates, either from the functions in the
+    select list or from declared `aggregations` keyed by output column name.  Columns that aren't aggregations must be
+    plain columns or `GROUP BY` expressions, so other aggregations (e.g. `DISTINCTCOUNT`) aren't mistaken for group
+    keys.  `AVG` cannot be merged from averages, so every `AVG(expr)` is rewritten into `SUM(expr)` and `COUNT(expr)`
+    sub-query columns.  Sub-query results are combined with a hash aggregation on the group keys, after which `ORDER BY`
+    and `LIMIT` are re-applied client side.  `HAVING` would filter the partial aggregates of every sub-query rather than
+    the merged ones, so it isn't supported.
+
+    Because every sub-query only sees its own shard, sub-queries are unordered and fetch up to `group_limit` groups
+    each.  Combining raises `DataError` when a sub-query has more groups than that, or reached Pinot's own
+    `numGroupsLimit`, as its groups were truncated and the merged result would be wrong.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        *,
+        aggregations: t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+    ):
+        super().__init__(operation)
+        select_list = find_select_list(operation)
+        if select_list is None:
+            raise ProgrammingError("Cannot merge aggregates: the query does not have a select list.")
+        if has_having(operation):
+            raise NotSupportedError(
+                "Cannot merge aggregates of a query with a HAVING clause: every sub-query would filter its own partial "
+                "aggregates rather than the merged ones."
+            )
+
+        declared = {normalize_identifier(k): v.lower() for k, v in (aggregations or {}).items()}
+        group_by = {normalize_identifier(expression) for expression in find_group_by(operation)}
+        self.group_limit = group_limit
+        sub_query_items: list[str] = []
+        self._columns: list[str] = []
+        self._keys: list[tuple[int, int]] = []  # (output position, sub-query index)
+        self._aggregates: list[tuple[int, _Aggregate]] = []  # (output position, aggregate)
+
+        for position, item in enumerate(select_list.items):
+            call = _match_function(item.expression)
+            name = item.alias or _output_name(item.expression, call)
+            function = declared.get(normalize_identifier(name))
+            if function is None and call and call[0].lower() in _AGGREGATION_FUNCTIONS:
+                function = call[0].lower()
+            if function is not None and function not in _AGGREGATION_FUNCTIONS:
+                raise NotSupportedError(f"Cannot merge aggregation {function!r} of column {name!r}.")
+            if call and function is not None and _DISTINCT_RE.match(call[1]):
+                raise NotSupportedError(f"Cannot merge distinct aggregation {item.expression!r} from sub-queries.")
+            if function is None and call and _PINOT_AGGREGATION_RE.match(call[0]):
+                raise NotSupportedError(f"Cannot merge aggregation {call[0]!r} of column {name!r}.")
+            if function is None and not _is_group_key(item, position, group_by):
+                raise NotSupportedError(
+                    f"Cannot merge column {name!r}: it is neither a SUM, COUNT, MIN, MAX or AVG aggregation nor a "
+                    f"GROUP BY expression.  Declare its aggregation function if it is one."
+                )
+
+            self._columns.append(name)
+            index = len(sub_query_items)
+            if function is None:
+                self._keys.append((position, index))
+                sub_query_items.append(_render_item(item))
+            elif function == "avg":
+                if call is None or call[0].lower() != "avg":
+                    raise NotSupportedError(f"Cannot merge column {name!r} as an average, it is not an AVG expression.")
+                sub_query_items.append(f"SUM({call[1]})")
+                sub_query_items.append(f"COUNT({call[1]})")
+                self._aggregates.append((position, _Aggregate("avg", (index, index + 1))))
+            else:
+                self._aggregates.append((position, _Aggregate(t.cast(AggregationFunction, function), (index,))))
+                sub_query_items.append(_render_item(item))
+
+        if not self._aggregates:
+            raise ProgrammingError("Cannot merge aggregates: the query does not select any aggregations.")
+        # aggregate columns are named by their alias or their function call, so check the order against those names
+        resolve_order_by(self._columns, self.order_by)
+
+        sub_query = f"{operation[: select_list.start]} {', '.join(sub_query_items)} {operation[select_list.end :]}"
+        # one more group than the limit, to tell a sub-query that has exactly `group_limit` groups from a truncated one
+        self.sub_query_operation = replace_limit(remove_order_by(sub_query), group_limit + 1)
+
+    def _types(self, result: SubQueryResult) -> list[str]:
+        types = [""] * len(self._columns)
+        for position, index in self._keys:
+            types[position] = result.types[index]
+        for position, aggregate in self._aggregates:
+            types[position] = _AGGREGATION_TYPES.get(aggregate.function) or result.types[aggregate.indexes[0]]
+        return types
+
+    def combine(self, results: t.Sequence[SubQueryResult]) -> tuple[list[str], list[str], list[list]]:
+        key_indexes = [index for _, index in self._keys]
+        groups: dict[tuple, list] = {}
+        for result in results:
+            if result.statistics.get("numGroupsLimitReached"):
+                raise DataError(
+                    "A sub-query reached the numGroupsLimit of the servers, so its groups are truncated and the merged "
+                    "aggregates would be wrong: raise the numGroupsLimit query option."
+                )
+            if len(result.rows) > self.group_limit:
+                raise DataError(
+                    f"A sub-query has more than {self.group_limit} groups, so its groups are truncated and the merged "
+                    f"aggregates would be wrong: raise group_limit."
+                )
+            for row in result.rows:
+                key = tuple([row[i] for i in key_indexes])
+                state = groups.get(key)
+                if state is None:
+                    groups[key] = [[row[i] for i in aggregate.indexes] for _, aggregate in self._aggregates]
+                    continue
+                for partial, (_, aggregate) in zip(state, self._aggregates):
+                    for j, i in enumerate(aggregate.indexes):
+                        partial[j] = _MERGE_FUNCTIONS[aggregate.function](partial[j], row[i])
+
+        rows = []
+        for key, state in groups.items():
+            row: list = [None] * len(self._columns)
+            for (position, _), value in zip(self._keys, key):
+                row[position] = value
+            for (position, aggregate), partial in zip(self._aggregates, state):
+                if aggregate.function == "avg":
+                    total, count = partial
+                    row[position] = total / count if count else None
+                else:
+                    row[position] = partial[0]
+            rows.append(row)
+
+        if self.order_by:
+            rows.sort(key=_sort_key(resolve_order_by(self._columns, self.order_by)))
+        return self._columns, self._types(results[0]), self._apply_limit(rows)
+
+
+def _render_item(item: SelectItem) -> str:
+    return f'{item.expression} AS "{item.alias}"' if item.alias else item.expression
+
+
+def _is_group_key(item: SelectItem, position: int, group_by: set[str]) -> bool:
+    # plain columns are keys even without a GROUP BY, e.g. when selected from a sub-query, and other expressions must be
+    # grouped by, by expression, alias or position
+    if _IDENTIFIER_RE.match(item.expression):
+        return True
+    names = {normalize_identifier(item.expression), str(position + 1)}
+    if item.alias:
+        names.add(normalize_identifier(item.alias))
+    return not names.isdisjoint(group_by)
+
+
+def _match_function(expression: str) -> tuple[str, str] | None:
+    """Match an expression that is a single function call, returning the function name and its argument text"""
+    masked = mask(expression)
+    match = _FUNCTION_RE.match(masked)
+    if match is None or masked.index(")") != len(masked.rstrip()) - 1:
+        return None
+    return match.group(1), expression[match.start(2) : match.end(2)]
+
+
+def _output_name(expression: str, function: tuple[str, str] | None) -> str:
+    # pinot names aggregation columns by the lower cased function name and its arguments, e.g. `sum(AirTime)`
+    if function is None:
+        return expression
+    return f"{function[0].lower()}({function[1].strip()})"
+
+
+def _merge_values(merge: t.Callable[[t.Any, t.Any], t.Any]) -> t.Callable[[t.Any, t.Any], t.Any]:
+    def merge_(left: t.Any, right: t.Any) -> t.Any:
+        if left is None:
+            return right
+        if right is None:
+            return left
+        return merge(left, right)
+
+    return merge_
+
+
+_MERGE_FUNCTIONS: t.Final[dict[str, t.Callable[[t.Any, t.Any], t.Any]]] = {
+    "sum": _merge_values(operator.add),
+    "count": _merge_values(operator.add),
+    "min": _merge_values(min),
+    "max": _merge_values(max),
+    "avg": _merge_values(operator.add),  # both the sum and the count of an average are added
+}
+
+
+def selects_aggregations(operation: str) -> bool:
+    """Whether the top level select list of a query calls aggregation functions"""
+    select_list = find_select_list(operation)
+    if select_list is None:
+        return False
+    calls = (_match_function(item.expression) for item in select_list.items)
+    return any(call is not None and _PINOT_AGGREGATION_RE.match(call[0]) for call in calls)
+
+
+def make_merge_plan(
+    operation: str,
+    *,
+    aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+    group_limit: int = DEFAULT_GROUP_LIMIT,
+) -> MergePlan:
+    """Build the plan for combining the sub-queries of `operation`
+
+    Args:
+        operation: the logical query
+        aggregate: `False` to concatenate (or merge sorted) sub-query rows, `True` to re-aggregate them using the
+            aggregation functions in the select list, or a mapping of output column name to aggregation function.
+            `None` concatenates the rows of queries that don't select aggregations, and raises `ProgrammingError` for
+            those that do, as their concatenated partial aggregates are rarely what was meant
+        group_limit: maximum number of groups fetched by each sub-query when re-aggregating
+    """
+    if aggregate is None:
+        if selects_aggregations(operation):
+            raise ProgrammingError(
+                "The query selects aggregations, which every sub-query computes over its own part of the data: pass "
+                "aggregate=True to re-aggregate them, or aggregate=False to get the partial aggregates of every "
+                "sub-query."
+            )
+        aggregate = False
+    if aggregate is False:
+        return MergePlan(operation)
+    return AggregateMergePlan(operation, aggregations=None if aggregate is True else aggregate, group_limit=group_limit)
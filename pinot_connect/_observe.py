@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import typing as t
+
+from ._sql import digest
+from ._sql import find_table
+from ._sql import normalize
+
+if t.TYPE_CHECKING:
+    from .cursor import QueryStatistics
+    from .options import QueryOptions
+
+
+class QueryRecord:
+    """What an execute call did, as passed to the observers of a connection (e.g. a `MetricsRegistry`)
+
+    The normalized query and its fingerprint are only computed when first read, so observers that don't need them (e.g.
+    a `SlowQueryLog` whose thresholds aren't exceeded) don't pay for normalizing the bound sql.
+
+    Attributes:
+        sql: the query with its params bound
+        query: the query normalized with its literals replaced by placeholders
+        query_options: the query options in effect, merged from the connection, cursor and call
+        table: table of the query, if found
+        fingerprint: hash of the normalized query
+        duration: client side duration of the call, in seconds
+        response_bytes: size of the response body, `0` if there was none
+        rows: number of rows returned, `None` if the call failed
+        statistics: the broker's query statistics, `None` if the call failed
+        error: the exception the call raised, if any
+    """
+
+    __slots__ = (
+        "sql",
+        "query_options",
+        "table",
+        "duration",
+        "response_bytes",
+        "rows",
+        "statistics",
+        "error",
+        "_query",
+        "_fingerprint",
+    )
+
+    def __init__(
+        self,
+        sql: str,
+        query_options: QueryOptions,
+        table: str | None,
+        duration: float,
+        response_bytes: int,
+        rows: int | None,
+        statistics: QueryStatistics | None,
+        error: BaseException | None,
+    ):
+        self.sql = sql
+        self.query_options = query_options
+        self.table = table
+        self.duration = duration
+        self.response_bytes = response_bytes
+        self.rows = rows
+        self.statistics = statistics
+        self.error = error
+        self._query: str | None = None
+        self._fingerprint: str | None = None
+
+    @classmethod
+    def make(
+        cls,
+        operation: str,
+        sql: str,
+        query_options: QueryOptions,
+        duration: float,
+        response_bytes: int,
+        rows: int | None,
+        statistics: QueryStatistics | None,
+        error: BaseException | None,
+    ) -> QueryRecord:
+        """Make the record of a call that ran `operation` bound as `sql`.  The table is found on the unbound operation,
+        which is usually much shorter than the bound sql (e.g. with a long `IN` list)"""
+        return cls(sql, query_options, find_table(operation), duration, response_bytes, rows, statistics, error)
+
+    @property
+    def query(self) -> str:
+        if self._query is None:
+            self._query = normalize(self.sql)
+        return self._query
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = digest(self.query)
+        return self._fingerprint
+
+
+class QueryObserver(t.Protocol):
+    def _record(self, record: QueryRecord) -> None:
+        ...
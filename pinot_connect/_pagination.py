@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import typing as t
+
+from ._merge import SubQueryResult
+from ._query import _escape_param
+from ._sql import add_predicate
+from ._sql import find_limit
+from ._sql import find_order_by
+from ._sql import normalize_identifier
+from ._sql import remove_limit
+from ._sql import remove_order_by
+from .exceptions import DataError
+from .exceptions import NotSupportedError
+from .exceptions import ProgrammingError
+
+DEFAULT_PAGE_SIZE: t.Final[int] = 10_000
+
+
+class KeysetPaginator:
+    """Rewrites an ordered query into a sequence of keyset (seek) paginated page queries
+
+    Every page after the first is filtered with `key > last_seen` (`key < last_seen` when the query is ordered by the
+    key descending) instead of skipping rows with an offset, so each page costs about the same to fetch.  The key must
+    be a selected, non-null column that is unique across the rows of the query, otherwise rows that share a key with
+    the last row of a page are skipped.
+
+    A paginator is stateful: call `next_operation` with each page's result, in order, to get the query for the next
+    page.
+    """
+
+    def __init__(self, operation: str, key: str, page_size: int = DEFAULT_PAGE_SIZE):
+        if page_size < 1:
+            raise ProgrammingError(f"page_size must be positive, got {page_size}.")
+
+        order_by = find_order_by(operation)
+        if order_by and normalize_identifier(order_by[0].expression) != normalize_identifier(key):
+            raise ProgrammingError(
+                f"Cannot paginate on {key!r}: the query is ordered by {order_by[0].expression!r}.  The key must be the "
+                f"first ORDER BY expression."
+            )
+        limit = find_limit(operation)
+        if limit is not None and limit.offset:
+            raise NotSupportedError("Cannot paginate a query with an offset.")
+
+        self.key = key
+        self.page_size = page_size
+        self.descending = bool(order_by) and order_by[0].descending
+        # the query's own limit caps the total number of rows across all pages
+        self.remaining = limit.limit if limit is not None else None
+        self._base_operation = remove_limit(remove_order_by(operation))
+        self._order_by = f" ORDER BY {key}{' DESC' if self.descending else ''}"
+
+    def _next_page_size(self) -> int:
+        return self.page_size if self.remaining is None else min(self.page_size, self.remaining)
+
+    def first_operation(self) -> str:
+        """The query for the first page"""
+        return f"{self._base_operation}{self._order_by} LIMIT {self._next_page_size()}"
+
+    def next_operation(self, page: SubQueryResult) -> str | None:
+        """The query for the page after `page`, or `None` if `page` was the last page"""
+        requested = self._next_page_size()
+        if self.remaining is not None:
+            self.remaining -= len(page.rows)
+        # a short page means the rows are exhausted
+        if not page.rows or len(page.rows) < requested or self.remaining == 0:
+            return None
+
+        columns = [normalize_identifier(column) for column in page.columns]
+        try:
+            index = columns.index(normalize_identifier(self.key))
+        except ValueError:
+            raise ProgrammingError(f"Cannot paginate on {self.key!r}: the key must be a selected column.") from None
+
+        last_seen = page.rows[-1][index]
+        if last_seen is None:
+            raise DataError(f"Cannot paginate on {self.key!r}: the last row of a page has a null key.")
+        predicate = f"{self.key} {'<' if self.descending else '>'} {_escape_param(self.key, last_seen)}"
+        return f"{add_predicate(self._base_operation, predicate)}{self._order_by} LIMIT {self._next_page_size()}"
@@ -15,6 +15,28 @@ def _escape_single_quotes(value: str) -> str:
     return value.replace("'", "''")
 
 
+def _is_array_like(value: t.Any) -> bool:
+    # duck types numpy (and numpy-like) arrays so numpy is never imported or required
+    return hasattr(value, "dtype") and hasattr(value, "tolist")
+
+
+def _escape_sequence(name_or_index: str | int, value: t.Any) -> str:
+    """Escape a sequence for an IN clause.
+
+    Homogeneous int, str and UUID sequences are escaped with a single join instead of recursing into `_escape_param`
+    per element, which matters for IN lists with hundreds of thousands of values.
+    """
+    value_types = set(map(type, value))
+    if value_types == {int}:
+        return f"({', '.join(map(str, value))})"
+    elif value_types == {str}:
+        return "('" + "', '".join([v.replace("'", "''") for v in value]) + "')"
+    elif value_types == {uuid.UUID}:
+        return "('" + "', '".join(map(str, value)) + "')"
+
+    return f"({', '.join([_escape_param(name_or_index, v) for v in value])})"
+
+
 def _escape_param(name_or_index: str | int, value: t.Any):
     if isinstance(value, str):
         return f"'{_escape_single_quotes(value)}'"
@@ -28,8 +50,12 @@ def _escape_param(name_or_index: str | int, value: t.Any):
     elif isinstance(value, (datetime.date, datetime.datetime)):
         return f"'{value.isoformat()}'"
 
-    elif isinstance(value, (list, tuple, set)):
-        return f"({', '.join(_escape_param(name_or_index, v) for v in value)})"
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return _escape_sequence(name_or_index, value)
+
+    elif _is_array_like(value):
+        # numpy arrays become lists and numpy scalars become python scalars
+        return _escape_param(name_or_index, value.tolist())
 
     elif value is None:
         return "NULL"
@@ -45,10 +71,34 @@ def _escape_param(name_or_index: str | int, value: t.Any):
         raise ProgrammingError(
             f"Unsupported param type at param {params_type}={name_or_index}: {type(value)}.  Only supported values "
             f"are str, int, float, Decimal, bool, date, datetime. A list/tuple/set of any of those types "
-            f"(for IN clauses) is also allowed."
+            f"(for IN clauses) or a numpy array is also allowed."
         )
 
 
+def _split_bounds(start: t.Any, end: t.Any, splits: int) -> list[t.Any]:
+    if type(start) is not type(end):
+        raise ProgrammingError(f"Range bounds must have the same type, got {type(start)} and {type(end)}.")
+    if not end > start:
+        raise ProgrammingError(f"Range end must be greater than range start, got {start} and {end}.")
+
+    if isinstance(start, datetime.datetime):
+        step: t.Any = (end - start) / splits
+    elif isinstance(start, datetime.date):
+        step = datetime.timedelta(days=max((end - start).days // splits, 1))
+    elif isinstance(start, int) and not isinstance(start, bool):
+        step = max((end - start) // splits, 1)
+    elif isinstance(start, float):
+        step = (end - start) / splits
+    else:
+        raise ProgrammingError(f"Cannot split a range of {type(start)}, expected datetime, date, int or float.")
+
+    bounds = [start]
+    while len(bounds) < splits and bounds[-1] + step < end:
+        bounds.append(bounds[-1] + step)
+    bounds.append(end)
+    return bounds
+
+
 @dataclass
 class Query:
     operation: str
@@ -58,6 +108,63 @@ class Query:
         if self.params and not isinstance(self.params, (dict, tuple, list)):
             raise ProgrammingError(f"params must be a dict or tuple, got {type(self.params)}")
 
+    def chunked(self, param: str | int, size: int) -> list[Query]:
+        """Split the sequence bound to `param` into chunks of at most `size` values, one query per chunk
+
+        All other params are bound unchanged in every chunk.
+        """
+        if size < 1:
+            raise ProgrammingError(f"chunk size must be positive, got {size}.")
+
+        try:
+            values = self.params[param]  # type: ignore[index]
+        except (KeyError, IndexError, TypeError):
+            raise ProgrammingError(f"Cannot chunk on param {param!r}: it is not bound to the query.") from None
+
+        if isinstance(values, (set, frozenset)):
+            values = list(values)
+        elif not isinstance(values, (list, tuple)) and not _is_array_like(values):
+            raise ProgrammingError(f"Cannot chunk on param {param!r}: expected a sequence, got {type(values)}.")
+
+        queries = []
+        for start in range(0, max(len(values), 1), size):
+            if isinstance(self.params, dict):
+                params: dict | list = {**self.params, param: values[start : start + size]}
+            else:
+                params = list(self.params)  # type: ignore[arg-type]
+                params[param] = values[start : start + size]  # type: ignore[index]
+            queries.append(Query(self.operation, params))
+        return queries
+
+    def split_range(self, start_param: str | int, end_param: str | int, splits: int) -> list[Query]:
+        """Split the half-open range `[params[start_param], params[end_param])` into `splits` contiguous sub-ranges of
+        equal width, one query per sub-range, in ascending order
+
+        Range bounds may be datetimes, dates, ints (e.g. epoch millis) or floats.  Dates and ints are never split
+        below a width of one day or one unit, so fewer queries than `splits` may be returned for narrow ranges.
+        """
+        if splits < 1:
+            raise ProgrammingError(f"splits must be positive, got {splits}.")
+
+        try:
+            start, end = self.params[start_param], self.params[end_param]  # type: ignore[index]
+        except (KeyError, IndexError, TypeError):
+            raise ProgrammingError(
+                f"Cannot split on params {start_param!r} and {end_param!r}: they are not bound to the query."
+            ) from None
+
+        bounds = _split_bounds(start, end, splits)
+        queries = []
+        for sub_start, sub_end in zip(bounds, bounds[1:]):
+            if isinstance(self.params, dict):
+                params: dict | list = {**self.params, start_param: sub_start, end_param: sub_end}
+            else:
+                params = list(self.params)  # type: ignore[arg-type]
+                params[start_param] = sub_start  # type: ignore[index]
+                params[end_param] = sub_end  # type: ignore[index]
+            queries.append(Query(self.operation, params))
+        return queries
+
     @cached_property
     def escaped_params(self) -> tuple | dict | None:
         if not self.params:
@@ -3,6 +3,7 @@ from __future__ import annotations
 import datetime
 import decimal
 import itertools
+import time
 import typing as t
 from abc import ABC
 from abc import abstractmethod
@@ -26,6 +27,9 @@ _TYPE_MAP: t.Final[dict[str, type]] = {
     "BIG_DECIMAL": decimal.Decimal,
 }
 
+# rows converted and then made into rows at a time by fetchmany and fetchall
+_TIMING_BATCH_SIZE: t.Final[int] = 1024
+
 Column = namedtuple(
     "Column",
     "name type_code display_size internal_size precision scale null_ok",
@@ -54,14 +58,31 @@ class _BaseResultSet(ABC, t.Generic[RowType]):
             Column(name=name, type_code=_TYPE_MAP.get(type_code)) for name, type_code in zip(self._columns, self._types)
         ]
         self._row_maker: RowMaker[RowType] = self._row_factory(self._description)
+        # nanoseconds spent pulling converted rows from the data, and making rows of them, see `ClientTimings`
+        self._convert_time = 0
+        self._materialize_time = 0
 
     def _transform_row(self, row: list) -> RowType:
         return self._row_maker(row)
 
     def _transform_many(self, n: int | t.Literal["all"]) -> list[RowType]:
-        data = itertools.islice(self._data, n) if isinstance(n, int) else self._data
-        row_gen: t.Iterator[RowType] = map(self._transform_row, data)
-        return list(row_gen)
+        # converting and making rows in two passes times each once per batch rather than once per row, and only a batch
+        # of converted rows is held between the passes, rather than a second list of every fetched row
+        rows: list[RowType] = []
+        remaining = n if isinstance(n, int) else None
+        while remaining is None or remaining > 0:
+            size = _TIMING_BATCH_SIZE if remaining is None else min(remaining, _TIMING_BATCH_SIZE)
+            start = time.perf_counter_ns()
+            batch = list(itertools.islice(self._data, size))
+            converted = time.perf_counter_ns()
+            rows.extend(map(self._transform_row, batch))
+            self._convert_time += converted - start
+            self._materialize_time += time.perf_counter_ns() - converted
+            if len(batch) < size:
+                break
+            if remaining is not None:
+                remaining -= size
+        return rows
 
     @property
     def description(self) -> list[Column]:
@@ -131,7 +152,9 @@ class EmptyResultSet(_BaseResultSet[RowType]):
 
 class ResultSet(_BaseResultSet[RowType]):
     def _advance(self, rows: int):
+        start = time.perf_counter_ns()
         skipped = list(itertools.islice(self._data, rows))
+        self._convert_time += time.perf_counter_ns() - start
         num_skipped = len(skipped)
         if num_skipped < rows:
             raise IndexError("Cursor is exhausted")
@@ -167,12 +190,17 @@ class ResultSet(_BaseResultSet[RowType]):
             self._scroll_absolute(value)
 
     def fetchone(self):
+        start = time.perf_counter_ns()
         try:
             row = next(self._data)
-            self._rownumber += 1
-            return self._transform_row(row)
         except StopIteration:
             return None
+        converted = time.perf_counter_ns()
+        self._rownumber += 1
+        result = self._transform_row(row)
+        self._convert_time += converted - start
+        self._materialize_time += time.perf_counter_ns() - converted
+        return result
 
     def fetchmany(self, size: int | None):
         if size is None:
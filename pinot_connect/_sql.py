@@ -0,0 +1,251 @@
+"""Lightweight inspection of Pinot SQL
+
+This is not a SQL parser.  It only understands enough of a single SELECT statement to find its top level clauses, which
+is all that query splitting and result merging need.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import typing as t
+
+from .exceptions import ProgrammingError
+
+_LIMIT_RE: t.Final[re.Pattern] = re.compile(
+    r"\blimit\s+(\d+)(?:\s*,\s*(\d+))?(?:\s+offset\s+(\d+))?\s*;?\s*$", re.IGNORECASE
+)
+_ORDER_BY_RE: t.Final[re.Pattern] = re.compile(r"\border\s+by\b(.+?)(?:\blimit\b.*)?;?\s*$", re.IGNORECASE | re.DOTALL)
+_GROUP_BY_RE: t.Final[re.Pattern] = re.compile(
+    r"\bgroup\s+by\b(.+?)(?:\b(?:having|order\s+by|limit)\b.*)?;?\s*$", re.IGNORECASE | re.DOTALL
+)
+_HAVING_RE: t.Final[re.Pattern] = re.compile(r"\bhaving\b", re.IGNORECASE)
+_SELECT_RE: t.Final[re.Pattern] = re.compile(r"^\s*select\b(.+?)\bfrom\b", re.IGNORECASE | re.DOTALL)
+_WHERE_RE: t.Final[re.Pattern] = re.compile(r"\bwhere\b", re.IGNORECASE)
+_FROM_RE: t.Final[re.Pattern] = re.compile(r"\bfrom\b", re.IGNORECASE)
+_TABLE_RE: t.Final[re.Pattern] = re.compile(r"\s*([\"`]?)([\w.$-]+)\1")
+# the clauses that can follow a WHERE clause, or the end of the query
+_AFTER_WHERE_RE: t.Final[re.Pattern] = re.compile(r"\b(?:group\s+by|having|order\s+by|limit)\b|$", re.IGNORECASE)
+_ALIAS_RE: t.Final[re.Pattern] = re.compile(
+    r"^(.+?)(?:\s+as)?\s+(\"[^\"]+\"|`[^`]+`|[A-Za-z_][\w$]*)$", re.IGNORECASE | re.DOTALL
+)
+_ORDER_ITEM_RE: t.Final[re.Pattern] = re.compile(
+    r"^(.+?)(?:\s+(asc|desc))?(?:\s+nulls\s+(?:first|last))?$", re.IGNORECASE | re.DOTALL
+)
+# string literals, quoted identifiers (kept as they are) and numeric literals, for normalizing queries
+_LITERAL_RE: t.Final[re.Pattern] = re.compile(
+    r"(?P<string>'(?:[^']|'')*')|(?P<identifier>\"[^\"]*\"|`[^`]*`)|(?<![\w.$])-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?\b"
+)
+_PLACEHOLDER_LIST_RE: t.Final[re.Pattern] = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE_RE: t.Final[re.Pattern] = re.compile(r"\s+")
+
+
+def mask(sql: str) -> str:
+    """Return `sql` with string literals, quoted identifiers and parenthesized content replaced by spaces
+
+    The masked string has the same length as `sql`, so offsets found by searching it can be used to slice `sql`.  This
+    makes it possible to find top level keywords with regular expressions without matching inside sub-queries, function
+    calls or literals.
+    """
+    chars = list(sql)
+    depth = 0
+    quote: str | None = None
+    for i, char in enumerate(sql):
+        if quote is not None:
+            chars[i] = " "
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+            chars[i] = " "
+        elif char == "(":
+            depth += 1
+            chars[i] = " " if depth > 1 else char
+        elif char == ")":
+            depth -= 1
+            chars[i] = " " if depth > 0 else char
+        elif depth > 0:
+            chars[i] = " "
+    return "".join(chars)
+
+
+class Limit(t.NamedTuple):
+    limit: int
+    offset: int
+
+
+def find_limit(sql: str) -> Limit | None:
+    """Find the top level `LIMIT` of a query, supporting both `LIMIT offset, n` and `LIMIT n OFFSET offset` forms"""
+    match = _LIMIT_RE.search(mask(sql))
+    if match is None:
+        return None
+    first, second, offset = match.groups()
+    if second is not None:
+        return Limit(limit=int(second), offset=int(first))
+    return Limit(limit=int(first), offset=int(offset or 0))
+
+
+def replace_limit(sql: str, limit: int) -> str:
+    """Replace the top level `LIMIT` (and any offset) of a query with `LIMIT limit`"""
+    match = _LIMIT_RE.search(mask(sql))
+    if match is None:
+        return f"{sql.rstrip().rstrip(';')} LIMIT {limit}"
+    return f"{sql[: match.start()]}LIMIT {limit}"
+
+
+def remove_limit(sql: str) -> str:
+    """Remove the top level `LIMIT` (and any offset) of a query"""
+    match = _LIMIT_RE.search(mask(sql))
+    if match is None:
+        return sql
+    return sql[: match.start()].rstrip()
+
+
+def add_predicate(sql: str, predicate: str) -> str:
+    """AND a predicate into the top level `WHERE` of a query, adding a `WHERE` clause if there is none"""
+    sql = sql.rstrip().rstrip(";")
+    masked = mask(sql)
+    where = _WHERE_RE.search(masked)
+    if where is not None:
+        end = _AFTER_WHERE_RE.search(masked, where.end())
+        assert end is not None  # the pattern always matches the end of the query
+        condition = sql[where.end() : end.start()].strip()
+        return f"{sql[: where.end()]} ({condition}) AND {predicate} {sql[end.start() :].strip()}".rstrip()
+
+    from_ = _FROM_RE.search(masked)
+    if from_ is None:
+        raise ProgrammingError("Cannot add a predicate to a query without a FROM clause.")
+    end = _AFTER_WHERE_RE.search(masked, from_.end())
+    assert end is not None
+    return f"{sql[: end.start()].rstrip()} WHERE {predicate} {sql[end.start() :].strip()}".rstrip()
+
+
+def find_table(sql: str) -> str | None:
+    """Find the table of the top level `FROM` clause of a query, or `None` when selecting from a sub-query"""
+    from_ = _FROM_RE.search(mask(sql))
+    if from_ is None:
+        return None
+    match = _TABLE_RE.match(sql, from_.end())
+    return match.group(2) if match else None
+
+
+def split_top_level(sql: str, start: int, end: int, separator: str = ",") -> list[str]:
+    """Split `sql[start:end]` on `separator` wherever it is not inside parentheses or quotes"""
+    masked = mask(sql)
+    parts = []
+    part_start = start
+    for i in range(start, end):
+        if masked[i] == separator:
+            parts.append(sql[part_start:i].strip())
+            part_start = i + 1
+    parts.append(sql[part_start:end].strip())
+    return [part for part in parts if part]
+
+
+class OrderByItem(t.NamedTuple):
+    expression: str
+    descending: bool
+
+
+def find_order_by(sql: str) -> list[OrderByItem]:
+    """Find the expressions and directions of the top level `ORDER BY` of a query"""
+    masked = mask(sql)
+    match = _ORDER_BY_RE.search(masked)
+    if match is None:
+        return []
+
+    items = []
+    for item in split_top_level(sql, match.start(1), match.end(1)):
+        item_match = _ORDER_ITEM_RE.match(item)
+        assert item_match is not None  # the pattern matches any non-empty string
+        expression, direction = item_match.groups()
+        items.append(OrderByItem(expression.strip(), (direction or "asc").lower() == "desc"))
+    return items
+
+
+def find_group_by(sql: str) -> list[str]:
+    """Find the expressions of the top level `GROUP BY` of a query"""
+    match = _GROUP_BY_RE.search(mask(sql))
+    if match is None:
+        return []
+    return split_top_level(sql, match.start(1), match.end(1))
+
+
+def has_having(sql: str) -> bool:
+    """Whether a query has a top level `HAVING` clause"""
+    return _HAVING_RE.search(mask(sql)) is not None
+
+
+def normalize_identifier(identifier: str) -> str:
+    """Lower case an identifier and strip any quoting, for matching expressions against result column names"""
+    identifier = identifier.strip()
+    if len(identifier) > 1 and identifier[0] == identifier[-1] and identifier[0] in '"`':
+        identifier = identifier[1:-1]
+    return "".join(identifier.split()).lower()
+
+
+def remove_order_by(sql: str) -> str:
+    """Remove the top level `ORDER BY` of a query, keeping any `LIMIT`"""
+    masked = mask(sql)
+    match = _ORDER_BY_RE.search(masked)
+    if match is None:
+        return sql
+    limit = _LIMIT_RE.search(masked)
+    rest = sql[limit.start() :] if limit and limit.start() > match.start() else ""
+    return f"{sql[: match.start()].rstrip()} {rest}".rstrip()
+
+
+class SelectItem(t.NamedTuple):
+    expression: str
+    alias: str | None
+
+
+class SelectList(t.NamedTuple):
+    start: int
+    end: int
+    items: list[SelectItem]
+
+
+def _parse_select_item(item: str) -> SelectItem:
+    match = _ALIAS_RE.match(item)
+    # an item ending in a closing parenthesis or with a single token has no alias
+    if (
+        match is None
+        or match.group(2).lower() == "end"  # CASE ... END
+        or mask(item).rstrip().endswith(")")
+        and not match.group(2).startswith(('"', "`"))
+    ):
+        return SelectItem(item, None)
+    expression, alias = match.groups()
+    return SelectItem(expression.strip(), alias.strip('"`'))
+
+
+def find_select_list(sql: str) -> SelectList | None:
+    """Find the items of the top level select list of a query, with their aliases"""
+    match = _SELECT_RE.search(mask(sql))
+    if match is None:
+        return None
+    items = [_parse_select_item(item) for item in split_top_level(sql, match.start(1), match.end(1))]
+    return SelectList(match.start(1), match.end(1), items)
+
+
+def _replace_literal(match: re.Match) -> str:
+    return match.group("identifier") or "?"
+
+
+def normalize(sql: str) -> str:
+    """Replace the literals of a query with `?` placeholders, so queries differing only in their literals (or in the
+    number of values in an `IN` list) normalize to the same query, e.g. `SELECT * FROM t WHERE id IN (?) LIMIT ?`"""
+    normalized = _LITERAL_RE.sub(_replace_literal, sql)
+    normalized = _PLACEHOLDER_LIST_RE.sub("(?)", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip().rstrip(";").rstrip()
+
+
+def fingerprint(sql: str) -> str:
+    """A short hash of the normalized query, identifying the query's shape"""
+    return digest(normalize(sql))
+
+
+def digest(normalized: str) -> str:
+    """The fingerprint of an already normalized query"""
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import time
+import typing as t
+
+import httpx
+
+_Trace = t.Callable[[str, dict], t.Any]
+
+
+class SendTimer:
+    """Time one request, as an httpcore trace callback
+
+    httpcore emits no events while a request waits for a connection from the pool, so the first event, from the
+    connection the request was assigned to, ends the pool wait.  Backends other than httpcore emit no events at all,
+    which leaves the pool wait, time to first byte and download unmeasured."""
+
+    __slots__ = ("start", "end", "acquired", "headers", "body", "_trace")
+
+    def __init__(self, request: httpx.Request):
+        self._trace: _Trace | None = request.extensions.get("trace")
+        # a new dict, as the extensions may be the caller's request options
+        request.extensions = {**request.extensions, "trace": self}
+        self.acquired: int | None = None
+        self.headers: int | None = None
+        self.body: int | None = None
+        self.end: int | None = None
+        self.start = time.perf_counter_ns()
+
+    def _event(self, event_name: str) -> None:
+        now = time.perf_counter_ns()
+        if self.acquired is None:
+            self.acquired = now
+        if event_name.endswith(".receive_response_headers.complete"):
+            self.headers = now
+        elif event_name.endswith(".receive_response_body.complete"):
+            self.body = now
+
+    def __call__(self, event_name: str, info: dict) -> None:
+        self._event(event_name)
+        if self._trace is not None:
+            self._trace(event_name, info)
+
+    def finish(self) -> None:
+        self.end = time.perf_counter_ns()
+
+    @property
+    def pool_wait(self) -> int | None:
+        return self.acquired - self.start if self.acquired is not None else None
+
+    @property
+    def first_byte(self) -> int | None:
+        return self.headers - self.acquired if self.headers is not None and self.acquired is not None else None
+
+    @property
+    def download(self) -> int | None:
+        return self.body - self.headers if self.body is not None and self.headers is not None else None
+
+
+class AsyncSendTimer(SendTimer):
+    """`SendTimer` for async clients, whose trace callbacks are coroutine functions"""
+
+    __slots__ = ()
+
+    async def __call__(self, event_name: str, info: dict) -> None:  # type: ignore[override]
+        self._event(event_name)
+        if self._trace is not None:
+            await self._trace(event_name, info)
+
+
+class QueryTimer:
+    """Time the client's share of one execute call, summed over every request it makes"""
+
+    __slots__ = ("build", "decode", "sends")
+
+    def __init__(self) -> None:
+        self.build = 0
+        self.decode = 0
+        self.sends: list[SendTimer] = []
+
+
+def _total(values: t.Iterable[int | None]) -> int | None:
+    measured = [value for value in values if value is not None]
+    return sum(measured) if measured else None
@@ -0,0 +1,568 @@
+"""HTTP clients a connection can send its requests with
+
+A connection only needs a small part of `httpx.Client`'s interface, described by `Backend` (and `AsyncBackend` for
+async connections), so any client implementing it can be used, e.g. `Connection(MyBackend(...))`.  `httpx` is the
+default backend.  The others skip its client layer (auth flows, redirects, cookie persistence and event hooks), which
+takes a noticeable share of the time of small, fast queries, and send requests with a leaner HTTP library:
+
+- `httpcore`: httpx's own connection pool, used directly
+- `urllib3`: a `urllib3` pool manager (`pip install pinot-connect[urllib3]`), sync only
+- `aiohttp`: an `aiohttp` session (`pip install pinot-connect[aiohttp]`), async only
+
+All backends build `httpx.Request`s and return `httpx.Response`s, and raise httpx's exceptions, so deadlines,
+cancellation, circuit breaking and compression work the same whatever the backend.  Pick one with the `backend`
+argument of `connect`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import ssl
+import typing as t
+
+import httpcore
+import httpx
+from httpx import USE_CLIENT_DEFAULT
+from httpx import _types as httpx_types
+from httpx._client import ACCEPT_ENCODING
+from httpx._client import USER_AGENT
+from httpx._client import BaseClient
+from httpx._client import UseClientDefault
+
+from .exceptions import ProgrammingError
+from .options import DEFAULT_CONNECTION_LIMITS
+from .options import DEFAULT_REQUEST_TIMEOUT
+from .options import ClientOptions
+
+__all__ = [
+    "Backend",
+    "AsyncBackend",
+    "BackendName",
+    "AsyncBackendName",
+    "HttpcoreBackend",
+    "AsyncHttpcoreBackend",
+    "Urllib3Backend",
+    "AiohttpBackend",
+]
+
+BackendName = t.Literal["httpx", "httpcore", "urllib3"]
+AsyncBackendName = t.Literal["httpx", "httpcore", "aiohttp"]
+
+_READ_CHUNK_SIZE: t.Final[int] = 65_536
+_MAX_CACHED_URLS: t.Final[int] = 256
+
+
+@t.runtime_checkable
+class Backend(t.Protocol):
+    """The part of `httpx.Client`'s interface a `Connection` sends its requests with"""
+
+    @property
+    def is_closed(self) -> bool:
+        ...
+
+    def build_request(
+        self,
+        method: str,
+        url: httpx.URL | str,
+        *,
+        params: httpx_types.QueryParamTypes | None = None,
+        headers: httpx_types.HeaderTypes | None = None,
+        content: httpx_types.RequestContent | None = None,
+        json: t.Any | None = None,
+        cookies: httpx_types.CookieTypes | None = None,
+        timeout: httpx_types.TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+        extensions: httpx_types.RequestExtensions | None = None,
+    ) -> httpx.Request:
+        ...
+
+    def send(self, request: httpx.Request, *, stream: bool = False) -> httpx.Response:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+@t.runtime_checkable
+class AsyncBackend(t.Protocol):
+    """The part of `httpx.AsyncClient`'s interface an `AsyncConnection` sends its requests with"""
+
+    @property
+    def is_closed(self) -> bool:
+        ...
+
+    def build_request(
+        self,
+        method: str,
+        url: httpx.URL | str,
+        *,
+        params: httpx_types.QueryParamTypes | None = None,
+        headers: httpx_types.HeaderTypes | None = None,
+        content: httpx_types.RequestContent | None = None,
+        json: t.Any | None = None,
+        cookies: httpx_types.CookieTypes | None = None,
+        timeout: httpx_types.TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+        extensions: httpx_types.RequestExtensions | None = None,
+    ) -> httpx.Request:
+        ...
+
+    async def send(self, request: httpx.Request, *, stream: bool = False) -> httpx.Response:
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
+
+class _BaseBackend:
+    """Builds requests the way `httpx.Client.build_request` does, for backends sending them without httpx's client"""
+
+    # the ClientOptions a backend supports, on top of base_url, auth and headers
+    options: t.ClassVar[frozenset[str]] = frozenset({"timeout", "limits", "verify", "cert", "http1", "http2"})
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        auth: httpx.Auth | None = None,
+        headers: httpx_types.HeaderTypes | None = None,
+        timeout: httpx_types.TimeoutTypes = DEFAULT_REQUEST_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_CONNECTION_LIMITS,
+        verify: ssl.SSLContext | str | bool = True,
+        cert: httpx_types.CertTypes | None = None,
+        http1: bool = True,
+        http2: bool = False,
+    ):
+        self.base_url = httpx.URL(base_url)
+        self.timeout = httpx.Timeout(timeout)
+        self.limits = limits
+        self.headers = httpx.Headers(
+            {"Accept": "*/*", "Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive", "User-Agent": USER_AGENT}
+        )
+        self.headers.update(headers)
+        if auth is not None:
+            # only auth schemes that set headers up front (e.g. basic auth) are supported, without a challenge
+            request = httpx.Request("GET", self.base_url)
+            next(auth.sync_auth_flow(request))
+            self.headers["Authorization"] = request.headers["Authorization"]
+        self._ssl_context = (
+            httpx.create_ssl_context(verify=verify, cert=cert) if self.base_url.scheme == "https" else None
+        )
+        self._http1 = http1
+        self._http2 = http2
+        self._closed = False
+        self._urls: dict[httpx.URL | str, httpx.URL] = {}
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise RuntimeError("Cannot send a request, as the backend has been closed.")
+
+    def _merge_url(self, url: httpx.URL | str) -> httpx.URL:
+        # requests go to a handful of paths, so parse each once: url parsing is a large part of building a request
+        merged = self._urls.get(url)
+        if merged is None:
+            merged = httpx.URL(url)
+            if merged.is_relative_url:
+                merged = self.base_url.copy_with(raw_path=self.base_url.raw_path.rstrip(b"/") + merged.raw_path)
+            if len(self._urls) < _MAX_CACHED_URLS:
+                self._urls[url] = merged
+        return merged
+
+    def build_request(
+        self,
+        method: str,
+        url: httpx.URL | str,
+        *,
+        params: httpx_types.QueryParamTypes | None = None,
+        headers: httpx_types.HeaderTypes | None = None,
+        content: httpx_types.RequestContent | None = None,
+        json: t.Any | None = None,
+        cookies: httpx_types.CookieTypes | None = None,
+        timeout: httpx_types.TimeoutTypes | UseClientDefault = USE_CLIENT_DEFAULT,
+        extensions: httpx_types.RequestExtensions | None = None,
+    ) -> httpx.Request:
+        merged_headers = self.headers.copy()
+        if headers is not None:
+            merged_headers.update(headers)
+        timeout = self.timeout if isinstance(timeout, UseClientDefault) else httpx.Timeout(timeout)
+        return httpx.Request(
+            method,
+            self._merge_url(url),
+            params=params,
+            headers=merged_headers,
+            content=content,
+            json=json,
+            cookies=cookies,
+            extensions={"timeout": timeout.as_dict(), **(extensions or {})},
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self.base_url)!r})"
+
+
+# httpcore's exceptions have the same names as httpx's
+_HTTPCORE_ERRORS: t.Final[tuple[type[Exception], ...]] = (
+    httpcore.TimeoutException,
+    httpcore.NetworkError,
+    httpcore.ProtocolError,
+    httpcore.ProxyError,
+    httpcore.UnsupportedProtocol,
+)
+
+
+@contextlib.contextmanager
+def _httpcore_errors(request: httpx.Request) -> t.Iterator[None]:
+    try:
+        yield
+    except _HTTPCORE_ERRORS as e:
+        error = getattr(httpx, type(e).__name__, httpx.TransportError)
+        raise error(str(e), request=request) from e
+
+
+def _httpcore_request(request: httpx.Request) -> httpcore.Request:
+    return httpcore.Request(
+        method=request.method,
+        url=httpcore.URL(
+            scheme=request.url.raw_scheme,
+            host=request.url.raw_host,
+            port=request.url.port,
+            target=request.url.raw_path,
+        ),
+        headers=request.headers.raw,
+        content=request.stream,
+        extensions=request.extensions,
+    )
+
+
+class _HttpcoreStream(httpx.SyncByteStream):
+    def __init__(self, stream: t.Iterable[bytes], request: httpx.Request):
+        self._stream = stream
+        self._request = request
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        with _httpcore_errors(self._request):
+            yield from self._stream
+
+    def close(self) -> None:
+        if hasattr(self._stream, "close"):
+            self._stream.close()
+
+
+class _AsyncHttpcoreStream(httpx.AsyncByteStream):
+    def __init__(self, stream: t.AsyncIterable[bytes], request: httpx.Request):
+        self._stream = stream
+        self._request = request
+
+    async def __aiter__(self) -> t.AsyncIterator[bytes]:
+        with _httpcore_errors(self._request):
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class HttpcoreBackend(_BaseBackend):
+    """Send requests with an `httpcore` connection pool, without httpx's client
+
+    Args:
+        base_url: base url of the broker
+        auth: *(optional)* auth setting the `Authorization` header of every request, e.g. `httpx.BasicAuth`
+        headers: *(optional)* headers of every request
+        timeout: *(optional)* default timeout of requests.  Default: `DEFAULT_REQUEST_TIMEOUT`
+        limits: *(optional)* connection pool limits.  Default: `DEFAULT_CONNECTION_LIMITS`
+        verify: *(optional)* SSL verification, as for `httpx.Client`.  Default: `True`
+        cert: *(optional)* client SSL certificate, as for `httpx.Client`
+        http1: *(optional)* whether to support HTTP/1.1.  Default: `True`
+        http2: *(optional)* whether to use HTTP/2, which needs the `h2` package.  Default: `False`
+    """
+
+    def __init__(self, base_url: str, **kwargs: t.Any):
+        super().__init__(base_url, **kwargs)
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=self._ssl_context,
+            max_connections=self.limits.max_connections,
+            max_keepalive_connections=self.limits.max_keepalive_connections,
+            keepalive_expiry=self.limits.keepalive_expiry,
+            http1=self._http1,
+            http2=self._http2,
+        )
+
+    def send(self, request: httpx.Request, *, stream: bool = False) -> httpx.Response:
+        self._check_open()
+        with _httpcore_errors(request):
+            response = self._pool.handle_request(_httpcore_request(request))
+        result = httpx.Response(
+            response.status,
+            headers=response.headers,
+            stream=_HttpcoreStream(t.cast(t.Iterable[bytes], response.stream), request),
+            extensions=response.extensions,
+            request=request,
+        )
+        if not stream:
+            try:
+                result.read()
+            finally:
+                result.close()
+        return result
+
+    def close(self) -> None:
+        self._closed = True
+        self._pool.close()
+
+
+class AsyncHttpcoreBackend(_BaseBackend):
+    """Send requests with an async `httpcore` connection pool, without httpx's client
+
+    Takes the same arguments as `HttpcoreBackend`.
+    """
+
+    def __init__(self, base_url: str, **kwargs: t.Any):
+        super().__init__(base_url, **kwargs)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=self._ssl_context,
+            max_connections=self.limits.max_connections,
+            max_keepalive_connections=self.limits.max_keepalive_connections,
+            keepalive_expiry=self.limits.keepalive_expiry,
+            http1=self._http1,
+            http2=self._http2,
+        )
+
+    async def send(self, request: httpx.Request, *, stream: bool = False) -> httpx.Response:
+        self._check_open()
+        with _httpcore_errors(request):
+            response = await self._pool.handle_async_request(_httpcore_request(request))
+        result = httpx.Response(
+            response.status,
+            headers=response.headers,
+            stream=_AsyncHttpcoreStream(t.cast(t.AsyncIterable[bytes], response.stream), request),
+            extensions=response.extensions,
+            request=request,
+        )
+        if not stream:
+            try:
+                await result.aread()
+            finally:
+                await result.aclose()
+        return result
+
+    async def aclose(self) -> None:
+        self._closed = True
+        await self._pool.aclose()
+
+
+class _Urllib3Stream(httpx.SyncByteStream):
+    def __init__(self, response: t.Any, backend: Urllib3Backend, request: httpx.Request):
+        self._response = response
+        self._backend = backend
+        self._request = request
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        with self._backend._errors(self._request):
+            yield from self._response.stream(_READ_CHUNK_SIZE, decode_content=False)
+
+    def close(self) -> None:
+        self._response.release_conn()
+
+
+class Urllib3Backend(_BaseBackend):
+    """Send requests with a `urllib3` pool manager
+
+    Requires the `urllib3` package (`pip install pinot-connect[urllib3]`).  Takes the same arguments as
+    `HttpcoreBackend`, except that urllib3 only speaks HTTP/1.1.  Up to `max_keepalive_connections` connections per host
+    are kept open for reuse.
+    """
+
+    def __init__(self, base_url: str, **kwargs: t.Any):
+        try:
+            import urllib3
+        except ImportError as e:  # pragma: no cover
+            raise ImportError("The urllib3 backend requires urllib3: pip install pinot-connect[urllib3]") from e
+        super().__init__(base_url, **kwargs)
+        if self._http2 or not self._http1:
+            raise ProgrammingError("The urllib3 backend only supports HTTP/1.1.")
+        self._urllib3 = urllib3
+        self._pool = urllib3.PoolManager(
+            maxsize=self.limits.max_keepalive_connections or DEFAULT_CONNECTION_LIMITS.max_keepalive_connections,
+            ssl_context=self._ssl_context,
+        )
+
+    @contextlib.contextmanager
+    def _errors(self, request: httpx.Request) -> t.Iterator[None]:
+        exceptions = self._urllib3.exceptions
+        try:
+            yield
+        except exceptions.NewConnectionError as e:  # a subclass of ConnectTimeoutError
+            raise httpx.ConnectError(str(e), request=request) from e
+        except exceptions.ConnectTimeoutError as e:
+            raise httpx.ConnectTimeout(str(e), request=request) from e
+        except exceptions.ReadTimeoutError as e:
+            raise httpx.ReadTimeout(str(e), request=request) from e
+        except exceptions.ProtocolError as e:
+            raise httpx.RemoteProtocolError(str(e), request=request) from e
+        except exceptions.HTTPError as e:
+            raise httpx.TransportError(str(e), request=request) from e
+
+    def send(self, request: httpx.Request, *, stream: bool = False) -> httpx.Response:
+        self._check_open()
+        timeout = request.extensions.get("timeout", {})
+        with self._errors(request):
+            response = self._pool.urlopen(
+                request.method,
+                str(request.url),
+                body=request.content,
+                headers=dict(request.headers),
+                timeout=self._urllib3.Timeout(connect=timeout.get("connect"), read=timeout.get("read")),
+                retries=False,
+                redirect=False,
+                preload_content=False,
+                decode_content=False,
+            )
+        result = httpx.Response(
+            response.status,
+            headers=list(response.headers.items()),
+            stream=_Urllib3Stream(response, self, request),
+            request=request,
+        )
+        if not stream:
+            try:
+                result.read()
+            finally:
+                result.close()
+        return result
+
+    def close(self) -> None:
+        self._closed = True
+        self._pool.clear()
+
+
+class _AiohttpStream(httpx.AsyncByteStream):
+    def __init__(self, response: t.Any, backend: AiohttpBackend, request: httpx.Request):
+        self._response = response
+        self._backend = backend
+        self._request = request
+
+    async def __aiter__(self) -> t.AsyncIterator[bytes]:
+        with self._backend._errors(self._request):
+            async for chunk in self._response.content.iter_chunked(_READ_CHUNK_SIZE):
+                yield chunk
+
+    async def aclose(self) -> None:
+        self._response.release()
+
+
+class AiohttpBackend(_BaseBackend):
+    """Send requests with an `aiohttp` client session
+
+    Requires the `aiohttp` package (`pip install pinot-connect[aiohttp]`).  Takes the same arguments as
+    `HttpcoreBackend`, except that aiohttp only speaks HTTP/1.1.  The session is created on the first request, as it
+    must be created in the event loop it is used from.
+    """
+
+    def __init__(self, base_url: str, **kwargs: t.Any):
+        try:
+            import aiohttp
+            import yarl
+        except ImportError as e:  # pragma: no cover
+            raise ImportError("The aiohttp backend requires aiohttp: pip install pinot-connect[aiohttp]") from e
+        super().__init__(base_url, **kwargs)
+        if self._http2 or not self._http1:
+            raise ProgrammingError("The aiohttp backend only supports HTTP/1.1.")
+        self._aiohttp = aiohttp
+        self._yarl = yarl
+        self._session: t.Any = None
+
+    def _get_session(self) -> t.Any:
+        if self._session is None:
+            connector = self._aiohttp.TCPConnector(
+                limit=self.limits.max_connections or 0,
+                limit_per_host=self.limits.max_connections or 0,
+                keepalive_timeout=self.limits.keepalive_expiry,
+                ssl=self._ssl_context if self._ssl_context is not None else True,
+            )
+            # responses are decoded by httpx, the same way for every backend
+            self._session = self._aiohttp.ClientSession(connector=connector, auto_decompress=False)
+        return self._session
+
+    @contextlib.contextmanager
+    def _errors(self, request: httpx.Request) -> t.Iterator[None]:
+        aiohttp = self._aiohttp
+        try:
+            yield
+        except aiohttp.ClientConnectorError as e:
+            raise httpx.ConnectError(str(e), request=request) from e
+        except getattr(aiohttp, "ConnectionTimeoutError", ()) as e:
+            raise httpx.ConnectTimeout(str(e), request=request) from e
+        except (aiohttp.ServerTimeoutError, asyncio.TimeoutError) as e:
+            raise httpx.ReadTimeout(str(e), request=request) from e
+        except aiohttp.ServerDisconnectedError as e:
+            raise httpx.RemoteProtocolError(str(e), request=request) from e
+        except aiohttp.ClientError as e:
+            raise httpx.TransportError(str(e), request=request) from e
+
+    async def send(self, request: httpx.Request, *, stream: bool = False) -> httpx.Response:
+        self._check_open()
+        timeout = request.extensions.get("timeout", {})
+        client_timeout = self._aiohttp.ClientTimeout(
+            connect=timeout.get("pool"), sock_connect=timeout.get("connect"), sock_read=timeout.get("read")
+        )
+        with self._errors(request):
+            response = await self._get_session().request(
+                request.method,
+                # already encoded by httpx, which aiohttp must not quote again
+                self._yarl.URL(str(request.url), encoded=True),
+                data=request.content,
+                headers=dict(request.headers),
+                timeout=client_timeout,
+                allow_redirects=False,
+            )
+        result = httpx.Response(
+            response.status,
+            headers=list(response.raw_headers),
+            stream=_AiohttpStream(response, self, request),
+            request=request,
+        )
+        if not stream:
+            try:
+                await result.aread()
+            finally:
+                await result.aclose()
+        return result
+
+    async def aclose(self) -> None:
+        self._closed = True
+        if self._session is not None:
+            await self._session.close()
+
+
+_BACKENDS: t.Final[dict[str, type]] = {"httpx": httpx.Client, "httpcore": HttpcoreBackend, "urllib3": Urllib3Backend}
+_ASYNC_BACKENDS: t.Final[dict[str, type]] = {
+    "httpx": httpx.AsyncClient,
+    "httpcore": AsyncHttpcoreBackend,
+    "aiohttp": AiohttpBackend,
+}
+
+
+def _backend_class(name: str, backends: t.Mapping[str, type]) -> type:
+    if name not in backends:
+        raise ProgrammingError(f"Unknown backend {name!r}, expected one of {', '.join(backends)}.")
+    return backends[name]
+
+
+def _backend_options(backend: type, options: dict[str, t.Any]) -> dict[str, t.Any]:
+    """The client options to create a backend with, refusing options it doesn't support that aren't left at default"""
+    if issubclass(backend, BaseClient):
+        return options
+    supported: frozenset[str] = getattr(backend, "options")
+    defaults = dataclasses.asdict(ClientOptions())
+    unsupported = [
+        name for name, value in options.items() if name not in supported and value != defaults.get(name, None)
+    ]
+    if unsupported:
+        raise ProgrammingError(f"The {backend.__name__} backend doesn't support {', '.join(unsupported)}.")
+    return {name: value for name, value in options.items() if name in supported}
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import threading
+import time
+import typing as t
+
+import httpx
+from typing_extensions import Self
+
+from .exceptions import OperationalError
+from .exceptions import ProgrammingError
+
+__all__ = ["CircuitBreaker", "CircuitPolicy", "CircuitEvent", "CircuitStats", "CircuitState"]
+
+CircuitState = t.Literal["closed", "open", "half_open"]
+CircuitListener = t.Callable[["CircuitEvent"], None]
+
+
+@dataclasses.dataclass(frozen=True)
+class CircuitPolicy:
+    """When the circuit of a broker opens, and how it recovers
+
+    Outcomes of the last `window_size` requests to a broker are kept, and the circuit opens when either the rate of
+    failed requests or the rate of slow requests in the window reaches its threshold.  A request fails when it raises
+    (e.g. connection errors and timeouts) or when the broker answers with a 5xx status; query errors reported by Pinot
+    are not broker failures.
+
+    Attributes:
+        failure_rate: *(optional)* fraction of failed requests in the window that opens the circuit.  Default: `0.5`
+        slow_call_duration: *(optional)* seconds after which a request counts as slow.  Default: latency is not
+            considered
+        slow_call_rate: *(optional)* fraction of slow requests in the window that opens the circuit.  Default: `0.8`
+        window_size: *(optional)* number of most recent requests the rates are computed over.  Default: `20`
+        min_calls: *(optional)* number of requests in the window before the circuit can open.  Default: `10`
+        open_duration: *(optional)* seconds the circuit stays open before probing the broker again.  Default: `30`
+        half_open_calls: *(optional)* number of probe requests let through while half-open, all of which must succeed
+            to close the circuit.  Default: `1`
+    """
+
+    failure_rate: float = 0.5
+    slow_call_duration: float | None = None
+    slow_call_rate: float = 0.8
+    window_size: int = 20
+    min_calls: int = 10
+    open_duration: float = 30.0
+    half_open_calls: int = 1
+
+    def __post_init__(self):
+        for name in ("failure_rate", "slow_call_rate"):
+            if not 0 < getattr(self, name) <= 1:
+                raise ProgrammingError(f"{name} must be in (0, 1], got {getattr(self, name)}.")
+        if not 1 <= self.min_calls <= self.window_size:
+            raise ProgrammingError(
+                f"min_calls must be between 1 and window_size ({self.window_size}), got {self.min_calls}."
+            )
+        if self.half_open_calls < 1:
+            raise ProgrammingError(f"half_open_calls must be positive, got {self.half_open_calls}.")
+        if self.open_duration < 0:
+            raise ProgrammingError(f"open_duration can't be negative, got {self.open_duration}.")
+
+
+@dataclasses.dataclass(frozen=True)
+class CircuitEvent:
+    """A change of state of the circuit of a broker
+
+    Attributes:
+        endpoint: the broker, as `scheme://host[:port]`
+        previous: the state before the change
+        state: the state after the change
+        reason: why the state changed
+        time: when the state changed, in seconds since the epoch
+    """
+
+    endpoint: str
+    previous: CircuitState
+    state: CircuitState
+    reason: str
+    time: float
+
+
+@dataclasses.dataclass(frozen=True)
+class CircuitStats:
+    """Snapshot of the circuit of a broker
+
+    Attributes:
+        state: the current state of the circuit
+        calls: total number of requests sent to the broker
+        failures: total number of requests to the broker that failed
+        slow_calls: total number of requests to the broker that were slow
+        rejected: total number of requests not sent to the broker because its circuit was open
+        opened: number of times the circuit opened
+    """
+
+    state: CircuitState
+    calls: int
+    failures: int
+    slow_calls: int
+    rejected: int
+    opened: int
+
+
+def _origin(url: httpx.URL) -> str:
+    return f"{url.scheme}://{url.netloc.decode('ascii')}"
+
+
+def _route(request: httpx.Request, endpoint: httpx.URL) -> None:
+    """Send a request to another broker, keeping its path and query"""
+    if (request.url.scheme, request.url.netloc) == (endpoint.scheme, endpoint.netloc):
+        return
+    request.url = request.url.copy_with(scheme=endpoint.scheme, netloc=endpoint.netloc)
+    request.headers["Host"] = endpoint.netloc.decode("ascii")
+
+
+class _Circuit:
+    __slots__ = (
+        "endpoint",
+        "url",
+        "policy",
+        "state",
+        "outcomes",
+        "opened_at",
+        "probes",
+        "probe_successes",
+        "calls",
+        "failures",
+        "slow_calls",
+        "rejected",
+        "opened",
+        "_lock",
+    )
+
+    def __init__(self, url: httpx.URL, policy: CircuitPolicy):
+        self.endpoint = _origin(url)
+        self.url = url
+        self.policy = policy
+        self.state: CircuitState = "closed"
+        # (failed, slow) of the most recent requests while closed
+        self.outcomes: collections.deque[tuple[bool, bool]] = collections.deque(maxlen=policy.window_size)
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: CircuitState, reason: str) -> CircuitEvent:
+        event = CircuitEvent(self.endpoint, self.state, state, reason, time.time())
+        self.state = state
+        self.probes = self.probe_successes = 0
+        if state == "open":
+            self.opened += 1
+            self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        return event
+
+    def acquire(self) -> tuple[bool | None, CircuitEvent | None]:
+        # try to let a request through, returning whether it is a probe (None if rejected) and any state change
+        with self._lock:
+            event = None
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.policy.open_duration:
+                    self.rejected += 1
+                    return None, None
+                event = self._transition("half_open", f"open for {self.policy.open_duration}s, probing")
+            if self.state == "half_open":
+                if self.probes >= self.policy.half_open_calls:
+                    self.rejected += 1
+                    return None, event
+                self.probes += 1
+                return True, event
+            return False, event
+
+    def release(self, probe: bool) -> None:
+        with self._lock:
+            if probe and self.state == "half_open":
+                self.probes -= 1
+
+    def record(self, probe: bool, failed: bool, slow: bool) -> CircuitEvent | None:
+        with self._lock:
+            self.calls += 1
+            self.failures += failed
+            self.slow_calls += slow
+            if probe:
+                if self.state != "half_open":
+                    return None
+                if failed or slow:
+                    return self._transition("open", f"probe {'failed' if failed else 'was slow'}")
+                self.probe_successes += 1
+                if self.probe_successes >= self.policy.half_open_calls:
+                    return self._transition("closed", f"{self.probe_successes} probe(s) succeeded")
+                return None
+            if self.state != "closed":
+                # the outcome of a request sent before the circuit opened
+                return None
+
+            self.outcomes.append((failed, slow))
+            if len(self.outcomes) < self.policy.min_calls:
+                return None
+            failure_rate = sum(f for f, _ in self.outcomes) / len(self.outcomes)
+            if failure_rate >= self.policy.failure_rate:
+                return self._transition("open", f"failure rate {failure_rate:.0%} of the last {len(self.outcomes)}")
+            slow_rate = sum(s for _, s in self.outcomes) / len(self.outcomes)
+            if self.policy.slow_call_duration is not None and slow_rate >= self.policy.slow_call_rate:
+                return self._transition("open", f"slow call rate {slow_rate:.0%} of the last {len(self.outcomes)}")
+            return None
+
+    def stats(self) -> CircuitStats:
+        return CircuitStats(self.state, self.calls, self.failures, self.slow_calls, self.rejected, self.opened)
+
+
+class _Call:
+    """Records the outcome of one request on its circuit"""
+
+    __slots__ = ("_breaker", "_circuit", "_probe", "_started", "_response")
+
+    def __init__(self, breaker: CircuitBreaker, circuit: _Circuit, probe: bool):
+        self._breaker = breaker
+        self._circuit = circuit
+        self._probe = probe
+        self._started = 0.0
+        self._response: httpx.Response | None = None
+
+    def __enter__(self) -> Self:
+        self._started = time.perf_counter()
+        return self
+
+    def done(self, response: httpx.Response) -> httpx.Response:
+        self._response = response
+        return response
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            # cancelled (or interrupted): says nothing about the broker
+            self._circuit.release(self._probe)
+            return
+        elapsed = time.perf_counter() - self._started
+        failed = exc_type is not None or (self._response is not None and self._response.status_code >= 500)
+        slow_call_duration = self._circuit.policy.slow_call_duration
+        slow = slow_call_duration is not None and elapsed > slow_call_duration
+        event = self._circuit.record(self._probe, failed, slow)
+        if event is not None:
+            self._breaker._emit(event)
+
+
+class CircuitBreaker:
+    """Per-broker circuit breaking of the requests sent by a connection
+
+    While a broker is healthy, its circuit is closed and requests go through.  Once its failure or slow request rate
+    reaches the policy's thresholds, the circuit opens and requests to it fail fast with `OperationalError`, or are
+    routed to the first fallback broker whose circuit is closed.  After `open_duration`, the circuit is half-open: a
+    limited number of probe requests are let through, which close the circuit if they succeed and open it again if any
+    fails.
+
+    The same breaker can be used by sync and async connections.
+
+    Args:
+        policy: *(optional)* when circuits open and how they recover.  Default: `CircuitPolicy()`
+        fallbacks: *(optional)* base urls of other brokers (e.g. `http://broker-2:8099`) to route requests to while the
+            circuit of the connection's broker is open, in order of preference
+        listeners: *(optional)* callables called with a `CircuitEvent` on every state change.  They are called on the
+            thread sending the request, so they should be quick and must not raise
+    """
+
+    def __init__(
+        self,
+        policy: CircuitPolicy | None = None,
+        *,
+        fallbacks: t.Sequence[str] = (),
+        listeners: t.Sequence[CircuitListener] = (),
+    ):
+        self.policy = policy or CircuitPolicy()
+        self.fallbacks = [httpx.URL(url) for url in fallbacks]
+        self._listeners = list(listeners)
+        self._circuits: dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: CircuitListener) -> None:
+        """Call `listener` with a `CircuitEvent` on every state change"""
+        self._listeners.append(listener)
+
+    def state(self, endpoint: str) -> CircuitState:
+        """The state of the circuit of a broker, given as its base url"""
+        circuit = self._circuits.get(_origin(httpx.URL(endpoint)))
+        return circuit.state if circuit is not None else "closed"
+
+    def stats(self) -> dict[str, CircuitStats]:
+        """A snapshot of the circuit of every broker requests were sent to, by `scheme://host[:port]`"""
+        return {endpoint: circuit.stats() for endpoint, circuit in self._circuits.items()}
+
+    def _circuit(self, url: httpx.URL) -> _Circuit:
+        endpoint = _origin(url)
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            with self._lock:
+                circuit = self._circuits.setdefault(endpoint, _Circuit(url, self.policy))
+        return circuit
+
+    def _emit(self, event: CircuitEvent) -> None:
+        for listener in self._listeners:
+            listener(event)
+
+    def _call(self, request: httpx.Request) -> _Call:
+        """Admit a request to the first broker whose circuit lets it through, routing it there"""
+        circuits = [self._circuit(request.url)]
+        circuits.extend(circuit for circuit in map(self._circuit, self.fallbacks) if circuit is not circuits[0])
+        for circuit in circuits:
+            probe, event = circuit.acquire()
+            if event is not None:
+                self._emit(event)
+            if probe is not None:
+                _route(request, circuit.url)
+                return _Call(self, circuit, probe)
+        endpoints = ", ".join(circuit.endpoint for circuit in circuits)
+        raise OperationalError(f"Circuit open for {endpoints}: failing fast without sending the query")
@@ -1,22 +1,59 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import dataclasses
+import re
+import threading
 import typing as t
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 
 import httpx
+import orjson
 from httpx._client import BaseClient
+from httpx._client import ClientState
 from typing_extensions import Self
 
+from ._deadline import _use_deadline
+from ._merge import DEFAULT_GROUP_LIMIT
+from ._merge import AggregationFunction
+from ._observe import QueryObserver
+from ._query import Query
+from ._query import _escape_param
+from .backends import _ASYNC_BACKENDS
+from .backends import _BACKENDS
+from .backends import AsyncBackend
+from .backends import AsyncBackendName
+from .backends import Backend
+from .backends import BackendName
+from .backends import _backend_class
+from .backends import _backend_options
+from .circuit import CircuitBreaker
 from .context import CoroContextManager
 from .cursor import AsyncCursor
 from .cursor import BaseCursor
 from .cursor import Cursor
 from .exceptions import *
+from .metrics import MetricsRegistry
+from .options import DEFAULT_CONNECTION_LIMITS
 from .options import ClientOptions
+from .options import CompressionOptions
+from .options import KeepAliveOptions
 from .options import QueryOptions
+from .options import RequestOptions
+from .ratelimit import RateLimit
+from .ratelimit import RateLimiter
+from .ratelimit import _parse_quota
 from .rows import RowFactory
 from .rows import RowType
 from .rows import tuple_row
+from .scheduler import AsyncScheduler
+from .scheduler import Scheduler
+from .slowlog import SlowQueryLog
+from .statements import StatementRegistry
+from .tracing import QueryTracer
 
 __all__ = [
     "BaseConnection",
@@ -24,8 +61,23 @@ __all__ = [
     "AsyncConnection",
 ]
 
+DEFAULT_SCAN_LIMIT: t.Final[int] = 1_000_000
+_IDENTIFIER_RE: t.Final[re.Pattern] = re.compile(r'^(?:"[^"]+"|`[^`]+`|[A-Za-z_][\w$.]*)$')
+
+
+def _max_connections(client: t.Any) -> int | None:
+    """The most connections the pool of a client opens at once, when it can tell"""
+    limits = getattr(client, "limits", None)
+    if isinstance(limits, httpx.Limits):
+        return limits.max_connections
+    # httpx clients don't expose their limits, but the pool of their default transport does
+    max_connections = getattr(getattr(getattr(client, "_transport", None), "_pool", None), "_max_connections", None)
+    return max_connections if isinstance(max_connections, int) else None
+
+
 _CursorType = t.TypeVar("_CursorType", bound=BaseCursor)
-_ClientType = t.TypeVar("_ClientType", bound=BaseClient)
+_ClientType = t.TypeVar("_ClientType", bound=t.Union[Backend, AsyncBackend])
+_SchedulerType = t.Union[Scheduler, AsyncScheduler]
 
 
 class BaseConnection(t.Generic[_CursorType, _ClientType]):
@@ -43,16 +95,50 @@ class BaseConnection(t.Generic[_CursorType, _ClientType]):
         client: _ClientType,
         *,
         query_options: QueryOptions | None = None,
+        controller_url: str | None = None,
+        scheduler: _SchedulerType | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        compression: CompressionOptions | None = None,
+        tracer: QueryTracer | None = None,
+        metrics: MetricsRegistry | None = None,
+        statements: StatementRegistry | None = None,
+        slow_query_log: SlowQueryLog | None = None,
     ):
         """Base class for building connections to Apache Pinot
 
         Args:
-            client: an instance of subclass of httpx.Client
+            client: the client to send requests with: an `httpx.Client` (`httpx.AsyncClient` for async connections) or
+                any other backend.  See `pinot_connect.backends`
             query_options: *(optional)*: global query options for all queries made from the connection
+            controller_url: *(optional)*: base url of the Pinot controller, used for reading table metadata
+            scheduler: *(optional)*: scheduler to queue the connection's requests by priority class
+            rate_limiter: *(optional)*: per-table rate limits of the connection's queries
+            circuit_breaker: *(optional)*: per-broker circuit breaking of the connection's requests
+            compression: *(optional)*: encodings of query responses to accept, by query size class
+            tracer: *(optional)*: OpenTelemetry tracing of the connection's queries
+            metrics: *(optional)*: client side metrics of the connection's queries
+            statements: *(optional)*: statistics of the connection's queries by query fingerprint
+            slow_query_log: *(optional)*: log of the connection's queries that exceed thresholds
         """
         self._client = client
         self._cursors: set[_CursorType] = set()
         self.query_options = query_options or QueryOptions()
+        self.controller_url = controller_url.rstrip("/") if controller_url else None
+        self.scheduler = scheduler
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.compression = compression
+        self.tracer = tracer
+        self.metrics = metrics
+        self.statements = statements
+        self.slow_query_log = slow_query_log
+        # what each execute call did is passed to these, see `BaseCursor._observe`
+        self._observers: tuple[QueryObserver, ...] = tuple(
+            observer for observer in (metrics, statements, slow_query_log) if observer is not None
+        )
+        # stops the background keep-alive pings: an event for sync connections, a task for async ones
+        self._keep_alive: threading.Event | asyncio.Task | None = None
 
     @classmethod
     def _connect(
@@ -67,10 +153,26 @@ class BaseConnection(t.Generic[_CursorType, _ClientType]):
         database: str | None,
         query_options: QueryOptions | None,
         client_options: ClientOptions | None,
+        controller_url: str | None,
+        scheduler: _SchedulerType | None,
+        rate_limiter: RateLimiter | None,
+        circuit_breaker: CircuitBreaker | None,
+        keep_alive: KeepAliveOptions | None,
+        tracer: QueryTracer | None,
+        metrics: MetricsRegistry | None,
+        statements: StatementRegistry | None,
+        slow_query_log: SlowQueryLog | None,
     ) -> Self:
         headers = {"database": database} if database else None
         basic_auth = httpx.BasicAuth(username, password) if username and password else None
         safe_client_options = dataclasses.asdict(client_options) if client_options is not None else {}
+        # not an httpx client option: the cursor sets Accept-Encoding on each query request
+        safe_client_options.pop("compression", None)
+        if keep_alive is not None:
+            safe_client_options["limits"] = keep_alive.limits(
+                safe_client_options.get("limits", DEFAULT_CONNECTION_LIMITS)
+            )
+        safe_client_options = _backend_options(client, safe_client_options)
 
         c = client(
             base_url=f"{scheme}://{host}:{port}",
@@ -78,13 +180,116 @@ class BaseConnection(t.Generic[_CursorType, _ClientType]):
             headers=headers,
             **safe_client_options,
         )
-        return cls(c, query_options=query_options)
+        return cls(
+            c,
+            query_options=query_options,
+            controller_url=controller_url,
+            scheduler=scheduler,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
+            compression=client_options.compression if client_options is not None else None,
+            tracer=tracer,
+            metrics=metrics,
+            statements=statements,
+            slow_query_log=slow_query_log,
+        )
 
     @property
     def closed(self) -> bool:
         """`True` if connection's client is closed"""
         return self._client.is_closed
 
+    def _warmup_connections(self, n: int) -> int:
+        """The number of connections to warm up: `n`, but no more than the pool opens at once, as checks beyond that
+        would wait for a connection held by another check until the pool times out"""
+        if n < 1:
+            raise ProgrammingError(f"Number of connections to warm up must be positive, got {n}.")
+        max_connections = _max_connections(self._client)
+        return min(n, max_connections) if max_connections is not None else n
+
+    @staticmethod
+    def _check_health(response: httpx.Response) -> None:
+        if httpx.codes.is_error(response.status_code):
+            raise OperationalError(f"Broker health check failed [{response.status_code}]")
+
+    def _controller_request(self, path: str) -> httpx.Request:
+        if self.controller_url is None:
+            raise ProgrammingError(
+                "Reading table metadata requires the connection to be created with a controller_url."
+            )
+        return self._client.build_request("GET", f"{self.controller_url}{path}")
+
+    @staticmethod
+    def _parse_segments(response: httpx.Response) -> list[str]:
+        if httpx.codes.is_error(response.status_code):
+            raise OperationalError(f"Failed to list segments [{response.status_code}]: {response.text}")
+        # the controller returns a list of {table type: segment names} objects, one per table type
+        body = orjson.loads(response.content)
+        by_type = body if isinstance(body, list) else [body]
+        return [segment for segments in by_type for names in segments.values() for segment in names]
+
+    def _set_rate_limit_from_quota(self, table: str, response: httpx.Response, burst: int | None) -> RateLimit | None:
+        if self.rate_limiter is None:
+            raise ProgrammingError("Loading a table's rate limit requires the connection to have a rate_limiter.")
+        if httpx.codes.is_error(response.status_code):
+            raise OperationalError(f"Failed to read table config [{response.status_code}]: {response.text}")
+        quota = _parse_quota(orjson.loads(response.content))
+        limit = RateLimit(quota, burst) if quota is not None else None
+        self.rate_limiter.set_limit(table, limit)
+        return limit
+
+    @staticmethod
+    def _build_scan_queries(
+        table: str,
+        columns: t.Sequence[str] | None,
+        where: str | None,
+        params: dict | tuple | list | None,
+        parallelism: int,
+        *,
+        partition_column: str | None,
+        segments: t.Sequence[str] | None,
+        limit: int,
+    ) -> list[str]:
+        if parallelism < 1:
+            raise ProgrammingError(f"parallelism must be positive, got {parallelism}.")
+        # table and column names go into the sql as they are, so they must be names rather than sql
+        if _IDENTIFIER_RE.match(table) is None:
+            raise ProgrammingError(f"table must be a table name, got {table!r}.")
+        for column in columns or ():
+            if _IDENTIFIER_RE.match(column) is None:
+                raise ProgrammingError(f"columns must be column names, got {column!r}.")
+
+        predicates = []
+        if partition_column is not None:
+            if _IDENTIFIER_RE.match(partition_column) is None:
+                raise ProgrammingError(f"partition_column must be a column name, got {partition_column!r}.")
+            # every value must land in exactly one slice: ABS keeps negative values in range, FLOOR makes fractional
+            # values whole (and ABS work on doubles, which can't overflow), and the first slice takes the nulls
+            slices = [f"MOD(ABS(FLOOR({partition_column})), {parallelism}) = {i}" for i in range(parallelism)]
+            predicates = [f"({slices[0]} OR {partition_column} IS NULL)", *slices[1:]]
+        elif segments:
+            # round robin the segments so every sub-query scans a similar number of segments
+            groups = [list(segments[i::parallelism]) for i in range(min(parallelism, len(segments)))]
+            predicates = [f"$segmentName IN {_escape_param('segments', group)}" for group in groups]
+        else:
+            raise ProgrammingError("Table has no segments to scan.")
+
+        bound_where = Query(where, params).operation_with_params if where else None
+        select = f"SELECT {', '.join(columns) if columns else '*'} FROM {table} WHERE "
+        return [
+            f"{select}{f'({bound_where}) AND ' if bound_where else ''}{predicate} LIMIT {limit}"
+            for predicate in predicates
+        ]
+
+    @staticmethod
+    def _check_scan_truncation(cursor: BaseCursor, limit: int) -> None:
+        if cursor.rowcount is not None and cursor.rowcount >= limit:
+            warnings.warn(
+                f"A parallel scan sub-query returned {limit} rows, so its results may be truncated.  Increase "
+                f"limit_per_query or parallelism.",
+                stacklevel=3,
+            )
+
     def _build_cursor(
         self,
         cursor: type[_CursorType],
@@ -98,7 +303,7 @@ class BaseConnection(t.Generic[_CursorType, _ClientType]):
         return c
 
 
-class Connection(BaseConnection[Cursor, httpx.Client]):
+class Connection(BaseConnection[Cursor, Backend]):
     @classmethod
     def connect(
         cls,
@@ -110,6 +315,17 @@ class Connection(BaseConnection[Cursor, httpx.Client]):
         database: str | None = None,
         query_options: QueryOptions | None = None,
         client_options: ClientOptions | None = None,
+        controller_url: str | None = None,
+        scheduler: Scheduler | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        warmup: int = 0,
+        keep_alive: KeepAliveOptions | None = None,
+        backend: BackendName = "httpx",
+        tracer: QueryTracer | None = None,
+        metrics: MetricsRegistry | None = None,
+        statements: StatementRegistry | None = None,
+        slow_query_log: SlowQueryLog | None = None,
     ) -> Self:
         """Constructor for building a client and returning a connection
 
@@ -122,9 +338,31 @@ class Connection(BaseConnection[Cursor, httpx.Client]):
             database: *(optional)*: the database/tenant to use
             query_options: *(optional)*: global query options for all queries made from the connection
             client_options: *(optional)*: httpx client options for all queries made from the connection
+            controller_url: *(optional)*: base url of the Pinot controller (e.g. `http://localhost:9000`), used for
+                reading table metadata such as segment lists
+            scheduler: *(optional)*: scheduler to queue the connection's requests by priority class, so that
+                latency-sensitive queries aren't stuck behind bulk reads.  See `pinot_connect.scheduler`
+            rate_limiter: *(optional)*: per-table rate limits of the connection's queries, to stay under table query
+                quotas.  See `pinot_connect.ratelimit`
+            circuit_breaker: *(optional)*: per-broker circuit breaker, to fail fast or route to fallback brokers
+                while the broker is unhealthy.  See `pinot_connect.circuit`
+            warmup: *(optional)*: number of keep-alive connections to the broker to open and verify before returning,
+                so the first queries don't pay for connection setup.  See `Connection.warmup`.  Default: `0`
+            keep_alive: *(optional)*: keep pooled connections to the broker open while the connection is idle, with
+                background pings
+            backend: *(optional)*: the HTTP library to send requests with: `httpx`, `httpcore` or `urllib3`.  Backends
+                other than `httpx` only support some `client_options`.  See `pinot_connect.backends`.  Default: `httpx`
+            tracer: *(optional)*: record OpenTelemetry spans for the connection's queries, with a child span for each
+                phase of `execute`.  See `pinot_connect.tracing`
+            metrics: *(optional)*: record latency histograms, response sizes, rows and errors of the connection's
+                queries by table and query fingerprint.  See `pinot_connect.metrics`
+            statements: *(optional)*: keep statistics of the connection's queries by query fingerprint, like
+                `pg_stat_statements`.  See `pinot_connect.statements`
+            slow_query_log: *(optional)*: log the connection's queries that exceed latency or query statistics
+                thresholds, as structured JSON.  See `pinot_connect.slowlog`
         """
-        return cls._connect(
-            httpx.Client,
+        connection = cls._connect(
+            _backend_class(backend, _BACKENDS),
             host=host,
             port=port,
             username=username,
@@ -133,11 +371,79 @@ class Connection(BaseConnection[Cursor, httpx.Client]):
             database=database,
             query_options=query_options,
             client_options=client_options,
+            controller_url=controller_url,
+            scheduler=scheduler,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
+            keep_alive=keep_alive,
+            tracer=tracer,
+            metrics=metrics,
+            statements=statements,
+            slow_query_log=slow_query_log,
         )
+        if warmup:
+            try:
+                connection.warmup(warmup)
+            except BaseException:
+                connection.close()
+                raise
+        if keep_alive is not None:
+            connection._start_keep_alive(keep_alive)
+        return connection
 
     def commit(self):  # pragma: no cover
         pass
 
+    def warmup(self, n: int = 1) -> int:
+        """Open `n` keep-alive connections to the broker, and verify them with its `/health` endpoint
+
+        The health checks are sent concurrently and held open until all of them have been answered, so that each uses
+        its own connection, which then goes back to the pool.  Connections beyond the pool's
+        `max_keepalive_connections` are closed rather than pooled, and no more than its `max_connections` are opened.
+
+        Args:
+            n: *(optional)* number of connections to open.  Default: `1`
+
+        Returns: the number of connections verified
+        """
+        n = self._warmup_connections(n)
+        barrier = threading.Barrier(n)
+
+        def check() -> None:
+            try:
+                response = self._client.send(self._client.build_request("GET", "/health"), stream=True)
+            except BaseException:
+                barrier.abort()  # don't keep the other checks waiting
+                raise
+            try:
+                with contextlib.suppress(threading.BrokenBarrierError):
+                    barrier.wait()
+                response.read()  # a connection is only reused once its response has been read
+                self._check_health(response)
+            finally:
+                response.close()
+
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            futures = [executor.submit(check) for _ in range(n)]
+        try:
+            for future in futures:
+                future.result()
+        except httpx.HTTPError as e:
+            raise OperationalError("Broker health check failed") from e
+        return n
+
+    def _start_keep_alive(self, options: KeepAliveOptions) -> None:
+        stop = threading.Event()
+
+        def ping() -> None:
+            while not stop.wait(options.ping_interval):
+                # a broker that is down is reported by the next query instead
+                with contextlib.suppress(Exception):
+                    self.warmup(options.connections)
+
+        threading.Thread(target=ping, name="pinot-connect-keep-alive", daemon=True).start()
+        self._keep_alive = stop
+
     @t.overload
     def cursor(
         self,
@@ -161,11 +467,246 @@ class Connection(BaseConnection[Cursor, httpx.Client]):
         """
         return self._build_cursor(Cursor, query_options, row_factory)
 
+    @t.overload
+    def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory: RowFactory[RowType],
+    ) -> Cursor[RowType]:
+        ...
+
+    @t.overload
+    def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> Cursor[tuple]:
+        ...
+
+    def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory=tuple_row,
+    ):
+        """Split a query over a long time range into concurrent sub-range queries and merge the results.
+
+        Creates a new cursor, runs `Cursor.execute_split` on it and returns it, ready to fetch from.  The caller is
+        responsible for closing the returned cursor.
+
+        Args:
+            operation: the sql operation to send to the broker, filtering on a half-open range bound by two params
+            params: sql params to bind to the operation
+            start_param: the name or index of the param holding the inclusive start of the range
+            end_param: the name or index of the param holding the exclusive end of the range
+            splits: *(optional)* number of sub-ranges to split the range into.  Default: `4`
+            max_concurrency: *(optional)* maximum number of sub-range queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                functions in its select list, a mapping of output column name to aggregation function, or `False`
+                to keep the partial results of every sub-query.  Queries selecting aggregations must set it
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query
+            query_options: *(optional)* query options that override what is set on the connection
+            request_options: *(optional)* request options to use for every sub-range query
+            row_factory: *(optional)*: RowFactory type to use to build rows fetched from the cursor, defaults to
+                returning tuples
+        """
+        cursor = self.cursor(row_factory=row_factory)
+        try:
+            cursor.execute_split(
+                operation,
+                params,
+                start_param=start_param,
+                end_param=end_param,
+                splits=splits,
+                max_concurrency=max_concurrency,
+                aggregate=aggregate,
+                group_limit=group_limit,
+                query_options=query_options,
+                request_options=request_options,
+            )
+        except BaseException:
+            cursor.close()
+            raise
+        return cursor
+
+    def segments(self, table: str) -> list[str]:
+        """List the names of the segments of a table (both offline and realtime) from the controller
+
+        Args:
+            table: the table name, without a type suffix
+        """
+        return self._parse_segments(self._client.send(self._controller_request(f"/segments/{table}")))
+
+    def load_rate_limit(self, table: str, *, burst: int | None = None) -> RateLimit | None:
+        """Set the rate limit of a table from the `maxQueriesPerSecond` quota in its table config on the controller
+
+        Pinot enforces the quota across all brokers, so when several clients query the same table, their rate limits
+        should add up to at most the quota.  A table without a quota has its rate limit removed.
+
+        Args:
+            table: the table name, without a type suffix
+            burst: *(optional)* burst of the rate limit, see `RateLimit`
+
+        Returns: the rate limit set, or `None` if the table has no quota
+        """
+        response = self._client.send(self._controller_request(f"/tables/{table}"))
+        return self._set_rate_limit_from_quota(table, response, burst)
+
+    @t.overload
+    def parallel_scan(
+        self,
+        table: str,
+        columns: t.Sequence[str] | None = None,
+        where: str | None = None,
+        params: dict | tuple | list | None = None,
+        parallelism: int = 4,
+        *,
+        partition_column: str | None = None,
+        segments: t.Sequence[str] | None = None,
+        limit_per_query: int = DEFAULT_SCAN_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory: RowFactory[RowType],
+    ) -> t.Iterator[RowType]:
+        ...
+
+    @t.overload
+    def parallel_scan(
+        self,
+        table: str,
+        columns: t.Sequence[str] | None = None,
+        where: str | None = None,
+        params: dict | tuple | list | None = None,
+        parallelism: int = 4,
+        *,
+        partition_column: str | None = None,
+        segments: t.Sequence[str] | None = None,
+        limit_per_query: int = DEFAULT_SCAN_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> t.Iterator[tuple]:
+        ...
+
+    def parallel_scan(
+        self,
+        table: str,
+        columns: t.Sequence[str] | None = None,
+        where: str | None = None,
+        params: dict | tuple | list | None = None,
+        parallelism: int = 4,
+        *,
+        partition_column: str | None = None,
+        segments: t.Sequence[str] | None = None,
+        limit_per_query: int = DEFAULT_SCAN_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory=tuple_row,
+    ):
+        """Scan a table with disjoint sub-queries run in parallel, yielding the union of their rows as one iterator.
+
+        Each sub-query selects a disjoint slice of the table, either
+        `MOD(ABS(FLOOR(partition_column)), parallelism) = i` for a numeric partition column (the first slice also
+        scanning rows where it is null), or `$segmentName IN (...)` for a round robin share of the table's segments.
+        The segment list is read from the controller (see `controller_url`) unless `segments` is passed.  Rows are
+        yielded as each sub-query completes, so the order of rows is not deterministic.  `table`, `columns` and
+        `partition_column` must be names, optionally quoted.
+
+        Args:
+            table: the table to scan
+            columns: *(optional)* the columns to select, defaults to all columns
+            where: *(optional)* a filter to apply to every sub-query, which may contain params
+            params: *(optional)* sql params to bind to `where`
+            parallelism: *(optional)* number of disjoint sub-queries to run concurrently.  Default: `4`
+            partition_column: *(optional)* a numeric column to split the table on instead of segments
+            segments: *(optional)* the segments to scan, instead of reading them from the controller
+            limit_per_query: *(optional)* the `LIMIT` of each sub-query.  A warning is emitted when a sub-query hits
+                it, since its rows may be truncated.  Default: `1_000_000`
+            query_options: *(optional)* query options that override what is set on the connection
+            request_options: *(optional)* request options to use for every sub-query
+            row_factory: *(optional)*: RowFactory type to use to build the yielded rows, defaults to returning tuples
+        """
+        if partition_column is None and segments is None:
+            segments = self.segments(table)
+        operations = self._build_scan_queries(
+            table,
+            columns,
+            where,
+            params,
+            parallelism,
+            partition_column=partition_column,
+            segments=segments,
+            limit=limit_per_query,
+        )
+
+        # resolve the deadline once, so every sub-query shares it
+        scan_deadline = BaseCursor._deadline(request_options)
+        request_options = dataclasses.replace(request_options, deadline=None) if request_options else None
+
+        def execute_(cursor: Cursor, operation: str) -> Cursor:
+            try:
+                # worker threads don't inherit the caller's context, so the ambient deadline is set explicitly
+                with _use_deadline(scan_deadline):
+                    cursor.execute(operation, query_options=query_options, request_options=request_options)
+            except BaseException:
+                cursor.close()
+                raise
+            return cursor
+
+        # the cursors are made up front, so sub-queries still running can be cancelled when the scan stops early
+        cursors = [self.cursor(row_factory=row_factory) for _ in operations]
+        executor = ThreadPoolExecutor(max_workers=len(operations))
+        futures = [executor.submit(execute_, cursor, operation) for cursor, operation in zip(cursors, operations)]
+        try:
+            for future in as_completed(futures):
+                with future.result() as cursor:
+                    self._check_scan_truncation(cursor, limit_per_query)
+                    yield from cursor
+        finally:
+            # cancelled on the broker, the running sub-queries fail fast rather than being waited for until they're done
+            for cursor, future in zip(cursors, futures):
+                if future.running():
+                    cursor.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+            for cursor in cursors:
+                cursor.close()
+
     def close(self):
         """Close the connection and cleans up resources.
 
         Closes all open cursors and all open TCP connections in the client.
         """
+        if self._keep_alive is not None:
+            self._keep_alive.set()
+            self._keep_alive = None
+
         for cursor in list(self._cursors):  # copy to ensure we don't modify set during iteration
             cursor.close()
 
@@ -175,15 +716,19 @@ class Connection(BaseConnection[Cursor, httpx.Client]):
             self._client.close()
 
     def __enter__(self) -> Self:
-        self._client.__enter__()
+        # noinspection PyProtectedMember
+        if isinstance(self._client, BaseClient) and self._client._state == ClientState.UNOPENED:
+            # the client is already open once used, e.g. by warmup
+            self._client.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._client.__exit__(exc_type, exc_val, exc_tb)
+        if isinstance(self._client, httpx.Client):
+            self._client.__exit__(exc_type, exc_val, exc_tb)
         self.close()
 
 
-class AsyncConnection(BaseConnection[AsyncCursor, httpx.AsyncClient]):
+class AsyncConnection(BaseConnection[AsyncCursor, AsyncBackend]):
     @classmethod
     def connect(
         cls,
@@ -195,6 +740,17 @@ class AsyncConnection(BaseConnection[AsyncCursor, httpx.AsyncClient]):
         database: str | None = None,
         query_options: QueryOptions | None = None,
         client_options: ClientOptions | None = None,
+        controller_url: str | None = None,
+        scheduler: AsyncScheduler | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        warmup: int = 0,
+        keep_alive: KeepAliveOptions | None = None,
+        backend: AsyncBackendName = "httpx",
+        tracer: QueryTracer | None = None,
+        metrics: MetricsRegistry | None = None,
+        statements: StatementRegistry | None = None,
+        slow_query_log: SlowQueryLog | None = None,
     ) -> CoroContextManager[Self]:
         """Constructor for building a client and returning an async connection wrapped in
         a CoroContextManager object.  This allows this method to both be awaited and be used
@@ -209,14 +765,37 @@ class AsyncConnection(BaseConnection[AsyncCursor, httpx.AsyncClient]):
             database: *(optional)*: the database/tenant to use
             query_options: *(optional)*: global query options for all queries made from the connection
             client_options: *(optional)*: httpx client options for all queries made from the connection
+            controller_url: *(optional)*: base url of the Pinot controller (e.g. `http://localhost:9000`), used for
+                reading table metadata such as segment lists
+            scheduler: *(optional)*: scheduler to queue the connection's requests by priority class, so that
+                latency-sensitive queries aren't stuck behind bulk reads.  See `pinot_connect.scheduler`
+            rate_limiter: *(optional)*: per-table rate limits of the connection's queries, to stay under table query
+                quotas.  See `pinot_connect.ratelimit`
+            circuit_breaker: *(optional)*: per-broker circuit breaker, to fail fast or route to fallback brokers
+                while the broker is unhealthy.  See `pinot_connect.circuit`
+            warmup: *(optional)*: number of keep-alive connections to the broker to open and verify before returning,
+                so the first queries don't pay for connection setup.  See `AsyncConnection.warmup`.  Default: `0`
+            keep_alive: *(optional)*: keep pooled connections to the broker open while the connection is idle, with
+                background pings
+            backend: *(optional)*: the HTTP library to send requests with: `httpx`, `httpcore` or `aiohttp`.  Backends
+                other than `httpx` only support some `client_options`.  See `pinot_connect.backends`.  Default: `httpx`
+            tracer: *(optional)*: record OpenTelemetry spans for the connection's queries, with a child span for each
+                phase of `execute`.  See `pinot_connect.tracing`
+            metrics: *(optional)*: record latency histograms, response sizes, rows and errors of the connection's
+                queries by table and query fingerprint.  See `pinot_connect.metrics`
+            statements: *(optional)*: keep statistics of the connection's queries by query fingerprint, like
+                `pg_stat_statements`.  See `pinot_connect.statements`
+            slow_query_log: *(optional)*: log the connection's queries that exceed latency or query statistics
+                thresholds, as structured JSON.  See `pinot_connect.slowlog`
 
         Returns: an instance of `pinot_connect.AsyncConnection` wrapped in a CoroContextManager
         """
         super_connect = super()._connect
+        client = _backend_class(backend, _ASYNC_BACKENDS)
 
         async def connect_():
-            return super_connect(
-                httpx.AsyncClient,
+            connection = super_connect(
+                client,
                 host=host,
                 port=port,
                 username=username,
@@ -225,7 +804,25 @@ class AsyncConnection(BaseConnection[AsyncCursor, httpx.AsyncClient]):
                 database=database,
                 query_options=query_options,
                 client_options=client_options,
+                controller_url=controller_url,
+                scheduler=scheduler,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                keep_alive=keep_alive,
+                tracer=tracer,
+                metrics=metrics,
+                statements=statements,
+                slow_query_log=slow_query_log,
             )
+            if warmup:
+                try:
+                    await connection.warmup(warmup)
+                except BaseException:
+                    await connection.close()
+                    raise
+            if keep_alive is not None:
+                connection._start_keep_alive(keep_alive)
+            return connection
 
         return CoroContextManager(connect_())
 
@@ -233,6 +830,55 @@ class AsyncConnection(BaseConnection[AsyncCursor, httpx.AsyncClient]):
         """Not implemented - read only interface"""  # pragma: no cover
         pass
 
+    async def warmup(self, n: int = 1) -> int:
+        """Open `n` keep-alive connections to the broker, and verify them with its `/health` endpoint
+
+        The health checks are sent concurrently and held open until all of them have been answered, so that each uses
+        its own connection, which then goes back to the pool.  Connections beyond the pool's
+        `max_keepalive_connections` are closed rather than pooled, and no more than its `max_connections` are opened.
+
+        Args:
+            n: *(optional)* number of connections to open.  Default: `1`
+
+        Returns: the number of connections verified
+        """
+        n = self._warmup_connections(n)
+        answered = 0
+        all_answered = asyncio.Event()
+
+        async def check() -> None:
+            nonlocal answered
+            try:
+                response = await self._client.send(self._client.build_request("GET", "/health"), stream=True)
+            except BaseException:
+                all_answered.set()  # don't keep the other checks waiting
+                raise
+            try:
+                answered += 1
+                if answered == n:
+                    all_answered.set()
+                await all_answered.wait()
+                await response.aread()  # a connection is only reused once its response has been read
+                self._check_health(response)
+            finally:
+                await response.aclose()
+
+        try:
+            await asyncio.gather(*(check() for _ in range(n)))
+        except httpx.HTTPError as e:
+            raise OperationalError("Broker health check failed") from e
+        return n
+
+    def _start_keep_alive(self, options: KeepAliveOptions) -> None:
+        async def ping() -> None:
+            while True:
+                await asyncio.sleep(options.ping_interval)
+                # a broker that is down is reported by the next query instead
+                with contextlib.suppress(Exception):
+                    await self.warmup(options.connections)
+
+        self._keep_alive = asyncio.ensure_future(ping())
+
     @t.overload
     def cursor(
         self,
@@ -260,11 +906,246 @@ class AsyncConnection(BaseConnection[AsyncCursor, httpx.AsyncClient]):
 
         return CoroContextManager(cursor_())
 
+    @t.overload
+    def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory: RowFactory[RowType],
+    ) -> CoroContextManager[AsyncCursor[RowType]]:
+        ...
+
+    @t.overload
+    def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> CoroContextManager[AsyncCursor[tuple]]:
+        ...
+
+    def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory=tuple_row,
+    ):
+        """Split a query over a long time range into concurrent sub-range queries and merge the results.
+
+        Creates a new cursor, runs `AsyncCursor.execute_split` on it and returns it wrapped in a CoroContextManager, so
+        it can be awaited or used with `async with`.  When awaited, the caller is responsible for closing the cursor.
+
+        Args:
+            operation: the sql operation to send to the broker, filtering on a half-open range bound by two params
+            params: sql params to bind to the operation
+            start_param: the name or index of the param holding the inclusive start of the range
+            end_param: the name or index of the param holding the exclusive end of the range
+            splits: *(optional)* number of sub-ranges to split the range into.  Default: `4`
+            max_concurrency: *(optional)* maximum number of sub-range queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                functions in its select list, a mapping of output column name to aggregation function, or `False`
+                to keep the partial results of every sub-query.  Queries selecting aggregations must set it
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query
+            query_options: *(optional)* query options that override what is set on the connection
+            request_options: *(optional)* request options to use for every sub-range query
+            row_factory: *(optional)*: RowFactory type to use to build rows fetched from the cursor, defaults to
+                returning tuples
+        """
+
+        async def execute_split_():
+            cursor = self._build_cursor(AsyncCursor, None, row_factory)
+            try:
+                await cursor.execute_split(
+                    operation,
+                    params,
+                    start_param=start_param,
+                    end_param=end_param,
+                    splits=splits,
+                    max_concurrency=max_concurrency,
+                    aggregate=aggregate,
+                    group_limit=group_limit,
+                    query_options=query_options,
+                    request_options=request_options,
+                )
+            except BaseException:
+                await cursor.close()
+                raise
+            return cursor
+
+        return CoroContextManager(execute_split_())
+
+    async def segments(self, table: str) -> list[str]:
+        """List the names of the segments of a table (both offline and realtime) from the controller
+
+        Args:
+            table: the table name, without a type suffix
+        """
+        return self._parse_segments(await self._client.send(self._controller_request(f"/segments/{table}")))
+
+    async def load_rate_limit(self, table: str, *, burst: int | None = None) -> RateLimit | None:
+        """Set the rate limit of a table from the `maxQueriesPerSecond` quota in its table config on the controller
+
+        Pinot enforces the quota across all brokers, so when several clients query the same table, their rate limits
+        should add up to at most the quota.  A table without a quota has its rate limit removed.
+
+        Args:
+            table: the table name, without a type suffix
+            burst: *(optional)* burst of the rate limit, see `RateLimit`
+
+        Returns: the rate limit set, or `None` if the table has no quota
+        """
+        response = await self._client.send(self._controller_request(f"/tables/{table}"))
+        return self._set_rate_limit_from_quota(table, response, burst)
+
+    @t.overload
+    def parallel_scan(
+        self,
+        table: str,
+        columns: t.Sequence[str] | None = None,
+        where: str | None = None,
+        params: dict | tuple | list | None = None,
+        parallelism: int = 4,
+        *,
+        partition_column: str | None = None,
+        segments: t.Sequence[str] | None = None,
+        limit_per_query: int = DEFAULT_SCAN_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory: RowFactory[RowType],
+    ) -> t.AsyncIterator[RowType]:
+        ...
+
+    @t.overload
+    def parallel_scan(
+        self,
+        table: str,
+        columns: t.Sequence[str] | None = None,
+        where: str | None = None,
+        params: dict | tuple | list | None = None,
+        parallelism: int = 4,
+        *,
+        partition_column: str | None = None,
+        segments: t.Sequence[str] | None = None,
+        limit_per_query: int = DEFAULT_SCAN_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> t.AsyncIterator[tuple]:
+        ...
+
+    async def parallel_scan(
+        self,
+        table: str,
+        columns: t.Sequence[str] | None = None,
+        where: str | None = None,
+        params: dict | tuple | list | None = None,
+        parallelism: int = 4,
+        *,
+        partition_column: str | None = None,
+        segments: t.Sequence[str] | None = None,
+        limit_per_query: int = DEFAULT_SCAN_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+        row_factory=tuple_row,
+    ):
+        """Scan a table with disjoint sub-queries run concurrently, yielding the union of their rows as one async
+        iterator.
+
+        Each sub-query selects a disjoint slice of the table, either
+        `MOD(ABS(FLOOR(partition_column)), parallelism) = i` for a numeric partition column (the first slice also
+        scanning rows where it is null), or `$segmentName IN (...)` for a round robin share of the table's segments.
+        The segment list is read from the controller (see `controller_url`) unless `segments` is passed.  Rows are
+        yielded as each sub-query completes, so the order of rows is not deterministic.  `table`, `columns` and
+        `partition_column` must be names, optionally quoted.
+
+        Args:
+            table: the table to scan
+            columns: *(optional)* the columns to select, defaults to all columns
+            where: *(optional)* a filter to apply to every sub-query, which may contain params
+            params: *(optional)* sql params to bind to `where`
+            parallelism: *(optional)* number of disjoint sub-queries to run concurrently.  Default: `4`
+            partition_column: *(optional)* a numeric column to split the table on instead of segments
+            segments: *(optional)* the segments to scan, instead of reading them from the controller
+            limit_per_query: *(optional)* the `LIMIT` of each sub-query.  A warning is emitted when a sub-query hits
+                it, since its rows may be truncated.  Default: `1_000_000`
+            query_options: *(optional)* query options that override what is set on the connection
+            request_options: *(optional)* request options to use for every sub-query
+            row_factory: *(optional)*: RowFactory type to use to build the yielded rows, defaults to returning tuples
+        """
+        if partition_column is None and segments is None:
+            segments = await self.segments(table)
+        operations = self._build_scan_queries(
+            table,
+            columns,
+            where,
+            params,
+            parallelism,
+            partition_column=partition_column,
+            segments=segments,
+            limit=limit_per_query,
+        )
+
+        async def execute_(operation: str) -> AsyncCursor:
+            cursor = self._build_cursor(AsyncCursor, None, row_factory)
+            try:
+                await cursor.execute(operation, query_options=query_options, request_options=request_options)
+            except BaseException:
+                await cursor.close()
+                raise
+            return cursor
+
+        # resolve the deadline once, so every sub-query shares it.  Tasks inherit the ambient deadline
+        scan_deadline = BaseCursor._deadline(request_options)
+        request_options = dataclasses.replace(request_options, deadline=None) if request_options else None
+        with _use_deadline(scan_deadline):
+            tasks = [asyncio.ensure_future(execute_(operation)) for operation in operations]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                async with await next_completed as cursor:
+                    self._check_scan_truncation(cursor, limit_per_query)
+                    async for row in cursor:
+                        yield row
+        finally:
+            for task in tasks:
+                task.cancel()
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, AsyncCursor):
+                    await result.close()
+
     async def close(self):
         """Close the connection and cleans up resources.
 
         Closes all open cursors and all open TCP connections in the client.
         """
+        if self._keep_alive is not None:
+            self._keep_alive.cancel()
+            self._keep_alive = None
+
         for cursor in list(self._cursors):  # copy to ensure we don't modify set during iteration
             await cursor.close()
 
@@ -274,9 +1155,13 @@ class AsyncConnection(BaseConnection[AsyncCursor, httpx.AsyncClient]):
             await self._client.aclose()
 
     async def __aenter__(self) -> Self:
-        await self._client.__aenter__()
+        # noinspection PyProtectedMember
+        if isinstance(self._client, BaseClient) and self._client._state == ClientState.UNOPENED:
+            # the client is already open once used, e.g. by warmup
+            await self._client.__aenter__()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self._client.__aexit__(exc_type, exc_val, exc_tb)
+        if isinstance(self._client, httpx.AsyncClient):
+            await self._client.__aexit__(exc_type, exc_val, exc_tb)
         await self.close()
@@ -1,36 +1,180 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import dataclasses
+import functools
+import threading
+import time
 import typing as t
+import uuid
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 
 import httpx
 import orjson
 from httpx import USE_CLIENT_DEFAULT
 from typing_extensions import Self
 
+from ._deadline import Deadline
+from ._deadline import _apply_deadline
+from ._deadline import _resolve_deadline
+from ._decoders import decode
 from ._decorators import acheck_cursor_open
 from ._decorators import check_cursor_open
+from ._merge import DEFAULT_GROUP_LIMIT
+from ._merge import AggregationFunction
+from ._merge import MergePlan
+from ._merge import SubQueryResult
+from ._merge import make_merge_plan
+from ._merge import merge_query_statistics
+from ._observe import QueryRecord
+from ._pagination import DEFAULT_PAGE_SIZE
+from ._pagination import KeysetPaginator
 from ._query import Query
 from ._result_set import Column
 from ._result_set import EmptyResultSet
 from ._result_set import ResultSet
 from ._result_set import _BaseResultSet
+from ._sql import find_limit
+from ._sql import find_table
+from ._timing import AsyncSendTimer
+from ._timing import QueryTimer
+from ._timing import SendTimer
+from ._timing import _total
 from ._type_converters import build_converters
+from .circuit import _route
 from .exceptions import *
+from .explain import DEFAULT_MIN_MATCH_RATIO
+from .explain import QueryPlan
 from .options import QueryOptions
 from .options import RequestOptions
+from .querytrace import QueryTrace
 from .rows import RowFactory
 from .rows import RowType
 
-__all__ = ["BaseCursor", "Cursor", "AsyncCursor", "QueryStatistics"]
+__all__ = ["BaseCursor", "Cursor", "AsyncCursor", "QueryStatistics", "TransferStatistics", "ClientTimings"]
 
 if t.TYPE_CHECKING:
+    from opentelemetry.context import Context
+    from opentelemetry.trace import Span
+
     from .connection import AsyncConnection
     from .connection import BaseConnection
     from .connection import Connection
+    from .tracing import QueryTracer
 
 _ConnectionType = t.TypeVar("_ConnectionType", bound="BaseConnection")
 
+_EXPLAIN_PREFIX: t.Final[str] = "EXPLAIN PLAN FOR "
+
+
+class _SendContext(t.NamedTuple):
+    """How the requests of one execute call are sent"""
+
+    deadline: Deadline | None = None
+    priority: str | None = None
+    table: str | None = None
+
+    @property
+    def wait_timeout(self) -> float | None:
+        """Longest a request may wait to be sent before its deadline passes"""
+        return max(self.deadline.remaining(), 0.0) if self.deadline is not None else None
+
+
+_NO_SEND_CONTEXT: t.Final[_SendContext] = _SendContext()
+
+
+class _Observation:
+    """What a query run other than by `execute` did, filled in by the call running it for `BaseCursor._observed`"""
+
+    __slots__ = ("operation", "sql", "response_bytes", "rows", "statistics", "span")
+
+    def __init__(self, operation: str, span: Span | None):
+        self.operation = operation
+        self.sql = operation
+        self.response_bytes = 0
+        self.rows: int | None = None
+        self.statistics: QueryStatistics | None = None
+        self.span = span
+
+
+_MAX_REQUEST_TEMPLATES: t.Final[int] = 64
+
+
+def _request_headers(accept_encoding: str | None) -> dict[str, str]:
+    # query bodies are encoded with orjson rather than httpx's json=, so the content type is set here
+    if accept_encoding is None:
+        return {"Content-Type": "application/json"}
+    return {"Content-Type": "application/json", "Accept-Encoding": accept_encoding}
+
+
+def _copy_uri_reference(url: httpx.URL, query_suffix: str) -> httpx.URL:
+    # copy the parsed url with the suffix appended to its query, rather than parsing a new url for each request:
+    # parsing and validating it again (which `URL.copy_with` does too) is the largest part of building a request
+    copy = httpx.URL.__new__(httpx.URL)
+    reference = url._uri_reference
+    copy._uri_reference = reference._replace(query=reference.query + query_suffix)
+    return copy
+
+
+def _can_copy_uri_reference() -> bool:
+    """Whether urls keep their components in a `_uri_reference` named tuple, as they do from httpx 0.23 to 0.28, so
+    `_copy_uri_reference` can copy them.  Other versions fall back to the public `URL.copy_with`"""
+    try:
+        copy = _copy_uri_reference(httpx.URL("http://broker/query?clientQueryId="), "0")
+        return str(copy) == "http://broker/query?clientQueryId=0" and copy.params["clientQueryId"] == "0"
+    except Exception:  # pragma: no cover
+        return False
+
+
+_COPY_URI_REFERENCE: t.Final[bool] = _can_copy_uri_reference()
+
+
+class _RequestTemplate(t.NamedTuple):
+    """The parts of a query request that are the same for every query sent with the same query options and
+    Accept-Encoding, built once with the connection's client so that its base url, default headers and timeout apply"""
+
+    url: httpx.URL
+    headers: httpx.Headers
+    extensions: dict
+
+    @classmethod
+    def build(cls, client: t.Any, query_options: str, accept_encoding: str | None) -> _RequestTemplate:
+        # the client query id is always the last query option, so each request appends it to the url
+        query_options = f"{query_options};clientQueryId=" if query_options else "clientQueryId="
+        request = client.build_request(
+            "POST", "/query", params={"queryOptions": query_options}, headers=_request_headers(accept_encoding)
+        )
+        # set for each request's body by httpx.Request
+        request.headers.pop("Content-Length", None)
+        return cls(request.url, request.headers, request.extensions)
+
+    def _url(self, client_query_id: str) -> httpx.URL:
+        # the id is hex, so it needs no escaping
+        if _COPY_URI_REFERENCE:
+            return _copy_uri_reference(self.url, client_query_id)
+        return self.url.copy_with(query=self.url.query + client_query_id.encode("ascii"))
+
+    def request(self, client_query_id: str, sql: str) -> httpx.Request:
+        return httpx.Request(
+            "POST",
+            self._url(client_query_id),
+            headers=self.headers,
+            content=orjson.dumps({"sql": sql}),
+            extensions=self.extensions.copy(),
+        )
+
+
+@contextlib.asynccontextmanager
+async def _unscheduled() -> t.AsyncIterator[None]:
+    # contextlib.nullcontext only supports async with from python 3.10
+    yield
+
+
+# strong references to background cancellation tasks, so they aren't garbage collected before they finish
+_background_tasks: set[asyncio.Task] = set()
+
 
 class QueryStatistics(t.TypedDict):
     """TypedDict for exposing query statistics for the last executed query
@@ -135,6 +279,86 @@ def _make_query_statistics(json_response: dict) -> QueryStatistics:
     return t.cast(QueryStatistics, {key: json_response[key] for key in valid_keys if key in json_response})
 
 
+@dataclasses.dataclass(frozen=True)
+class TransferStatistics:
+    """How the responses to the last executed query were transferred, summed over every request it made
+
+    Attributes:
+        requests: number of responses
+        encoding: `Content-Encoding` of the responses, `identity` when uncompressed.  When the responses of a fan-out
+            were encoded differently, the encodings are joined with `, `
+        compressed_bytes: bytes received, as encoded by the broker
+        uncompressed_bytes: bytes of the decoded responses
+        decode_time: seconds spent decoding the responses
+    """
+
+    requests: int
+    encoding: str
+    compressed_bytes: int
+    uncompressed_bytes: int
+    decode_time: float
+
+    @property
+    def ratio(self) -> float:
+        """Uncompressed bytes per compressed byte"""
+        return self.uncompressed_bytes / self.compressed_bytes if self.compressed_bytes else 1.0
+
+    @classmethod
+    def combine(cls, transfers: t.Sequence[TransferStatistics]) -> TransferStatistics:
+        return cls(
+            requests=sum(transfer.requests for transfer in transfers),
+            encoding=", ".join(dict.fromkeys(transfer.encoding for transfer in transfers)),
+            compressed_bytes=sum(transfer.compressed_bytes for transfer in transfers),
+            uncompressed_bytes=sum(transfer.uncompressed_bytes for transfer in transfers),
+            decode_time=sum(transfer.decode_time for transfer in transfers),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class ClientTimings:
+    """Where the client spent the time of the last executed query, in nanoseconds (from `time.perf_counter_ns`) summed
+    over every request it made, to tell a slow client from a slow broker
+
+    Attributes:
+        requests: number of requests sent
+        build: building the requests, including binding params
+        send: sending the requests until their responses were read, including `pool_wait`, `first_byte` and `download`
+        pool_wait: waiting for a connection from the pool.  `None` when not measured: only the `httpx` and `httpcore`
+            backends report it, and only for requests sent through their connection pool
+        first_byte: from getting a connection until the response headers arrived, including connecting.  `None` when
+            not measured, as for `pool_wait`
+        download: reading the response bodies.  `None` when not measured, as for `pool_wait`
+        decode: parsing the response bodies as JSON
+        convert: applying converters to values (e.g. parsing timestamps), which grows as rows are fetched
+        materialize: making rows with the row factory, which grows as rows are fetched
+    """
+
+    requests: int
+    build: int
+    send: int
+    pool_wait: int | None
+    first_byte: int | None
+    download: int | None
+    decode: int
+    convert: int
+    materialize: int
+
+    @classmethod
+    def _make(cls, timer: QueryTimer, result_set: _BaseResultSet) -> ClientTimings:
+        sends = list(timer.sends)
+        return cls(
+            requests=len(sends),
+            build=timer.build,
+            send=sum(send.end - send.start for send in sends if send.end is not None),
+            pool_wait=_total(send.pool_wait for send in sends),
+            first_byte=_total(send.first_byte for send in sends),
+            download=_total(send.download for send in sends),
+            decode=timer.decode,
+            convert=result_set._convert_time,
+            materialize=result_set._materialize_time,
+        )
+
+
 class BaseCursor(t.Generic[_ConnectionType, RowType]):
     __slots__ = (
         "_connection",
@@ -147,6 +371,12 @@ class BaseCursor(t.Generic[_ConnectionType, RowType]):
         "_last_query_statistics",
         "_row_factory",
         "_convert_binary",
+        "_in_flight",
+        "_transfers",
+        "_encoded_query_options",
+        "_request_templates",
+        "_trace_context",
+        "_timer",
     )
 
     _result_set: _BaseResultSet[RowType]
@@ -164,6 +394,17 @@ class BaseCursor(t.Generic[_ConnectionType, RowType]):
         self._closed = False
         self._last_query: Query | None = None
         self._last_query_statistics: QueryStatistics | None = None
+        # client query id of every request sent but not yet answered, for cancelling them on the broker
+        self._in_flight: dict[httpx.Request, str] = {}
+        # transfer statistics of every response to the last executed query, when the connection negotiates compression
+        self._transfers: list[TransferStatistics] = []
+        # query options of the cursor serialized once, and the request templates built for them, see `_make_request`
+        self._encoded_query_options = QueryOptions.to_kv_pair(self._query_options.asdict())
+        self._request_templates: dict[tuple[str, str | None], _RequestTemplate] = {}
+        # context of the span of the last execute, when the connection traces queries, for the spans of its fetches
+        self._trace_context: Context | None = None
+        # the client's share of the time of the last execute, see `client_timings`
+        self._timer = QueryTimer()
 
         # noinspection PyProtectedMember
         if self not in connection._cursors:  # pragma: no branch
@@ -218,6 +459,28 @@ class BaseCursor(t.Generic[_ConnectionType, RowType]):
         """Statistics about the last executed query"""
         return self._last_query_statistics
 
+    @property
+    def query_trace(self) -> QueryTrace | None:
+        """The servers' operator timings of the last executed query, parsed from its `traceInfo` statistic.  Only
+        returned by the broker for queries run with `QueryOptions(trace=True)`"""
+        statistics = self._last_query_statistics
+        if statistics is None or not statistics.get("traceInfo"):
+            return None
+        return QueryTrace.parse(statistics)
+
+    @property
+    def transfer_statistics(self) -> TransferStatistics | None:
+        """Compressed and uncompressed bytes of the responses to the last executed query, and the time spent decoding
+        them.  Only recorded when the connection was created with `ClientOptions.compression`"""
+        return TransferStatistics.combine(self._transfers) if self._transfers else None
+
+    @property
+    def client_timings(self) -> ClientTimings | None:
+        """Where the client spent the time of the last executed query: building the request, waiting for a pooled
+        connection, waiting for and downloading the response, decoding it, and converting values and making rows as
+        they are fetched"""
+        return ClientTimings._make(self._timer, self._result_set) if self._last_query is not None else None
+
     def _build_request(
         self,
         operation: str,
@@ -226,29 +489,292 @@ class BaseCursor(t.Generic[_ConnectionType, RowType]):
         query_options: QueryOptions | None = None,
         request_options: RequestOptions | None = None,
     ) -> httpx.Request:
-        query_options = QueryOptions.merge(self._query_options, query_options or QueryOptions())
         query = Query(operation, params)
         self._last_query = query
-        http_params = {"queryOptions": QueryOptions.to_kv_pair(query_options.asdict())} if query_options else None
+        self._transfers.clear()
+        self._trace_context = None
+        self._timer = QueryTimer()
+        return self._make_request(query, query_options=query_options, request_options=request_options)
+
+    def _make_request(
+        self,
+        query: Query,
+        *,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> httpx.Request:
+        start = time.perf_counter_ns()
+        client_query_id = uuid.uuid4().hex
+        encoded_query_options = self._encoded_query_options
+        if query_options is not None:
+            encoded_query_options = QueryOptions.to_kv_pair(
+                QueryOptions.merge(self._query_options, query_options).asdict()
+            )
+        sql = query.operation_with_params
+        compression = self._connection.compression
+        accept_encoding = None
+        if compression is not None:
+            size_class = request_options.size_class if request_options else None
+            if size_class is None:
+                # the limit is found in the query before its params are bound, which can make it much longer
+                limit = find_limit(query.operation)
+                size_class = compression.size_class(limit.limit if limit is not None else None)
+            accept_encoding = compression.accept_encoding(size_class)
         # noinspection PyProtectedMember
-        return self._connection._client.build_request(
-            "POST",
-            "/query",
-            params=http_params,
-            json={"sql": query.operation_with_params},
-            timeout=request_options.timeout if request_options and request_options.timeout else USE_CLIENT_DEFAULT,
-            cookies=request_options.cookies if request_options else None,
-            extensions=request_options.extensions if request_options else None,
+        client = self._connection._client
+        if (
+            request_options is None
+            or not (request_options.timeout or request_options.cookies or request_options.extensions)
+        ) and not getattr(client, "cookies", None):
+            # fast path: everything but the client query id and sql is the same for every query with the same options,
+            # so build it once with the client and skip re-parsing urls and re-merging headers for each request.  A
+            # client with cookies takes the slow path, as its cookies can change between requests
+            key = (encoded_query_options, accept_encoding)
+            template = self._request_templates.get(key)
+            if template is None:
+                template = _RequestTemplate.build(client, encoded_query_options, accept_encoding)
+                if len(self._request_templates) < _MAX_REQUEST_TEMPLATES:
+                    self._request_templates[key] = template
+            request = template.request(client_query_id, sql)
+        else:
+            request = client.build_request(
+                "POST",
+                "/query",
+                params={"queryOptions": f"{encoded_query_options};clientQueryId={client_query_id}".lstrip(";")},
+                headers=_request_headers(accept_encoding),
+                content=orjson.dumps({"sql": sql}),
+                timeout=request_options.timeout if request_options and request_options.timeout else USE_CLIENT_DEFAULT,
+                cookies=request_options.cookies if request_options else None,
+                extensions=request_options.extensions if request_options else None,
+            )
+        self._in_flight[request] = client_query_id
+        self._timer.build += time.perf_counter_ns() - start
+        return request
+
+    @staticmethod
+    def _deadline(request_options: RequestOptions | None) -> Deadline | None:
+        """Resolve the deadline of an execute call once, so every request it makes shares the same budget"""
+        return _resolve_deadline(request_options.deadline if request_options else None)
+
+    def _send_context(self, operation: str, request_options: RequestOptions | None) -> _SendContext:
+        """Resolve how the requests of an execute call are sent, once for every request it makes"""
+        # the table is only needed by a rate limiter, and finding it in the query isn't free
+        rate_limited = self._connection.rate_limiter is not None
+        if request_options is None:
+            return _SendContext(self._deadline(None), None, find_table(operation) if rate_limited else None)
+        table = request_options.table
+        if table is None and rate_limited:
+            table = find_table(operation)
+        return _SendContext(self._deadline(request_options), request_options.priority, table)
+
+    def _check_deadline(self, request: httpx.Request, deadline: Deadline | None) -> None:
+        if deadline is None:
+            return
+        if deadline.expired:
+            raise OperationalError("Query deadline exceeded before the request was sent")
+        _apply_deadline(request, deadline)
+
+    def _build_cancel_request(self, client_query_id: str, url: httpx.URL) -> httpx.Request:
+        # noinspection PyProtectedMember
+        request = self._connection._client.build_request("DELETE", f"/clientQuery/{client_query_id}")
+        # the query id is only known to the broker running the query, which a circuit breaker may have changed
+        _route(request, url)
+        return request
+
+    def _prepare_split(
+        self,
+        operation: str,
+        params: dict | tuple | list | None,
+        *,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+    ) -> tuple[Query, MergePlan]:
+        """Record the logical query and return the query that should be split into sub-queries, with the plan for
+        combining the sub-query results"""
+        plan = make_merge_plan(operation, aggregate=aggregate, group_limit=group_limit)
+        self._last_query = Query(operation, params)
+        self._transfers.clear()
+        self._trace_context = None
+        self._timer = QueryTimer()
+        return Query(plan.sub_query_operation, params), plan
+
+    def _make_requests(
+        self,
+        queries: list[Query],
+        *,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> list[httpx.Request]:
+        return [
+            self._make_request(query, query_options=query_options, request_options=request_options) for query in queries
+        ]
+
+    def _decode(self, response: httpx.Response, raw: bytes) -> httpx.Response:
+        """Decode the raw body of a streamed response, recording its transfer statistics"""
+        start = time.perf_counter()
+        content = decode(response.headers, raw)
+        decode_time = time.perf_counter() - start
+        response._content = content
+        encoding = response.headers.get("Content-Encoding", "identity")
+        self._transfers.append(TransferStatistics(1, encoding, len(raw), len(content), decode_time))
+        return response
+
+    def _build_request_traced(
+        self,
+        tracer: QueryTracer,
+        span: Span,
+        operation: str,
+        params: dict | tuple | list | None,
+        *,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> httpx.Request:
+        # noinspection PyProtectedMember
+        with tracer._phase("pinot.build_request"):
+            request = self._build_request(
+                operation, params=params, query_options=query_options, request_options=request_options
+            )
+        assert self._last_query is not None
+        # noinspection PyProtectedMember
+        tracer._record_query(span, self._last_query.operation_with_params)
+        return request
+
+    def _handle_response_traced(self, tracer: QueryTracer, span: Span, response: httpx.Response) -> httpx.Response:
+        # noinspection PyProtectedMember
+        with tracer._phase("pinot.decode"):
+            json_response = self._load_json(response)
+        # noinspection PyProtectedMember
+        with tracer._phase("pinot.result_set"):
+            self._handle_json_response(response, json_response)
+        # noinspection PyProtectedMember
+        tracer._record_result(span, self._last_query_statistics, len(response.content))
+        # noinspection PyProtectedMember
+        self._trace_context = tracer._context(span)
+        return response
+
+    def _fetch_traced(self, method: str, fetch: t.Callable[[], list[RowType]]) -> list[RowType]:
+        assert self._trace_context is not None
+        # noinspection PyProtectedMember
+        return self._connection.tracer._fetch(self._trace_context, method, fetch)
+
+    def _observe(
+        self,
+        operation: str,
+        query_options: QueryOptions | None,
+        start: float,
+        response: httpx.Response | None,
+        error: BaseException | None,
+    ) -> None:
+        """Pass what an execute call did to the observers of the connection"""
+        query = self._last_query
+        # the query isn't recorded when binding its params failed
+        sql = query.operation_with_params if query is not None and query.operation is operation else operation
+        self._record(
+            operation,
+            sql,
+            query_options,
+            start,
+            len(response.content) if response is not None else 0,
+            self._result_set.rowcount if error is None else None,
+            self._last_query_statistics if error is None else None,
+            error,
         )
 
+    def _record(
+        self,
+        operation: str,
+        sql: str,
+        query_options: QueryOptions | None,
+        start: float,
+        response_bytes: int,
+        rows: int | None,
+        statistics: QueryStatistics | None,
+        error: BaseException | None,
+    ) -> None:
+        record = QueryRecord.make(
+            operation,
+            sql,
+            QueryOptions.merge(self._query_options, query_options) if query_options else self._query_options,
+            time.perf_counter() - start,
+            response_bytes,
+            rows,
+            statistics,
+            error,
+        )
+        # noinspection PyProtectedMember
+        for observer in self._connection._observers:
+            # noinspection PyProtectedMember
+            observer._record(record)
+
+    @contextlib.contextmanager
+    def _observed(self, operation: str, query_options: QueryOptions | None) -> t.Iterator[_Observation]:
+        """Observe and trace a query that isn't run by `execute` as `execute` would: one record for the observers of the
+        connection and one `pinot.execute` span, from what the body fills into the yielded observation"""
+        # noinspection PyProtectedMember
+        observed = bool(self._connection._observers)
+        tracer = self._connection.tracer
+        start = time.perf_counter()
+        # noinspection PyProtectedMember
+        with tracer._execute() if tracer is not None else contextlib.nullcontext() as span:
+            observation = _Observation(operation, span)
+            try:
+                yield observation
+            except Exception as e:
+                if observed:
+                    self._record(operation, observation.sql, query_options, start, 0, None, None, e)
+                raise
+            finally:
+                if tracer is not None:
+                    # noinspection PyProtectedMember
+                    tracer._record_query(span, observation.sql)
+                    # noinspection PyProtectedMember
+                    tracer._record_result(span, observation.statistics, observation.response_bytes)
+        if observed:
+            self._record(
+                operation,
+                observation.sql,
+                query_options,
+                start,
+                observation.response_bytes,
+                observation.rows,
+                observation.statistics,
+                None,
+            )
+
+    @staticmethod
+    def _observe_page(observation: _Observation, response: httpx.Response, page: SubQueryResult) -> SubQueryResult:
+        """Fill in what the query of a page of `paginate` did"""
+        observation.response_bytes = len(response.content)
+        observation.rows = len(page.rows)
+        observation.statistics = page.statistics
+        return page
+
+    def _observe_split(self, observation: _Observation, responses: list[httpx.Response]) -> None:
+        """Fill in what a fan-out call did, once its combined result is the cursor's result"""
+        assert self._last_query is not None
+        observation.sql = self._last_query.operation_with_params
+        observation.response_bytes = sum(len(response.content) for response in responses)
+        observation.rows = self._result_set.rowcount
+        observation.statistics = self._last_query_statistics
+        if observation.span is not None:
+            # noinspection PyProtectedMember
+            self._trace_context = self._connection.tracer._context(observation.span)
+
     def _reset(self):
         # if the result set is already an EmptyResultSet, this can be a noop
         if isinstance(self._result_set, ResultSet):
             self._result_set = self._result_set.make_empty()
 
     def _handle_response(self, r: httpx.Response) -> httpx.Response:
+        return self._handle_json_response(r, self._load_json(r))
+
+    def _load_json(self, r: httpx.Response) -> dict:
+        start = time.perf_counter_ns()
         json_response = orjson.loads(r.content)
+        self._timer.decode += time.perf_counter_ns() - start
+        return json_response
 
+    def _handle_json_response(self, r: httpx.Response, json_response: dict) -> httpx.Response:
         if "resultTable" in json_response:
             self._handle_query_result(json_response)
         elif "exceptions" in json_response and json_response["exceptions"]:  # pragma: no branch
@@ -258,6 +784,72 @@ class BaseCursor(t.Generic[_ConnectionType, RowType]):
 
         return r
 
+    def _load_sub_query_result(self, r: httpx.Response) -> SubQueryResult:
+        json_response = self._load_json(r)
+
+        if "resultTable" not in json_response:
+            if json_response.get("exceptions"):
+                self._handle_query_exception(json_response)
+            elif httpx.codes.is_error(r.status_code):
+                self._handle_query_http_error_code(r)
+            raise InterfaceError("Broker response did not contain a result table")
+
+        self._check_servers_responded(json_response)
+        types = json_response["resultTable"]["dataSchema"]["columnDataTypes"]
+        return SubQueryResult(
+            columns=json_response["resultTable"]["dataSchema"]["columnNames"],
+            types=types,
+            rows=list(self._generate_rows(types, json_response["resultTable"]["rows"])),
+            statistics=_make_query_statistics(json_response),
+        )
+
+    def _set_result(self, columns: list[str], types: list[str], rows: list[list], statistics: QueryStatistics) -> None:
+        self._result_set = ResultSet[RowType](
+            iter(rows),
+            columns=columns,
+            types=types,
+            rowcount=len(rows),
+            arraysize=self._result_set.arraysize,
+            row_factory=self._result_set._row_factory,
+        )
+        self._last_query_statistics = statistics
+
+    def _handle_split_responses(self, responses: list[httpx.Response], plan: MergePlan) -> list[httpx.Response]:
+        results = [self._load_sub_query_result(r) for r in responses]
+        columns, types, rows = plan.combine(results)
+        self._set_result(columns, types, rows, merge_query_statistics([result.statistics for result in results]))
+        return responses
+
+    def _prepare_keyset(
+        self, operation: str, params: dict | tuple | list | None, *, key: str, page_size: int
+    ) -> KeysetPaginator:
+        query = Query(operation, params)
+        self._last_query = query
+        self._transfers.clear()
+        self._trace_context = None
+        self._timer = QueryTimer()
+        return KeysetPaginator(query.operation_with_params, key, page_size)
+
+    def _add_page_timings(self, timer: QueryTimer, transfers: list[TransferStatistics]) -> None:
+        """Add the timings and transfer statistics of a page fetched by another cursor to those of this cursor"""
+        self._timer.build += timer.build
+        self._timer.decode += timer.decode
+        self._timer.sends.extend(timer.sends)
+        self._transfers.extend(transfers)
+
+    def _handle_page(self, page: SubQueryResult, statistics: list[QueryStatistics]) -> None:
+        """Make a page the current result set of the cursor, with the statistics of all pages so far"""
+        statistics.append(page.statistics)
+        self._set_result(page.columns, page.types, page.rows, merge_query_statistics(statistics))
+
+    def _query_plan(self, query: Query, statistics: QueryStatistics | None, min_match_ratio: float) -> QueryPlan:
+        """Parse the result of an `EXPLAIN PLAN FOR` query, leaving its rows fetchable from the cursor"""
+        result_set = self._result_set
+        assert self._last_query_statistics is not None
+        columns, types, rows = result_set._columns, result_set._types, list(result_set._data)
+        self._set_result(columns, types, rows, self._last_query_statistics)
+        return QueryPlan.parse(query.operation_with_params, columns, rows, statistics, min_match_ratio=min_match_ratio)
+
     def _generate_rows(self, types: list[str], rows: list[list]) -> t.Iterator[list]:
         converters = build_converters(types)
         for row in rows:
@@ -291,7 +883,9 @@ class BaseCursor(t.Generic[_ConnectionType, RowType]):
         exception = json_response["exceptions"][0]
         error_code, message = exception["errorCode"], exception["message"]
         DbapiException = CODE_EXCEPTION_MAP.get(error_code, Error)
-        raise DbapiException(f"[Pinot Error {error_code}] {message}")
+        error = DbapiException(f"[Pinot Error {error_code}] {message}")
+        error.error_code = error_code
+        raise error
 
     def _handle_query_http_error_code(self, response: httpx.Response):
         if response.status_code >= 500:
@@ -352,13 +946,392 @@ class Cursor(BaseCursor["Connection", RowType]):
             request_options: *(optional)* request options to use for this specific query.  Can override timeout and
                 cookies from cursor/connection
         """
-        request = self._build_request(operation, params=params, query_options=query_options)
+        # noinspection PyProtectedMember
+        if self._connection._observers:
+            return self._execute_observed(operation, params, query_options, request_options)
+        return self._execute(operation, params, query_options, request_options)
+
+    def _execute(
+        self,
+        operation: str,
+        params: dict | tuple | list | None,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> httpx.Response:
+        tracer = self._connection.tracer
+        if tracer is not None:
+            return self._execute_traced(tracer, operation, params, query_options, request_options)
+        request = self._build_request(
+            operation, params=params, query_options=query_options, request_options=request_options
+        )
+        response = self._send(request, self._send_context(operation, request_options))
+        return self._handle_response(response)
+
+    def _execute_observed(
+        self,
+        operation: str,
+        params: dict | tuple | list | None,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = self._execute(operation, params, query_options, request_options)
+        except Exception as e:
+            self._observe(operation, query_options, start, None, e)
+            raise
+        self._observe(operation, query_options, start, response, None)
+        return response
+
+    def _execute_traced(
+        self,
+        tracer: QueryTracer,
+        operation: str,
+        params: dict | tuple | list | None,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> httpx.Response:
+        # noinspection PyProtectedMember
+        with tracer._execute() as span:
+            request = self._build_request_traced(
+                tracer, span, operation, params, query_options=query_options, request_options=request_options
+            )
+            # noinspection PyProtectedMember
+            with tracer._phase("pinot.send"):
+                response = self._send(request, self._send_context(operation, request_options))
+            return self._handle_response_traced(tracer, span, response)
+
+    @check_cursor_open
+    def explain(
+        self,
+        operation: str,
+        params: dict | tuple | list | None = None,
+        *,
+        profile: bool = False,
+        min_match_ratio: float = DEFAULT_MIN_MATCH_RATIO,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> QueryPlan:
+        """Explain a query: run `EXPLAIN PLAN FOR` it, and parse the plan into a `QueryPlan` reviewed for performance
+        problems, such as full scans, filters not using an index and aggregations not using a star-tree index.  See
+        `pinot_connect.explain`.
+
+        With `profile`, the query itself is run first, to review how well its segments were pruned from its
+        statistics.  Its rows are discarded, so only profile queries with a reasonable `LIMIT`.  Either way, the rows
+        of the plan are the cursor's result set afterwards.  Only plans of the single-stage engine can be parsed.
+
+        Args:
+            operation: the sql operation to explain
+            params: *(optional)* sql params to bind to the operation
+            profile: *(optional)* run the query too, to review its segment pruning.  Default: `False`
+            min_match_ratio: *(optional)* share of the queried segments a profiled run must match not to be
+                reported as poorly pruned.  Default: `0.5`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for the queries
+        """
+        statistics = None
+        if profile:
+            self.execute(operation, params, query_options=query_options, request_options=request_options)
+            statistics = self._last_query_statistics
+        self.execute(_EXPLAIN_PREFIX + operation, params, query_options=query_options, request_options=request_options)
+        return self._query_plan(Query(operation, params), statistics, min_match_ratio)
+
+    @check_cursor_open
+    def execute_chunked(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        chunk_param: str | int,
+        chunk_size: int = 10_000,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> list[httpx.Response]:
+        """Execute a query with a very large IN list by splitting the list into chunks and running one query per chunk
+        concurrently.  The rows of all chunks are concatenated into a single result set, which is then fetched like
+        the result of `execute`.
+
+        A top level `ORDER BY` is preserved by merging the sorted chunk results, and a top level `LIMIT` (and offset)
+        is re-applied to the combined rows.  Queries without a `LIMIT` are subject to Pinot's default limit for *every*
+        chunk, so set one explicitly.  Aggregation queries can be re-aggregated across chunks with `aggregate`.
+
+        Args:
+            operation: the sql operation to send to the broker
+            params: sql params to bind to the operation
+            chunk_param: the name (dict params) or index (sequence params) of the param holding the IN list to split
+            chunk_size: *(optional)* maximum number of IN list values per query.  Default: `10_000`
+            max_concurrency: *(optional)* maximum number of chunk queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                `SUM`, `COUNT`, `MIN`, `MAX` and `AVG` functions in its select list, or a mapping of output column name
+                to aggregation function to declare them, or `False` to keep the partial results of every sub-query.
+                Queries selecting aggregations must set it, otherwise `ProgrammingError` is raised
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query.
+                Default: `100_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every chunk query
+
+        Returns: the `httpx.Response` of every chunk query, in chunk order
+        """
+        with self._observed(operation, query_options) as observation:
+            query, plan = self._prepare_split(operation, params, aggregate=aggregate, group_limit=group_limit)
+            queries = query.chunked(chunk_param, chunk_size)
+            requests = self._make_requests(queries, query_options=query_options, request_options=request_options)
+            responses = self._handle_split_responses(
+                self._send_all(requests, max_concurrency, self._send_context(operation, request_options)), plan
+            )
+            self._observe_split(observation, responses)
+        return responses
+
+    @check_cursor_open
+    def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> list[httpx.Response]:
+        """Execute a query over a long time range by splitting the range into `splits` sub-ranges and running one query
+        per sub-range concurrently.  The results are combined into a single result set, which is then fetched like the
+        result of `execute`.
+
+        The operation must filter on a half-open range bound by two params, e.g.
+        `where ts >= %(start)s and ts < %(end)s`, so that rows on the boundary of two sub-ranges are returned once.
+
+        A top level `ORDER BY` is preserved with a k-way merge of the sorted sub-range results, otherwise rows are
+        returned in sub-range order.  A top level `LIMIT` (and offset) is re-applied to the combined rows.
+        Aggregation queries can be re-aggregated across sub-ranges with `aggregate`.
+
+        Args:
+            operation: the sql operation to send to the broker
+            params: sql params to bind to the operation
+            start_param: the name (dict params) or index (sequence params) of the param holding the inclusive start
+            end_param: the name (dict params) or index (sequence params) of the param holding the exclusive end
+            splits: *(optional)* number of sub-ranges to split the range into.  Default: `4`
+            max_concurrency: *(optional)* maximum number of sub-range queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                `SUM`, `COUNT`, `MIN`, `MAX` and `AVG` functions in its select list, or a mapping of output column name
+                to aggregation function to declare them, or `False` to keep the partial results of every sub-query.
+                Queries selecting aggregations must set it, otherwise `ProgrammingError` is raised
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query.
+                Default: `100_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every sub-range query
+
+        Returns: the `httpx.Response` of every sub-range query, in time order
+        """
+        with self._observed(operation, query_options) as observation:
+            query, plan = self._prepare_split(operation, params, aggregate=aggregate, group_limit=group_limit)
+            queries = query.split_range(start_param, end_param, splits)
+            requests = self._make_requests(queries, query_options=query_options, request_options=request_options)
+            responses = self._handle_split_responses(
+                self._send_all(requests, max_concurrency, self._send_context(operation, request_options)), plan
+            )
+            self._observe_split(observation, responses)
+        return responses
+
+    @check_cursor_open
+    def execute_sharded(
+        self,
+        operation: str,
+        shards: t.Sequence[dict | tuple | list],
+        *,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> list[httpx.Response]:
+        """Execute the same operation once per set of params in `shards` concurrently, and combine the results into a
+        single result set, which is then fetched like the result of `execute`.
+
+        This is useful when sharding a query yourself, e.g. by partition, with the params of each shard binding a
+        disjoint predicate.  Results are combined exactly like the results of `execute_split`.
+
+        Args:
+            operation: the sql operation to send to the broker
+            shards: the sql params to bind to the operation, one per shard
+            max_concurrency: *(optional)* maximum number of shard queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                `SUM`, `COUNT`, `MIN`, `MAX` and `AVG` functions in its select list, or a mapping of output column name
+                to aggregation function to declare them, or `False` to keep the partial results of every sub-query.
+                Queries selecting aggregations must set it, otherwise `ProgrammingError` is raised
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query.
+                Default: `100_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every shard query
+
+        Returns: the `httpx.Response` of every shard query, in shard order
+        """
+        if not shards:
+            raise ProgrammingError("execute_sharded requires at least one shard.")
+        with self._observed(operation, query_options) as observation:
+            query, plan = self._prepare_split(operation, None, aggregate=aggregate, group_limit=group_limit)
+            queries = [Query(query.operation, params) for params in shards]
+            requests = self._make_requests(queries, query_options=query_options, request_options=request_options)
+            responses = self._handle_split_responses(
+                self._send_all(requests, max_concurrency, self._send_context(operation, request_options)), plan
+            )
+            self._observe_split(observation, responses)
+        return responses
+
+    @check_cursor_open
+    def paginate(
+        self,
+        operation: str,
+        params: dict | tuple | list | None = None,
+        *,
+        key: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> t.Iterator[RowType]:
+        """Iterate over the rows of an ordered query using keyset (seek) pagination, fetching `page_size` rows at a
+        time.
+
+        Pages after the first are fetched by re-executing the query with `key > last_seen` (`key < last_seen` when
+        the query is ordered by the key descending) and `LIMIT page_size`, rather than with an offset, so servers don't
+        re-scan and discard the rows of earlier pages.  The next page is prefetched by a cursor of its own while the
+        current one is consumed, and iteration stops at the first short page.  Each page becomes the cursor's current
+        result set, so `description`, `rowcount` and `query_statistics` (accumulated across pages) are available while
+        iterating.
+
+        The key must be a selected column that is unique and non-null across the rows of the query, and if the query
+        has an `ORDER BY`, its first expression must be the key.  A `LIMIT` on the query caps the total number of rows
+        across all pages.
+
+        Args:
+            operation: the sql operation to send to the broker
+            params: *(optional)* sql params to bind to the operation
+            key: the column to paginate on
+            page_size: *(optional)* number of rows to fetch per page.  Default: `10_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every page query
+        """
+        paginator = self._prepare_keyset(operation, params, key=key, page_size=page_size)
+        context = self._send_context(operation, request_options)
+        statistics: list[QueryStatistics] = []
+        # pages are fetched by a cursor of their own, so the prefetch thread shares no state with this cursor, which the
+        # caller reads while the next page is fetched
+        fetcher = Cursor(self._connection, self._result_set._row_factory, query_options=self._query_options)
+
+        def fetch_page(operation_: str) -> tuple[SubQueryResult, QueryTimer, list[TransferStatistics]]:
+            fetcher._timer, fetcher._transfers = QueryTimer(), []
+            with fetcher._observed(operation_, query_options) as observation:
+                request = fetcher._make_request(
+                    Query(operation_), query_options=query_options, request_options=request_options
+                )
+                response = fetcher._send(request, context)
+                page = fetcher._observe_page(observation, response, fetcher._load_sub_query_result(response))
+            return page, fetcher._timer, fetcher._transfers
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            next_page: Future[tuple[SubQueryResult, QueryTimer, list[TransferStatistics]]] | None = executor.submit(
+                fetch_page, paginator.first_operation()
+            )
+            while next_page is not None:
+                page, timer, transfers = next_page.result()
+                next_operation = paginator.next_operation(page)
+                next_page = executor.submit(fetch_page, next_operation) if next_operation is not None else None
+                self._add_page_timings(timer, transfers)
+                self._handle_page(page, statistics)
+                yield from iter(self._result_set.fetchone, None)
+        finally:
+            # don't wait on a prefetched page the caller no longer wants, but stop it on the broker
+            fetcher.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            fetcher.close()
+
+    def _send_all(
+        self, requests: list[httpx.Request], max_concurrency: int, context: _SendContext
+    ) -> list[httpx.Response]:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(requests)))) as executor:
+            return list(executor.map(functools.partial(self._send, context=context), requests))
+
+    def _send(self, request: httpx.Request, context: _SendContext = _NO_SEND_CONTEXT) -> httpx.Response:
+        scheduler, rate_limiter = self.connection.scheduler, self.connection.rate_limiter
+        circuit_breaker = self.connection.circuit_breaker
         try:
+            if rate_limiter is not None:
+                rate_limiter.acquire(context.table, context.wait_timeout)
+            # the deadline's remaining budget also bounds the wait for a slot
+            slot = scheduler.slot(context.priority, context.wait_timeout) if scheduler is not None else None
+            with slot if slot is not None else contextlib.nullcontext():
+                self._check_deadline(request, context.deadline)
+                if circuit_breaker is None:
+                    return self._send_now(request)
+                # noinspection PyProtectedMember
+                with circuit_breaker._call(request) as call:
+                    return call.done(self._send_now(request))
+        finally:
+            self._in_flight.pop(request, None)
+
+    def _send_now(self, request: httpx.Request) -> httpx.Response:
+        timer = SendTimer(request)
+        self._timer.sends.append(timer)
+        metrics = self.connection.metrics
+        if metrics is not None:
             # noinspection PyProtectedMember
-            response = self.connection._client.send(request)
+            metrics._request_started()
+        try:
+            return self._transmit(request)
+        finally:
+            timer.finish()
+            if metrics is not None:
+                # noinspection PyProtectedMember
+                metrics._request_finished(timer.pool_wait)
+
+    def _transmit(self, request: httpx.Request) -> httpx.Response:
+        try:
+            if self.connection.compression is None:
+                # noinspection PyProtectedMember
+                return self.connection._client.send(request)
+            # read the body as sent, to account for its size and decoding separately.  The stream is read directly
+            # rather than with iter_raw, which refuses responses already read in memory (e.g. from mock transports)
+            # noinspection PyProtectedMember
+            response = self.connection._client.send(request, stream=True)
+            try:
+                raw = b"".join(t.cast(httpx.SyncByteStream, response.stream))
+            finally:
+                response.close()
+            return self._decode(response, raw)
+        except httpx.TimeoutException as e:
+            # the broker keeps running the query after the client gives up on it, so cancel it without waiting
+            threading.Thread(
+                target=self._cancel_quietly, args=(self._in_flight.get(request), request.url), daemon=True
+            ).start()
+            raise DatabaseError("Failed to execute query") from e
         except Exception as e:
             raise DatabaseError("Failed to execute query") from e
-        return self._handle_response(response)
+
+    def _cancel_quietly(self, client_query_id: str | None, url: httpx.URL) -> None:
+        # cancellation is best-effort: the query may have already finished, or the broker may not support it.  A client
+        # closed in the meantime raises RuntimeError, which would escape the thread this may run in
+        if client_query_id is not None:
+            with contextlib.suppress(httpx.HTTPError, RuntimeError):
+                # noinspection PyProtectedMember
+                self.connection._client.send(self._build_cancel_request(client_query_id, url))
+
+    def cancel(self) -> None:
+        """Cancel the queries this cursor is currently executing on the broker
+
+        Every request is tagged with a `clientQueryId`, which is used to cancel it with the broker's
+        `DELETE /clientQuery/{id}` endpoint.  This is meant to be called from another thread than the one executing
+        the query; the executing call then fails with the broker's cancellation error.  Cancellation is best-effort and
+        is a no-op when no query is running.
+        """
+        for request, client_query_id in list(self._in_flight.items()):
+            self._cancel_quietly(client_query_id, request.url)
 
     def executemany(self, operation: str, parameters: t.Sequence[tuple] | t.Sequence[dict]):
         raise NotSupportedError(
@@ -386,6 +1359,8 @@ class Cursor(BaseCursor["Connection", RowType]):
         Args:
             size: *(optional)* number of records to fetch - if not passed, will use arraysize property instead
         """
+        if self._trace_context is not None:
+            return self._fetch_traced("fetchmany", functools.partial(self._result_set.fetchmany, size))
         return self._result_set.fetchmany(size)
 
     @check_cursor_open
@@ -395,8 +1370,9 @@ class Cursor(BaseCursor["Connection", RowType]):
 
         Uses passed `row_factory` to cursor to determine `RowType` of returned rows.
         """
-        rows = self._result_set.fetchall()
-        return rows
+        if self._trace_context is not None:
+            return self._fetch_traced("fetchall", self._result_set.fetchall)
+        return self._result_set.fetchall()
 
     def setinputsizes(self, sizes: t.Sequence[int | type | None]) -> None:  # pragma: no cover
         pass
@@ -442,6 +1418,7 @@ class AsyncCursor(BaseCursor["AsyncConnection", RowType]):
         params: dict | tuple | list | None = None,
         *,
         query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
     ) -> httpx.Response:
         """Execute a query against the *Pinot* broker
 
@@ -452,14 +1429,400 @@ class AsyncCursor(BaseCursor["AsyncConnection", RowType]):
             operation: the sql operation to send to the broker
             params: *(optional)* sql params to bind to the operation
             query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for this specific query.  Can override timeout and
+                cookies from cursor/connection
         """
-        request = self._build_request(operation, params=params, query_options=query_options)
+        # noinspection PyProtectedMember
+        if self._connection._observers:
+            return await self._execute_observed(operation, params, query_options, request_options)
+        return await self._execute(operation, params, query_options, request_options)
+
+    async def _execute(
+        self,
+        operation: str,
+        params: dict | tuple | list | None,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> httpx.Response:
+        tracer = self._connection.tracer
+        if tracer is not None:
+            return await self._execute_traced(tracer, operation, params, query_options, request_options)
+        request = self._build_request(
+            operation, params=params, query_options=query_options, request_options=request_options
+        )
+        response = await self._send(request, self._send_context(operation, request_options))
+        return self._handle_response(response)
+
+    async def _execute_observed(
+        self,
+        operation: str,
+        params: dict | tuple | list | None,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> httpx.Response:
+        start = time.perf_counter()
         try:
+            response = await self._execute(operation, params, query_options, request_options)
+        except Exception as e:
+            self._observe(operation, query_options, start, None, e)
+            raise
+        self._observe(operation, query_options, start, response, None)
+        return response
+
+    async def _execute_traced(
+        self,
+        tracer: QueryTracer,
+        operation: str,
+        params: dict | tuple | list | None,
+        query_options: QueryOptions | None,
+        request_options: RequestOptions | None,
+    ) -> httpx.Response:
+        # noinspection PyProtectedMember
+        with tracer._execute() as span:
+            request = self._build_request_traced(
+                tracer, span, operation, params, query_options=query_options, request_options=request_options
+            )
             # noinspection PyProtectedMember
-            response = await self.connection._client.send(request)
+            with tracer._phase("pinot.send"):
+                response = await self._send(request, self._send_context(operation, request_options))
+            return self._handle_response_traced(tracer, span, response)
+
+    @acheck_cursor_open
+    async def explain(
+        self,
+        operation: str,
+        params: dict | tuple | list | None = None,
+        *,
+        profile: bool = False,
+        min_match_ratio: float = DEFAULT_MIN_MATCH_RATIO,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> QueryPlan:
+        """Explain a query: run `EXPLAIN PLAN FOR` it, and parse the plan into a `QueryPlan` reviewed for performance
+        problems, such as full scans, filters not using an index and aggregations not using a star-tree index.  See
+        `pinot_connect.explain`.
+
+        With `profile`, the query itself is run first, to review how well its segments were pruned from its
+        statistics.  Its rows are discarded, so only profile queries with a reasonable `LIMIT`.  Either way, the rows
+        of the plan are the cursor's result set afterwards.  Only plans of the single-stage engine can be parsed.
+
+        Args:
+            operation: the sql operation to explain
+            params: *(optional)* sql params to bind to the operation
+            profile: *(optional)* run the query too, to review its segment pruning.  Default: `False`
+            min_match_ratio: *(optional)* share of the queried segments a profiled run must match not to be
+                reported as poorly pruned.  Default: `0.5`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for the queries
+        """
+        statistics = None
+        if profile:
+            await self.execute(operation, params, query_options=query_options, request_options=request_options)
+            statistics = self._last_query_statistics
+        await self.execute(
+            _EXPLAIN_PREFIX + operation, params, query_options=query_options, request_options=request_options
+        )
+        return self._query_plan(Query(operation, params), statistics, min_match_ratio)
+
+    @acheck_cursor_open
+    async def execute_chunked(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        chunk_param: str | int,
+        chunk_size: int = 10_000,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> list[httpx.Response]:
+        """Execute a query with a very large IN list by splitting the list into chunks and running one query per chunk
+        concurrently.  The rows of all chunks are concatenated into a single result set, which is then fetched like
+        the result of `execute`.
+
+        A top level `ORDER BY` is preserved by merging the sorted chunk results, and a top level `LIMIT` (and offset)
+        is re-applied to the combined rows.  Queries without a `LIMIT` are subject to Pinot's default limit for *every*
+        chunk, so set one explicitly.  Aggregation queries can be re-aggregated across chunks with `aggregate`.
+
+        Args:
+            operation: the sql operation to send to the broker
+            params: sql params to bind to the operation
+            chunk_param: the name (dict params) or index (sequence params) of the param holding the IN list to split
+            chunk_size: *(optional)* maximum number of IN list values per query.  Default: `10_000`
+            max_concurrency: *(optional)* maximum number of chunk queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                `SUM`, `COUNT`, `MIN`, `MAX` and `AVG` functions in its select list, or a mapping of output column name
+                to aggregation function to declare them, or `False` to keep the partial results of every sub-query.
+                Queries selecting aggregations must set it, otherwise `ProgrammingError` is raised
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query.
+                Default: `100_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every chunk query
+
+        Returns: the `httpx.Response` of every chunk query, in chunk order
+        """
+        with self._observed(operation, query_options) as observation:
+            query, plan = self._prepare_split(operation, params, aggregate=aggregate, group_limit=group_limit)
+            queries = query.chunked(chunk_param, chunk_size)
+            requests = self._make_requests(queries, query_options=query_options, request_options=request_options)
+            responses = self._handle_split_responses(
+                await self._send_all(requests, max_concurrency, self._send_context(operation, request_options)), plan
+            )
+            self._observe_split(observation, responses)
+        return responses
+
+    @acheck_cursor_open
+    async def execute_split(
+        self,
+        operation: str,
+        params: dict | tuple | list,
+        *,
+        start_param: str | int,
+        end_param: str | int,
+        splits: int = 4,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> list[httpx.Response]:
+        """Execute a query over a long time range by splitting the range into `splits` sub-ranges and running one query
+        per sub-range concurrently.  The results are combined into a single result set, which is then fetched like the
+        result of `execute`.
+
+        The operation must filter on a half-open range bound by two params, e.g.
+        `where ts >= %(start)s and ts < %(end)s`, so that rows on the boundary of two sub-ranges are returned once.
+
+        A top level `ORDER BY` is preserved with a k-way merge of the sorted sub-range results, otherwise rows are
+        returned in sub-range order.  A top level `LIMIT` (and offset) is re-applied to the combined rows.
+        Aggregation queries can be re-aggregated across sub-ranges with `aggregate`.
+
+        Args:
+            operation: the sql operation to send to the broker
+            params: sql params to bind to the operation
+            start_param: the name (dict params) or index (sequence params) of the param holding the inclusive start
+            end_param: the name (dict params) or index (sequence params) of the param holding the exclusive end
+            splits: *(optional)* number of sub-ranges to split the range into.  Default: `4`
+            max_concurrency: *(optional)* maximum number of sub-range queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                `SUM`, `COUNT`, `MIN`, `MAX` and `AVG` functions in its select list, or a mapping of output column name
+                to aggregation function to declare them, or `False` to keep the partial results of every sub-query.
+                Queries selecting aggregations must set it, otherwise `ProgrammingError` is raised
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query.
+                Default: `100_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every sub-range query
+
+        Returns: the `httpx.Response` of every sub-range query, in time order
+        """
+        with self._observed(operation, query_options) as observation:
+            query, plan = self._prepare_split(operation, params, aggregate=aggregate, group_limit=group_limit)
+            queries = query.split_range(start_param, end_param, splits)
+            requests = self._make_requests(queries, query_options=query_options, request_options=request_options)
+            responses = self._handle_split_responses(
+                await self._send_all(requests, max_concurrency, self._send_context(operation, request_options)), plan
+            )
+            self._observe_split(observation, responses)
+        return responses
+
+    @acheck_cursor_open
+    async def execute_sharded(
+        self,
+        operation: str,
+        shards: t.Sequence[dict | tuple | list],
+        *,
+        max_concurrency: int = 4,
+        aggregate: bool | t.Mapping[str, AggregationFunction] | None = None,
+        group_limit: int = DEFAULT_GROUP_LIMIT,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> list[httpx.Response]:
+        """Execute the same operation once per set of params in `shards` concurrently, and combine the results into a
+        single result set, which is then fetched like the result of `execute`.
+
+        This is useful when sharding a query yourself, e.g. by partition, with the params of each shard binding a
+        disjoint predicate.  Results are combined exactly like the results of `execute_split`.
+
+        Args:
+            operation: the sql operation to send to the broker
+            shards: the sql params to bind to the operation, one per shard
+            max_concurrency: *(optional)* maximum number of shard queries in flight at once.  Default: `4`
+            aggregate: *(optional)* `True` to re-aggregate the partial results of an aggregation query using the
+                `SUM`, `COUNT`, `MIN`, `MAX` and `AVG` functions in its select list, or a mapping of output column name
+                to aggregation function to declare them, or `False` to keep the partial results of every sub-query.
+                Queries selecting aggregations must set it, otherwise `ProgrammingError` is raised
+            group_limit: *(optional)* when re-aggregating, the maximum number of groups fetched by each sub-query.
+                Default: `100_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every shard query
+
+        Returns: the `httpx.Response` of every shard query, in shard order
+        """
+        if not shards:
+            raise ProgrammingError("execute_sharded requires at least one shard.")
+        with self._observed(operation, query_options) as observation:
+            query, plan = self._prepare_split(operation, None, aggregate=aggregate, group_limit=group_limit)
+            queries = [Query(query.operation, params) for params in shards]
+            requests = self._make_requests(queries, query_options=query_options, request_options=request_options)
+            responses = self._handle_split_responses(
+                await self._send_all(requests, max_concurrency, self._send_context(operation, request_options)), plan
+            )
+            self._observe_split(observation, responses)
+        return responses
+
+    async def paginate(
+        self,
+        operation: str,
+        params: dict | tuple | list | None = None,
+        *,
+        key: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        query_options: QueryOptions | None = None,
+        request_options: RequestOptions | None = None,
+    ) -> t.AsyncIterator[RowType]:
+        """Iterate over the rows of an ordered query using keyset (seek) pagination, fetching `page_size` rows at a
+        time.
+
+        Pages after the first are fetched by re-executing the query with `key > last_seen` (`key < last_seen` when
+        the query is ordered by the key descending) and `LIMIT page_size`, rather than with an offset, so servers don't
+        re-scan and discard the rows of earlier pages.  The next page is prefetched while the current one is consumed,
+        and iteration stops at the first short page.  Each page becomes the cursor's current result set, so
+        `description`, `rowcount` and `query_statistics` (accumulated across pages) are available while iterating.
+
+        The key must be a selected column that is unique and non-null across the rows of the query, and if the query
+        has an `ORDER BY`, its first expression must be the key.  A `LIMIT` on the query caps the total number of rows
+        across all pages.
+
+        Args:
+            operation: the sql operation to send to the broker
+            params: *(optional)* sql params to bind to the operation
+            key: the column to paginate on
+            page_size: *(optional)* number of rows to fetch per page.  Default: `10_000`
+            query_options: *(optional)* query options that override what is set on cursor/connection
+            request_options: *(optional)* request options to use for every page query
+        """
+        if self.closed:
+            raise ProgrammingError("Operation failed: Cannot call paginate on closed cursor.")
+        paginator = self._prepare_keyset(operation, params, key=key, page_size=page_size)
+        context = self._send_context(operation, request_options)
+        statistics: list[QueryStatistics] = []
+
+        async def fetch_page(operation_: str) -> SubQueryResult:
+            with self._observed(operation_, query_options) as observation:
+                request = self._make_request(
+                    Query(operation_), query_options=query_options, request_options=request_options
+                )
+                response = await self._send(request, context)
+                return self._observe_page(observation, response, self._load_sub_query_result(response))
+
+        next_page: asyncio.Future[SubQueryResult] | None = asyncio.ensure_future(
+            fetch_page(paginator.first_operation())
+        )
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_operation = paginator.next_operation(page)
+                next_page = asyncio.ensure_future(fetch_page(next_operation)) if next_operation is not None else None
+                self._handle_page(page, statistics)
+                for row in iter(self._result_set.fetchone, None):
+                    yield row
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def _send_all(
+        self, requests: list[httpx.Request], max_concurrency: int, context: _SendContext
+    ) -> list[httpx.Response]:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def send_(request: httpx.Request) -> httpx.Response:
+            async with semaphore:
+                return await self._send(request, context)
+
+        return list(await asyncio.gather(*(send_(request) for request in requests)))
+
+    async def _send(self, request: httpx.Request, context: _SendContext = _NO_SEND_CONTEXT) -> httpx.Response:
+        scheduler, rate_limiter = self.connection.scheduler, self.connection.rate_limiter
+        circuit_breaker = self.connection.circuit_breaker
+        try:
+            if rate_limiter is not None:
+                await rate_limiter.acquire_async(context.table, context.wait_timeout)
+            # the deadline's remaining budget also bounds the wait for a slot
+            slot = scheduler.slot(context.priority, context.wait_timeout) if scheduler is not None else None
+            async with slot if slot is not None else _unscheduled():
+                self._check_deadline(request, context.deadline)
+                if circuit_breaker is None:
+                    return await self._send_now(request)
+                # noinspection PyProtectedMember
+                with circuit_breaker._call(request) as call:
+                    return call.done(await self._send_now(request))
+        finally:
+            self._in_flight.pop(request, None)
+
+    async def _send_now(self, request: httpx.Request) -> httpx.Response:
+        timer = AsyncSendTimer(request)
+        self._timer.sends.append(timer)
+        metrics = self.connection.metrics
+        if metrics is not None:
+            # noinspection PyProtectedMember
+            metrics._request_started()
+        try:
+            return await self._transmit(request)
+        finally:
+            timer.finish()
+            if metrics is not None:
+                # noinspection PyProtectedMember
+                metrics._request_finished(timer.pool_wait)
+
+    async def _transmit(self, request: httpx.Request) -> httpx.Response:
+        try:
+            if self.connection.compression is None:
+                # noinspection PyProtectedMember
+                return await self.connection._client.send(request)
+            # read the body as sent, to account for its size and decoding separately
+            # noinspection PyProtectedMember
+            response = await self.connection._client.send(request, stream=True)
+            try:
+                raw = b"".join([chunk async for chunk in t.cast(httpx.AsyncByteStream, response.stream)])
+            finally:
+                await response.aclose()
+            return self._decode(response, raw)
+        except (asyncio.CancelledError, httpx.TimeoutException) as e:
+            # the broker keeps running the query after the client gives up on it, so cancel it in the background
+            client_query_id = self._in_flight.get(request)
+            if client_query_id is not None:
+                task = asyncio.ensure_future(self._cancel_quietly(client_query_id, request.url))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise DatabaseError("Failed to make query request to server") from e
         except Exception as e:
             raise DatabaseError("Failed to make query request to server") from e
-        return self._handle_response(response)
+
+    async def _cancel_quietly(self, client_query_id: str, url: httpx.URL) -> None:
+        # cancellation is best-effort: the query may have already finished, or the broker may not support it.  A client
+        # closed in the meantime raises RuntimeError, which would be left unretrieved in the background task
+        with contextlib.suppress(httpx.HTTPError, RuntimeError):
+            # noinspection PyProtectedMember
+            await self.connection._client.send(self._build_cancel_request(client_query_id, url))
+
+    async def cancel(self) -> None:
+        """Cancel the queries this cursor is currently executing on the broker
+
+        Every request is tagged with a `clientQueryId`, which is used to cancel it with the broker's
+        `DELETE /clientQuery/{id}` endpoint.  Cancelling the task running a query, or a request timing out, also
+        cancels the query on the broker in the background.  Cancellation is best-effort and is a no-op when no query is
+        running.
+        """
+        await asyncio.gather(
+            *(
+                self._cancel_quietly(client_query_id, request.url)
+                for request, client_query_id in list(self._in_flight.items())
+            )
+        )
 
     async def executemany(self, operation: str, parameters: t.Sequence[tuple] | t.Sequence[dict]):
         raise NotSupportedError(
@@ -487,6 +1850,8 @@ class AsyncCursor(BaseCursor["AsyncConnection", RowType]):
         Args:
             size: *(optional)* number of records to fetch - if not passed, will use arraysize property instead
         """
+        if self._trace_context is not None:
+            return self._fetch_traced("fetchmany", functools.partial(self._result_set.fetchmany, size))
         return self._result_set.fetchmany(size)
 
     @acheck_cursor_open
@@ -496,6 +1861,8 @@ class AsyncCursor(BaseCursor["AsyncConnection", RowType]):
 
         Uses passed `row_factory` to cursor to determine `RowType` of returned rows.
         """
+        if self._trace_context is not None:
+            return self._fetch_traced("fetchall", self._result_set.fetchall)
         return self._result_set.fetchall()
 
     async def setinputsizes(self, sizes: t.Sequence[int | type | None]) -> None:  # pragma: no cover
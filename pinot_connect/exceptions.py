@@ -1,8 +1,13 @@
 class Error(Exception):
     """Exception that is the base class of all other error exceptions.
     You can use this to catch all errors with one single except statement.
+
+    Attributes:
+        error_code: the Pinot error code of errors reported by the broker, see `CODE_EXCEPTION_MAP`
     """
 
+    error_code: "int | None" = None
+
 
 class InterfaceError(Error):
     """Exception raised for errors that are related to the database interface rather than the database itself"""
@@ -0,0 +1,244 @@
+"""Parsing and review of `EXPLAIN PLAN FOR` output
+
+`cursor.explain` runs `EXPLAIN PLAN FOR` on a query and parses the rows Pinot returns (one per operator, with the ids
+of the operator and of its parent) into a tree of `PlanNode`, which it reviews for common performance problems:
+
+| finding                  | meaning                                                                                |
+| ------------------------ | -------------------------------------------------------------------------------------- |
+| `full_scan`              | a filter scans every document of the segments (`FILTER_FULL_SCAN`)                     |
+| `missing_inverted_index` | an equality or `IN` filter scans rather than using an inverted or sorted index         |
+| `missing_range_index`    | a range filter scans rather than using a range or sorted index                         |
+| `no_star_tree`           | an aggregation doesn't use a star-tree index                                           |
+| `poor_segment_pruning`   | a profiled run of the query processed many more segments than it matched               |
+
+Findings are hints: a full scan of a small table is fine, and only tables with a star-tree index can use one.  The
+plan and its findings are plain data (`QueryPlan.asdict`), to check queries automatically, e.g. in CI.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import re
+import typing as t
+
+from .exceptions import NotSupportedError
+
+if t.TYPE_CHECKING:
+    from .cursor import QueryStatistics
+
+__all__ = ["QueryPlan", "PlanNode", "PlanFinding", "DEFAULT_MIN_MATCH_RATIO"]
+
+# a profiled run matching fewer than this share of the segments it processed is reported as poorly pruned
+DEFAULT_MIN_MATCH_RATIO: t.Final[float] = 0.5
+
+Severity = t.Literal["warning", "info"]
+
+_OPERATOR_RE: t.Final[re.Pattern] = re.compile(r"^\s*(?P<name>[A-Z0-9_]+)(?:\((?P<attributes>.*)\))?\s*$", re.DOTALL)
+# attributes are `key:value` pairs separated by commas, and values (e.g. predicates) can contain commas themselves
+_ATTRIBUTE_SEPARATOR_RE: t.Final[re.Pattern] = re.compile(r",(?=\s*[A-Za-z]\w*:)")
+_EQUALITY_OPERATORS: t.Final[frozenset[str]] = frozenset({"EQ", "NOT_EQ", "IN", "NOT_IN"})
+_RANGE_OPERATORS: t.Final[frozenset[str]] = frozenset({"RANGE"})
+_NON_SCAN_AGGREGATIONS: t.Final[frozenset[str]] = frozenset({"AGGREGATE_NO_SCAN"})
+
+
+@dataclasses.dataclass
+class PlanNode:
+    """An operator of a query plan
+
+    Attributes:
+        id: the operator's id
+        parent_id: id of the operator's parent, `-1` for the root
+        operator: the operator's name, e.g. `FILTER_FULL_SCAN`
+        attributes: the operator's attributes, e.g. `{"operator": "RANGE", "predicate": "ts > '2024-01-01'"}`
+        description: the operator as returned by Pinot
+        children: the operator's children, in order of their ids
+    """
+
+    id: int
+    parent_id: int
+    operator: str
+    attributes: dict[str, str]
+    description: str
+    children: list[PlanNode] = dataclasses.field(default_factory=list)
+
+    def walk(self) -> t.Iterator[PlanNode]:
+        """The node and every node below it, depth first"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+@dataclasses.dataclass(frozen=True)
+class PlanFinding:
+    """A possible performance problem of a query plan
+
+    Attributes:
+        code: what the problem is, e.g. `full_scan`.  See `pinot_connect.explain`
+        severity: `warning` or `info`
+        message: description of the problem
+        node_id: id of the operator the problem is about, if any
+    """
+
+    code: str
+    severity: Severity
+    message: str
+    node_id: int | None = None
+
+
+def _parse_operator(description: str) -> tuple[str, dict[str, str]]:
+    match = _OPERATOR_RE.match(description)
+    if match is None:
+        return description.strip(), {}
+    attributes = {}
+    if match["attributes"]:
+        for attribute in _ATTRIBUTE_SEPARATOR_RE.split(match["attributes"]):
+            key, _, value = attribute.partition(":")
+            attributes[key.strip()] = value.strip()
+    return match["name"], attributes
+
+
+def _review(nodes: list[PlanNode], statistics: QueryStatistics | None, min_match_ratio: float) -> list[PlanFinding]:
+    findings = []
+    operators = {node.operator for node in nodes}
+    for node in nodes:
+        if node.operator != "FILTER_FULL_SCAN":
+            continue
+        predicate = node.attributes.get("predicate", "")
+        findings.append(
+            PlanFinding(
+                "full_scan", "warning", f"Filter scans every document: {predicate or node.description}", node.id
+            )
+        )
+        operator = node.attributes.get("operator", "")
+        if operator in _EQUALITY_OPERATORS:
+            findings.append(
+                PlanFinding(
+                    "missing_inverted_index",
+                    "warning",
+                    f"Equality filter doesn't use an inverted or sorted index: {predicate}",
+                    node.id,
+                )
+            )
+        elif operator in _RANGE_OPERATORS:
+            findings.append(
+                PlanFinding(
+                    "missing_range_index",
+                    "warning",
+                    f"Range filter doesn't use a range or sorted index: {predicate}",
+                    node.id,
+                )
+            )
+    # metadata and dictionary based aggregations don't scan, so a star-tree index wouldn't help them
+    scanning_aggregations = [
+        operator
+        for operator in operators
+        if operator.startswith(("AGGREGATE", "GROUP_BY"))
+        and operator not in _NON_SCAN_AGGREGATIONS
+        and "DICTIONARY" not in operator
+        and "METADATA" not in operator
+    ]
+    if scanning_aggregations and not any("STAR_TREE" in operator or "STARTREE" in operator for operator in operators):
+        findings.append(PlanFinding("no_star_tree", "info", "Aggregation doesn't use a star-tree index"))
+    if statistics is not None:
+        # segments pruned by the broker or the servers before processing count against the ratio too
+        queried = statistics.get("numSegmentsQueried", statistics.get("numSegmentsProcessed", 0))
+        processed = statistics.get("numSegmentsProcessed", queried)
+        matched = statistics.get("numSegmentsMatched", 0)
+        if queried and matched / queried < min_match_ratio:
+            findings.append(
+                PlanFinding(
+                    "poor_segment_pruning",
+                    "warning",
+                    f"Queried {queried} segments ({processed} processed) but only {matched} matched: partitioning, a "
+                    f"sorted column or bloom filters could prune the others",
+                )
+            )
+    return findings
+
+
+@dataclasses.dataclass(frozen=True)
+class QueryPlan:
+    """A query plan parsed from `EXPLAIN PLAN FOR` output, with its findings
+
+    Attributes:
+        query: the explained query
+        root: the root operator of the plan
+        nodes: every operator of the plan, by id
+        findings: possible performance problems of the plan
+        statistics: query statistics of a profiled run of the query, if one was made
+    """
+
+    query: str
+    root: PlanNode
+    nodes: dict[int, PlanNode]
+    findings: list[PlanFinding]
+    statistics: QueryStatistics | None = None
+
+    @classmethod
+    def parse(
+        cls,
+        query: str,
+        columns: list[str],
+        rows: list[list],
+        statistics: QueryStatistics | None = None,
+        *,
+        min_match_ratio: float = DEFAULT_MIN_MATCH_RATIO,
+    ) -> QueryPlan:
+        """Parse the result of `EXPLAIN PLAN FOR` a query
+
+        Args:
+            query: the explained query
+            columns: the result's column names
+            rows: the result's rows
+            statistics: *(optional)* query statistics of a run of the query, to review its segment pruning
+            min_match_ratio: *(optional)* share of queried segments a run must match not to be reported as poorly
+                pruned.  Default: `0.5`
+        """
+        try:
+            operator, operator_id, parent_id = (
+                columns.index(name) for name in ("Operator", "Operator_Id", "Parent_Id")
+            )
+        except ValueError:
+            raise NotSupportedError(
+                f"Can't parse an explain plan with columns {columns}: only single-stage engine plans are supported"
+            ) from None
+        nodes = {}
+        for row in rows:
+            name, attributes = _parse_operator(row[operator])
+            node = PlanNode(int(row[operator_id]), int(row[parent_id]), name, attributes, row[operator])
+            nodes[node.id] = node
+        roots = []
+        for node in sorted(nodes.values(), key=lambda node: node.id):
+            parent = nodes.get(node.parent_id)
+            if parent is None or parent is node:
+                roots.append(node)
+            else:
+                parent.children.append(node)
+        if not roots:
+            raise NotSupportedError("Can't parse an explain plan without operators")
+        root = roots[0]
+        # plans are a single tree, but keep any stray operators reachable
+        root.children.extend(roots[1:])
+        return cls(query, root, nodes, _review(list(nodes.values()), statistics, min_match_ratio), statistics)
+
+    def find(self, operator: str) -> list[PlanNode]:
+        """The operators of the plan with the given name, or starting with it, e.g. `FILTER`"""
+        return [node for node in self.root.walk() if node.operator.startswith(operator)]
+
+    def asdict(self) -> dict[str, t.Any]:
+        """The plan and its findings as plain dicts and lists, e.g. to dump as JSON"""
+
+        def node_dict(node: PlanNode) -> dict[str, t.Any]:
+            return {
+                "id": node.id,
+                "operator": node.operator,
+                "attributes": node.attributes,
+                "children": [node_dict(child) for child in node.children],
+            }
+
+        return {
+            "query": self.query,
+            "plan": node_dict(self.root),
+            "findings": [dataclasses.asdict(finding) for finding in self.findings],
+            "statistics": {key: value for key, value in (self.statistics or {}).items() if key != "traceInfo"} or None,
+        }
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import math
+import threading
+import typing as t
+
+from .exceptions import ProgrammingError
+
+if t.TYPE_CHECKING:
+    from ._observe import QueryRecord
+
+__all__ = ["MetricsRegistry", "MetricsSnapshot", "QueryMetrics", "Histogram", "prometheus_text"]
+
+DEFAULT_LATENCY_BUCKETS: t.Final[tuple[float, ...]] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+DEFAULT_MAX_LABEL_SETS: t.Final[int] = 1000
+# label value of the queries recorded once a registry holds max_label_sets label sets
+OTHER: t.Final[str] = "other"
+
+_LabelSet = t.Tuple[str, str]
+
+
+@dataclasses.dataclass(frozen=True)
+class Histogram:
+    """Snapshot of a histogram
+
+    Attributes:
+        buckets: upper bounds of the buckets, in increasing order
+        counts: number of observations in each bucket (not cumulative), with a last bucket for observations above the
+            largest bound
+        sum: sum of all observations
+    """
+
+    buckets: tuple[float, ...]
+    counts: tuple[int, ...]
+    sum: float
+
+    @property
+    def count(self) -> int:
+        """Number of observations"""
+        return sum(self.counts)
+
+
+@dataclasses.dataclass(frozen=True)
+class QueryMetrics:
+    """Snapshot of the metrics of the queries of one table and query fingerprint
+
+    Attributes:
+        table: table of the queries, or `""` when it couldn't be found in the query
+        fingerprint: fingerprint of the queries, see `pinot_connect.tracing`
+        latency: client side duration of execute calls, in seconds, whether they succeeded or not
+        response_bytes: total size of the (decoded) response bodies
+        rows: total number of rows returned
+        errors: number of failed execute calls, by Pinot error code for errors reported by Pinot, and by exception
+            name otherwise, e.g. `{"150": 2, "DatabaseError": 1}`
+    """
+
+    table: str
+    fingerprint: str
+    latency: Histogram
+    response_bytes: int
+    rows: int
+    errors: dict[str, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class MetricsSnapshot:
+    """Snapshot of the metrics of a connection
+
+    Attributes:
+        queries: metrics of each table and query fingerprint
+        pool_wait: time requests waited for a connection from the pool, in seconds.  Only measured with the `httpx`
+            and `httpcore` backends
+        in_flight: number of requests currently being sent or waiting for a response
+    """
+
+    queries: list[QueryMetrics]
+    pool_wait: Histogram
+    in_flight: int
+
+
+class _Shard:
+    """The metrics recorded by one thread, only ever written by that thread, so recording takes no lock"""
+
+    __slots__ = (
+        "latency",
+        "latency_sum",
+        "response_bytes",
+        "rows",
+        "errors",
+        "pool_wait",
+        "pool_wait_sum",
+        "in_flight",
+    )
+
+    def __init__(self, buckets: int):
+        self.clear(buckets)
+        self.in_flight = 0
+
+    def clear(self, buckets: int) -> None:
+        """Forget the recorded metrics.  The number of requests in flight is a gauge rather than a metric of what was
+        recorded, and only the shard's thread writes it, as `-= 1` isn't atomic, so it is kept"""
+        self.latency: dict[_LabelSet, list[int]] = {}
+        self.latency_sum: dict[_LabelSet, float] = {}
+        self.response_bytes: dict[_LabelSet, int] = {}
+        self.rows: dict[_LabelSet, int] = {}
+        self.errors: dict[tuple[_LabelSet, str], int] = {}
+        self.pool_wait = [0] * (buckets + 1)
+        self.pool_wait_sum = 0.0
+
+    def add(self, other: _Shard) -> None:
+        """Add the metrics of another shard to this one.  Copying a dict's items is atomic, so the other shard's thread
+        can keep recording meanwhile"""
+        for label_set, counts in list(other.latency.items()):
+            total = self.latency.setdefault(label_set, [0] * len(counts))
+            for i, count in enumerate(list(counts)):
+                total[i] += count
+        for label_set, value in list(other.latency_sum.items()):
+            self.latency_sum[label_set] = self.latency_sum.get(label_set, 0.0) + value
+        for label_set, value in list(other.response_bytes.items()):
+            self.response_bytes[label_set] = self.response_bytes.get(label_set, 0) + value
+        for label_set, value in list(other.rows.items()):
+            self.rows[label_set] = self.rows.get(label_set, 0) + value
+        for key, value in list(other.errors.items()):
+            self.errors[key] = self.errors.get(key, 0) + value
+        for i, count in enumerate(list(other.pool_wait)):
+            self.pool_wait[i] += count
+        self.pool_wait_sum += other.pool_wait_sum
+        self.in_flight += other.in_flight
+
+
+class MetricsRegistry:
+    """Client side metrics of the queries of a connection, labelled by table and query fingerprint
+
+    Pass a registry to `connect` to record the latency, response size, rows and errors of each `execute` call, and the
+    time requests wait for a pooled connection and the number of requests in flight.  Every thread records into its own
+    shard of counters, which `snapshot` sums, so recording never contends on a lock however many threads share the
+    connection.  Expose the metrics to Prometheus with `prometheus_text`.
+
+    Args:
+        buckets: *(optional)* upper bounds of the latency and pool wait histogram buckets, in seconds.  Default:
+            `DEFAULT_LATENCY_BUCKETS`
+        max_label_sets: *(optional)* maximum number of table and fingerprint label sets, to bound the number of time
+            series.  Queries of further label sets are recorded with the fingerprint `other`.  Default: `1000`
+    """
+
+    def __init__(
+        self, buckets: t.Sequence[float] = DEFAULT_LATENCY_BUCKETS, *, max_label_sets: int = DEFAULT_MAX_LABEL_SETS
+    ):
+        if not buckets or list(buckets) != sorted(set(buckets)):
+            raise ProgrammingError("buckets must be a non-empty sequence of increasing bounds.")
+        if max_label_sets < 1:
+            raise ProgrammingError(f"max_label_sets must be positive, got {max_label_sets}.")
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self.max_label_sets = max_label_sets
+        self._lock = threading.Lock()  # only taken to add a shard or a label set, and to read the shards
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, _Shard]] = []
+        # metrics of the threads that exited, e.g. the workers of execute_chunked, so their shards don't pile up
+        self._retired = _Shard(len(self.buckets))
+        self._label_sets: set[_LabelSet] = set()
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(len(self.buckets))
+            with self._lock:
+                live = []
+                for thread, other in self._shards:
+                    if thread.is_alive():
+                        live.append((thread, other))
+                    else:
+                        self._retired.add(other)
+                live.append((threading.current_thread(), shard))
+                self._shards = live
+            return shard
+
+    def _label_set(self, table: str | None, fingerprint: str) -> _LabelSet:
+        label_set = (table or "", fingerprint)
+        if label_set in self._label_sets:
+            return label_set
+        with self._lock:
+            if len(self._label_sets) < self.max_label_sets:
+                self._label_sets.add(label_set)
+                return label_set
+        return label_set[0], OTHER
+
+    def _record(self, record: QueryRecord) -> None:
+        shard = self._shard()
+        label_set = self._label_set(record.table, record.fingerprint)
+        latency = shard.latency.get(label_set)
+        if latency is None:
+            latency = shard.latency[label_set] = [0] * (len(self.buckets) + 1)
+        latency[bisect.bisect_left(self.buckets, record.duration)] += 1
+        shard.latency_sum[label_set] = shard.latency_sum.get(label_set, 0.0) + record.duration
+        shard.response_bytes[label_set] = shard.response_bytes.get(label_set, 0) + record.response_bytes
+        shard.rows[label_set] = shard.rows.get(label_set, 0) + (record.rows or 0)
+        if record.error is not None:
+            code = getattr(record.error, "error_code", None)
+            key = (label_set, str(code) if code is not None else type(record.error).__name__)
+            shard.errors[key] = shard.errors.get(key, 0) + 1
+
+    def _request_started(self) -> None:
+        self._shard().in_flight += 1
+
+    def _request_finished(self, pool_wait: int | None) -> None:
+        """Count a finished request, with the nanoseconds it waited for a pooled connection, if measured"""
+        shard = self._shard()
+        shard.in_flight -= 1
+        if pool_wait is not None:
+            seconds = pool_wait / 1e9
+            shard.pool_wait[bisect.bisect_left(self.buckets, seconds)] += 1
+            shard.pool_wait_sum += seconds
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Sum the metrics recorded by every thread so far"""
+        total = _Shard(len(self.buckets))
+        with self._lock:
+            total.add(self._retired)
+            for _, shard in self._shards:
+                total.add(shard)
+        errors: dict[_LabelSet, dict[str, int]] = {}
+        for (label_set, code), count in total.errors.items():
+            errors.setdefault(label_set, {})[code] = count
+        return MetricsSnapshot(
+            queries=[
+                QueryMetrics(
+                    table=label_set[0],
+                    fingerprint=label_set[1],
+                    latency=Histogram(self.buckets, tuple(counts), total.latency_sum.get(label_set, 0.0)),
+                    response_bytes=total.response_bytes.get(label_set, 0),
+                    rows=total.rows.get(label_set, 0),
+                    errors=errors.get(label_set, {}),
+                )
+                for label_set, counts in total.latency.items()
+            ],
+            pool_wait=Histogram(self.buckets, tuple(total.pool_wait), total.pool_wait_sum),
+            in_flight=total.in_flight,
+        )
+
+    def reset(self) -> None:
+        """Forget every metric recorded so far, except the number of requests in flight"""
+        with self._lock:
+            self._retired.clear(len(self.buckets))
+            for _, shard in self._shards:
+                shard.clear(len(self.buckets))
+            self._label_sets.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(bound)
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{_format_bound(bound)}"}} {cumulative}')
+    braces = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{braces} {histogram.sum!r}")
+    lines.append(f"{name}_count{braces} {cumulative}")
+    return lines
+
+
+def prometheus_text(metrics: MetricsRegistry | MetricsSnapshot, *, namespace: str = "pinot_connect") -> str:
+    """Format metrics in the Prometheus text exposition format, e.g. to serve from a `/metrics` endpoint
+
+    Args:
+        metrics: the registry to snapshot, or a snapshot
+        namespace: *(optional)* prefix of the metric names.  Default: `pinot_connect`
+    """
+    snapshot = metrics.snapshot() if isinstance(metrics, MetricsRegistry) else metrics
+    queries = sorted(snapshot.queries, key=lambda query: (query.table, query.fingerprint))
+    labels = {
+        id(query): f'table="{_escape(query.table)}",fingerprint="{_escape(query.fingerprint)}"' for query in queries
+    }
+
+    lines = [
+        f"# HELP {namespace}_query_duration_seconds Client side duration of execute calls.",
+        f"# TYPE {namespace}_query_duration_seconds histogram",
+    ]
+    for query in queries:
+        lines.extend(_histogram_lines(f"{namespace}_query_duration_seconds", labels[id(query)], query.latency))
+    lines.append(f"# HELP {namespace}_response_bytes_total Size of query response bodies.")
+    lines.append(f"# TYPE {namespace}_response_bytes_total counter")
+    lines.extend(f"{namespace}_response_bytes_total{{{labels[id(q)]}}} {q.response_bytes}" for q in queries)
+    lines.append(f"# HELP {namespace}_rows_total Rows returned by queries.")
+    lines.append(f"# TYPE {namespace}_rows_total counter")
+    lines.extend(f"{namespace}_rows_total{{{labels[id(q)]}}} {q.rows}" for q in queries)
+    lines.append(f"# HELP {namespace}_errors_total Failed execute calls, by Pinot error code or exception name.")
+    lines.append(f"# TYPE {namespace}_errors_total counter")
+    for query in queries:
+        for code, count in sorted(query.errors.items()):
+            lines.append(f'{namespace}_errors_total{{{labels[id(query)]},code="{_escape(code)}"}} {count}')
+    lines.append(f"# HELP {namespace}_pool_wait_seconds Time requests waited for a pooled connection.")
+    lines.append(f"# TYPE {namespace}_pool_wait_seconds histogram")
+    lines.extend(_histogram_lines(f"{namespace}_pool_wait_seconds", "", snapshot.pool_wait))
+    lines.append(f"# HELP {namespace}_requests_in_flight Requests being sent or waiting for a response.")
+    lines.append(f"# TYPE {namespace}_requests_in_flight gauge")
+    lines.append(f"{namespace}_requests_in_flight {snapshot.in_flight}")
+    return "\n".join(lines) + "\n"
@@ -8,20 +8,34 @@ from dataclasses import dataclass
 import httpx
 from httpx import _types as httpx_types
 
+from ._decoders import DECODERS
+from .exceptions import ProgrammingError
+
 __all__ = [
     "QueryOption",
     "QueryOptions",
     "QUERY_OPTION_NOT_SET",
     "ClientOptions",
     "RequestOptions",
+    "KeepAliveOptions",
+    "CompressionOptions",
+    "SizeClass",
     "DEFAULT_REQUEST_TIMEOUT",
     "DEFAULT_CONNECTION_LIMITS",
+    "DEFAULT_HTTP2_CONNECTION_LIMITS",
     "DEFAULT_MAX_REDIRECTS",
 ]
 
 DEFAULT_REQUEST_TIMEOUT: t.Final[httpx.Timeout] = httpx.Timeout(5.0)
 DEFAULT_CONNECTION_LIMITS: t.Final[httpx.Limits] = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+# with http/2, httpx multiplexes concurrent requests to a broker over one connection (up to the server's max concurrent
+# streams at a time), so the pool only needs a few connections rather than one per request in flight
+DEFAULT_HTTP2_CONNECTION_LIMITS: t.Final[httpx.Limits] = httpx.Limits(max_connections=10, max_keepalive_connections=10)
 DEFAULT_MAX_REDIRECTS: t.Final[int] = 20
+DEFAULT_BROKER_IDLE_TIMEOUT: t.Final[float] = 30.0
+
+SizeClass = t.Literal["small", "large"]
+_CONTENT_ENCODINGS: t.Final[frozenset[str]] = frozenset({"gzip", "deflate", "br", "zstd"})
 
 
 class _NotSet:
@@ -67,6 +81,7 @@ class QueryOptions:
             servers for a query
         filtered_aggregations_skip_empty_groups: This config can be set to true to avoid computing all the groups in a
             group by query with only filtered aggregations (and no non-filtered aggregations)
+        trace: Return the servers' operator timings in the `traceInfo` statistic, see `pinot_connect.querytrace`
     """
 
     timeout_ms: QueryOption[int] = QUERY_OPTION_NOT_SET
@@ -91,6 +106,7 @@ class QueryOptions:
     max_server_response_size_bytes: QueryOption[int] = QUERY_OPTION_NOT_SET
     max_query_response_size_bytes: QueryOption[int] = QUERY_OPTION_NOT_SET
     filtered_aggregations_skip_empty_groups: QueryOption[bool] = QUERY_OPTION_NOT_SET
+    trace: QueryOption[bool] = QUERY_OPTION_NOT_SET
 
     def asdict(self) -> dict:
         return dict(
@@ -114,17 +130,19 @@ class QueryOptions:
             maxServerResponseSizeBytes=self.max_server_response_size_bytes,
             maxQueryResponseSizeBytes=self.max_query_response_size_bytes,
             filteredAggregationsSkipEmptyGroup=self.filtered_aggregations_skip_empty_groups,
+            trace=self.trace,
         )
 
     @classmethod
     def merge(cls, parent: QueryOptions, child: QueryOptions) -> QueryOptions:
-        return dataclasses.replace(parent, **vars(child))
+        """Options of `parent`, overridden by the options set on `child`"""
+        return dataclasses.replace(parent, **{k: v for k, v in vars(child).items() if v is not QUERY_OPTION_NOT_SET})
 
     @classmethod
     def to_kv_pair(cls, d: dict) -> str:
         """Pinot's servers expect query options to be sent as 'option1=value;option2=value"""
         return ";".join(
-            f"{k}={v if v not in {True, False} else str(v).lower()}" for k, v in d.items() if v != QUERY_OPTION_NOT_SET
+            f"{k}={str(v).lower() if isinstance(v, bool) else v}" for k, v in d.items() if v is not QUERY_OPTION_NOT_SET
         )
 
 
@@ -141,13 +159,20 @@ class ClientOptions:
         proxy:  *(optional)* A proxy URL where all the traffic should be routed
         timeout: *(optional)* The timeout configuration to use when sending request, all in seconds
         follow_redirects: *(optional)* Whether to follow redirects when sending request.  Default: `true`.
-        limits: *(optional)* The limits configuration to use.
+        limits: *(optional)* The limits configuration to use.  Default: `DEFAULT_CONNECTION_LIMITS`, or
+            `DEFAULT_HTTP2_CONNECTION_LIMITS` when `http2` is enabled
         max_redirects: *(optional)* The maximum number of redirect responses that should be followed request URLs
         transport: *(optional)* A transport class to use for sending requests over the network
         event_hooks: *(optional)* A list of hooks to when either request has been prepared or reponse has been fetched
         default_encoding: *(optional)* The default encoding to use for decoding response text, if no charset information
             is included in a response Content-Type header. Set to a callable for automatic character set detection.
             Default: "utf-8".
+        http1: *(optional)* Whether to support HTTP/1.1.  Set it to `False` with `http2` enabled to talk HTTP/2 to a
+            plain `http` endpoint, which can't negotiate it.  Default: `True`
+        http2: *(optional)* Whether to use HTTP/2 when the server supports it, multiplexing concurrent requests over a
+            few connections.  Requires the `h2` package (`pip install pinot-connect[http2]`).  Default: `False`
+        compression: *(optional)* Which compressed encodings of query responses to accept, by query size class, with
+            transfer statistics reported by the cursor.  Default: httpx's default `Accept-Encoding`, without statistics
     """
 
     cookies: httpx_types.CookieTypes | None = None
@@ -162,6 +187,15 @@ class ClientOptions:
     transport: httpx.BaseTransport | None = None
     event_hooks: t.Mapping[str, list[t.Callable[..., t.Any]]] | None = None
     default_encoding: t.Callable[[bytes], str] | str = "utf-8"
+    http1: bool = True
+    http2: bool = False
+    compression: CompressionOptions | None = None
+
+    def __post_init__(self):
+        if not (self.http1 or self.http2):
+            raise ProgrammingError("At least one of http1 and http2 must be enabled.")
+        if self.http2 and self.limits is DEFAULT_CONNECTION_LIMITS:
+            self.limits = DEFAULT_HTTP2_CONNECTION_LIMITS
 
 
 @dataclasses.dataclass()
@@ -172,8 +206,115 @@ class RequestOptions:
         cookies: *(optional)* Dictionary of Cookie items to include when sending requests
         timeout: *(optional)* The timeout configuration to use when sending request, all in seconds
         extensions: *(optional)* Optional dictionary for low-level request customizations
+        deadline: *(optional)* Time budget of the execute call in seconds, shared by every request it makes.  Derives
+            both the request timeout and Pinot's `timeoutMs` from the time remaining.  See `pinot_connect.deadline`
+            for setting an ambient deadline
+        priority: *(optional)* Name of the priority class to schedule the requests of the execute call in, when the
+            connection has a scheduler.  Defaults to the `default` class.  See `pinot_connect.scheduler`
+        table: *(optional)* Table the execute call queries, for rate limiting.  Defaults to the table of the query's
+            `FROM` clause.  See `pinot_connect.ratelimit`
+        size_class: *(optional)* Size class of the execute call's results, choosing the encodings accepted when the
+            connection has `CompressionOptions`.  Defaults to classing queries by their `LIMIT`
     """
 
     cookies: httpx_types.CookieTypes | None = None
     timeout: httpx_types.TimeoutTypes | None = None
     extensions: httpx_types.RequestExtensions | None = None
+    deadline: float | None = None
+    priority: str | None = None
+    table: str | None = None
+    size_class: SizeClass | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class KeepAliveOptions:
+    """Options for keeping a connection's pooled broker connections open while the connection is idle
+
+    The client closes pooled connections that have been idle for 80% of `idle_timeout`, before the broker would close
+    them and fail the next query sent on them, and pings the broker's `/health` endpoint on `connections` pooled
+    connections every `interval` seconds so they don't go idle.
+
+    Attributes:
+        connections: *(optional)* number of pooled connections to keep open.  Default: `1`
+        idle_timeout: *(optional)* seconds after which the broker, or any load balancer in front of it, closes an idle
+            connection.  Default: `30`
+        interval: *(optional)* seconds between pings.  Default: a third of `idle_timeout`
+    """
+
+    connections: int = 1
+    idle_timeout: float = DEFAULT_BROKER_IDLE_TIMEOUT
+    interval: float | None = None
+
+    def __post_init__(self):
+        if self.connections < 1:
+            raise ProgrammingError(f"connections must be positive, got {self.connections}.")
+        if self.idle_timeout <= 0:
+            raise ProgrammingError(f"idle_timeout must be positive, got {self.idle_timeout}.")
+        if self.interval is not None and not 0 < self.interval < self.keepalive_expiry:
+            raise ProgrammingError(
+                f"interval must be positive and less than 80% of idle_timeout ({self.keepalive_expiry}s), got "
+                f"{self.interval}."
+            )
+
+    @property
+    def keepalive_expiry(self) -> float:
+        """Seconds after which the client closes an idle pooled connection"""
+        return self.idle_timeout * 0.8
+
+    @property
+    def ping_interval(self) -> float:
+        """Seconds between pings"""
+        return self.interval if self.interval is not None else self.idle_timeout / 3
+
+    def limits(self, limits: httpx.Limits) -> httpx.Limits:
+        """Adjust the connection pool limits of a client to keep the connections open"""
+        max_keepalive_connections = limits.max_keepalive_connections
+        if max_keepalive_connections is not None:
+            max_keepalive_connections = max(max_keepalive_connections, self.connections)
+        return httpx.Limits(
+            max_connections=limits.max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class CompressionOptions:
+    """Options for negotiating compressed query responses with the broker
+
+    Compression trades broker and client CPU for fewer bytes on the wire, which pays off for large results but rarely
+    for small ones, so the encodings to accept are set per size class.  A query is `large` when its top level `LIMIT`
+    is at least `large_limit` rows, and `small` otherwise (including queries without a `LIMIT`, which Pinot limits to
+    10 rows).  The `LIMIT` is read from the query before its params are bound, so pass `RequestOptions.size_class`,
+    which overrides this, for a query whose `LIMIT` is a param.  Encodings are sent in `Accept-Encoding` in order of
+    preference, leaving out those without an installed decoder: `br` needs the `brotli` package and `zstd` the
+    `zstandard` package.  A size class without encodings asks for uncompressed (`identity`) responses.
+
+    Attributes:
+        small: *(optional)* encodings to accept for small queries, most preferred first.  Default: `()`, uncompressed
+        large: *(optional)* encodings to accept for large queries, most preferred first.  Default:
+            `("zstd", "br", "gzip")`
+        large_limit: *(optional)* smallest `LIMIT` of a large query.  Default: `1000`
+    """
+
+    small: t.Sequence[str] = ()
+    large: t.Sequence[str] = ("zstd", "br", "gzip")
+    large_limit: int = 1000
+
+    def __post_init__(self):
+        for encoding in (*self.small, *self.large):
+            if encoding not in _CONTENT_ENCODINGS:
+                raise ProgrammingError(
+                    f"Unsupported encoding {encoding!r}, expected one of {', '.join(sorted(_CONTENT_ENCODINGS))}."
+                )
+        if self.large_limit < 1:
+            raise ProgrammingError(f"large_limit must be positive, got {self.large_limit}.")
+
+    def size_class(self, limit: int | None) -> SizeClass:
+        """The size class of a query with a top level `LIMIT` of `limit` rows, or `None` without one"""
+        return "large" if limit is not None and limit >= self.large_limit else "small"
+
+    def accept_encoding(self, size_class: SizeClass) -> str:
+        """The `Accept-Encoding` header of a query in a size class"""
+        encodings = self.large if size_class == "large" else self.small
+        return ", ".join(encoding for encoding in encodings if encoding in DECODERS) or "identity"
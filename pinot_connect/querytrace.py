@@ -0,0 +1,245 @@
+"""Parsing of the trace info Pinot returns for queries run with tracing on
+
+Run a query with `QueryOptions(trace=True)`, and the broker returns the `traceInfo` statistic: for each server that
+processed the query, the operators it ran and the milliseconds each took, grouped in one trace per unit of work (e.g.
+per segment, or per thread combining segments).  `cursor.query_trace` parses it into a `QueryTrace`:
+
+    QueryTrace
+    └── ServerTrace (one per server and table type)
+        └── SegmentTrace (one per trace logged by the server)
+            └── OperatorTiming (one per timed operator)
+
+Operator timings nest (e.g. a combine operator's time includes the time of the operators below it), so times of
+different operators shouldn't be added up; `ServerTrace.time_ms` is the longest operator time of the server.
+"""
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import typing as t
+
+import orjson
+
+if t.TYPE_CHECKING:
+    from .cursor import QueryStatistics
+
+__all__ = ["QueryTrace", "ServerTrace", "SegmentTrace", "OperatorTiming", "OperatorStats", "PruningStats"]
+
+TableType = t.Literal["OFFLINE", "REALTIME"]
+
+_TIME_SUFFIX: t.Final[str] = " Time"
+_TABLE_TYPE_SUFFIXES: t.Final[dict[str, TableType]] = {
+    "_OFFLINE": "OFFLINE",
+    "_REALTIME": "REALTIME",
+    "_O": "OFFLINE",
+    "_R": "REALTIME",
+}
+_SEGMENT_KEYS: t.Final[tuple[str, ...]] = ("segmentName", "segment")
+
+
+@dataclasses.dataclass(frozen=True)
+class OperatorTiming:
+    """Time an operator took
+
+    Attributes:
+        operator: name of the operator, e.g. `FilterOperator`
+        time_ms: milliseconds the operator took
+    """
+
+    operator: str
+    time_ms: float
+
+
+@dataclasses.dataclass(frozen=True)
+class SegmentTrace:
+    """One trace logged by a server, for a segment or for a thread working on several
+
+    Attributes:
+        trace_id: id of the trace in the server's trace info
+        segment: name of the segment, when the server logged it
+        operators: the operator timings, in the order they were logged
+        info: entries of the trace other than operator timings
+    """
+
+    trace_id: str
+    segment: str | None
+    operators: list[OperatorTiming]
+    info: dict[str, t.Any]
+
+    @property
+    def time_ms(self) -> float:
+        """Longest operator time of the trace"""
+        return max((operator.time_ms for operator in self.operators), default=0.0)
+
+
+@dataclasses.dataclass(frozen=True)
+class ServerTrace:
+    """The traces a server logged for the query
+
+    Attributes:
+        server: the server's name, as reported by the broker
+        table_type: `OFFLINE` or `REALTIME`, when it can be told from the server's name
+        segments: the server's traces
+    """
+
+    server: str
+    table_type: TableType | None
+    segments: list[SegmentTrace]
+
+    @property
+    def time_ms(self) -> float:
+        """Longest operator time of the server, which approximates the time it took to process the query"""
+        return max((segment.time_ms for segment in self.segments), default=0.0)
+
+    @property
+    def operators(self) -> t.Iterator[OperatorTiming]:
+        for segment in self.segments:
+            yield from segment.operators
+
+
+@dataclasses.dataclass(frozen=True)
+class OperatorStats:
+    """Timings of one operator, over every trace of a query
+
+    Attributes:
+        operator: name of the operator
+        calls: number of timings of the operator
+        total_ms: sum of the operator's times
+        max_ms: longest of the operator's times
+        server: server of the longest time
+    """
+
+    operator: str
+    calls: int
+    total_ms: float
+    max_ms: float
+    server: str
+
+
+@dataclasses.dataclass(frozen=True)
+class PruningStats:
+    """How well the query's segments were pruned, from its query statistics
+
+    Attributes:
+        queried: `numSegmentsQueried`, the segments routed to servers
+        processed: `numSegmentsProcessed`, the segments servers ran the query on
+        matched: `numSegmentsMatched`, the segments with rows matching the query
+        pruned_by_broker: `numSegmentsPrunedByBroker`
+        pruned_by_server: `numSegmentsPrunedByServer`
+        pruned_by_value: `numSegmentsPrunedByValue`
+        pruned_by_limit: `numSegmentsPrunedByLimit`
+        pruned_invalid: `numSegmentsPrunedInvalid`
+    """
+
+    queried: int
+    processed: int
+    matched: int
+    pruned_by_broker: int
+    pruned_by_server: int
+    pruned_by_value: int
+    pruned_by_limit: int
+    pruned_invalid: int
+
+    @property
+    def match_ratio(self) -> float:
+        """Share of the processed segments that had matching rows.  A low ratio means servers scanned segments that
+        could have been pruned, e.g. with partitioning, a sorted column or bloom filters"""
+        return self.matched / self.processed if self.processed else 1.0
+
+    @property
+    def pruned_ratio(self) -> float:
+        """Share of the queried segments that were pruned rather than processed"""
+        return 1.0 - self.processed / self.queried if self.queried else 0.0
+
+
+def _table_type(server: str) -> TableType | None:
+    for suffix, table_type in _TABLE_TYPE_SUFFIXES.items():
+        if server.endswith(suffix):
+            return table_type
+    return None
+
+
+def _parse_segment(trace_id: str, entries: t.Any) -> SegmentTrace:
+    operators = []
+    info: dict[str, t.Any] = {}
+    for entry in entries if isinstance(entries, list) else [entries]:
+        if not isinstance(entry, dict):
+            continue
+        for key, value in entry.items():
+            if key.endswith(_TIME_SUFFIX) and isinstance(value, (int, float)) and not isinstance(value, bool):
+                operators.append(OperatorTiming(key[: -len(_TIME_SUFFIX)], float(value)))
+            else:
+                info[key] = value
+    segment = next((info[key] for key in _SEGMENT_KEYS if isinstance(info.get(key), str)), None)
+    return SegmentTrace(trace_id, segment, operators, info)
+
+
+def _parse_server(server: str, trace: t.Any) -> ServerTrace:
+    # servers' traces are JSON encoded as strings in the broker response
+    if isinstance(trace, (str, bytes)):
+        try:
+            trace = orjson.loads(trace)
+        except orjson.JSONDecodeError:
+            trace = []
+    segments = []
+    for index, item in enumerate(trace if isinstance(trace, list) else [trace]):
+        if isinstance(item, dict) and len(item) == 1 and isinstance(next(iter(item.values())), list):
+            ((trace_id, entries),) = item.items()
+            segments.append(_parse_segment(str(trace_id), entries))
+        else:
+            segments.append(_parse_segment(str(index), item))
+    return ServerTrace(server, _table_type(server), segments)
+
+
+@dataclasses.dataclass(frozen=True)
+class QueryTrace:
+    """The trace of a query, parsed from its `traceInfo` statistic
+
+    Attributes:
+        servers: the traces of each server
+        pruning: how well the query's segments were pruned, when its statistics report it
+    """
+
+    servers: list[ServerTrace]
+    pruning: PruningStats | None
+
+    @classmethod
+    def parse(cls, statistics: QueryStatistics | t.Mapping[str, t.Any]) -> QueryTrace:
+        """Parse the trace of a query from its query statistics"""
+        trace_info = statistics.get("traceInfo") or {}
+        pruning = None
+        if "numSegmentsQueried" in statistics:
+            pruning = PruningStats(
+                queried=statistics.get("numSegmentsQueried", 0),
+                processed=statistics.get("numSegmentsProcessed", 0),
+                matched=statistics.get("numSegmentsMatched", 0),
+                pruned_by_broker=statistics.get("numSegmentsPrunedByBroker", 0),
+                pruned_by_server=statistics.get("numSegmentsPrunedByServer", 0),
+                pruned_by_value=statistics.get("numSegmentsPrunedByValue", 0),
+                pruned_by_limit=statistics.get("numSegmentsPrunedByLimit", 0),
+                pruned_invalid=statistics.get("numSegmentsPrunedInvalid", 0),
+            )
+        return cls([_parse_server(server, trace) for server, trace in trace_info.items()], pruning)
+
+    def slowest_servers(self, n: int = 5) -> list[ServerTrace]:
+        """The `n` servers that took the longest"""
+        return sorted(self.servers, key=lambda server: server.time_ms, reverse=True)[:n]
+
+    def slowest_operators(self, n: int = 10) -> list[OperatorStats]:
+        """The `n` operators with the largest total time over every server"""
+        calls: collections.Counter[str] = collections.Counter()
+        totals: dict[str, float] = collections.defaultdict(float)
+        longest: dict[str, tuple[float, str]] = {}
+        for server in self.servers:
+            for operator in server.operators:
+                calls[operator.operator] += 1
+                totals[operator.operator] += operator.time_ms
+                if operator.operator not in longest or operator.time_ms > longest[operator.operator][0]:
+                    longest[operator.operator] = (operator.time_ms, server.server)
+        stats = [OperatorStats(operator, calls[operator], totals[operator], *longest[operator]) for operator in calls]
+        return sorted(stats, key=lambda stat: stat.total_ms, reverse=True)[:n]
+
+    def asdict(self) -> dict[str, t.Any]:
+        """The trace as plain dicts and lists, e.g. to log as JSON"""
+        return dataclasses.asdict(self)
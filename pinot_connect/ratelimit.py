@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import threading
+import time
+import typing as t
+
+from .exceptions import OperationalError
+from .exceptions import ProgrammingError
+
+__all__ = ["RateLimit", "RateLimiter"]
+
+_TABLE_TYPE_SUFFIXES: t.Final[tuple[str, ...]] = ("_OFFLINE", "_REALTIME")
+
+
+@dataclasses.dataclass(frozen=True)
+class RateLimit:
+    """A token bucket limit on the queries sent to a table
+
+    Attributes:
+        rate: sustained queries per second
+        burst: *(optional)* number of queries that can be sent at once after the table has been idle.  Defaults to
+            `rate`, rounded up, and at least `1`
+    """
+
+    rate: float
+    burst: int | None = None
+
+    def __post_init__(self):
+        if self.rate <= 0:
+            raise ProgrammingError(f"Rate limit must have a positive rate, got {self.rate}.")
+        if self.burst is not None and self.burst < 1:
+            raise ProgrammingError(f"Rate limit burst must be at least 1, got {self.burst}.")
+
+    @property
+    def capacity(self) -> int:
+        """The size of the bucket"""
+        return self.burst if self.burst is not None else max(1, -int(-self.rate // 1))
+
+
+class _TokenBucket:
+    __slots__ = ("limit", "tokens", "updated_at", "_lock")
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.tokens = float(limit.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, timeout: float | None) -> float:
+        # Take a token, returning how long to wait before it may be used.  Tokens are reserved in arrival order by
+        # letting the bucket go negative, so waiters are served first come first served without polling.  If the wait
+        # would exceed `timeout`, no token is taken and -1 is returned.
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self.updated_at) * self.limit.rate, self.limit.capacity)
+            self.updated_at = now
+            wait = max(1 - self.tokens, 0.0) / self.limit.rate
+            if timeout is not None and wait > timeout:
+                return -1
+            self.tokens -= 1
+            return wait
+
+
+def _base_table_name(table: str) -> str:
+    for suffix in _TABLE_TYPE_SUFFIXES:
+        if table.endswith(suffix):
+            return table[: -len(suffix)]
+    return table
+
+
+class RateLimiter:
+    """Per-table token bucket rate limiting of the queries sent by a connection
+
+    Use it to stay under a table's query quota on the client side, rather than having the broker reject queries once
+    the quota is exceeded.  Sync cursors block until a query may be sent, and async cursors await.  Every sub-query of a
+    fan-out (e.g. `execute_split`) counts as a query.
+
+    Args:
+        limits: *(optional)* rate limits by table name.  Table type suffixes (`_OFFLINE`, `_REALTIME`) are ignored
+        default: *(optional)* rate limit of each table without its own limit.  Default: tables without a limit are not
+            limited
+        timeout: *(optional)* maximum seconds to wait for a query to be allowed, after which `OperationalError` is
+            raised.  A deadline in effect also bounds the wait.  Default: wait as long as needed
+    """
+
+    def __init__(
+        self,
+        limits: t.Mapping[str, RateLimit] | None = None,
+        *,
+        default: RateLimit | None = None,
+        timeout: float | None = None,
+    ):
+        self.default = default
+        self.timeout = timeout
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._lock = threading.Lock()
+        for table, limit in (limits or {}).items():
+            self.set_limit(table, limit)
+
+    def set_limit(self, table: str, limit: RateLimit | None) -> None:
+        """Set (or with `None`, remove) the rate limit of a table"""
+        table = _base_table_name(table)
+        with self._lock:
+            if limit is None:
+                self._buckets.pop(table, None)
+            else:
+                self._buckets[table] = _TokenBucket(limit)
+
+    def limits(self) -> dict[str, RateLimit]:
+        """The rate limit of each table, including tables given the default limit so far"""
+        return {table: bucket.limit for table, bucket in self._buckets.items()}
+
+    def _bucket(self, table: str | None) -> _TokenBucket | None:
+        if table is None:
+            return None
+        table = _base_table_name(table)
+        bucket = self._buckets.get(table)
+        if bucket is None and self.default is not None:
+            with self._lock:
+                bucket = self._buckets.setdefault(table, _TokenBucket(self.default))
+        return bucket
+
+    def _reserve(self, table: str | None, timeout: float | None) -> float:
+        bucket = self._bucket(table)
+        if bucket is None:
+            return 0.0
+        if self.timeout is not None:
+            timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        wait = bucket.reserve(timeout)
+        if wait < 0:
+            raise OperationalError(f"Rate limit of table {table!r} exceeded: no query allowed within {timeout:.3f}s")
+        return wait
+
+    def acquire(self, table: str | None, timeout: float | None = None) -> None:
+        """Block until a query may be sent to `table`
+
+        Args:
+            table: the table being queried, or `None` if unknown, which is not limited
+            timeout: *(optional)* maximum seconds to wait, on top of the limiter's own timeout
+        """
+        wait = self._reserve(table, timeout)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, table: str | None, timeout: float | None = None) -> None:
+        """Wait until a query may be sent to `table`
+
+        Args:
+            table: the table being queried, or `None` if unknown, which is not limited
+            timeout: *(optional)* maximum seconds to wait, on top of the limiter's own timeout
+        """
+        wait = self._reserve(table, timeout)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _parse_quota(table_config: dict) -> float | None:
+    """Read the lowest `maxQueriesPerSecond` quota of a controller `GET /tables/{table}` response"""
+    quotas = [
+        float(config["quota"]["maxQueriesPerSecond"])
+        for config in table_config.values()
+        if isinstance(config, dict) and (config.get("quota") or {}).get("maxQueriesPerSecond")
+    ]
+    return min(quotas) if quotas else None
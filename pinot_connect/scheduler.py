@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import threading
+import time
+import typing as t
+
+from .exceptions import OperationalError
+from .exceptions import ProgrammingError
+
+__all__ = ["PriorityClass", "PriorityStats", "Scheduler", "AsyncScheduler", "DEFAULT_PRIORITY"]
+
+DEFAULT_PRIORITY: t.Final[str] = "default"
+
+_Waiter = t.TypeVar("_Waiter")
+
+
+@dataclasses.dataclass(frozen=True)
+class PriorityClass:
+    """Scheduling configuration of a class of requests sharing a connection
+
+    Attributes:
+        weight: *(optional)* relative share of request slots the class gets while other classes are also waiting, e.g.
+            a class with weight `4` is admitted four times as often as a class with weight `1`.  Default: `1`
+        max_concurrency: *(optional)* maximum number of requests of the class in flight at once, regardless of free
+            slots.  Default: no cap
+    """
+
+    weight: float = 1
+    max_concurrency: int | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class PriorityStats:
+    """Snapshot of the scheduling of one priority class
+
+    Attributes:
+        running: number of requests of the class currently in flight
+        queued: number of requests of the class currently waiting for a slot
+        admitted: total number of requests of the class admitted so far
+        queue_time_total: total seconds requests of the class spent waiting for a slot
+        queue_time_max: longest time in seconds a request of the class spent waiting for a slot
+    """
+
+    running: int
+    queued: int
+    admitted: int
+    queue_time_total: float
+    queue_time_max: float
+
+    @property
+    def queue_time_mean(self) -> float:
+        """Mean seconds requests of the class spent waiting for a slot"""
+        return self.queue_time_total / self.admitted if self.admitted else 0.0
+
+
+class _ClassState(t.Generic[_Waiter]):
+    __slots__ = ("config", "waiters", "running", "virtual_finish", "admitted", "queue_time_total", "queue_time_max")
+
+    def __init__(self, config: PriorityClass):
+        self.config = config
+        self.waiters: collections.deque[_Waiter] = collections.deque()
+        self.running = 0
+        self.virtual_finish = 0.0
+        self.admitted = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    @property
+    def at_capacity(self) -> bool:
+        return self.config.max_concurrency is not None and self.running >= self.config.max_concurrency
+
+
+class _BaseScheduler(t.Generic[_Waiter]):
+    # Weighted fair queueing of requests in front of the connection pool.  Each class is admitted in proportion to its
+    # weight (stride scheduling over a virtual clock), subject to the scheduler's total max_concurrency and each
+    # class's own cap.  A class that has been idle does not bank credit: it rejoins at the current virtual time, so it
+    # can't starve the others once it becomes busy.
+
+    def __init__(self, classes: t.Mapping[str, PriorityClass] | None = None, *, max_concurrency: int = 100):
+        if max_concurrency < 1:
+            raise ProgrammingError(f"max_concurrency must be positive, got {max_concurrency}.")
+        classes = {DEFAULT_PRIORITY: PriorityClass(), **(classes or {})}
+        for name, config in classes.items():
+            if config.weight <= 0:
+                raise ProgrammingError(f"Priority class {name!r} must have a positive weight, got {config.weight}.")
+        self.max_concurrency = max_concurrency
+        self._classes: dict[str, _ClassState[_Waiter]] = {name: _ClassState(config) for name, config in classes.items()}
+        self._running = 0
+        self._virtual_time = 0.0
+
+    def _state(self, priority: str | None) -> _ClassState[_Waiter]:
+        try:
+            return self._classes[priority or DEFAULT_PRIORITY]
+        except KeyError:
+            raise ProgrammingError(
+                f"Unknown priority class {priority!r}, expected one of {sorted(self._classes)}."
+            ) from None
+
+    def _enqueue(self, state: _ClassState[_Waiter], waiter: _Waiter) -> None:
+        if not state.waiters:
+            state.virtual_finish = max(state.virtual_finish, self._virtual_time)
+        state.waiters.append(waiter)
+
+    def _next_waiter(self) -> _Waiter | None:
+        """Pop the next waiter to admit, or `None` if nothing can be admitted right now"""
+        if self._running >= self.max_concurrency:
+            return None
+        for state in self._classes.values():
+            while state.waiters and self._abandoned(state.waiters[0]):
+                state.waiters.popleft()
+        candidates = [state for state in self._classes.values() if state.waiters and not state.at_capacity]
+        if not candidates:
+            return None
+        state = min(candidates, key=lambda s: s.virtual_finish)
+        self._virtual_time = state.virtual_finish
+        state.virtual_finish += 1 / state.config.weight
+        state.running += 1
+        self._running += 1
+        return state.waiters.popleft()
+
+    def _abandoned(self, waiter: _Waiter) -> bool:
+        return False
+
+    def _record_admitted(self, state: _ClassState[_Waiter], queued_at: float) -> None:
+        queue_time = time.perf_counter() - queued_at
+        state.admitted += 1
+        state.queue_time_total += queue_time
+        state.queue_time_max = max(state.queue_time_max, queue_time)
+
+    @staticmethod
+    def _timed_out(priority: str | None, timeout: float) -> OperationalError:
+        return OperationalError(
+            f"No request slot of priority class {priority or DEFAULT_PRIORITY!r} became free within {timeout:.3f}s"
+        )
+
+    def _release(self, state: _ClassState[_Waiter]) -> None:
+        state.running -= 1
+        self._running -= 1
+
+    def stats(self) -> dict[str, PriorityStats]:
+        """A snapshot of the scheduling statistics of every priority class"""
+        return {
+            name: PriorityStats(
+                running=state.running,
+                queued=len(state.waiters),
+                admitted=state.admitted,
+                queue_time_total=state.queue_time_total,
+                queue_time_max=state.queue_time_max,
+            )
+            for name, state in self._classes.items()
+        }
+
+
+class Scheduler(_BaseScheduler[threading.Event]):
+    """Schedules the requests of a `Connection` shared by many threads by priority class
+
+    Args:
+        classes: *(optional)* the priority classes, by name.  A `default` class with weight `1` is used for requests
+            without a priority unless it is overridden
+        max_concurrency: *(optional)* maximum number of requests in flight at once across all classes.  This should not
+            exceed the connection pool's `max_connections`.  Default: `100`
+    """
+
+    def __init__(self, classes: t.Mapping[str, PriorityClass] | None = None, *, max_concurrency: int = 100):
+        super().__init__(classes, max_concurrency=max_concurrency)
+        self._lock = threading.Lock()
+
+    def _dispatch(self) -> None:
+        while (waiter := self._next_waiter()) is not None:
+            waiter.set()
+
+    @contextlib.contextmanager
+    def slot(self, priority: str | None = None, timeout: float | None = None) -> t.Iterator[None]:
+        """Block until a request of the priority class can be sent, and hold its slot for the duration of the block
+
+        Args:
+            priority: *(optional)* the priority class of the request.  Default: `default`
+            timeout: *(optional)* maximum seconds to wait for a slot, after which `OperationalError` is raised.
+                Default: no limit
+        """
+        state = self._state(priority)
+        waiter = threading.Event()
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._enqueue(state, waiter)
+            self._dispatch()
+        admitted = waiter.wait(timeout)
+        with self._lock:
+            # admitted while the wait timed out, the slot is taken anyway
+            if not admitted and not waiter.is_set():
+                state.waiters.remove(waiter)
+                raise self._timed_out(priority, t.cast(float, timeout))
+            self._record_admitted(state, queued_at)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._release(state)
+                self._dispatch()
+
+
+class AsyncScheduler(_BaseScheduler["asyncio.Future[None]"]):
+    """Schedules the requests of an `AsyncConnection` shared by many tasks by priority class
+
+    Args:
+        classes: *(optional)* the priority classes, by name.  A `default` class with weight `1` is used for requests
+            without a priority unless it is overridden
+        max_concurrency: *(optional)* maximum number of requests in flight at once across all classes.  This should not
+            exceed the connection pool's `max_connections`.  Default: `100`
+    """
+
+    def _abandoned(self, waiter: asyncio.Future[None]) -> bool:
+        # waiters whose task was cancelled while queued
+        return waiter.done()
+
+    def _dispatch(self) -> None:
+        while (waiter := self._next_waiter()) is not None:
+            waiter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: str | None = None, timeout: float | None = None) -> t.AsyncIterator[None]:
+        """Wait until a request of the priority class can be sent, and hold its slot for the duration of the block
+
+        Args:
+            priority: *(optional)* the priority class of the request.  Default: `default`
+            timeout: *(optional)* maximum seconds to wait for a slot, after which `OperationalError` is raised.
+                Default: no limit
+        """
+        state = self._state(priority)
+        loop = asyncio.get_running_loop()
+        waiter: asyncio.Future[None] = loop.create_future()
+        queued_at = time.perf_counter()
+        timed_out = False
+
+        def expire() -> None:
+            nonlocal timed_out
+            if not waiter.done():
+                timed_out = True
+                waiter.cancel()
+
+        self._enqueue(state, waiter)
+        self._dispatch()
+        expiry = loop.call_later(timeout, expire) if timeout is not None else None
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                with contextlib.suppress(ValueError):
+                    state.waiters.remove(waiter)
+            else:
+                # admitted in the same loop iteration as the cancellation: give the slot to someone else
+                self._release(state)
+                self._dispatch()
+            if timed_out:
+                raise self._timed_out(priority, t.cast(float, timeout)) from None
+            raise
+        finally:
+            if expiry is not None:
+                expiry.cancel()
+        self._record_admitted(state, queued_at)
+        try:
+            yield
+        finally:
+            self._release(state)
+            self._dispatch()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import queue
+import random
+import threading
+import typing as t
+
+import orjson
+
+from .exceptions import ProgrammingError
+from .options import QUERY_OPTION_NOT_SET
+
+if t.TYPE_CHECKING:
+    from ._observe import QueryRecord
+
+__all__ = ["SlowQueryLog", "DEFAULT_LOGGER_NAME"]
+
+DEFAULT_LOGGER_NAME: t.Final[str] = "pinot_connect.slow_query"
+DEFAULT_MAX_QUEUED: t.Final[int] = 1000
+
+Redact = t.Union[bool, t.Callable[[str], str]]
+
+_STOP: t.Final = object()
+
+
+class SlowQueryLog:
+    """Log the queries of a connection that exceed any of the given thresholds, as structured JSON
+
+    Pass a slow query log to `connect` to check every `execute` call against the thresholds.  Each slow query is logged
+    as one JSON document, with its fingerprint, normalized and bound sql, effective query options, the thresholds it
+    exceeded and the broker's full query statistics:
+
+        {"timestamp": "...", "fingerprint": "...", "query": "SELECT * FROM t WHERE id = ?", "sql": "...",
+         "table": "t", "exceeded": ["time_used_ms"], "duration": 1.2, "response_bytes": 123, "rows": 10,
+         "query_options": {"timeoutMs": 5000}, "statistics": {...}, "error": null}
+
+    Queries are checked against the thresholds on their raw duration, response size and statistics, and slow queries
+    are only queued by the query that triggered them: a background thread normalizes, formats and logs them, so neither
+    checking nor logging adds the cost of normalizing the query to its latency.  When the queue is full, slow queries
+    are dropped and counted in `dropped`.
+
+    Args:
+        latency: *(optional)* seconds an execute call may take, as seen by the client
+        time_used_ms: *(optional)* the broker's `timeUsedMs` a query may take
+        docs_scanned: *(optional)* `numDocsScanned` a query may scan
+        entries_scanned_post_filter: *(optional)* `numEntriesScannedPostFilter` a query may scan
+        response_bytes: *(optional)* size of the response body a query may have
+        sample_rate: *(optional)* fraction of slow queries to log.  Default: `1.0`
+        redact: *(optional)* `True` to leave the bound sql out of records, as its literals may be sensitive, or a
+            function returning the sql to log for the bound sql.  Default: `False`
+        logger: *(optional)* the logger to log to, at `WARNING` level.  Default: the `pinot_connect.slow_query` logger
+        max_queued: *(optional)* maximum number of slow queries waiting to be logged.  Default: `1000`
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float | None = None,
+        time_used_ms: int | None = None,
+        docs_scanned: int | None = None,
+        entries_scanned_post_filter: int | None = None,
+        response_bytes: int | None = None,
+        sample_rate: float = 1.0,
+        redact: Redact = False,
+        logger: logging.Logger | None = None,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        if not 0.0 < sample_rate <= 1.0:
+            raise ProgrammingError(f"sample_rate must be in (0, 1], got {sample_rate}.")
+        if max_queued < 1:
+            raise ProgrammingError(f"max_queued must be positive, got {max_queued}.")
+        # threshold name -> (threshold, statistic of the query statistics it applies to)
+        self._statistic_thresholds = {
+            name: (threshold, statistic)
+            for name, threshold, statistic in (
+                ("time_used_ms", time_used_ms, "timeUsedMs"),
+                ("docs_scanned", docs_scanned, "numDocsScanned"),
+                ("entries_scanned_post_filter", entries_scanned_post_filter, "numEntriesScannedPostFilter"),
+            )
+            if threshold is not None
+        }
+        if latency is None and response_bytes is None and not self._statistic_thresholds:
+            raise ProgrammingError("SlowQueryLog needs at least one threshold.")
+        self.latency = latency
+        self.time_used_ms = time_used_ms
+        self.docs_scanned = docs_scanned
+        self.entries_scanned_post_filter = entries_scanned_post_filter
+        self.response_bytes = response_bytes
+        self.sample_rate = sample_rate
+        self.redact = redact
+        self.logger = logger or logging.getLogger(DEFAULT_LOGGER_NAME)
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(max_queued)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def _exceeded(self, record: QueryRecord) -> list[str]:
+        exceeded = []
+        if self.latency is not None and record.duration > self.latency:
+            exceeded.append("latency")
+        if self.response_bytes is not None and record.response_bytes > self.response_bytes:
+            exceeded.append("response_bytes")
+        statistics = record.statistics
+        if statistics is not None:
+            for name, (threshold, statistic) in self._statistic_thresholds.items():
+                if statistics.get(statistic, 0) > threshold:
+                    exceeded.append(name)
+        return exceeded
+
+    def _record(self, record: QueryRecord) -> None:
+        # only the raw measurements are read here, the record's normalized query and fingerprint are left to `_drain`
+        exceeded = self._exceeded(record)
+        if not exceeded or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return
+        self._start()
+        try:
+            self._queue.put_nowait((datetime.datetime.now(datetime.timezone.utc), record, exceeded))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._drain, name="pinot-slow-query-log", daemon=True)
+                self._thread.start()
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                if self.logger.isEnabledFor(logging.WARNING):
+                    entry = self._entry(*item)
+                    self.logger.warning(orjson.dumps(entry, default=str).decode(), extra={"slow_query": entry})
+            except Exception:  # pragma: no cover
+                # a record that can't be logged mustn't stop the records after it
+                pass
+            finally:
+                self._queue.task_done()
+
+    def _entry(self, timestamp: datetime.datetime, record: QueryRecord, exceeded: list[str]) -> dict[str, t.Any]:
+        if self.redact is True:
+            sql = None
+        elif self.redact is False:
+            sql = record.sql
+        else:
+            sql = self.redact(record.sql)
+        error = record.error
+        return {
+            "timestamp": timestamp.isoformat(),
+            "fingerprint": record.fingerprint,
+            "query": record.query,
+            "sql": sql,
+            "table": record.table,
+            "exceeded": exceeded,
+            "duration": record.duration,
+            "response_bytes": record.response_bytes,
+            "rows": record.rows,
+            "query_options": {
+                key: value for key, value in record.query_options.asdict().items() if value is not QUERY_OPTION_NOT_SET
+            },
+            "statistics": record.statistics,
+            "error": (
+                None
+                if error is None
+                else {"type": type(error).__name__, "message": str(error), "code": getattr(error, "error_code", None)}
+            ),
+        }
+
+    def flush(self) -> None:
+        """Wait until every slow query queued so far is logged"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Log every queued slow query, and stop the background thread.  Slow queries recorded later start it again"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+                thread.join()
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import dataclasses
+import random
+import threading
+import typing as t
+
+from .exceptions import ProgrammingError
+
+if t.TYPE_CHECKING:
+    from ._observe import QueryRecord
+
+__all__ = ["StatementRegistry", "StatementStats"]
+
+DEFAULT_MAX_STATEMENTS: t.Final[int] = 5000
+DEFAULT_SAMPLE_SIZE: t.Final[int] = 1024
+# share of the statements evicted at once when the registry is full, so eviction doesn't run on every new statement
+_EVICTION_RATIO: t.Final[float] = 0.05
+
+SortKey = t.Literal[
+    "calls",
+    "total_time",
+    "mean_time",
+    "max_time",
+    "rows",
+    "response_bytes",
+    "docs_scanned",
+    "entries_scanned_in_filter",
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class StatementStats:
+    """Statistics of the queries of one shape, i.e. of one normalized query
+
+    Attributes:
+        fingerprint: hash of the normalized query, see `pinot_connect.tracing`
+        query: the query normalized with its literals replaced by `?`
+        table: table of the query, or `None` when it couldn't be found in the query
+        calls: number of execute calls
+        errors: number of execute calls that failed
+        total_time: total client side duration of the calls, in seconds
+        min_time: shortest call, in seconds
+        max_time: longest call, in seconds
+        p50_time: median duration of the calls, in seconds, estimated from a sample of them
+        p95_time: 95th percentile duration of the calls, in seconds, estimated from a sample of them
+        p99_time: 99th percentile duration of the calls, in seconds, estimated from a sample of them
+        broker_time: total `timeUsedMs` reported by the broker, in seconds
+        rows: total number of rows returned
+        response_bytes: total size of the response bodies
+        docs_scanned: total `numDocsScanned`
+        entries_scanned_in_filter: total `numEntriesScannedInFilter`
+        entries_scanned_post_filter: total `numEntriesScannedPostFilter`
+    """
+
+    fingerprint: str
+    query: str
+    table: str | None
+    calls: int
+    errors: int
+    total_time: float
+    min_time: float
+    max_time: float
+    p50_time: float
+    p95_time: float
+    p99_time: float
+    broker_time: float
+    rows: int
+    response_bytes: int
+    docs_scanned: int
+    entries_scanned_in_filter: int
+    entries_scanned_post_filter: int
+
+    @property
+    def mean_time(self) -> float:
+        """Mean duration of the calls, in seconds"""
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class _Statement:
+    __slots__ = (
+        "query",
+        "table",
+        "calls",
+        "errors",
+        "total_time",
+        "min_time",
+        "max_time",
+        "sample",
+        "broker_time",
+        "rows",
+        "response_bytes",
+        "docs_scanned",
+        "entries_scanned_in_filter",
+        "entries_scanned_post_filter",
+    )
+
+    def __init__(self, query: str, table: str | None):
+        self.query = query
+        self.table = table
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.min_time = float("inf")
+        self.max_time = 0.0
+        self.sample: list[float] = []
+        self.broker_time = 0.0
+        self.rows = 0
+        self.response_bytes = 0
+        self.docs_scanned = 0
+        self.entries_scanned_in_filter = 0
+        self.entries_scanned_post_filter = 0
+
+
+def _percentile(ordered: list[float], percentile: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+
+class StatementRegistry:
+    """Statistics of a connection's queries by query shape, like Postgres' `pg_stat_statements`
+
+    Pass a registry to `connect` to keep, for every fingerprint of the queries run by `execute` (the hash of the query
+    normalized with its literals replaced by placeholders), the number of calls, their latency, and the rows, bytes and
+    work the broker reported for them.  `snapshot` sorted by `total_time` or `docs_scanned` shows the few query
+    shapes that account for most of the load.
+
+    The registry is bounded: once it holds `max_statements` fingerprints, the least called 5% are evicted to make room.
+    Latency percentiles are estimated from a uniform sample of each fingerprint's calls.
+
+    Args:
+        max_statements: *(optional)* maximum number of fingerprints to keep statistics of.  Default: `5000`
+        sample_size: *(optional)* number of calls sampled per fingerprint for latency percentiles.  Default: `1024`
+    """
+
+    def __init__(self, max_statements: int = DEFAULT_MAX_STATEMENTS, *, sample_size: int = DEFAULT_SAMPLE_SIZE):
+        if max_statements < 1:
+            raise ProgrammingError(f"max_statements must be positive, got {max_statements}.")
+        if sample_size < 1:
+            raise ProgrammingError(f"sample_size must be positive, got {sample_size}.")
+        self.max_statements = max_statements
+        self.sample_size = sample_size
+        self._statements: dict[str, _Statement] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def _evict(self) -> None:
+        evicted = max(1, int(self.max_statements * _EVICTION_RATIO))
+        for fingerprint in sorted(self._statements, key=lambda f: self._statements[f].calls)[:evicted]:
+            del self._statements[fingerprint]
+
+    def _record(self, record: QueryRecord) -> None:
+        statistics = record.statistics or {}
+        with self._lock:
+            statement = self._statements.get(record.fingerprint)
+            if statement is None:
+                if len(self._statements) >= self.max_statements:
+                    self._evict()
+                statement = self._statements[record.fingerprint] = _Statement(record.query, record.table)
+            statement.calls += 1
+            duration = record.duration
+            statement.total_time += duration
+            statement.min_time = min(statement.min_time, duration)
+            statement.max_time = max(statement.max_time, duration)
+            # reservoir sampling keeps a uniform sample of every call so far
+            if len(statement.sample) < self.sample_size:
+                statement.sample.append(duration)
+            else:
+                index = self._random.randrange(statement.calls)
+                if index < self.sample_size:
+                    statement.sample[index] = duration
+            if record.error is not None:
+                statement.errors += 1
+            statement.broker_time += statistics.get("timeUsedMs", 0) / 1000
+            statement.rows += record.rows or 0
+            statement.response_bytes += record.response_bytes
+            statement.docs_scanned += statistics.get("numDocsScanned", 0)
+            statement.entries_scanned_in_filter += statistics.get("numEntriesScannedInFilter", 0)
+            statement.entries_scanned_post_filter += statistics.get("numEntriesScannedPostFilter", 0)
+
+    def snapshot(self, *, sort_by: SortKey = "total_time", limit: int | None = None) -> list[StatementStats]:
+        """Statistics of every fingerprint, in decreasing order
+
+        Args:
+            sort_by: *(optional)* the statistic to order by.  Default: `total_time`
+            limit: *(optional)* return only this many fingerprints
+        """
+        with self._lock:
+            # percentiles are computed outside the lock, as sorting every sample is the slow part
+            statements = [
+                (
+                    StatementStats(
+                        fingerprint=fingerprint,
+                        query=statement.query,
+                        table=statement.table,
+                        calls=statement.calls,
+                        errors=statement.errors,
+                        total_time=statement.total_time,
+                        min_time=statement.min_time,
+                        max_time=statement.max_time,
+                        p50_time=0.0,
+                        p95_time=0.0,
+                        p99_time=0.0,
+                        broker_time=statement.broker_time,
+                        rows=statement.rows,
+                        response_bytes=statement.response_bytes,
+                        docs_scanned=statement.docs_scanned,
+                        entries_scanned_in_filter=statement.entries_scanned_in_filter,
+                        entries_scanned_post_filter=statement.entries_scanned_post_filter,
+                    ),
+                    list(statement.sample),
+                )
+                for fingerprint, statement in self._statements.items()
+            ]
+        stats = []
+        for stat, sample in statements:
+            sample.sort()
+            stats.append(
+                dataclasses.replace(
+                    stat,
+                    p50_time=_percentile(sample, 0.5),
+                    p95_time=_percentile(sample, 0.95),
+                    p99_time=_percentile(sample, 0.99),
+                )
+            )
+        stats.sort(key=lambda stat: getattr(stat, sort_by), reverse=True)
+        return stats[:limit] if limit is not None else stats
+
+    def reset(self, fingerprint: str | None = None) -> None:
+        """Forget the statistics of one fingerprint, or of every fingerprint"""
+        with self._lock:
+            if fingerprint is None:
+                self._statements.clear()
+            else:
+                self._statements.pop(fingerprint, None)
@@ -0,0 +1,97 @@
+"""OpenTelemetry tracing of query execution
+
+Pass a `QueryTracer` to `connect` to record a `pinot.execute` span for each `execute`, with a child span for each of
+its phases, so a slow query can be attributed to the broker, the network or the client:
+
+- `pinot.build_request`: binding params and building the request
+- `pinot.send`: sending the request and reading the response, including time queued by the scheduler or rate limiter
+- `pinot.decode`: parsing the response body with `orjson.loads`
+- `pinot.result_set`: building the result set from the parsed response
+- `pinot.fetch`: each `fetchmany` and `fetchall` call made on the result, which is when values are converted and rows
+  are made
+
+Fan-out calls (e.g. `execute_chunked`) record a single `pinot.execute` span of their logical query, without phase
+spans, and `paginate` records one for each page.
+
+The execute span is tagged with the broker's query statistics (as `pinot.<statistic>`, e.g. `pinot.timeUsedMs`), the
+table, and the query normalized with its literals replaced by placeholders (`db.query.text`) and its fingerprint.  Bound
+sql is never recorded, as its literals may be sensitive.
+
+Requires the `opentelemetry-api` package (`pip install pinot-connect[opentelemetry]`); spans are exported by the
+OpenTelemetry SDK the application configures.  Connections without a tracer don't touch OpenTelemetry at all.
+"""
+
+from __future__ import annotations
+
+import typing as t
+
+from ._sql import digest
+from ._sql import find_table
+from ._sql import normalize
+
+if t.TYPE_CHECKING:
+    from opentelemetry.context import Context
+    from opentelemetry.trace import Span
+    from opentelemetry.trace import TracerProvider
+
+    from .cursor import QueryStatistics
+
+__all__ = ["QueryTracer"]
+
+_Row = t.TypeVar("_Row")
+
+
+class QueryTracer:
+    """Record OpenTelemetry spans for the queries of a connection
+
+    Args:
+        tracer_provider: *(optional)* the tracer provider to get the tracer from.  Default: the global tracer provider
+    """
+
+    def __init__(self, tracer_provider: TracerProvider | None = None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:  # pragma: no cover
+            raise ImportError("Tracing requires opentelemetry-api: pip install pinot-connect[opentelemetry]") from e
+        self._trace = trace
+        self._tracer = trace.get_tracer("pinot_connect", tracer_provider=tracer_provider)
+
+    def _execute(self) -> t.ContextManager[Span]:
+        """Start the span of an execute call, as the current span"""
+        return self._tracer.start_as_current_span(
+            "pinot.execute", kind=self._trace.SpanKind.CLIENT, attributes={"db.system": "pinot"}
+        )
+
+    def _phase(self, name: str, context: Context | None = None) -> t.ContextManager[Span]:
+        """Start the span of a phase of an execute call, as a child of the current span or of `context`"""
+        return self._tracer.start_as_current_span(name, context=context)
+
+    def _context(self, span: Span) -> Context:
+        """The context to start the spans of later calls on the result of an execute call (fetches) in"""
+        return self._trace.set_span_in_context(span)
+
+    @staticmethod
+    def _record_query(span: Span, sql: str) -> None:
+        query = normalize(sql)
+        span.set_attribute("db.query.text", query)
+        span.set_attribute("pinot.query.fingerprint", digest(query))
+        table = find_table(sql)
+        if table is not None:
+            span.set_attribute("db.collection.name", table)
+
+    @staticmethod
+    def _record_result(span: Span, statistics: QueryStatistics | None, response_bytes: int) -> None:
+        span.set_attribute("http.response.body.size", response_bytes)
+        if statistics is None:
+            return
+        for key, value in statistics.items():
+            # nested objects, such as the trace info, are left out
+            if isinstance(value, (bool, int, float, str)):
+                span.set_attribute(f"pinot.{key}", value)
+
+    def _fetch(self, context: Context, method: str, fetch: t.Callable[[], list[_Row]]) -> list[_Row]:
+        with self._phase("pinot.fetch", context) as span:
+            rows = fetch()
+            span.set_attribute("pinot.fetch.method", method)
+            span.set_attribute("pinot.fetch.rows", len(rows))
+        return rows
@@ -0,0 +1,107 @@
+"""Compare the per-query overhead of the HTTP backends on sub-millisecond queries
+
+Runs the same sequence of small queries against a local stand-in broker answering immediately with every backend,
+sync and async, one query at a time, so the latency of each query is the client's overhead plus a loopback round trip
+that is the same for every backend.  Prints throughput and latency percentiles in microseconds.
+
+    poetry run python scripts/backend_benchmarks.py --queries 5000 --rows 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import importlib.util
+import statistics
+import time
+
+from standin_broker import StandinBroker
+from standin_broker import broker_response
+
+import pinot_connect
+from pinot_connect.rows import list_row
+
+SYNC_BACKENDS = ["httpx", "httpcore", "urllib3"]
+ASYNC_BACKENDS = ["httpx", "httpcore", "aiohttp"]
+QUERY = "select * from benchmark limit 10"
+
+
+def run_sync(broker: StandinBroker, backend: str, queries: int) -> list[float]:
+    latencies = []
+    with pinot_connect.connect(host=broker.host, port=broker.port, backend=backend) as conn:
+        with conn.cursor(row_factory=list_row) as cursor:
+            cursor.execute(QUERY)  # open the connection before timing
+            for _ in range(queries):
+                start = time.perf_counter()
+                cursor.execute(QUERY)
+                cursor.fetchall()
+                latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_async(broker: StandinBroker, backend: str, queries: int) -> list[float]:
+    latencies = []
+    async with pinot_connect.AsyncConnection.connect(host=broker.host, port=broker.port, backend=backend) as conn:
+        async with conn.cursor(row_factory=list_row) as cursor:
+            await cursor.execute(QUERY)
+            for _ in range(queries):
+                start = time.perf_counter()
+                await cursor.execute(QUERY)
+                await cursor.fetchall()
+                latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "qps": len(latencies) / sum(latencies),
+        "mean": statistics.mean(latencies) * 1e6,
+        "p50": percentiles[49] * 1e6,
+        "p99": percentiles[98] * 1e6,
+    }
+
+
+def benchmark(broker: StandinBroker, backend: str, is_async: bool, queries: int, rounds: int) -> dict[str, float]:
+    summaries = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            if is_async:
+                latencies = asyncio.run(run_async(broker, backend, queries))
+            else:
+                latencies = run_sync(broker, backend, queries)
+        finally:
+            gc.enable()
+        summaries.append(summarize(latencies))
+    # report the median round for each statistic
+    return {key: statistics.median(summary[key] for summary in summaries) for key in summaries[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=5000, help="sequential queries per round")
+    parser.add_argument("--rows", type=int, default=10, help="rows in each response")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"\n{args.queries} sequential queries returning {args.rows} rows, median of {args.rounds} rounds")
+    print("|                      |        qps |   avg (µs) |   p50 (µs) |   p99 (µs) |")
+    print("| -------------------- | ---------- | ---------- | ---------- | ---------- |")
+    with StandinBroker(broker_response(rows=args.rows)) as broker:
+        for is_async, backends in (False, SYNC_BACKENDS), (True, ASYNC_BACKENDS):
+            for backend in backends:
+                if backend != "httpx" and importlib.util.find_spec(backend) is None:
+                    continue
+                summary = benchmark(broker, backend, is_async, args.queries, args.rounds)
+                name = f"**{backend}{' (async)' if is_async else ''}**"
+                print(
+                    f"| {name:<20} | {summary['qps']:>10.0f} | {summary['mean']:>10.1f} | {summary['p50']:>10.1f} "
+                    f"| {summary['p99']:>10.1f} |"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare HTTP/1.1 and HTTP/2 throughput and latency under high concurrency
+
+Runs the same burst of concurrent async queries against a local stand-in broker over HTTP/1.1 and over HTTP/2 (h2c),
+with each protocol's default pool limits, and prints throughput, latency percentiles and the number of connections
+the broker accepted.  Needs the `h2` package.
+
+    poetry run python scripts/http2_benchmarks.py --queries 1000 --latency 0.005
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import statistics
+import time
+
+from standin_broker import StandinBroker
+
+import pinot_connect
+from pinot_connect.rows import list_row
+
+
+async def run_burst(broker: StandinBroker, client_options: pinot_connect.ClientOptions, queries: int) -> list[float]:
+    """Send `queries` queries at once, returning the latency of each in seconds"""
+    async with pinot_connect.AsyncConnection.connect(
+        host=broker.host, port=broker.port, client_options=client_options
+    ) as conn:
+
+        async def query() -> float:
+            start = time.perf_counter()
+            async with conn.cursor(row_factory=list_row) as cursor:
+                await cursor.execute("select * from benchmark limit 10")
+                await cursor.fetchall()
+            return time.perf_counter() - start
+
+        await query()  # open the first connection before timing
+        return list(await asyncio.gather(*(query() for _ in range(queries))))
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict[str, float]:
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "qps": len(latencies) / elapsed,
+        "mean": statistics.mean(latencies) * 1000,
+        "p50": percentiles[49] * 1000,
+        "p95": percentiles[94] * 1000,
+        "p99": percentiles[98] * 1000,
+    }
+
+
+def benchmark(http2: bool, queries: int, latency: float, rounds: int) -> tuple[dict[str, float], int]:
+    client_options = pinot_connect.ClientOptions(http1=not http2, http2=http2, timeout=60)
+    summaries = []
+    with StandinBroker(http2=http2, latency=latency) as broker:
+        for _ in range(rounds):
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                latencies = asyncio.run(run_burst(broker, client_options, queries))
+                elapsed = time.perf_counter() - start
+            finally:
+                gc.enable()
+            summaries.append(summarize(latencies, elapsed))
+        connections = broker.connections // rounds
+    # report the median round for each statistic
+    return {key: statistics.median(summary[key] for summary in summaries) for key in summaries[0]}, connections
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=1000, help="concurrent queries per round")
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in broker latency in seconds")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"\n{args.queries} concurrent queries, {args.latency * 1000:g}ms broker latency, median of {args.rounds} rounds"
+    )
+    print("|             |        qps |   avg (ms) |   p50 (ms) |   p95 (ms) |   p99 (ms) | connections |")
+    print("| ----------- | ---------- | ---------- | ---------- | ---------- | ---------- | ----------- |")
+    for name, http2 in ("**HTTP/1.1**", False), ("**HTTP/2**", True):
+        summary, connections = benchmark(http2, args.queries, args.latency, args.rounds)
+        print(
+            f"| {name:<11} | {summary['qps']:>10.0f} | {summary['mean']:>10.2f} | {summary['p50']:>10.2f} "
+            f"| {summary['p95']:>10.2f} | {summary['p99']:>10.2f} | {connections:>11} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Generate query load on a local stand-in broker, and report throughput, latency percentiles and pool wait
+
+Load is sent from an `AsyncConnection` (`--client async`), or from a `Connection` shared by a pool of threads
+(`--client threads`), in one of two modes:
+
+- closed loop (`--mode closed`): `--concurrency` workers each send their next query as soon as their last one is done,
+  like a fixed number of interactive clients.  Throughput is whatever the client and the broker sustain
+- open loop (`--mode open`): queries arrive at `--qps` (with exponentially distributed gaps, like independent users),
+  whether or not earlier ones are done, with at most `--concurrency` in flight.  Latency is measured from when each
+  query was due rather than from when it was sent, so a client falling behind shows in its latency rather than hiding
+  it (coordinated omission)
+
+The stand-in broker waits a latency drawn from `--latency` before answering each query: seconds, e.g. `0.005`, or a
+distribution, e.g. `exponential:0.005`, `lognormal:0.005,0.5` or `bimodal:0.002,0.1,0.01`.  Pool wait is the time
+each query waited for a connection from the client's pool (`cursor.client_timings.pool_wait`), which grows once
+`--max-connections` are busy.  Results are written as JSON:
+
+    poetry run python scripts/load_generator.py --client async --mode open --qps 500 --latency lognormal:0.005,0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import random
+import statistics
+import sys
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import orjson
+from offline_benchmarks import QUERY
+from offline_benchmarks import environment
+from standin_broker import SHAPES
+from standin_broker import StandinBroker
+from standin_broker import parse_latency
+from standin_broker import synthetic_response
+
+import pinot_connect
+from pinot_connect.rows import list_row
+
+
+class Sample(t.NamedTuple):
+    """One query: when it was due, sent and done (from `time.perf_counter`), and how long it waited for a connection"""
+
+    due: float
+    start: float
+    end: float
+    pool_wait: float | None
+    error: str | None
+
+
+def client_options(args: argparse.Namespace) -> pinot_connect.ClientOptions:
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    return pinot_connect.ClientOptions(http1=not args.http2, http2=args.http2, limits=limits, timeout=args.timeout)
+
+
+def _pool_wait(cursor: pinot_connect.Cursor | pinot_connect.AsyncCursor) -> float | None:
+    timings = cursor.client_timings
+    return timings.pool_wait / 1e9 if timings is not None and timings.pool_wait is not None else None
+
+
+def _arrivals(args: argparse.Namespace, start: float) -> t.Iterator[float]:
+    """When queries are due in open loop mode, until the end of the run"""
+    rng = random.Random(args.seed)
+    due = start
+    while due < start + args.warmup + args.duration:
+        yield due
+        due += rng.expovariate(args.qps)
+
+
+async def run_async(broker: StandinBroker, args: argparse.Namespace) -> tuple[float, list[Sample]]:
+    async with pinot_connect.AsyncConnection.connect(
+        host=broker.host, port=broker.port, client_options=client_options(args)
+    ) as conn:
+        in_flight = asyncio.Semaphore(args.concurrency)
+
+        async def query(due: float) -> Sample:
+            async with in_flight:
+                start = time.perf_counter()
+                pool_wait, error = None, None
+                try:
+                    async with conn.cursor(row_factory=list_row) as cursor:
+                        await cursor.execute(QUERY)
+                        await cursor.fetchall()
+                        pool_wait = _pool_wait(cursor)
+                except Exception as e:
+                    error = type(e).__name__
+                return Sample(due, start, time.perf_counter(), pool_wait, error)
+
+        start = time.perf_counter()
+        if args.mode == "closed":
+
+            async def worker() -> list[Sample]:
+                samples = []
+                while time.perf_counter() < start + args.warmup + args.duration:
+                    samples.append(await query(time.perf_counter()))
+                return samples
+
+            workers = await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            return start, [sample for samples in workers for sample in samples]
+
+        tasks = []
+        for due in _arrivals(args, start):
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(query(due)))
+        return start, list(await asyncio.gather(*tasks))
+
+
+def run_threads(broker: StandinBroker, args: argparse.Namespace) -> tuple[float, list[Sample]]:
+    with pinot_connect.Connection.connect(
+        host=broker.host, port=broker.port, client_options=client_options(args)
+    ) as conn:
+        local = threading.local()
+
+        def query(due: float) -> Sample:
+            # a cursor per thread, as cursors aren't thread safe
+            if not hasattr(local, "cursor"):
+                local.cursor = conn.cursor(row_factory=list_row)
+            cursor = local.cursor
+            start = time.perf_counter()
+            pool_wait, error = None, None
+            try:
+                cursor.execute(QUERY)
+                cursor.fetchall()
+                pool_wait = _pool_wait(cursor)
+            except Exception as e:
+                error = type(e).__name__
+            return Sample(due, start, time.perf_counter(), pool_wait, error)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="load") as executor:
+            if args.mode == "closed":
+
+                def worker() -> list[Sample]:
+                    samples = []
+                    while time.perf_counter() < start + args.warmup + args.duration:
+                        samples.append(query(time.perf_counter()))
+                    return samples
+
+                futures = [executor.submit(worker) for _ in range(args.concurrency)]
+                return start, [sample for future in futures for sample in future.result()]
+
+            # queries due while every thread is busy queue in the executor, and the wait counts in their latency
+            futures = []
+            for due in _arrivals(args, start):
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(query, due))
+            return start, [future.result() for future in futures]
+
+
+def percentiles(values: list[float]) -> dict[str, float] | None:
+    """Percentiles of `values` in milliseconds"""
+    if not values:
+        return None
+    values = sorted(values)
+
+    def rank(quantile: float) -> float:
+        return values[min(len(values) - 1, int(len(values) * quantile))] * 1e3
+
+    return {
+        "mean": statistics.fmean(values) * 1e3,
+        "p50": rank(0.5),
+        "p99": rank(0.99),
+        "p999": rank(0.999),
+        "max": values[-1] * 1e3,
+    }
+
+
+def summarize(samples: list[Sample], start: float, args: argparse.Namespace) -> dict[str, t.Any]:
+    # queries due during the warm up are left out, while connections are opened and caches filled
+    measured = [sample for sample in samples if sample.due >= start + args.warmup]
+    succeeded = [sample for sample in measured if sample.error is None]
+    elapsed = max((sample.end for sample in measured), default=start) - (start + args.warmup)
+    return {
+        "sent": len(measured),
+        "completed": len(succeeded),
+        "errors": dict(collections.Counter(sample.error for sample in measured if sample.error is not None)),
+        "elapsed_s": elapsed,
+        "throughput_qps": len(succeeded) / elapsed if elapsed > 0 else None,
+        # from when each query was due: the same as service time in closed loop mode
+        "latency_ms": percentiles([sample.end - sample.due for sample in succeeded]),
+        "service_time_ms": percentiles([sample.end - sample.start for sample in succeeded]),
+        "pool_wait_ms": percentiles([sample.pool_wait for sample in succeeded if sample.pool_wait is not None]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--client", choices=["async", "threads"], default="async")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--qps", type=float, default=200.0, help="queries per second to send in open loop mode")
+    parser.add_argument("--concurrency", type=int, default=50, help="workers, or maximum queries in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to measure for")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds to send load for before measuring")
+    parser.add_argument("--latency", type=parse_latency, default="0.005", help="stand-in broker latency")
+    parser.add_argument("--shape", choices=list(SHAPES), default="narrow", help="shape of the responses")
+    parser.add_argument("--rows", type=int, default=10, help="rows in each response")
+    parser.add_argument("--max-connections", type=int, default=100, help="size of the client's connection pool")
+    parser.add_argument("--http2", action="store_true", help="talk HTTP/2 to the stand-in, which needs h2")
+    parser.add_argument("--timeout", type=float, default=60.0, help="request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the open loop arrivals")
+    parser.add_argument("--output", help="file to write the results to.  Default: stdout")
+    args = parser.parse_args()
+
+    body = synthetic_response(args.rows, args.shape)
+    with StandinBroker(body, latency=args.latency, http2=args.http2) as broker:
+        start, samples = asyncio.run(run_async(broker, args)) if args.client == "async" else run_threads(broker, args)
+        result = {**summarize(samples, start, args), "connections": broker.connections}
+
+    print(
+        f"{args.client} {args.mode} loop: {result['completed']} queries, {result['throughput_qps'] or 0:.0f} qps",
+        file=sys.stderr,
+    )
+    settings = {key: value for key, value in vars(args).items() if key != "output"}
+    settings["latency"] = repr(args.latency)
+    output = orjson.dumps(
+        {"environment": environment(), "settings": settings, "result": result}, option=orjson.OPT_INDENT_2
+    )
+    if args.output:
+        with open(args.output, "wb") as file:
+            file.write(output)
+    else:
+        sys.stdout.buffer.write(output + b"\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Measure the memory the client uses to execute a query and fetch its rows, without a cluster or a network
+
+Queries are answered by an `httpx.MockTransport` with a synthetic response from the stand-in broker (see
+`offline_benchmarks.py`), copied for every request as a download would be.  For each result size, fetch method
+(`fetchall`, `fetchmany` and iterating over the cursor) and row factory (`tuple_row`, `dict_row`, `kwargs_row` and
+`dict_row_load_json_fields`), one child process executes the query and fetches every row, keeping them, twice:
+
+- sampling the process' resident set size from a background thread, for the RSS growth the operating system sees
+- with `tracemalloc`, for the peak of memory allocated by Python during the query, and the memory still allocated
+  once it's done, which is what the kept rows cost
+
+Peak and retained bytes are also reported per row, and the peak is broken down by phase: `execute` holds the raw
+response body while `orjson` parses it, then the cursor holds the parsed response while fetching makes rows of it.
+The body, the parsed response and the rows add up to the peak, as the body is kept until the garbage collector runs.
+Results are written as JSON:
+
+    poetry run python scripts/memory_benchmarks.py --rows 1000,100000,1000000 --output memory.json
+
+Every case runs in a fresh process, so memory freed by earlier cases but kept by the allocator doesn't skew RSS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import typing as t
+
+import httpx
+import orjson
+from offline_benchmarks import QUERY
+from offline_benchmarks import ROW_FACTORIES
+from offline_benchmarks import csv_arg
+from offline_benchmarks import environment
+from standin_broker import SHAPES
+from standin_broker import synthetic_response
+
+import pinot_connect
+
+FETCHES: t.Final[tuple[str, ...]] = ("fetchall", "fetchmany", "iterate")
+MEMORY_ROW_FACTORIES: t.Final[tuple[str, ...]] = ("tuple_row", "dict_row", "kwargs_row", "dict_row_load_json_fields")
+
+_PAGE_SIZE: t.Final[int] = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss() -> int | None:
+    """Resident set size of the process in bytes, where `/proc` can tell it"""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:  # pragma: no cover
+        return None
+
+
+class RssSampler:
+    """Sample the resident set size every `interval` seconds from a background thread, keeping the largest"""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.baseline = rss()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak or 0, rss() or 0)
+            time.sleep(self.interval)
+
+    def __enter__(self) -> RssSampler:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak or 0, rss() or 0)
+
+    @property
+    def growth(self) -> int | None:
+        return self.peak - self.baseline if self.baseline is not None and self.peak is not None else None
+
+
+def fetch_kept(cursor: pinot_connect.Cursor, method: str, arraysize: int) -> list:
+    """Fetch every row of the executed query with `method`, keeping them all"""
+    if method == "fetchall":
+        return cursor.fetchall()
+    rows: list = []
+    if method == "fetchmany":
+        while batch := cursor.fetchmany(arraysize):
+            rows.extend(batch)
+    else:
+        rows.extend(cursor)
+    return rows
+
+
+def measure(shape: str, rows: int, method: str, row_factory: str, arraysize: int) -> dict[str, t.Any]:
+    """Measure one case, in the process it's called in"""
+    body = synthetic_response(rows, shape)
+    # a copy per request, so the body is allocated during the query as a download would be
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=bytes(memoryview(body))))
+    connection = pinot_connect.Connection(httpx.Client(base_url="http://broker:8099", transport=transport))
+    cursor = connection.cursor(row_factory=ROW_FACTORIES[row_factory](shape))
+
+    gc.collect()
+    with RssSampler() as sampler:
+        cursor.execute(QUERY)
+        kept = fetch_kept(cursor, method, arraysize)
+    del kept
+    gc.collect()
+
+    # execute holds the raw body until it's parsed, and fetching makes rows from the parsed response
+    tracemalloc.start()
+    try:
+        cursor.execute(QUERY)
+        parsed, execute_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        kept = fetch_kept(cursor, method, arraysize)
+        retained, fetch_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(kept) == rows
+    peak = max(execute_peak, fetch_peak)
+    # httpx responses reference themselves through their stream, so the body is only freed by the garbage collector
+    raw_body = sys.getsizeof(body)
+
+    return {
+        "shape": shape,
+        "rows": rows,
+        "fetch": method,
+        "row_factory": row_factory,
+        "response_bytes": len(body),
+        "rss_growth_bytes": sampler.growth,
+        "peak_bytes": peak,
+        "retained_bytes": retained,
+        "peak_bytes_per_row": peak / rows,
+        "retained_bytes_per_row": retained / rows,
+        "breakdown": {
+            "peak_phase": "execute" if execute_peak >= fetch_peak else "fetch",
+            # held until the garbage collector frees it, after the query's done
+            "raw_body_bytes": raw_body,
+            # the parsed response, held by the cursor until its rows are fetched
+            "parsed_json_bytes": parsed - raw_body,
+            # allocated by fetching, on top of the parsed response
+            "rows_bytes": fetch_peak - parsed,
+            "execute_peak_bytes": execute_peak,
+            "fetch_peak_bytes": fetch_peak,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", type=csv_arg(str), default=["json"], help="comma separated response shapes")
+    parser.add_argument("--rows", type=csv_arg(int), default=[1_000, 10_000, 100_000], help="comma separated rows")
+    parser.add_argument("--fetches", type=csv_arg(str), default=list(FETCHES), help="comma separated fetch methods")
+    parser.add_argument(
+        "--row-factories", type=csv_arg(str), default=list(MEMORY_ROW_FACTORIES), help="comma separated row factories"
+    )
+    parser.add_argument("--arraysize", type=int, default=1000, help="rows per fetchmany call")
+    parser.add_argument("--output", help="file to write the results to.  Default: stdout")
+    args = parser.parse_args()
+    if unknown := set(args.shapes) - set(SHAPES):
+        parser.error(f"unknown shapes {sorted(unknown)}, choose from {list(SHAPES)}")
+
+    results = []
+    # spawned rather than forked, so every case starts from a fresh interpreter
+    context = multiprocessing.get_context("spawn")
+    for shape in args.shapes:
+        for rows in args.rows:
+            for method in args.fetches:
+                for row_factory in args.row_factories:
+                    if ROW_FACTORIES[row_factory](shape) is None:
+                        continue
+                    print(f"{shape} x {rows} rows, {method}, {row_factory}", file=sys.stderr)
+                    with context.Pool(1) as pool:
+                        results.append(pool.apply(measure, (shape, rows, method, row_factory, args.arraysize)))
+
+    settings = {key: value for key, value in vars(args).items() if key != "output"}
+    output = orjson.dumps(
+        {"environment": environment(), "settings": settings, "results": results}, option=orjson.OPT_INDENT_2
+    )
+    if args.output:
+        with open(args.output, "wb") as file:
+            file.write(output)
+    else:
+        sys.stdout.buffer.write(output + b"\n")
+
+
+if __name__ == "__main__":
+    main()
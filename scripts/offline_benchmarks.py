@@ -0,0 +1,258 @@
+"""Benchmark suite timing the client on synthetic broker responses, without a cluster or a network
+
+Queries are answered by an `httpx.MockTransport` with a canned response of one of the stand-in broker's synthetic
+shapes (`narrow`, `wide`, `timestamp`, `decimal` and `json` heavy), for each number of rows.  Every case executes the
+query and fetches its rows, sync and async:
+
+- with each fetch method (`fetchone`, `fetchmany`, `fetchall` and iterating over the cursor) and `tuple_row`, and with
+  `execute` alone, which parses the response without making rows
+- with `fetchall` and each row factory (`dict_row_load_json_fields` only for shapes with JSON columns)
+
+Each case runs until it took `--min-time` seconds and at least `--min-runs` runs, with garbage collection disabled.
+Results are written as JSON, one entry per case, so runs can be stored and compared, e.g. in CI:
+
+    poetry run python scripts/offline_benchmarks.py --rows 1,1000,100000 --output benchmarks.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import gc
+import importlib.metadata
+import platform
+import statistics
+import sys
+import time
+import types
+import typing as t
+
+import httpx
+import orjson
+from standin_broker import SHAPES
+from standin_broker import json_columns
+from standin_broker import synthetic_response
+
+import pinot_connect
+from pinot_connect.rows import RowFactory
+from pinot_connect.rows import args_row
+from pinot_connect.rows import dict_row
+from pinot_connect.rows import dict_row_load_json_fields
+from pinot_connect.rows import kwargs_row
+from pinot_connect.rows import list_row
+from pinot_connect.rows import tuple_row
+
+__all__ = [
+    "QUERY",
+    "FETCHES",
+    "ROW_FACTORIES",
+    "cases",
+    "make_cursor",
+    "make_async_cursor",
+    "fetch",
+    "afetch",
+    "environment",
+    "csv_arg",
+]
+
+QUERY = "select * from benchmark"
+# `execute` alone parses the response without making any rows
+FETCHES: t.Final[tuple[str, ...]] = ("execute", "fetchone", "fetchmany", "fetchall", "iterate")
+# row factory name -> function making the row factory for a shape, or None when it doesn't apply to the shape
+ROW_FACTORIES: t.Final[dict[str, t.Callable[[str], RowFactory | None]]] = {
+    "tuple_row": lambda shape: tuple_row,
+    "list_row": lambda shape: list_row,
+    "dict_row": lambda shape: dict_row,
+    "kwargs_row": lambda shape: kwargs_row(types.SimpleNamespace),
+    "args_row": lambda shape: args_row(lambda *values: values),
+    "dict_row_load_json_fields": lambda shape: (
+        dict_row_load_json_fields(*json_columns(shape)) if json_columns(shape) else None
+    ),
+}
+
+
+def cases(shape: str) -> list[tuple[str, str]]:
+    """The (fetch, row factory) cases to run on a shape"""
+    by_fetch = [(fetch_, "tuple_row") for fetch_ in FETCHES]
+    by_row_factory = [
+        ("fetchall", name)
+        for name, make_row_factory in ROW_FACTORIES.items()
+        if name != "tuple_row" and make_row_factory(shape) is not None
+    ]
+    return by_fetch + by_row_factory
+
+
+def _transport(body: bytes) -> httpx.MockTransport:
+    response_headers = {"content-type": "application/json"}
+    return httpx.MockTransport(lambda request: httpx.Response(200, content=body, headers=response_headers))
+
+
+def make_cursor(body: bytes, row_factory: RowFactory, arraysize: int) -> pinot_connect.Cursor:
+    """A cursor of a connection answering every query with `body`"""
+    connection = pinot_connect.Connection(httpx.Client(base_url="http://broker:8099", transport=_transport(body)))
+    cursor = connection.cursor(row_factory=row_factory)
+    cursor.arraysize = arraysize
+    return cursor
+
+
+async def make_async_cursor(body: bytes, row_factory: RowFactory, arraysize: int) -> pinot_connect.AsyncCursor:
+    """An async cursor of a connection answering every query with `body`"""
+    client = httpx.AsyncClient(base_url="http://broker:8099", transport=_transport(body))
+    cursor = await pinot_connect.AsyncConnection(client).cursor(row_factory=row_factory)
+    cursor.arraysize = arraysize
+    return cursor
+
+
+def fetch(cursor: pinot_connect.Cursor, method: str) -> None:
+    """Execute the query and fetch every row with `method`"""
+    cursor.execute(QUERY)
+    if method == "fetchone":
+        while cursor.fetchone() is not None:
+            pass
+    elif method == "fetchmany":
+        while cursor.fetchmany():
+            pass
+    elif method == "fetchall":
+        cursor.fetchall()
+    elif method == "iterate":
+        for _ in cursor:
+            pass
+
+
+async def afetch(cursor: pinot_connect.AsyncCursor, method: str) -> None:
+    """Execute the query and fetch every row with `method`"""
+    await cursor.execute(QUERY)
+    if method == "fetchone":
+        while await cursor.fetchone() is not None:
+            pass
+    elif method == "fetchmany":
+        while await cursor.fetchmany():
+            pass
+    elif method == "fetchall":
+        await cursor.fetchall()
+    elif method == "iterate":
+        async for _ in cursor:
+            pass
+
+
+class Timer:
+    """Repeat a call until it took `min_time` seconds and `min_runs` runs, keeping the duration of each run"""
+
+    def __init__(self, min_time: float, min_runs: int):
+        self.min_time = min_time
+        self.min_runs = min_runs
+        self.durations: list[float] = []
+        self._start = 0.0
+
+    def __iter__(self) -> t.Iterator[None]:
+        gc.collect()
+        started = time.perf_counter()
+        while len(self.durations) < self.min_runs or time.perf_counter() - started < self.min_time:
+            gc.disable()
+            self._start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.durations.append(time.perf_counter() - self._start)
+                gc.enable()
+
+    def result(self, rows: int) -> dict[str, t.Any]:
+        durations = sorted(self.durations)
+        median = statistics.median(durations)
+        return {
+            "runs": len(durations),
+            "min_ms": durations[0] * 1e3,
+            "median_ms": median * 1e3,
+            "mean_ms": statistics.fmean(durations) * 1e3,
+            "p99_ms": durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1e3,
+            "rows_per_second": rows / median if median else None,
+        }
+
+
+def run_sync(body: bytes, shape: str, rows: int, args: argparse.Namespace) -> t.Iterator[dict[str, t.Any]]:
+    for method, row_factory in cases(shape):
+        cursor = make_cursor(body, ROW_FACTORIES[row_factory](shape), args.arraysize)
+        fetch(cursor, method)  # warm up
+        timer = Timer(args.min_time, args.min_runs)
+        for _ in timer:
+            fetch(cursor, method)
+        yield {"mode": "sync", "fetch": method, "row_factory": row_factory, **timer.result(rows)}
+
+
+async def run_async(body: bytes, shape: str, rows: int, args: argparse.Namespace) -> list[dict[str, t.Any]]:
+    results = []
+    for method, row_factory in cases(shape):
+        cursor = await make_async_cursor(body, ROW_FACTORIES[row_factory](shape), args.arraysize)
+        await afetch(cursor, method)  # warm up
+        timer = Timer(args.min_time, args.min_runs)
+        for _ in timer:
+            await afetch(cursor, method)
+        results.append({"mode": "async", "fetch": method, "row_factory": row_factory, **timer.result(rows)})
+    return results
+
+
+def environment() -> dict[str, t.Any]:
+    try:
+        version = importlib.metadata.version("pinot-connect")
+    except importlib.metadata.PackageNotFoundError:  # pragma: no cover
+        version = None
+    return {
+        "pinot_connect": version,
+        "httpx": httpx.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def csv_arg(type_: t.Callable[[str], t.Any]) -> t.Callable[[str], list]:
+    """Argument type of comma separated values"""
+    return lambda value: [type_(item) for item in value.split(",") if item]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", type=csv_arg(str), default=list(SHAPES), help="comma separated response shapes")
+    parser.add_argument("--rows", type=csv_arg(int), default=[1, 100, 10_000, 1_000_000], help="comma separated rows")
+    parser.add_argument("--modes", type=csv_arg(str), default=["sync", "async"], help="comma separated: sync, async")
+    parser.add_argument("--arraysize", type=int, default=1000, help="rows per fetchmany call")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to run each case for, at least")
+    parser.add_argument("--min-runs", type=int, default=3, help="runs of each case, at least")
+    parser.add_argument("--max-cells", type=int, default=20_000_000, help="skip responses with more values")
+    parser.add_argument("--output", help="file to write the results to.  Default: stdout")
+    args = parser.parse_args()
+    if unknown := set(args.shapes) - set(SHAPES):
+        parser.error(f"unknown shapes {sorted(unknown)}, choose from {list(SHAPES)}")
+
+    results = []
+    for shape in args.shapes:
+        for rows in args.rows:
+            if rows * len(SHAPES[shape]) > args.max_cells:
+                print(f"skipping {shape} x {rows} rows: more than --max-cells values", file=sys.stderr)
+                continue
+            body = synthetic_response(rows, shape)
+            print(f"{shape} x {rows} rows ({len(body)} bytes)", file=sys.stderr)
+            response = {"shape": shape, "rows": rows, "columns": len(SHAPES[shape]), "response_bytes": len(body)}
+            if "sync" in args.modes:
+                results.extend({**response, **result} for result in run_sync(body, shape, rows, args))
+            if "async" in args.modes:
+                results.extend({**response, **result} for result in asyncio.run(run_async(body, shape, rows, args)))
+            del body
+            gc.collect()
+
+    settings = {key: value for key, value in vars(args).items() if key != "output"}
+    output = orjson.dumps(
+        {"environment": environment(), "settings": settings, "results": results}, option=orjson.OPT_INDENT_2
+    )
+    if args.output:
+        with open(args.output, "wb") as file:
+            file.write(output)
+    else:
+        sys.stdout.buffer.write(output + b"\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure the client's own overhead per query, without any network
+
+Runs small queries against an `httpx.MockTransport` answering with a canned broker response, so all of the time
+measured is spent in the client: building the request, httpx's client and the mock transport, parsing the response and
+fetching the rows.  Compares requests built from the cursor's cached request templates with requests built by the
+client for every query (which is what queries with their own timeout, cookies or extensions use), and times building
+the request alone.
+
+    poetry run python scripts/overhead_benchmarks.py --queries 20000 --rows 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import statistics
+import time
+import typing as t
+
+import httpx
+from standin_broker import broker_response
+
+import pinot_connect
+from pinot_connect.rows import list_row
+
+QUERY = "select * from benchmark limit 10"
+
+
+def make_cursor(rows: int) -> pinot_connect.Cursor:
+    body = broker_response(rows=rows)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    connection = pinot_connect.Connection(httpx.Client(base_url="http://broker:8099", transport=transport))
+    return connection.cursor(row_factory=list_row)
+
+
+def time_per_call(function: t.Callable[[], t.Any], calls: int, rounds: int) -> float:
+    """Median over `rounds` of the mean time of one call, in microseconds"""
+    function()  # build the request template outside of the timings
+    means = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(calls):
+                function()
+            means.append((time.perf_counter() - start) / calls * 1e6)
+        finally:
+            gc.enable()
+    return statistics.median(means)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20000, help="queries per round")
+    parser.add_argument("--rows", type=int, default=10, help="rows in each response")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    cursor = make_cursor(args.rows)
+    # a timeout of its own makes the cursor build each request with the client
+    per_request = pinot_connect.RequestOptions(timeout=5.0)
+
+    def execute(request_options: pinot_connect.RequestOptions | None) -> t.Callable[[], None]:
+        def execute_() -> None:
+            cursor.execute(QUERY, request_options=request_options)
+            cursor.fetchall()
+
+        return execute_
+
+    def build(request_options: pinot_connect.RequestOptions | None) -> t.Callable[[], None]:
+        def build_() -> None:
+            cursor._build_request(QUERY, request_options=request_options)
+            cursor._in_flight.clear()
+
+        return build_
+
+    print(f"\n{args.queries} queries returning {args.rows} rows, median of {args.rounds} rounds")
+    print("|                     | execute + fetchall (µs) | build request (µs) |")
+    print("| ------------------- | ----------------------- | ------------------ |")
+    for name, request_options in ("**request template**", None), ("**client built**", per_request):
+        total = time_per_call(execute(request_options), args.queries, args.rounds)
+        build_only = time_per_call(build(request_options), args.queries, args.rounds)
+        print(f"| {name:<19} | {total:>23.1f} | {build_only:>18.1f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""A stand-in for a Pinot broker, for benchmarking the client without a cluster
+
+Answers every `POST /query` with the same canned broker response after an injectable latency (standing in for broker and
+server time), fixed or drawn from a `LatencyDistribution`, and `GET /health` with `OK`.  It speaks HTTP/1.1 with
+keep-alive, and HTTP/2 with prior knowledge (h2c), which needs the `h2` package.  The server runs in its own process, so it doesn't compete with the client for the GIL.
+
+    with StandinBroker(http2=True, latency=0.005) as broker:
+        conn = pinot_connect.connect(host=broker.host, port=broker.port)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import math
+import multiprocessing
+import random
+import typing as t
+from multiprocessing.connection import Connection
+
+import orjson
+
+__all__ = [
+    "StandinBroker",
+    "broker_response",
+    "synthetic_response",
+    "json_columns",
+    "SHAPES",
+    "LatencyDistribution",
+    "Fixed",
+    "Uniform",
+    "Exponential",
+    "LogNormal",
+    "Bimodal",
+    "parse_latency",
+]
+
+
+def broker_response(rows: int = 10, columns: int = 4) -> bytes:
+    """A broker response with a result table of INT, STRING, DOUBLE and TIMESTAMP columns"""
+    types = ["INT", "STRING", "DOUBLE", "TIMESTAMP"]
+    column_types = [types[i % len(types)] for i in range(columns)]
+    values = {"INT": 42, "STRING": "pinot", "DOUBLE": 3.14, "TIMESTAMP": "2024-01-01 00:00:00.0"}
+    return orjson.dumps(
+        {
+            "resultTable": {
+                "dataSchema": {"columnNames": [f"c{i}" for i in range(columns)], "columnDataTypes": column_types},
+                "rows": [[values[column_type] for column_type in column_types] for _ in range(rows)],
+            },
+            "exceptions": [],
+            "numServersQueried": 1,
+            "numServersResponded": 1,
+            "timeUsedMs": 1,
+        }
+    )
+
+
+# column types of each synthetic response shape, and the columns holding JSON documents
+SHAPES: t.Final[dict[str, list[str]]] = {
+    "narrow": ["INT", "STRING", "DOUBLE"],
+    "wide": ["INT", "LONG", "STRING", "DOUBLE", "BOOLEAN"] * 8,
+    "timestamp": ["INT"] + ["TIMESTAMP"] * 4,
+    "decimal": ["INT"] + ["BIG_DECIMAL"] * 4,
+    "json": ["INT", "JSON", "JSON"],
+}
+_VALUES: t.Final[dict[str, t.Any]] = {
+    "INT": 42,
+    "LONG": 1_700_000_000_000,
+    "STRING": "pinot",
+    "DOUBLE": 3.14,
+    "BOOLEAN": True,
+    "TIMESTAMP": "2024-01-01 00:00:00.0",
+    "BIG_DECIMAL": "12345.6789",
+    "JSON": orjson.dumps({"id": 42, "tags": ["a", "b"], "payload": {"name": "pinot", "score": 3.14}}).decode(),
+}
+
+
+def synthetic_response(rows: int, shape: str = "narrow") -> bytes:
+    """A broker response with `rows` rows of one of the `SHAPES`, the first column numbering the rows"""
+    column_types = SHAPES[shape]
+    values = [_VALUES[column_type] for column_type in column_types[1:]]
+    return orjson.dumps(
+        {
+            "resultTable": {
+                "dataSchema": {
+                    "columnNames": [f"c{i}" for i in range(len(column_types))],
+                    "columnDataTypes": column_types,
+                },
+                "rows": [[i, *values] for i in range(rows)],
+            },
+            "exceptions": [],
+            "numServersQueried": 1,
+            "numServersResponded": 1,
+            "timeUsedMs": 1,
+        }
+    )
+
+
+def json_columns(shape: str) -> list[str]:
+    """Names of the JSON columns of a synthetic response shape"""
+    return [f"c{i}" for i, column_type in enumerate(SHAPES[shape]) if column_type == "JSON"]
+
+
+class LatencyDistribution(t.Protocol):
+    """Draws the seconds the stand-in waits before answering a query"""
+
+    def sample(self, rng: random.Random) -> float:
+        ...
+
+
+@dataclasses.dataclass(frozen=True)
+class Fixed:
+    seconds: float
+
+    def sample(self, rng: random.Random) -> float:
+        return self.seconds
+
+
+@dataclasses.dataclass(frozen=True)
+class Uniform:
+    low: float
+    high: float
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high)
+
+
+@dataclasses.dataclass(frozen=True)
+class Exponential:
+    mean: float
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.expovariate(1 / self.mean) if self.mean else 0.0
+
+
+@dataclasses.dataclass(frozen=True)
+class LogNormal:
+    """Long tailed latency: `median` seconds, with `sigma` the standard deviation of its logarithm"""
+
+    median: float
+    sigma: float
+
+    def sample(self, rng: random.Random) -> float:
+        return self.median * math.exp(rng.gauss(0.0, self.sigma))
+
+
+@dataclasses.dataclass(frozen=True)
+class Bimodal:
+    """`fast` seconds, except for a `slow_ratio` share of queries taking `slow` seconds, e.g. cache misses"""
+
+    fast: float
+    slow: float
+    slow_ratio: float
+
+    def sample(self, rng: random.Random) -> float:
+        return self.slow if rng.random() < self.slow_ratio else self.fast
+
+
+_DISTRIBUTIONS: t.Final[dict[str, type]] = {
+    "fixed": Fixed,
+    "uniform": Uniform,
+    "exponential": Exponential,
+    "lognormal": LogNormal,
+    "bimodal": Bimodal,
+}
+
+
+def parse_latency(spec: str) -> LatencyDistribution:
+    """Parse a latency distribution from the command line: seconds, e.g. `0.005`, or a distribution and its
+    parameters, e.g. `uniform:0.001,0.01`, `exponential:0.005`, `lognormal:0.005,0.5` or `bimodal:0.002,0.1,0.01`"""
+    name, _, parameters = spec.partition(":")
+    if not parameters:
+        return Fixed(float(name))
+    if name not in _DISTRIBUTIONS:
+        raise ValueError(f"unknown latency distribution {name!r}, choose from {list(_DISTRIBUTIONS)}")
+    return _DISTRIBUTIONS[name](*(float(parameter) for parameter in parameters.split(",")))
+
+
+class StandinBroker:
+    """Serve canned broker responses on `127.0.0.1`
+
+    Args:
+        body: *(optional)* the body of every query response.  Default: `broker_response()`
+        latency: *(optional)* seconds to wait before answering a query, or the distribution to draw them from.
+            Default: `0`
+        http2: *(optional)* speak HTTP/2 (h2c, prior knowledge) instead of HTTP/1.1.  Default: `False`
+        max_concurrent_streams: *(optional)* HTTP/2 streams allowed per connection.  Default: `100`
+    """
+
+    def __init__(
+        self,
+        body: bytes | None = None,
+        *,
+        latency: float | LatencyDistribution = 0.0,
+        http2: bool = False,
+        max_concurrent_streams: int = 100,
+    ):
+        self.body = body if body is not None else broker_response()
+        self.latency = Fixed(latency) if isinstance(latency, (int, float)) else latency
+        self.http2 = http2
+        self.max_concurrent_streams = max_concurrent_streams
+        self.host = "127.0.0.1"
+        self.port = 0
+        # counters shared with the server process
+        self._connections = multiprocessing.RawValue("q", 0)
+        self._requests = multiprocessing.RawValue("q", 0)
+        self._process: multiprocessing.Process | None = None
+        # seeded, so runs with the same distribution draw the same latencies
+        self._rng = random.Random(0)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def connections(self) -> int:
+        """Number of connections accepted so far"""
+        return self._connections.value
+
+    @property
+    def requests(self) -> int:
+        """Number of requests answered so far"""
+        return self._requests.value
+
+    def _response_body(self, path: str) -> tuple[int, bytes]:
+        if path == "/health":
+            return 200, b"OK"
+        if path.startswith("/query"):
+            return 200, self.body
+        return 404, b"{}"
+
+    async def _wait(self, path: str) -> None:
+        self._requests.value += 1
+        if path.startswith("/query"):
+            delay = self.latency.sample(self._rng)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _serve_http1(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.value += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = dict(line.split(": ", 1) for line in header_lines if line)
+                headers = {name.lower(): value for name, value in headers.items()}
+                await reader.readexactly(int(headers.get("content-length", 0)))
+                path = request_line.split(" ")[1]
+                await self._wait(path)
+                status, body = self._response_body(path)
+                head = f"HTTP/1.1 {status} OK\r\ncontent-type: application/json\r\ncontent-length: {len(body)}\r\n\r\n"
+                writer.write(head.encode() + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_http2(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.settings
+
+        self._connections.value += 1
+        connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        connection.initiate_connection()
+        connection.update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: self.max_concurrent_streams})
+        writer.write(connection.data_to_send())
+        window_opened = asyncio.Event()
+        tasks: set[asyncio.Task] = set()
+
+        async def respond(stream_id: int, path: str) -> None:
+            await self._wait(path)
+            status, body = self._response_body(path)
+            connection.send_headers(
+                stream_id,
+                [(":status", str(status)), ("content-type", "application/json"), ("content-length", str(len(body)))],
+            )
+            while body:
+                window = min(connection.local_flow_control_window(stream_id), connection.max_outbound_frame_size)
+                if window <= 0:
+                    window_opened.clear()
+                    writer.write(connection.data_to_send())
+                    await window_opened.wait()
+                    continue
+                chunk, body = body[:window], body[window:]
+                connection.send_data(stream_id, chunk, end_stream=not body)
+            writer.write(connection.data_to_send())
+
+        paths: dict[int, str] = {}
+        try:
+            while data := await reader.read(65536):
+                for event in connection.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        paths[event.stream_id] = dict(event.headers)[":path"]
+                    elif isinstance(event, h2.events.DataReceived):
+                        connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        task = asyncio.ensure_future(respond(event.stream_id, paths.pop(event.stream_id)))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        window_opened.set()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                writer.write(connection.data_to_send())
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    def _serve(self, ready: Connection) -> None:
+        loop = asyncio.new_event_loop()
+        handler = self._serve_http2 if self.http2 else self._serve_http1
+        server = loop.run_until_complete(asyncio.start_server(handler, self.host, 0))
+        ready.send(server.sockets[0].getsockname()[1])
+        loop.run_forever()
+
+    def start(self) -> None:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(target=self._serve, args=(sender,), name="standin-broker", daemon=True)
+        self._process.start()
+        self.port = receiver.recv()
+
+    def stop(self) -> None:
+        assert self._process is not None
+        self._process.terminate()
+        self._process.join()
+
+    def __enter__(self) -> StandinBroker:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.stop()
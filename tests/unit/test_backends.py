@@ -0,0 +1,203 @@
+import contextlib
+import gzip
+import http.server
+import importlib.util
+import threading
+import time
+
+import httpx
+import orjson
+import pytest
+
+from pinot_connect.backends import AiohttpBackend
+from pinot_connect.backends import AsyncBackend
+from pinot_connect.backends import AsyncHttpcoreBackend
+from pinot_connect.backends import Backend
+from pinot_connect.backends import HttpcoreBackend
+from pinot_connect.backends import Urllib3Backend
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import DatabaseError
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.options import ClientOptions
+from pinot_connect.options import CompressionOptions
+from pinot_connect.options import RequestOptions
+
+RESULT = orjson.dumps(
+    {
+        "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": [[1]] * 100},
+        "exceptions": [],
+    }
+)
+
+_urllib3 = pytest.mark.skipif(importlib.util.find_spec("urllib3") is None, reason="urllib3 is not installed")
+_aiohttp = pytest.mark.skipif(importlib.util.find_spec("aiohttp") is None, reason="aiohttp is not installed")
+SYNC_BACKENDS = ["httpx", "httpcore", pytest.param("urllib3", marks=_urllib3)]
+ASYNC_BACKENDS = ["httpx", "httpcore", pytest.param("aiohttp", marks=_aiohttp)]
+
+
+class _BrokerHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def _respond(self, status: int, body: bytes, encoding: str | None = None) -> None:
+        # the client is gone when it timed out
+        with contextlib.suppress(BrokenPipeError, ConnectionResetError):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        self._respond(200 if self.path == "/health" else 404, b"OK")
+
+    def do_POST(self):
+        sql = orjson.loads(self.rfile.read(int(self.headers["Content-Length"])))["sql"]
+        self.server.requests.append((self.path, dict(self.headers)))
+        if "sleep" in sql:
+            time.sleep(0.5)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            self._respond(200, gzip.compress(RESULT), "gzip")
+        else:
+            self._respond(200, RESULT)
+
+    def do_DELETE(self):
+        self._respond(200, b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def broker():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _BrokerHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_httpx_clients_are_backends():
+    assert isinstance(httpx.Client(), Backend)
+    assert isinstance(httpx.AsyncClient(), AsyncBackend)
+    assert isinstance(HttpcoreBackend("http://localhost:8099"), Backend)
+    assert isinstance(AsyncHttpcoreBackend("http://localhost:8099"), AsyncBackend)
+
+
+def test_build_request():
+    backend = HttpcoreBackend("http://broker:8099/pinot", headers={"database": "db"}, auth=httpx.BasicAuth("u", "p"))
+    request = backend.build_request("POST", "/query", params={"a": "b"}, json={"sql": "select 1"}, timeout=2.0)
+    assert str(request.url) == "http://broker:8099/pinot/query?a=b"
+    assert request.headers["database"] == "db"
+    assert request.headers["Authorization"] == httpx.BasicAuth("u", "p")._auth_header
+    assert request.extensions["timeout"] == httpx.Timeout(2.0).as_dict()
+    assert str(backend.build_request("GET", "http://controller:9000/tables").url) == "http://controller:9000/tables"
+
+
+@pytest.mark.parametrize("backend", SYNC_BACKENDS)
+def test_execute(broker, backend):
+    port = broker.server_address[1]
+    compression = ClientOptions(compression=CompressionOptions(small=("gzip",)))
+    with Connection.connect(
+        host="127.0.0.1", port=port, backend=backend, database="db", client_options=compression
+    ) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM table")
+        assert cursor.fetchall() == [(1,)] * 100
+        assert cursor.transfer_statistics.encoding == "gzip"
+        assert cursor.transfer_statistics.uncompressed_bytes == len(RESULT)
+        path, headers = broker.requests[-1]
+        assert path.startswith("/query?queryOptions=clientQueryId%3D")
+        assert headers["database"] == "db"
+
+
+@pytest.mark.parametrize("backend", SYNC_BACKENDS)
+def test_errors(broker, backend):
+    port = broker.server_address[1]
+    with Connection.connect(host="127.0.0.1", port=port, backend=backend) as connection:
+        with pytest.raises(DatabaseError) as exc_info:
+            connection.cursor().execute("SELECT sleep FROM table", request_options=RequestOptions(timeout=0.1))
+        assert isinstance(exc_info.value.__cause__, httpx.ReadTimeout)
+    with Connection.connect(host="127.0.0.1", port=1, backend=backend) as connection:
+        with pytest.raises(DatabaseError) as exc_info:
+            connection.cursor().execute("SELECT id FROM table")
+        assert isinstance(exc_info.value.__cause__, httpx.ConnectError)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ASYNC_BACKENDS)
+async def test_execute_async(broker, backend):
+    port = broker.server_address[1]
+    compression = ClientOptions(compression=CompressionOptions(small=("gzip",)))
+    async with AsyncConnection.connect(
+        host="127.0.0.1", port=port, backend=backend, database="db", client_options=compression
+    ) as connection:
+        cursor = await connection.cursor()
+        await cursor.execute("SELECT id FROM table")
+        assert await cursor.fetchall() == [(1,)] * 100
+        assert cursor.transfer_statistics.encoding == "gzip"
+        assert broker.requests[-1][1]["database"] == "db"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ASYNC_BACKENDS)
+async def test_errors_async(broker, backend):
+    port = broker.server_address[1]
+    async with AsyncConnection.connect(host="127.0.0.1", port=port, backend=backend) as connection:
+        cursor = await connection.cursor()
+        with pytest.raises(DatabaseError) as exc_info:
+            await cursor.execute("SELECT sleep FROM table", request_options=RequestOptions(timeout=0.1))
+        assert isinstance(exc_info.value.__cause__, httpx.ReadTimeout)
+    async with AsyncConnection.connect(host="127.0.0.1", port=1, backend=backend) as connection:
+        cursor = await connection.cursor()
+        with pytest.raises(DatabaseError) as exc_info:
+            await cursor.execute("SELECT id FROM table")
+        assert isinstance(exc_info.value.__cause__, httpx.ConnectError)
+
+
+def test_warmup(broker):
+    with Connection.connect(host="127.0.0.1", port=broker.server_address[1], backend="httpcore", warmup=2):
+        assert len(set(broker.client_ports)) == 2
+
+
+def test_closed_backend():
+    backend = HttpcoreBackend("http://localhost:8099")
+    backend.close()
+    assert backend.is_closed
+    with pytest.raises(RuntimeError, match="closed"):
+        backend.send(backend.build_request("GET", "/health"))
+
+
+def test_unknown_backend():
+    with pytest.raises(ProgrammingError, match="Unknown backend 'requests'"):
+        Connection.connect(host="localhost", backend="requests")
+
+
+def test_unsupported_client_options():
+    with pytest.raises(ProgrammingError, match="doesn't support follow_redirects, max_redirects"):
+        Connection.connect(
+            host="localhost", backend="httpcore", client_options=ClientOptions(follow_redirects=True, max_redirects=3)
+        )
+    # supported options, and unsupported ones left at their default, are fine
+    client_options = ClientOptions(timeout=1.0, limits=httpx.Limits(max_connections=2))
+    with Connection.connect(host="localhost", backend="httpcore", client_options=client_options) as connection:
+        assert connection._client.timeout == httpx.Timeout(1.0)
+        assert connection._client._pool._max_connections == 2
+
+
+@_urllib3
+def test_urllib3_http1_only():
+    with pytest.raises(ProgrammingError, match="HTTP/1.1"):
+        Urllib3Backend("http://localhost:8099", http1=False, http2=True)
+
+
+@_aiohttp
+def test_aiohttp_http1_only():
+    with pytest.raises(ProgrammingError, match="HTTP/1.1"):
+        AiohttpBackend("http://localhost:8099", http2=True)
@@ -0,0 +1,170 @@
+import asyncio
+
+import httpx
+import pytest
+
+from pinot_connect.circuit import CircuitBreaker
+from pinot_connect.circuit import CircuitPolicy
+from pinot_connect.circuit import CircuitStats
+from pinot_connect.circuit import _route
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import DatabaseError
+from pinot_connect.exceptions import OperationalError
+from pinot_connect.exceptions import ProgrammingError
+
+BROKER_URL = "http://broker:8099"
+FALLBACK_URL = "http://broker-2:8099"
+RESULT = {
+    "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": [[1]]},
+    "exceptions": [],
+}
+
+
+class _Broker:
+    """Mock transport handler answering from the fallback broker and failing on the others"""
+
+    def __init__(self, healthy: set[str] = frozenset({"broker-2"})):
+        self.healthy = healthy
+        self.hosts: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.hosts.append(request.headers["Host"])
+        if request.url.host not in self.healthy:
+            raise httpx.ConnectError("broker down")
+        return httpx.Response(200, json=RESULT)
+
+
+def _connection(handler: _Broker, breaker: CircuitBreaker) -> Connection:
+    client = httpx.Client(transport=httpx.MockTransport(handler), base_url=BROKER_URL)
+    return Connection(client, circuit_breaker=breaker)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"failure_rate": 0}, {"slow_call_rate": 1.5}, {"min_calls": 0}, {"min_calls": 30}, {"half_open_calls": 0}],
+)
+def test_invalid_policy(kwargs):
+    with pytest.raises(ProgrammingError):
+        CircuitPolicy(**kwargs)
+
+
+def test_opens_on_failure_rate_and_fails_fast():
+    events = []
+    breaker = CircuitBreaker(CircuitPolicy(window_size=4, min_calls=2), listeners=[events.append])
+    handler = _Broker(healthy=set())
+    with _connection(handler, breaker) as connection:
+        cursor = connection.cursor()
+        for _ in range(2):
+            with pytest.raises(DatabaseError, match="Failed to execute query"):
+                cursor.execute("select id from t")
+        with pytest.raises(OperationalError, match="Circuit open for http://broker:8099"):
+            cursor.execute("select id from t")
+    assert len(handler.hosts) == 2
+    assert [(e.endpoint, e.previous, e.state) for e in events] == [(BROKER_URL, "closed", "open")]
+    assert "failure rate 100%" in events[0].reason
+    assert breaker.state(BROKER_URL) == "open"
+    assert breaker.stats() == {
+        BROKER_URL: CircuitStats(state="open", calls=2, failures=2, slow_calls=0, rejected=1, opened=1)
+    }
+
+
+def test_routes_to_fallback_while_open():
+    breaker = CircuitBreaker(CircuitPolicy(window_size=1, min_calls=1), fallbacks=[FALLBACK_URL])
+    handler = _Broker()
+    with _connection(handler, breaker) as connection:
+        cursor = connection.cursor()
+        with pytest.raises(DatabaseError):
+            cursor.execute("select id from t")
+        cursor.execute("select id from t")
+        assert cursor.fetchall() == [(1,)]
+    assert handler.hosts == ["broker:8099", "broker-2:8099"]
+    assert breaker.stats()[FALLBACK_URL].calls == 1
+
+
+def test_half_open_probe():
+    events = []
+    breaker = CircuitBreaker(CircuitPolicy(window_size=1, min_calls=1, open_duration=0), listeners=[events.append])
+    handler = _Broker(healthy=set())
+    with _connection(handler, breaker) as connection:
+        cursor = connection.cursor()
+        with pytest.raises(DatabaseError):
+            cursor.execute("select id from t")
+        with pytest.raises(DatabaseError):
+            cursor.execute("select id from t")  # the failed probe opens the circuit again
+        handler.healthy = {"broker"}
+        cursor.execute("select id from t")
+    assert [(e.previous, e.state) for e in events] == [
+        ("closed", "open"),
+        ("open", "half_open"),
+        ("half_open", "open"),
+        ("open", "half_open"),
+        ("half_open", "closed"),
+    ]
+    assert breaker.state(BROKER_URL) == "closed"
+
+
+def test_half_open_limits_probes():
+    breaker = CircuitBreaker(CircuitPolicy(window_size=1, min_calls=1, open_duration=0))
+    request = httpx.Request("POST", f"{BROKER_URL}/query")
+    with pytest.raises(ValueError):
+        with breaker._call(request):
+            raise ValueError
+    with breaker._call(request):
+        # only one probe at a time
+        with pytest.raises(OperationalError, match="Circuit open"):
+            breaker._call(request)
+    assert breaker.state(BROKER_URL) == "closed"
+
+
+def test_cancelled_probe_is_released():
+    breaker = CircuitBreaker(CircuitPolicy(window_size=1, min_calls=1, open_duration=0))
+    request = httpx.Request("POST", f"{BROKER_URL}/query")
+    with pytest.raises(ValueError):
+        with breaker._call(request):
+            raise ValueError
+    with pytest.raises(asyncio.CancelledError):
+        with breaker._call(request):
+            raise asyncio.CancelledError
+    assert breaker.state(BROKER_URL) == "half_open"
+    with breaker._call(request):
+        pass
+    assert breaker.state(BROKER_URL) == "closed"
+
+
+def test_opens_on_slow_calls_and_server_errors():
+    breaker = CircuitBreaker(CircuitPolicy(window_size=2, min_calls=2, slow_call_duration=0, slow_call_rate=1))
+    request = httpx.Request("POST", f"{BROKER_URL}/query")
+    for _ in range(2):
+        with breaker._call(request) as call:
+            call.done(httpx.Response(200))
+    assert breaker.stats()[BROKER_URL].slow_calls == 2
+    assert breaker.state(BROKER_URL) == "open"
+
+    breaker = CircuitBreaker(CircuitPolicy(window_size=2, min_calls=2))
+    for status_code in (200, 503):
+        with breaker._call(request) as call:
+            call.done(httpx.Response(status_code))
+    assert breaker.stats()[BROKER_URL].failures == 1
+    assert breaker.state(BROKER_URL) == "open"
+
+
+def test_route():
+    request = httpx.Request("POST", "http://broker:8099/pinot/query?x=1")
+    _route(request, httpx.URL("https://broker-2:443"))
+    assert str(request.url) == "https://broker-2/pinot/query?x=1"
+    assert request.headers["Host"] == "broker-2"
+
+
+@pytest.mark.asyncio
+async def test_async_connection():
+    breaker = CircuitBreaker(CircuitPolicy(window_size=1, min_calls=1), fallbacks=[FALLBACK_URL])
+    handler = _Broker()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=BROKER_URL)
+    async with AsyncConnection(client, circuit_breaker=breaker) as connection:
+        async with connection.cursor() as cursor:
+            with pytest.raises(DatabaseError):
+                await cursor.execute("select id from t")
+            await cursor.execute("select id from t")
+            assert await cursor.fetchall() == [(1,)]
+    assert handler.hosts == ["broker:8099", "broker-2:8099"]
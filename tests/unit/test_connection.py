@@ -1,7 +1,14 @@
+import asyncio
+import http.server
+import threading
+import time
 from unittest.mock import AsyncMock
 from unittest.mock import MagicMock
 from unittest.mock import Mock
+from unittest.mock import patch
 
+import httpx
+import orjson
 import pytest
 
 from pinot_connect.connection import AsyncConnection
@@ -9,7 +16,62 @@ from pinot_connect.connection import BaseConnection
 from pinot_connect.connection import Connection
 from pinot_connect.cursor import AsyncCursor
 from pinot_connect.cursor import Cursor
+from pinot_connect.exceptions import OperationalError
 from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.options import ClientOptions
+from pinot_connect.options import KeepAliveOptions
+from pinot_connect.ratelimit import RateLimit
+from pinot_connect.ratelimit import RateLimiter
+from pinot_connect.rows import list_row
+
+CONTROLLER_URL = "http://controller:9000"
+SEGMENTS = [{"OFFLINE": ["seg_0", "seg_1", "seg_2"]}, {"REALTIME": ["seg_3"]}]
+
+
+def _scan_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.startswith("/segments/"):
+        return httpx.Response(200, json=SEGMENTS)
+    if request.url.path.startswith("/tables/"):
+        if request.url.path == "/tables/missing":
+            return httpx.Response(404, json={"error": "Table missing not found"})
+        return httpx.Response(200, json={"OFFLINE": {"quota": {"maxQueriesPerSecond": "10"}}})
+    sql = orjson.loads(request.content)["sql"]
+    # return one row per segment named in the query, or the partition for a MOD predicate
+    if "$segmentName" in sql:
+        rows = [[int(name[-1])] for name in ("seg_0", "seg_1", "seg_2", "seg_3") if f"'{name}'" in sql]
+    else:
+        rows = [[int(sql.split("= ")[-1].split(" ")[0])]]
+    body = {
+        "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": rows},
+        "exceptions": [],
+    }
+    return httpx.Response(200, json=body)
+
+
+class _HealthHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        self.send_response(200 if self.path == "/health" else 404)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"OK")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def health_server():
+    """A broker stand-in answering /health, recording the client port of every request"""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _HealthHandler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
 
 
 @pytest.fixture
@@ -40,6 +102,88 @@ class TestBaseConnection:
         connection._build_cursor(cursor_class, query_options, row_factory)
         cursor_class.assert_called_once_with(connection, query_options=query_options, row_factory=row_factory)
 
+    def test_build_scan_queries_segments(self):
+        queries = BaseConnection._build_scan_queries(
+            "t",
+            ["a", "b"],
+            "b > %s",
+            (1,),
+            2,
+            partition_column=None,
+            segments=["s0", "s1", "s2"],
+            limit=10,
+        )
+        assert queries == [
+            "SELECT a, b FROM t WHERE (b > 1) AND $segmentName IN ('s0', 's2') LIMIT 10",
+            "SELECT a, b FROM t WHERE (b > 1) AND $segmentName IN ('s1') LIMIT 10",
+        ]
+
+    def test_build_scan_queries_partition_column(self):
+        queries = BaseConnection._build_scan_queries(
+            "t", None, None, None, 2, partition_column="id", segments=None, limit=10
+        )
+        assert queries == [
+            "SELECT * FROM t WHERE (MOD(ABS(FLOOR(id)), 2) = 0 OR id IS NULL) LIMIT 10",
+            "SELECT * FROM t WHERE MOD(ABS(FLOOR(id)), 2) = 1 LIMIT 10",
+        ]
+
+    @pytest.mark.parametrize("partition_column", ["id, 1) = 0 OR (id", "abs(id)", ""])
+    def test_build_scan_queries_partition_column_not_a_column(self, partition_column):
+        with pytest.raises(ProgrammingError, match="partition_column"):
+            BaseConnection._build_scan_queries(
+                "t", None, None, None, 2, partition_column=partition_column, segments=None, limit=10
+            )
+
+    @pytest.mark.parametrize(
+        "table, columns, match",
+        [("t; DROP", None, "table"), ("t", ["id", "1 = 1 OR id"], "columns"), ("(SELECT * FROM t)", None, "table")],
+    )
+    def test_build_scan_queries_names_not_sql(self, table, columns, match):
+        with pytest.raises(ProgrammingError, match=match):
+            BaseConnection._build_scan_queries(
+                table, columns, None, None, 2, partition_column="id", segments=None, limit=10
+            )
+
+    @pytest.mark.parametrize("parallelism, segments", [(0, ["s0"]), (2, [])])
+    def test_build_scan_queries_errors(self, parallelism, segments):
+        with pytest.raises(ProgrammingError):
+            BaseConnection._build_scan_queries(
+                "t", None, None, None, parallelism, partition_column=None, segments=segments, limit=10
+            )
+
+    def test_segments_requires_controller_url(self, mock_client):
+        with pytest.raises(ProgrammingError, match="controller_url"):
+            Connection(mock_client).segments("t")
+
+    def test_load_rate_limit_requires_rate_limiter(self):
+        client = httpx.Client(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        with pytest.raises(ProgrammingError, match="rate_limiter"):
+            Connection(client, controller_url=CONTROLLER_URL).load_rate_limit("t")
+
+    def test_warmup_requires_positive_n(self, mock_client):
+        with pytest.raises(ProgrammingError, match="positive"):
+            Connection(mock_client).warmup(0)
+
+    @pytest.mark.parametrize(
+        "handler",
+        [lambda request: httpx.Response(503), lambda request: (_ for _ in ()).throw(httpx.ConnectError("down"))],
+    )
+    def test_warmup_fails_on_unhealthy_broker(self, handler):
+        client = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://broker:8099")
+        with pytest.raises(OperationalError, match="health check failed"):
+            Connection(client).warmup(3)
+
+    @pytest.mark.parametrize("kwargs", [{"connections": 0}, {"idle_timeout": 0}, {"idle_timeout": 10, "interval": 9}])
+    def test_invalid_keep_alive_options(self, kwargs):
+        with pytest.raises(ProgrammingError):
+            KeepAliveOptions(**kwargs)
+
+    def test_keep_alive_limits(self):
+        options = KeepAliveOptions(connections=30, idle_timeout=60)
+        limits = options.limits(httpx.Limits(max_connections=100, max_keepalive_connections=20))
+        assert limits == httpx.Limits(max_connections=100, max_keepalive_connections=30, keepalive_expiry=48)
+        assert options.ping_interval == 20
+
     def test_build_cursor_fails_when_connection_closed(self, mock_client):
         connection = BaseConnection(mock_client)
         mock_client.is_closed = True
@@ -71,11 +215,117 @@ class TestConnection:
         mock_cursor.close.assert_called_once()
         assert connection.closed is True
 
+    def test_execute_split(self):
+        with Connection.connect(host="localhost") as connection:
+            with patch.object(Cursor, "execute_split") as mock_execute_split:
+                cursor = connection.execute_split(
+                    "select 1", {"start": 0, "end": 1}, start_param="start", end_param="end", splits=2
+                )
+            assert isinstance(cursor, Cursor)
+            assert mock_execute_split.call_args.kwargs["splits"] == 2
+
+    def test_execute_split_error_closes_cursor(self):
+        with Connection.connect(host="localhost") as connection:
+            with patch.object(Cursor, "execute_split", side_effect=ProgrammingError("bad")):
+                with pytest.raises(ProgrammingError, match="bad"):
+                    connection.execute_split("select 1", (0, 1), start_param=0, end_param=1)
+            assert not connection._cursors
+
+    def test_segments(self):
+        client = httpx.Client(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        with Connection(client, controller_url=f"{CONTROLLER_URL}/") as connection:
+            assert connection.segments("t") == ["seg_0", "seg_1", "seg_2", "seg_3"]
+
+    def test_load_rate_limit(self):
+        client = httpx.Client(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        with Connection(client, controller_url=CONTROLLER_URL, rate_limiter=RateLimiter()) as connection:
+            assert connection.load_rate_limit("t", burst=2) == RateLimit(10.0, 2)
+            assert connection.rate_limiter.limits() == {"t": RateLimit(10.0, 2)}
+            with pytest.raises(OperationalError, match="404"):
+                connection.load_rate_limit("missing")
+
+    def test_parallel_scan_segments(self):
+        client = httpx.Client(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        with Connection(client, controller_url=CONTROLLER_URL) as connection:
+            rows = connection.parallel_scan("t", ["id"], parallelism=3, row_factory=list_row)
+            assert sorted(rows) == [[0], [1], [2], [3]]
+            assert not connection._cursors
+
+    def test_parallel_scan_partition_column(self):
+        client = httpx.Client(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        with Connection(client) as connection:
+            assert sorted(connection.parallel_scan("t", partition_column="id", parallelism=3)) == [(0,), (1,), (2,)]
+
+    def test_parallel_scan_warns_on_truncation(self):
+        client = httpx.Client(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        with Connection(client) as connection:
+            with pytest.warns(UserWarning, match="truncated"):
+                list(connection.parallel_scan("t", partition_column="id", parallelism=2, limit_per_query=1))
+
+    def test_parallel_scan_early_exit_closes_cursors(self):
+        client = httpx.Client(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        with Connection(client) as connection:
+            rows = connection.parallel_scan("t", partition_column="id", parallelism=4)
+            next(rows)
+            rows.close()
+            assert not connection._cursors
+
+    def test_parallel_scan_early_exit_cancels_running_sub_queries(self):
+        running, cancelled = [], threading.Event()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "DELETE":
+                cancelled.set()
+                return httpx.Response(200)
+            if "IS NULL" in orjson.loads(request.content)["sql"]:
+                return _scan_handler(request)
+            running.append(request)
+            cancelled.wait(5)
+            return httpx.Response(500, text="query cancelled")
+
+        client = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://broker:8099")
+        with Connection(client) as connection:
+            rows = connection.parallel_scan("t", partition_column="id", parallelism=4)
+            assert next(rows) == (0,)
+            while len(running) < 3:
+                time.sleep(0.001)
+            start = time.perf_counter()
+            rows.close()
+            assert cancelled.is_set()
+            assert time.perf_counter() - start < 1
+            assert not connection._cursors
+
     def test_context_manager(self):
         with Connection.connect(host="localhost") as connection:
             assert not connection.closed
         assert connection.closed
 
+    def test_warmup(self, health_server):
+        host, port = health_server.server_address
+        with Connection.connect(host=host, port=port, warmup=3) as connection:
+            assert len(set(health_server.client_ports)) == 3
+            # the connections went back to the pool and are reused
+            assert connection.warmup(3) == 3
+            assert set(health_server.client_ports[3:]) == set(health_server.client_ports[:3])
+
+    def test_warmup_capped_by_pool(self, health_server):
+        host, port = health_server.server_address
+        client_options = ClientOptions(limits=httpx.Limits(max_connections=2, max_keepalive_connections=2), timeout=5)
+        with Connection.connect(host=host, port=port, client_options=client_options) as connection:
+            assert connection.warmup(5) == 2
+            assert len(set(health_server.client_ports)) == 2
+
+    def test_keep_alive(self, health_server):
+        host, port = health_server.server_address
+        keep_alive = KeepAliveOptions(connections=2, idle_timeout=1, interval=0.05)
+        with Connection.connect(host=host, port=port, keep_alive=keep_alive) as connection:
+            assert connection._client._transport._pool._keepalive_expiry == 0.8
+            time.sleep(0.3)
+            assert len(set(health_server.client_ports)) == 2
+        pings = len(health_server.client_ports)
+        time.sleep(0.1)
+        assert len(health_server.client_ports) == pings  # stopped on close
+
 
 class TestAsyncConnection:
     @pytest.mark.asyncio
@@ -103,8 +353,72 @@ class TestAsyncConnection:
         mock_cursor.close.assert_awaited_once()
         assert connection._client.is_closed
 
+    @pytest.mark.asyncio
+    async def test_execute_split(self):
+        async with AsyncConnection.connect(host="localhost") as connection:
+            with patch.object(AsyncCursor, "execute_split", new_callable=AsyncMock) as mock_execute_split:
+                async with connection.execute_split("select 1", (0, 1), start_param=0, end_param=1) as cursor:
+                    assert isinstance(cursor, AsyncCursor)
+            mock_execute_split.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_load_rate_limit(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        async with AsyncConnection(client, controller_url=CONTROLLER_URL, rate_limiter=RateLimiter()) as connection:
+            assert await connection.load_rate_limit("t") == RateLimit(10.0)
+
+    @pytest.mark.asyncio
+    async def test_parallel_scan_segments(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        async with AsyncConnection(client, controller_url=CONTROLLER_URL) as connection:
+            rows = [row async for row in connection.parallel_scan("t", ["id"], parallelism=2)]
+            assert sorted(rows) == [(0,), (1,), (2,), (3,)]
+            assert not connection._cursors
+
+    @pytest.mark.asyncio
+    async def test_parallel_scan_early_exit_closes_cursors(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_scan_handler), base_url="http://broker:8099")
+        async with AsyncConnection(client) as connection:
+            rows = connection.parallel_scan("t", partition_column="id", parallelism=4)
+            await rows.__anext__()
+            await rows.aclose()
+            assert not connection._cursors
+
     @pytest.mark.asyncio
     async def test_async_context_manager(self, mock_async_client):
         async with AsyncConnection.connect(host="localhost") as connection:
             assert not connection.closed
         assert connection.closed
+
+    @pytest.mark.asyncio
+    async def test_warmup(self, health_server):
+        host, port = health_server.server_address
+        async with AsyncConnection.connect(host=host, port=port, warmup=3) as connection:
+            assert len(set(health_server.client_ports)) == 3
+            assert await connection.warmup(3) == 3
+            assert set(health_server.client_ports[3:]) == set(health_server.client_ports[:3])
+
+    @pytest.mark.asyncio
+    async def test_warmup_capped_by_pool(self, health_server):
+        host, port = health_server.server_address
+        client_options = ClientOptions(limits=httpx.Limits(max_connections=2, max_keepalive_connections=2), timeout=5)
+        async with AsyncConnection.connect(host=host, port=port, client_options=client_options) as connection:
+            assert await connection.warmup(5) == 2
+            assert len(set(health_server.client_ports)) == 2
+
+    @pytest.mark.asyncio
+    async def test_warmup_fails_on_unhealthy_broker(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(503)), base_url="http://b")
+        with pytest.raises(OperationalError, match="health check failed"):
+            await AsyncConnection(client).warmup(2)
+
+    @pytest.mark.asyncio
+    async def test_keep_alive(self, health_server):
+        host, port = health_server.server_address
+        keep_alive = KeepAliveOptions(idle_timeout=1, interval=0.05)
+        async with AsyncConnection.connect(host=host, port=port, keep_alive=keep_alive) as connection:
+            await asyncio.sleep(0.3)
+            assert len(health_server.client_ports) >= 2
+            task = connection._keep_alive
+        await asyncio.sleep(0)
+        assert task.cancelled()
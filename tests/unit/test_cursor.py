@@ -1,4 +1,6 @@
+import asyncio
 import decimal
+import gzip
 from unittest.mock import AsyncMock
 from unittest.mock import MagicMock
 from unittest.mock import PropertyMock
@@ -8,20 +10,42 @@ import httpx
 import orjson
 import pytest
 
+from pinot_connect._deadline import deadline
 from pinot_connect._query import Query
 from pinot_connect._result_set import Column
 from pinot_connect._result_set import EmptyResultSet
 from pinot_connect._result_set import ResultSet
+from pinot_connect._sql import find_limit
+from pinot_connect._timing import SendTimer
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.cursor import _COPY_URI_REFERENCE
 from pinot_connect.cursor import AsyncCursor
 from pinot_connect.cursor import BaseCursor
 from pinot_connect.cursor import Cursor
 from pinot_connect.cursor import QueryStatistics
 from pinot_connect.cursor import _make_query_statistics
+from pinot_connect.cursor import _RequestTemplate
 from pinot_connect.exceptions import DatabaseError
 from pinot_connect.exceptions import NotSupportedError
 from pinot_connect.exceptions import OperationalError
 from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.options import CompressionOptions
 from pinot_connect.options import QueryOptions
+from pinot_connect.options import RequestOptions
+from pinot_connect.ratelimit import RateLimit
+from pinot_connect.ratelimit import RateLimiter
+from pinot_connect.rows import list_row
+from pinot_connect.scheduler import PriorityClass
+from pinot_connect.scheduler import Scheduler
+
+BROKER_URL = "http://localhost:8099/query"
+COMPRESSIBLE_RESULT = orjson.dumps(
+    {
+        "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": [[1]] * 1000},
+        "exceptions": [],
+    }
+)
 
 
 @pytest.fixture
@@ -29,7 +53,16 @@ def mock_connection():
     connection = MagicMock()
     connection._cursors = set()
     connection.query_options = QueryOptions()
-    connection._client.build_request.return_value = MagicMock(spec=httpx.Request)
+    connection.scheduler = None
+    connection.rate_limiter = None
+    connection.circuit_breaker = None
+    connection.compression = None
+    connection.tracer = None
+    connection.metrics = None
+    connection._observers = ()
+    connection._client.build_request.return_value = MagicMock(
+        spec=httpx.Request, url=httpx.URL(BROKER_URL), extensions={}
+    )
     connection._client.send = MagicMock()
     return connection
 
@@ -39,11 +72,41 @@ def mock_async_connection():
     connection = MagicMock()
     connection._cursors = set()
     connection.query_options = QueryOptions()
-    connection._client.build_request.return_value = MagicMock(spec=httpx.Request)
+    connection.scheduler = None
+    connection.rate_limiter = None
+    connection.circuit_breaker = None
+    connection.compression = None
+    connection.tracer = None
+    connection.metrics = None
+    connection._observers = ()
+    connection._client.build_request.return_value = MagicMock(
+        spec=httpx.Request, url=httpx.URL(BROKER_URL), extensions={}
+    )
     connection._client.send = AsyncMock()
     return connection
 
 
+def _compressing_broker(request: httpx.Request) -> httpx.Response:
+    """Mock transport handler gzipping the result when the request accepts it"""
+    if "gzip" in request.headers["Accept-Encoding"]:
+        return httpx.Response(200, content=gzip.compress(COMPRESSIBLE_RESULT), headers={"Content-Encoding": "gzip"})
+    return httpx.Response(200, content=COMPRESSIBLE_RESULT)
+
+
+def _result_response(rows: list, columns: list | None = None, types: list | None = None, **statistics) -> MagicMock:
+    content = orjson.dumps(
+        {
+            "resultTable": {
+                "dataSchema": {"columnNames": columns or ["id"], "columnDataTypes": types or ["INT"]},
+                "rows": rows,
+            },
+            "exceptions": [],
+            **statistics,
+        }
+    )
+    return MagicMock(spec=httpx.Response, content=content, status_code=200)
+
+
 @pytest.fixture
 def base_cursor(mock_connection):
     return BaseCursor(connection=mock_connection, row_factory=lambda x: x)
@@ -155,6 +218,12 @@ class TestBaseCursor:
         mock_connection._client.build_request.assert_called_once()
         assert isinstance(request, httpx.Request)
 
+    def test_build_request_tags_client_query_id(self, base_cursor, mock_connection):
+        request = base_cursor._build_request("SELECT * FROM table")
+        client_query_id = base_cursor._in_flight[request]
+        query_options = mock_connection._client.build_request.call_args.kwargs["params"]["queryOptions"]
+        assert f"clientQueryId={client_query_id}" in query_options
+
     def test_handle_response(self, base_cursor):
         response = MagicMock(spec=httpx.Response)
         response.content = orjson.dumps(
@@ -241,6 +310,330 @@ class TestCursor:
         with pytest.raises(DatabaseError, match="Failed to execute query"):
             cursor.execute("SELECT * FROM table")
 
+    def test_execute_timeout_cancels_query(self, cursor, mock_connection):
+        mock_connection._client.send.side_effect = httpx.ReadTimeout("timed out")
+        with patch("pinot_connect.cursor.threading.Thread") as mock_thread:
+            with pytest.raises(DatabaseError, match="Failed to execute query"):
+                cursor.execute("SELECT * FROM table")
+        client_query_id = mock_thread.call_args.kwargs["args"][0]
+        assert client_query_id is not None
+        mock_thread.return_value.start.assert_called_once()
+        assert not cursor._in_flight
+
+    def test_cancel_after_connection_closed(self):
+        connection = Connection(httpx.Client(base_url="http://broker:8099"))
+        cursor = connection.cursor()
+        connection.close()
+        # run in a daemon thread after a timeout, so nothing must escape it
+        cursor._cancel_quietly("id", httpx.URL("http://broker:8099/query/sql"))
+
+    def test_execute_deadline_exceeded(self, cursor, mock_connection):
+        with pytest.raises(OperationalError, match="deadline exceeded"):
+            cursor.execute("SELECT * FROM table", request_options=RequestOptions(deadline=-1.0))
+        mock_connection._client.send.assert_not_called()
+        assert not cursor._in_flight
+
+    def test_execute_deadline_sets_timeouts(self, mock_connection):
+        with httpx.Client(base_url="http://broker:8099") as client:
+            mock_connection._client.build_request.side_effect = client.build_request
+        mock_connection._client.send.return_value = _result_response([[1]])
+        cursor = Cursor(connection=mock_connection, row_factory=list_row)
+        with deadline(5.0):
+            cursor.execute("SELECT * FROM table", request_options=RequestOptions(deadline=2.0))
+        request = mock_connection._client.send.call_args.args[0]
+        assert request.extensions["timeout"]["read"] <= 2.0
+        assert "timeoutMs=1" in request.url.params["queryOptions"]
+
+    def test_execute_priority(self, cursor, mock_connection):
+        mock_connection.scheduler = Scheduler({"interactive": PriorityClass(weight=4)})
+        mock_connection._client.send.return_value = MagicMock(spec=httpx.Response, content=b"{}", status_code=200)
+        cursor.execute("SELECT * FROM table", request_options=RequestOptions(priority="interactive"))
+        assert mock_connection.scheduler.stats()["interactive"].admitted == 1
+        with pytest.raises(ProgrammingError, match="Unknown priority class"):
+            cursor.execute("SELECT * FROM table", request_options=RequestOptions(priority="bulk"))
+        assert not cursor._in_flight
+
+    def test_execute_priority_deadline(self, cursor, mock_connection):
+        mock_connection.scheduler = Scheduler(max_concurrency=1)
+        with mock_connection.scheduler.slot():
+            with pytest.raises(OperationalError, match="became free within"):
+                cursor.execute("SELECT * FROM table", request_options=RequestOptions(deadline=0.01))
+        mock_connection._client.send.assert_not_called()
+        assert mock_connection.scheduler.stats()["default"].queued == 0
+
+    def test_execute_rate_limit(self, cursor, mock_connection):
+        mock_connection.rate_limiter = RateLimiter({"table": RateLimit(rate=1, burst=1)}, timeout=0.1)
+        mock_connection._client.send.return_value = MagicMock(spec=httpx.Response, content=b"{}", status_code=200)
+        cursor.execute("SELECT * FROM table")
+        with pytest.raises(OperationalError, match="Rate limit of table 'table' exceeded"):
+            cursor.execute("SELECT * FROM table")
+        # the table can be named explicitly when it can't be found in the query
+        with pytest.raises(OperationalError, match="Rate limit"):
+            cursor.execute("SELECT * FROM (SELECT 1)", request_options=RequestOptions(table="table"))
+        cursor.execute("SELECT * FROM other")
+        assert mock_connection._client.send.call_count == 2
+
+    def test_send_context_table(self, cursor, mock_connection):
+        # without a rate limiter the table isn't looked for
+        with patch("pinot_connect.cursor.find_table") as find_table:
+            assert cursor._send_context("SELECT * FROM table", None).table is None
+            assert cursor._send_context("SELECT * FROM table", RequestOptions(priority="bulk")).table is None
+        find_table.assert_not_called()
+        mock_connection.rate_limiter = RateLimiter()
+        assert cursor._send_context("SELECT * FROM table", None).table == "table"
+        with patch("pinot_connect.cursor.find_table") as find_table:
+            assert cursor._send_context("SELECT * FROM table", RequestOptions(table="other")).table == "other"
+        find_table.assert_not_called()
+
+    def test_execute_compression(self):
+        client = httpx.Client(transport=httpx.MockTransport(_compressing_broker), base_url="http://broker:8099")
+        with Connection(client, compression=CompressionOptions(large=("gzip",))) as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT id FROM table LIMIT 1000")
+            statistics = cursor.transfer_statistics
+            assert statistics.encoding == "gzip"
+            assert statistics.compressed_bytes < statistics.uncompressed_bytes == len(COMPRESSIBLE_RESULT)
+            assert statistics.ratio > 1 and statistics.decode_time > 0
+            assert cursor.rowcount == 1000
+
+            # small queries are not compressed, unless classed as large explicitly
+            cursor.execute("SELECT id FROM table")
+            assert cursor.transfer_statistics.encoding == "identity"
+            assert cursor.transfer_statistics.compressed_bytes == len(COMPRESSIBLE_RESULT)
+            cursor.execute("SELECT id FROM table", request_options=RequestOptions(size_class="large"))
+            assert cursor.transfer_statistics.encoding == "gzip"
+
+            # the limit is found in the query before binding its params, and not at all when the size class is given
+            with patch("pinot_connect.cursor.find_limit", wraps=find_limit) as find_limit_:
+                cursor.execute("SELECT id FROM table WHERE id IN %s LIMIT 1000", (list(range(100)),))
+                find_limit_.assert_called_once_with("SELECT id FROM table WHERE id IN %s LIMIT 1000")
+                assert cursor.transfer_statistics.encoding == "gzip"
+                cursor.execute("SELECT id FROM table", request_options=RequestOptions(size_class="small"))
+                assert find_limit_.call_count == 1
+
+            # a fan-out sums the statistics of its requests
+            cursor.execute_sharded("SELECT id FROM table WHERE id = %s LIMIT 5000", [(1,), (2,)])
+            assert cursor.transfer_statistics.requests == 2
+            assert cursor.transfer_statistics.uncompressed_bytes == 2 * len(COMPRESSIBLE_RESULT)
+
+    def test_execute_request_template(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, content=COMPRESSIBLE_RESULT)
+
+        client = httpx.Client(
+            transport=httpx.MockTransport(handler), base_url="http://broker:8099", headers={"database": "db"}
+        )
+        with Connection(client, query_options=QueryOptions(timeout_ms=100)) as connection:
+            cursor = connection.cursor(query_options=QueryOptions(enable_null_handling=True))
+            cursor.execute("SELECT id FROM table")
+            cursor.execute("SELECT id FROM table WHERE id = %s", (1,))
+            cursor.execute("SELECT id FROM table", query_options=QueryOptions(timeout_ms=5))
+            cursor.execute("SELECT id FROM table", request_options=RequestOptions(timeout=1.0))
+
+        options = [request.url.params["queryOptions"].rsplit("=", 1) for request in requests]
+        assert [option for option, _ in options] == [
+            "timeoutMs=100;enableNullHandling=true;clientQueryId",
+            "timeoutMs=100;enableNullHandling=true;clientQueryId",
+            "timeoutMs=5;enableNullHandling=true;clientQueryId",
+            "timeoutMs=100;enableNullHandling=true;clientQueryId",
+        ]
+        assert len({client_query_id for _, client_query_id in options}) == 4
+        assert orjson.loads(requests[1].content) == {"sql": "SELECT id FROM table WHERE id = 1"}
+        for request in requests:
+            assert request.headers["Content-Type"] == "application/json"
+            assert request.headers["Content-Length"] == str(len(request.content))
+            assert request.headers["database"] == "db"
+        assert requests[0].extensions["timeout"] == client.timeout.as_dict()
+        assert requests[3].extensions["timeout"] == httpx.Timeout(1.0).as_dict()
+        # requests with the same options share a template, and requests with their own timeout don't use one
+        assert len(cursor._request_templates) == 2
+
+    @pytest.mark.parametrize("copy_uri_reference", [True, False])
+    def test_request_template_url(self, copy_uri_reference):
+        # the private fast path must be available on every supported httpx version, and agree with the public one
+        assert _COPY_URI_REFERENCE
+        template = _RequestTemplate.build(httpx.Client(base_url="http://broker:8099/pinot"), "timeoutMs=100", None)
+        with patch("pinot_connect.cursor._COPY_URI_REFERENCE", copy_uri_reference):
+            url = template.request("0af3", "SELECT 1").url
+        assert str(url) == "http://broker:8099/pinot/query?queryOptions=timeoutMs%3D100%3BclientQueryId%3D0af3"
+        assert url.params["queryOptions"] == "timeoutMs=100;clientQueryId=0af3"
+        assert str(template.url) == "http://broker:8099/pinot/query?queryOptions=timeoutMs%3D100%3BclientQueryId%3D"
+
+    def test_client_timings(self):
+        client = httpx.Client(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=COMPRESSIBLE_RESULT)),
+            base_url="http://broker:8099",
+        )
+        with Connection(client) as connection:
+            cursor = connection.cursor()
+            assert cursor.client_timings is None
+            cursor.execute("SELECT id FROM table")
+            timings = cursor.client_timings
+            assert timings.requests == 1
+            assert timings.build > 0 and timings.send > 0 and timings.decode > 0
+            # mock transports emit no trace events
+            assert timings.pool_wait is timings.first_byte is timings.download is None
+            assert timings.materialize == 0
+            cursor.fetchone()
+            cursor.fetchmany(10)
+            cursor.fetchall()
+            assert cursor.client_timings.materialize > 0
+            assert cursor.client_timings.convert > 0
+
+    def test_send_timer(self):
+        events = []
+        request = httpx.Request("POST", BROKER_URL, extensions={"trace": lambda name, info: events.append(name)})
+        timer = SendTimer(request)
+        for name in (
+            "connection.connect_tcp.started",
+            "http11.send_request_headers.started",
+            "http11.receive_response_headers.complete",
+            "http11.receive_response_body.complete",
+        ):
+            request.extensions["trace"](name, {})
+        timer.finish()
+        assert len(events) == 4
+        assert timer.pool_wait >= 0 and timer.first_byte >= 0 and timer.download >= 0
+        assert timer.pool_wait + timer.first_byte + timer.download <= timer.end - timer.start
+
+    def test_transfer_statistics_without_compression(self, cursor, mock_connection):
+        mock_connection._client.send.return_value = MagicMock(spec=httpx.Response, content=b"{}", status_code=200)
+        cursor.execute("SELECT * FROM table")
+        assert cursor.transfer_statistics is None
+
+    def test_cancel(self, cursor, mock_connection):
+        cursor._build_request("SELECT * FROM table")
+        (client_query_id,) = cursor._in_flight.values()
+        mock_connection._client.send.side_effect = httpx.ConnectError("broker down")
+        cursor.cancel()  # errors are swallowed
+        mock_connection._client.build_request.assert_called_with("DELETE", f"/clientQuery/{client_query_id}")
+
+    def test_execute_chunked(self, mock_connection):
+        cursor = Cursor(connection=mock_connection, row_factory=list_row)
+        mock_connection._client.send.side_effect = [
+            _result_response([[1], [2]], numDocsScanned=2),
+            _result_response([[3]], numDocsScanned=1),
+        ]
+        responses = cursor.execute_chunked(
+            "SELECT id FROM table WHERE id IN %(ids)s LIMIT 100", {"ids": [1, 2, 3]}, chunk_param="ids", chunk_size=2
+        )
+        assert len(responses) == 2
+        assert mock_connection._client.send.call_count == 2
+        assert cursor.fetchall() == [[1], [2], [3]]
+        assert cursor.rowcount == 3
+        assert cursor.query_statistics == {"numDocsScanned": 3}
+
+    def test_execute_chunked_offset(self, mock_connection):
+        cursor = Cursor(connection=mock_connection, row_factory=list_row)
+        mock_connection._client.send.side_effect = [_result_response([[2], [1]]), _result_response([[4], [3]])]
+        cursor.execute_chunked(
+            "SELECT id FROM table WHERE id IN %(ids)s ORDER BY id DESC LIMIT 1, 2",
+            {"ids": [1, 2, 3, 4]},
+            chunk_param="ids",
+            chunk_size=2,
+        )
+        assert cursor.fetchall() == [[3], [2]]
+        sent = [
+            orjson.loads(call.kwargs["content"])["sql"] for call in mock_connection._client.build_request.call_args_list
+        ]
+        assert sent[-1] == "SELECT id FROM table WHERE id IN (3, 4) ORDER BY id DESC LIMIT 3"
+
+    def test_execute_chunked_requires_aggregate(self, cursor, mock_connection):
+        with pytest.raises(ProgrammingError, match="aggregate=True"):
+            cursor.execute_chunked(
+                "SELECT k, COUNT(*) FROM table WHERE id IN %(ids)s GROUP BY k", {"ids": [1, 2]}, chunk_param="ids"
+            )
+        mock_connection._client.send.assert_not_called()
+
+    def test_execute_chunked_unselected_order_by(self, cursor, mock_connection):
+        with pytest.raises(NotSupportedError, match="must be a selected column"):
+            cursor.execute_chunked(
+                "SELECT id FROM table WHERE id IN %(ids)s ORDER BY ts", {"ids": [1, 2]}, chunk_param="ids"
+            )
+        mock_connection._client.send.assert_not_called()
+
+    def test_execute_sharded_aggregate(self, mock_connection):
+        cursor = Cursor(connection=mock_connection, row_factory=list_row)
+        mock_connection._client.send.side_effect = [
+            _result_response([[2, 3]], columns=["sum(x)", "count(x)"], types=["DOUBLE", "LONG"]),
+            _result_response([[4, 1]], columns=["sum(x)", "count(x)"], types=["DOUBLE", "LONG"]),
+        ]
+        cursor.execute_sharded("SELECT avg(x) FROM table WHERE p = %(p)s", [{"p": 0}, {"p": 1}], aggregate=True)
+        assert cursor.fetchall() == [[1.5]]
+        assert cursor.description[0].name == "avg(x)"
+        sent = [
+            orjson.loads(call.kwargs["content"])["sql"] for call in mock_connection._client.build_request.call_args_list
+        ]
+        assert sent == [
+            "SELECT SUM(x), COUNT(x) FROM table WHERE p = 0 LIMIT 100001",
+            "SELECT SUM(x), COUNT(x) FROM table WHERE p = 1 LIMIT 100001",
+        ]
+
+    def test_execute_sharded_no_shards(self, cursor):
+        with pytest.raises(ProgrammingError, match="at least one shard"):
+            cursor.execute_sharded("SELECT 1", [])
+
+    def test_paginate(self, mock_connection):
+        cursor = Cursor(connection=mock_connection, row_factory=list_row)
+        mock_connection._client.send.side_effect = [
+            _result_response([[1], [2]], numDocsScanned=2),
+            _result_response([[3], [4]], numDocsScanned=2),
+            _result_response([[5]], numDocsScanned=1),
+        ]
+        rows = list(cursor.paginate("SELECT id FROM table WHERE x = %s", (1,), key="id", page_size=2))
+        assert rows == [[1], [2], [3], [4], [5]]
+        sql = [
+            orjson.loads(call.kwargs["content"])["sql"] for call in mock_connection._client.build_request.call_args_list
+        ]
+        assert sql == [
+            "SELECT id FROM table WHERE x = 1 ORDER BY id LIMIT 2",
+            "SELECT id FROM table WHERE (x = 1) AND id > 2 ORDER BY id LIMIT 2",
+            "SELECT id FROM table WHERE (x = 1) AND id > 4 ORDER BY id LIMIT 2",
+        ]
+        assert cursor.query == "SELECT id FROM table WHERE x = %s"
+        assert cursor.query_statistics == {"numDocsScanned": 5}
+        # pages are fetched by a cursor of their own, whose timings are added to this cursor's as pages are consumed
+        assert cursor.client_timings.requests == 3
+        assert not cursor._in_flight
+
+    def test_paginate_early_exit(self, mock_connection):
+        cursor = Cursor(connection=mock_connection, row_factory=list_row)
+        mock_connection._client.send.side_effect = [_result_response([[1], [2]]), _result_response([[3], [4]])]
+        rows = cursor.paginate("SELECT id FROM table", key="id", page_size=2)
+        assert next(rows) == [1]
+        rows.close()
+        assert mock_connection._client.send.call_count <= 2
+
+    def test_execute_split(self, mock_connection):
+        cursor = Cursor(connection=mock_connection, row_factory=list_row)
+        mock_connection._client.send.side_effect = [_result_response([[1], [3]]), _result_response([[5], [7]])]
+        cursor.execute_split(
+            "SELECT id FROM table WHERE ts >= %(start)s AND ts < %(end)s ORDER BY id LIMIT 3",
+            {"start": 0, "end": 100},
+            start_param="start",
+            end_param="end",
+            splits=2,
+        )
+        assert cursor.fetchall() == [[1], [3], [5]]
+        sent = [
+            orjson.loads(call.kwargs["content"])["sql"] for call in mock_connection._client.build_request.call_args_list
+        ]
+        assert sent == [
+            "SELECT id FROM table WHERE ts >= 0 AND ts < 50 ORDER BY id LIMIT 3",
+            "SELECT id FROM table WHERE ts >= 50 AND ts < 100 ORDER BY id LIMIT 3",
+        ]
+        assert cursor.query == "SELECT id FROM table WHERE ts >= %(start)s AND ts < %(end)s ORDER BY id LIMIT 3"
+
+    def test_execute_chunked_exception(self, cursor, mock_connection):
+        error = MagicMock(spec=httpx.Response, status_code=200)
+        error.content = orjson.dumps({"exceptions": [{"errorCode": 150, "message": "Some error"}]})
+        mock_connection._client.send.side_effect = [_result_response([[1]]), error]
+        with pytest.raises(ProgrammingError, match=r"\[Pinot Error 150\] Some error"):
+            cursor.execute_chunked("SELECT id FROM table WHERE id IN %s", ([1, 2],), chunk_param=0, chunk_size=1)
+
     def test_executemany(self, cursor):
         with pytest.raises(NotSupportedError, match="The dbapi for apache pinot is read only"):
             cursor.executemany("INSERT INTO table VALUES (?, ?)", [(1, "a")])
@@ -292,11 +685,118 @@ class TestAsyncCursor:
         response = await async_cursor.execute("SELECT * FROM table")
         assert response == mock_response
 
+    async def test_execute_compression(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_compressing_broker), base_url="http://broker:8099")
+        async with AsyncConnection(client, compression=CompressionOptions(large=("gzip",))) as connection:
+            cursor = await connection.cursor()
+            await cursor.execute("SELECT id FROM table LIMIT 1000")
+            statistics = cursor.transfer_statistics
+            assert statistics.encoding == "gzip"
+            assert statistics.compressed_bytes < statistics.uncompressed_bytes == len(COMPRESSIBLE_RESULT)
+            assert cursor.rowcount == 1000
+
     async def test_execute_error(self, async_cursor, mock_async_connection):
         mock_async_connection._client.send.side_effect = Exception("Network error")
         with pytest.raises(DatabaseError, match="Failed to make query request to server"):
             await async_cursor.execute("SELECT * FROM table")
 
+    async def test_task_cancellation_cancels_query(self):
+        deleted = []
+        started = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.method == "DELETE":
+                deleted.append(request.url.path)
+                return httpx.Response(200)
+            started.set()
+            await asyncio.sleep(10)
+            return httpx.Response(200, json={})  # pragma: no cover
+
+        connection = MagicMock()
+        connection._cursors = set()
+        connection.query_options = QueryOptions()
+        connection.scheduler = None
+        connection.rate_limiter = None
+        connection.circuit_breaker = None
+        connection.compression = None
+        connection.tracer = None
+        connection.metrics = None
+        connection._observers = ()
+        connection._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://broker:8099")
+        async_cursor = AsyncCursor(connection=connection, row_factory=list_row)
+        task = asyncio.ensure_future(async_cursor.execute("SELECT * FROM table"))
+        await started.wait()
+        (client_query_id,) = async_cursor._in_flight.values()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)  # let the background cancellation run
+        assert deleted == [f"/clientQuery/{client_query_id}"]
+        assert not async_cursor._in_flight
+
+    async def test_cancel(self, async_cursor, mock_async_connection):
+        async_cursor._build_request("SELECT * FROM table")
+        (client_query_id,) = async_cursor._in_flight.values()
+        await async_cursor.cancel()
+        mock_async_connection._client.build_request.assert_called_with("DELETE", f"/clientQuery/{client_query_id}")
+        mock_async_connection._client.send.assert_awaited()
+
+    async def test_cancel_after_connection_closed(self):
+        connection = AsyncConnection(httpx.AsyncClient(base_url="http://broker:8099"))
+        cursor = await connection.cursor()
+        await connection.close()
+        await cursor._cancel_quietly("id", httpx.URL("http://broker:8099/query/sql"))
+
+    async def test_execute_chunked(self, mock_async_connection):
+        async_cursor = AsyncCursor(connection=mock_async_connection, row_factory=list_row)
+        mock_async_connection._client.send.side_effect = [_result_response([[1], [2]]), _result_response([[3]])]
+        responses = await async_cursor.execute_chunked(
+            "SELECT id FROM table WHERE id IN %(ids)s LIMIT 2", {"ids": [1, 2, 3]}, chunk_param="ids", chunk_size=2
+        )
+        assert len(responses) == 2
+        assert await async_cursor.fetchall() == [[1], [2]]
+
+    async def test_execute_chunked_requires_aggregate(self, async_cursor):
+        with pytest.raises(ProgrammingError, match="aggregate=True"):
+            await async_cursor.execute_chunked(
+                "SELECT SUM(x) FROM table WHERE id IN %(ids)s", {"ids": [1, 2]}, chunk_param="ids"
+            )
+
+    async def test_execute_sharded(self, mock_async_connection):
+        async_cursor = AsyncCursor(connection=mock_async_connection, row_factory=list_row)
+        mock_async_connection._client.send.side_effect = [_result_response([[2]]), _result_response([[1]])]
+        await async_cursor.execute_sharded("SELECT id FROM table WHERE p = %s", [(0,), (1,)])
+        assert await async_cursor.fetchall() == [[2], [1]]
+
+    async def test_paginate(self, mock_async_connection):
+        async_cursor = AsyncCursor(connection=mock_async_connection, row_factory=list_row)
+        mock_async_connection._client.send.side_effect = [
+            _result_response([[3], [2]]),
+            _result_response([[1]]),
+        ]
+        rows = [row async for row in async_cursor.paginate("SELECT id FROM t ORDER BY id DESC", key="id", page_size=2)]
+        assert rows == [[3], [2], [1]]
+        sent = orjson.loads(mock_async_connection._client.build_request.call_args_list[-1].kwargs["content"])["sql"]
+        assert sent == "SELECT id FROM t WHERE id < 2 ORDER BY id DESC LIMIT 2"
+
+    async def test_paginate_closed_cursor(self, async_cursor):
+        await async_cursor.close()
+        with pytest.raises(ProgrammingError):
+            async for _ in async_cursor.paginate("SELECT id FROM t", key="id"):
+                pass
+
+    async def test_execute_split(self, mock_async_connection):
+        async_cursor = AsyncCursor(connection=mock_async_connection, row_factory=list_row)
+        mock_async_connection._client.send.side_effect = [_result_response([[2]]), _result_response([[1]])]
+        await async_cursor.execute_split(
+            "SELECT id FROM table WHERE ts >= %s AND ts < %s ORDER BY id",
+            (0, 10),
+            start_param=0,
+            end_param=1,
+            splits=2,
+        )
+        assert await async_cursor.fetchall() == [[1], [2]]
+
     async def test_executemany(self, async_cursor):
         with pytest.raises(NotSupportedError, match="The dbapi for apache pinot is read only"):
             await async_cursor.executemany("INSERT INTO table VALUES (?, ?)", [(1, "a")])
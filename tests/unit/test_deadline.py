@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from pinot_connect._deadline import Deadline
+from pinot_connect._deadline import _apply_deadline
+from pinot_connect._deadline import _resolve_deadline
+from pinot_connect._deadline import current_deadline
+from pinot_connect._deadline import deadline
+
+
+def _request(query_options: str = "", timeout: float = 5.0) -> httpx.Request:
+    with httpx.Client(base_url="http://broker:8099") as client:
+        params = {"queryOptions": query_options} if query_options else None
+        return client.build_request("POST", "/query", params=params, json={"sql": "select 1"}, timeout=timeout)
+
+
+def test_deadline_remaining():
+    d = Deadline.after(2.0, network_margin=0.5)
+    assert 1.9 < d.remaining() <= 2.0
+    assert 1400 < d.timeout_ms() <= 1500
+    assert not d.expired
+    assert Deadline(time.monotonic() - 1).expired
+
+
+def test_earliest():
+    early, late = Deadline.after(1.0), Deadline.after(2.0)
+    assert early.earliest(late) is early
+    assert late.earliest(early) is early
+    assert late.earliest(None) is late
+
+
+def test_nested_deadlines_only_shorten():
+    assert current_deadline() is None
+    with deadline(1.0) as outer:
+        with deadline(10.0) as inner:
+            assert inner is outer
+            assert current_deadline() is outer
+        with deadline(0.5) as inner:
+            assert inner.expires_at < outer.expires_at
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_resolve_deadline():
+    assert _resolve_deadline(None) is None
+    with deadline(1.0) as ambient:
+        assert _resolve_deadline(None) is ambient
+        assert _resolve_deadline(5.0) is ambient
+        assert _resolve_deadline(0.5).expires_at < ambient.expires_at
+
+
+@pytest.mark.asyncio
+async def test_tasks_inherit_deadline():
+    with deadline(1.0) as d:
+        assert await asyncio.ensure_future(asyncio.sleep(0, result=current_deadline())) is d
+
+
+def test_apply_deadline():
+    request = _request("enableNullHandling=true")
+    _apply_deadline(request, Deadline.after(2.0, network_margin=0.5))
+    assert all(1.9 < value <= 2.0 for value in request.extensions["timeout"].values())
+    options = dict(option.split("=") for option in request.url.params["queryOptions"].split(";"))
+    assert options["enableNullHandling"] == "true"
+    assert 1400 < int(options["timeoutMs"]) <= 1500
+
+
+def test_apply_deadline_keeps_shorter_timeouts():
+    request = _request("timeoutMs=100", timeout=0.2)
+    _apply_deadline(request, Deadline.after(2.0))
+    assert request.extensions["timeout"]["read"] == 0.2
+    assert request.url.params["queryOptions"] == "timeoutMs=100"
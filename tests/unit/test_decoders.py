@@ -0,0 +1,49 @@
+import gzip
+import zlib
+
+import httpx
+import pytest
+
+from pinot_connect._decoders import decode
+
+BODY = b'{"resultTable": {"rows": []}}' * 100
+
+
+def _headers(encoding: str) -> httpx.Headers:
+    return httpx.Headers({"Content-Encoding": encoding})
+
+
+@pytest.mark.parametrize(
+    "encoding, data",
+    [
+        ("identity", BODY),
+        ("gzip", gzip.compress(BODY)),
+        ("GZIP", gzip.compress(BODY)),
+        ("deflate", zlib.compress(BODY)),
+        ("deflate", zlib.compress(BODY)[2:-4]),  # raw deflate, without the zlib wrapper
+        ("unknown", BODY),
+    ],
+)
+def test_decode(encoding, data):
+    assert decode(_headers(encoding), data) == BODY
+
+
+def test_decode_several_encodings():
+    assert decode(_headers("deflate, gzip"), gzip.compress(zlib.compress(BODY))) == BODY
+    assert decode(httpx.Headers(), BODY) == BODY
+
+
+def test_decode_brotli():
+    brotli = pytest.importorskip("brotli")
+    assert decode(_headers("br"), brotli.compress(BODY)) == BODY
+
+
+def test_decode_zstd_frames():
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    assert decode(_headers("zstd"), compressor.compress(BODY[:100]) + compressor.compress(BODY[100:])) == BODY
+
+
+def test_decode_invalid():
+    with pytest.raises(httpx.DecodingError, match="gzip"):
+        decode(_headers("gzip"), b"not gzip")
@@ -0,0 +1,147 @@
+import httpx
+import orjson
+import pytest
+
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import NotSupportedError
+from pinot_connect.explain import QueryPlan
+
+COLUMNS = ["Operator", "Operator_Id", "Parent_Id"]
+SELECTION_PLAN = [
+    ["BROKER_REDUCE(limit:10)", 0, -1],
+    ["COMBINE_SELECT", 1, 0],
+    ["PLAN_START(numSegmentsForThisPlan:4)", 2, 1],
+    ["SELECT(selectList:id, name)", 3, 2],
+    ["PROJECT(name, id)", 4, 3],
+    ["DOC_ID_SET", 5, 4],
+    ["FILTER_AND", 6, 5],
+    ["FILTER_FULL_SCAN(operator:IN,predicate:name IN ('a','b'))", 7, 6],
+    ["FILTER_FULL_SCAN(operator:RANGE,predicate:ts > '2024-01-01')", 8, 6],
+    ["FILTER_SORTED_INDEX(indexLookUp:sorted_index,operator:EQ,predicate:id = '1')", 9, 6],
+]
+AGGREGATION_PLAN = [
+    ["BROKER_REDUCE(limit:10)", 0, -1],
+    ["COMBINE_GROUP_BY", 1, 0],
+    ["PLAN_START(numSegmentsForThisPlan:4)", 2, 1],
+    ["GROUP_BY(groupKeys:country, aggregations:sum(clicks))", 3, 2],
+    ["PROJECT(country, clicks)", 4, 3],
+    ["DOC_ID_SET", 5, 4],
+    ["FILTER_INVERTED_INDEX(indexLookUp:inverted_index,operator:EQ,predicate:device = 'ios')", 6, 5],
+]
+
+
+def test_parse():
+    plan = QueryPlan.parse("SELECT id, name FROM t", COLUMNS, SELECTION_PLAN)
+    assert plan.root.operator == "BROKER_REDUCE"
+    assert plan.root.attributes == {"limit": "10"}
+    assert [node.id for node in plan.root.walk()] == list(range(10))
+    assert [node.id for node in plan.nodes[6].children] == [7, 8, 9]
+    assert plan.nodes[7].attributes == {"operator": "IN", "predicate": "name IN ('a','b')"}
+    assert plan.nodes[9].attributes["indexLookUp"] == "sorted_index"
+    assert [node.id for node in plan.find("FILTER_FULL_SCAN")] == [7, 8]
+
+
+def test_findings():
+    plan = QueryPlan.parse("SELECT id, name FROM t", COLUMNS, SELECTION_PLAN)
+    assert [(finding.code, finding.node_id) for finding in plan.findings] == [
+        ("full_scan", 7),
+        ("missing_inverted_index", 7),
+        ("full_scan", 8),
+        ("missing_range_index", 8),
+    ]
+    assert QueryPlan.parse("SELECT country FROM t", COLUMNS, AGGREGATION_PLAN).findings[0].code == "no_star_tree"
+    star_tree = [["BROKER_REDUCE", 0, -1], ["AGGREGATE", 1, 0], ["FILTER_STARTREE_INDEX", 2, 1]]
+    assert QueryPlan.parse("SELECT count(*) FROM t", COLUMNS, star_tree).findings == []
+    no_scan = [["BROKER_REDUCE", 0, -1], ["AGGREGATE_NO_SCAN", 1, 0]]
+    assert QueryPlan.parse("SELECT count(*) FROM t", COLUMNS, no_scan).findings == []
+    # aggregations answered from dictionaries or metadata don't scan, whatever other operators the plan has
+    for operator in ("AGGREGATE_DICTIONARY", "AGGREGATE_METADATA"):
+        plan = [["BROKER_REDUCE", 0, -1], ["COMBINE_AGGREGATE", 1, 0], [operator, 2, 1]]
+        assert QueryPlan.parse("SELECT max(x) FROM t", COLUMNS, plan).findings == []
+
+
+def test_segment_pruning():
+    statistics = {"numSegmentsQueried": 10, "numSegmentsProcessed": 8, "numSegmentsMatched": 2}
+    plan = QueryPlan.parse("SELECT country FROM t", COLUMNS, AGGREGATION_PLAN, statistics)
+    assert plan.findings[-1].code == "poor_segment_pruning"
+    assert plan.findings[-1].node_id is None
+    # the ratio is of the queried segments, 2 / 10, not of the processed ones, 2 / 8
+    plan = QueryPlan.parse("SELECT country FROM t", COLUMNS, AGGREGATION_PLAN, statistics, min_match_ratio=0.25)
+    assert plan.findings[-1].code == "poor_segment_pruning"
+    assert plan.findings[-1].message.startswith("Queried 10 segments (8 processed) but only 2 matched")
+    plan = QueryPlan.parse("SELECT country FROM t", COLUMNS, AGGREGATION_PLAN, statistics, min_match_ratio=0.2)
+    assert [finding.code for finding in plan.findings] == ["no_star_tree"]
+
+
+def test_asdict():
+    statistics = {"numSegmentsProcessed": 4, "numSegmentsMatched": 1, "traceInfo": {}}
+    plan = orjson.loads(orjson.dumps(QueryPlan.parse("SELECT id FROM t", COLUMNS, SELECTION_PLAN, statistics).asdict()))
+    assert plan["plan"]["children"][0]["operator"] == "COMBINE_SELECT"
+    assert plan["findings"][0] == {
+        "code": "full_scan",
+        "severity": "warning",
+        "message": "Filter scans every document: name IN ('a','b')",
+        "node_id": 7,
+    }
+    assert plan["statistics"] == {"numSegmentsProcessed": 4, "numSegmentsMatched": 1}
+
+
+@pytest.mark.parametrize("columns, rows", [(["SQL", "PLAN"], [["SELECT 1", "..."]]), (COLUMNS, [])])
+def test_unsupported(columns, rows):
+    with pytest.raises(NotSupportedError):
+        QueryPlan.parse("SELECT 1", columns, rows)
+
+
+def _broker(request: httpx.Request) -> httpx.Response:
+    sql = orjson.loads(request.content)["sql"]
+    if sql.startswith("EXPLAIN PLAN FOR "):
+        result = {"columnNames": COLUMNS, "columnDataTypes": ["STRING", "INT", "INT"]}, SELECTION_PLAN
+    else:
+        result = {"columnNames": ["id"], "columnDataTypes": ["INT"]}, [[1]]
+    schema, rows = result
+    return httpx.Response(
+        200,
+        content=orjson.dumps(
+            {
+                "resultTable": {"dataSchema": schema, "rows": rows},
+                "exceptions": [],
+                "numSegmentsQueried": 10,
+                "numSegmentsProcessed": 10,
+                "numSegmentsMatched": 1,
+            }
+        ),
+    )
+
+
+def test_cursor_explain():
+    sent = []
+
+    def broker(request: httpx.Request) -> httpx.Response:
+        sent.append(orjson.loads(request.content)["sql"])
+        return _broker(request)
+
+    client = httpx.Client(transport=httpx.MockTransport(broker), base_url="http://broker:8099")
+    with Connection(client) as connection:
+        cursor = connection.cursor()
+        plan = cursor.explain("SELECT id, name FROM t WHERE id = %s", (1,))
+        assert sent == ["EXPLAIN PLAN FOR SELECT id, name FROM t WHERE id = 1"]
+        assert plan.query == "SELECT id, name FROM t WHERE id = 1"
+        assert plan.statistics is None
+        assert "poor_segment_pruning" not in {finding.code for finding in plan.findings}
+        assert cursor.fetchone() == ("BROKER_REDUCE(limit:10)", 0, -1)
+        plan = cursor.explain("SELECT id, name FROM t", profile=True)
+        assert sent[1:] == ["SELECT id, name FROM t", "EXPLAIN PLAN FOR SELECT id, name FROM t"]
+        assert plan.statistics["numSegmentsMatched"] == 1
+        assert plan.findings[-1].code == "poor_segment_pruning"
+        assert cursor.rowcount == len(SELECTION_PLAN)
+
+
+@pytest.mark.asyncio
+async def test_async_cursor_explain():
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    async with AsyncConnection(client) as connection:
+        cursor = await connection.cursor()
+        plan = await cursor.explain("SELECT id, name FROM t", profile=True)
+        assert plan.findings[-1].code == "poor_segment_pruning"
+        assert len(await cursor.fetchall()) == len(SELECTION_PLAN)
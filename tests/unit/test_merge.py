@@ -0,0 +1,210 @@
+import pytest
+
+from pinot_connect._merge import AggregateMergePlan
+from pinot_connect._merge import MergePlan
+from pinot_connect._merge import SubQueryResult
+from pinot_connect._merge import concat_results
+from pinot_connect._merge import make_merge_plan
+from pinot_connect._merge import merge_query_statistics
+from pinot_connect._merge import resolve_order_by
+from pinot_connect._merge import selects_aggregations
+from pinot_connect._sql import OrderByItem
+from pinot_connect.exceptions import DataError
+from pinot_connect.exceptions import NotSupportedError
+from pinot_connect.exceptions import ProgrammingError
+
+
+def test_merge_query_statistics():
+    merged = merge_query_statistics(
+        [
+            {"numDocsScanned": 10, "timeUsedMs": 5, "partialResult": False, "tablesQueried": ["t"], "requestId": "1"},
+            {"numDocsScanned": 5, "timeUsedMs": 8, "partialResult": True, "tablesQueried": ["t"], "requestId": "2"},
+        ]
+    )
+    assert merged == {
+        "numDocsScanned": 15,
+        "timeUsedMs": 8,
+        "partialResult": True,
+        "tablesQueried": ["t"],
+        "requestId": "1,2",
+    }
+
+
+def test_concat_results():
+    results = [
+        SubQueryResult(["a"], ["INT"], [[1], [2]], {}),
+        SubQueryResult(["a"], ["INT"], [[3]], {}),
+    ]
+    assert list(concat_results(results)) == [[1], [2], [3]]
+
+
+def test_resolve_order_by():
+    columns = ["ts", "count(*)"]
+    assert resolve_order_by(columns, [OrderByItem('"TS"', True), OrderByItem("COUNT( * )", False)]) == [
+        (0, True),
+        (1, False),
+    ]
+    with pytest.raises(NotSupportedError, match="must be a selected column"):
+        resolve_order_by(columns, [OrderByItem("other", False)])
+
+
+class TestMergePlan:
+    @pytest.fixture
+    def results(self):
+        return [
+            SubQueryResult(["ts", "v"], ["LONG", "INT"], [[1, "a"], [4, "b"], [6, None]], {}),
+            SubQueryResult(["ts", "v"], ["LONG", "INT"], [[2, "c"], [3, "d"]], {}),
+        ]
+
+    def test_concat(self, results):
+        plan = MergePlan("select ts, v from t")
+        assert plan.sub_query_operation == "select ts, v from t"
+        columns, types, rows = plan.combine(results)
+        assert columns == ["ts", "v"]
+        assert types == ["LONG", "INT"]
+        assert rows == [[1, "a"], [4, "b"], [6, None], [2, "c"], [3, "d"]]
+
+    def test_ordered(self, results):
+        _, _, rows = MergePlan("select ts, v from t order by ts").combine(results)
+        assert [row[0] for row in rows] == [1, 2, 3, 4, 6]
+
+    def test_ordered_descending(self):
+        results = [
+            SubQueryResult(["ts"], ["LONG"], [[None], [5], [1]], {}),
+            SubQueryResult(["ts"], ["LONG"], [[4], [2]], {}),
+        ]
+        _, _, rows = MergePlan("select ts from t order by ts desc").combine(results)
+        assert rows == [[None], [5], [4], [2], [1]]
+
+    def test_limit_and_offset(self, results):
+        plan = MergePlan("select ts, v from t order by ts limit 1, 2")
+        assert plan.sub_query_operation == "select ts, v from t order by ts LIMIT 3"
+        _, _, rows = plan.combine(results)
+        assert [row[0] for row in rows] == [2, 3]
+
+    @pytest.mark.parametrize(
+        "sql",
+        ["select ts, v as value from t order by value", "select * from t order by ts", "select t.* from t order by ts"],
+    )
+    def test_order_by_selected(self, sql):
+        assert MergePlan(sql).order_by
+
+    @pytest.mark.parametrize(
+        "sql",
+        ["select a from t order by ts", "select v as value from t order by v", "select * from t order by upper(k)"],
+    )
+    def test_order_by_not_selected(self, sql):
+        with pytest.raises(NotSupportedError, match="must be a selected column"):
+            MergePlan(sql)
+
+
+class TestAggregateMergePlan:
+    def test_sub_query_operation(self):
+        plan = AggregateMergePlan(
+            "select carrier, sum(x) as total, avg(d), count(*) from t group by carrier order by total desc limit 5",
+            group_limit=1000,
+        )
+        assert plan.sub_query_operation == (
+            'select carrier, sum(x) AS "total", SUM(d), COUNT(d), count(*) from t group by carrier LIMIT 1001'
+        )
+
+    def test_combine(self):
+        plan = AggregateMergePlan(
+            "select carrier, sum(x) as total, avg(d), min(m), max(m), count(*) from t group by carrier "
+            "order by total desc limit 2"
+        )
+        types = ["STRING", "DOUBLE", "DOUBLE", "LONG", "INT", "INT", "LONG"]
+        columns = ["carrier", "total", "sum(d)", "count(d)", "min(m)", "max(m)", "count(*)"]
+        results = [
+            SubQueryResult(columns, types, [["AA", 1.0, 10.0, 2, 3, 9, 2], ["BB", 5.0, 4.0, 1, 1, 1, 1]], {}),
+            SubQueryResult(columns, types, [["AA", 2.0, 2.0, 2, 1, 5, 2], ["CC", 1.0, None, 0, None, None, 0]], {}),
+        ]
+        columns, types, rows = plan.combine(results)
+        assert columns == ["carrier", "total", "avg(d)", "min(m)", "max(m)", "count(*)"]
+        assert types == ["STRING", "DOUBLE", "DOUBLE", "INT", "INT", "LONG"]
+        assert rows == [["BB", 5.0, 4.0, 1, 1, 1], ["AA", 3.0, 3.0, 1, 9, 4]]
+
+    def test_no_group_by(self):
+        plan = AggregateMergePlan("select count(*) from t")
+        results = [SubQueryResult(["count(*)"], ["LONG"], [[3]], {}), SubQueryResult(["count(*)"], ["LONG"], [[4]], {})]
+        assert plan.combine(results)[2] == [[7]]
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "select upper(k), count(*) from t group by upper(k)",
+            "select upper(k) as uk, count(*) from t group by uk",
+            "select upper(k), count(*) from t group by 1",
+        ],
+    )
+    def test_expression_group_keys(self, sql):
+        plan = AggregateMergePlan(sql)
+        results = [
+            SubQueryResult(["upper(k)", "count(*)"], ["STRING", "LONG"], [["A", 1]], {}),
+            SubQueryResult(["upper(k)", "count(*)"], ["STRING", "LONG"], [["A", 2]], {}),
+        ]
+        assert plan.combine(results)[2] == [["A", 3]]
+
+    @pytest.mark.parametrize(
+        "rows, statistics, match",
+        [
+            ([["a", 1], ["b", 1], ["c", 1]], {}, "more than 2 groups"),
+            ([["a", 1]], {"numGroupsLimitReached": True}, "numGroupsLimit"),
+        ],
+    )
+    def test_group_limit_reached(self, rows, statistics, match):
+        plan = AggregateMergePlan("select k, count(*) from t group by k", group_limit=2)
+        assert plan.sub_query_operation.endswith("LIMIT 3")
+        result = SubQueryResult(["k", "count(*)"], ["STRING", "LONG"], rows, statistics)
+        with pytest.raises(DataError, match=match):
+            plan.combine([result])
+        assert plan.combine([result._replace(rows=rows[:2], statistics={})])[2] == rows[:2]
+
+    def test_declared_aggregations(self):
+        plan = make_merge_plan("select k, total from t", aggregate={"total": "max"})
+        results = [
+            SubQueryResult(["k", "total"], ["STRING", "INT"], [["a", 1]], {}),
+            SubQueryResult(["k", "total"], ["STRING", "INT"], [["a", 3]], {}),
+        ]
+        assert plan.combine(results)[2] == [["a", 3]]
+
+    @pytest.mark.parametrize(
+        "sql, aggregations, error, match",
+        [
+            ("select k from t", None, ProgrammingError, "does not select any aggregations"),
+            ("select distinctcount(k) from t", {"distinctcount(k)": "distinctcount"}, NotSupportedError, "aggregation"),
+            ("select count(distinct k) from t", None, NotSupportedError, "distinct aggregation"),
+            ("select k, total from t", {"total": "avg"}, NotSupportedError, "not an AVG expression"),
+            ("select k, distinctcount(x) from t group by k", None, NotSupportedError, "aggregation 'distinctcount'"),
+            ("select percentileest(x, 99), count(*) from t", None, NotSupportedError, "aggregation 'percentileest'"),
+            ("select upper(k), count(*) from t group by k", None, NotSupportedError, "GROUP BY expression"),
+            ("select k, sum(x) / count(*) from t group by k", None, NotSupportedError, "GROUP BY expression"),
+            ("select k, sum(x) from t group by k having sum(x) > 1", None, NotSupportedError, "HAVING"),
+            ("select k, count(*) from t group by k order by ts", None, NotSupportedError, "selected column"),
+            ("select k, sum(x) as total from t group by k order by sum(x)", None, NotSupportedError, "selected column"),
+        ],
+    )
+    def test_errors(self, sql, aggregations, error, match):
+        with pytest.raises(error, match=match):
+            AggregateMergePlan(sql, aggregations=aggregations)
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select k, count(*) from t group by k", True),
+        ("select DISTINCTCOUNTHLL(k) from t", True),
+        ("select percentile(x, 99) as p from t", True),
+        ("select k, upper(name) from t", False),
+        ("select * from t", False),
+    ],
+)
+def test_selects_aggregations(sql, expected):
+    assert selects_aggregations(sql) is expected
+
+
+def test_make_merge_plan_requires_aggregate():
+    with pytest.raises(ProgrammingError, match="aggregate=True"):
+        make_merge_plan("select k, sum(x) from t group by k")
+    assert type(make_merge_plan("select k, sum(x) from t group by k", aggregate=False)) is MergePlan
+    assert type(make_merge_plan("select k from t")) is MergePlan
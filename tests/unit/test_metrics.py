@@ -0,0 +1,210 @@
+import threading
+
+import httpx
+import orjson
+import pytest
+
+from pinot_connect._sql import fingerprint
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import DatabaseError
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.metrics import MetricsRegistry
+from pinot_connect.metrics import prometheus_text
+
+RESULT = orjson.dumps(
+    {
+        "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": [[1], [2], [3]]},
+        "exceptions": [],
+        "numServersQueried": 1,
+        "numServersResponded": 1,
+    }
+)
+ERROR = orjson.dumps({"exceptions": [{"errorCode": 150, "message": "bad query"}]})
+
+
+def _broker(request: httpx.Request) -> httpx.Response:
+    if b"bad" in request.content:
+        return httpx.Response(200, content=ERROR)
+    if b"down" in request.content:
+        raise httpx.ConnectError("broker down")
+    return httpx.Response(200, content=RESULT)
+
+
+def _by_fingerprint(registry: MetricsRegistry) -> dict:
+    return {query.fingerprint: query for query in registry.snapshot().queries}
+
+
+def test_execute_metrics():
+    registry = MetricsRegistry()
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, metrics=registry) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM table WHERE id > %s", (0,))
+        cursor.execute("SELECT id FROM table WHERE id > %s", (10,))
+        with pytest.raises(ProgrammingError):
+            cursor.execute("SELECT bad FROM table")
+        with pytest.raises(DatabaseError):
+            cursor.execute("SELECT down FROM other")
+
+    queries = _by_fingerprint(registry)
+    query = queries[fingerprint("SELECT id FROM table WHERE id > 0")]
+    assert query.table == "table"
+    assert query.latency.count == 2
+    assert query.latency.sum > 0
+    assert query.rows == 6
+    assert query.response_bytes == 2 * len(RESULT)
+    assert query.errors == {}
+    assert queries[fingerprint("SELECT bad FROM table")].errors == {"150": 1}
+    assert queries[fingerprint("SELECT down FROM other")].errors == {"DatabaseError": 1}
+    snapshot = registry.snapshot()
+    assert snapshot.in_flight == 0
+    # mock transports emit no trace events
+    assert snapshot.pool_wait.count == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_metrics_async():
+    registry = MetricsRegistry()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    async with AsyncConnection(client, metrics=registry) as connection:
+        cursor = await connection.cursor()
+        await cursor.execute("SELECT id FROM table")
+        with pytest.raises(ProgrammingError):
+            await cursor.execute("SELECT bad FROM table")
+    queries = _by_fingerprint(registry)
+    assert queries[fingerprint("SELECT id FROM table")].rows == 3
+    assert queries[fingerprint("SELECT bad FROM table")].errors == {"150": 1}
+    assert registry.snapshot().in_flight == 0
+
+
+def test_fan_out_metrics():
+    registry = MetricsRegistry()
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, metrics=registry) as connection:
+        cursor = connection.cursor()
+        cursor.execute_chunked("SELECT id FROM table WHERE id IN %s", ([1, 2, 3],), chunk_param=0, chunk_size=2)
+        cursor.execute_sharded("SELECT id FROM table WHERE p = %s", [(0,), (1,), (2,)])
+        with pytest.raises(ProgrammingError):
+            cursor.execute_sharded("SELECT bad FROM table WHERE p = %s", [(0,), (1,)])
+        assert [row for row in cursor.paginate("SELECT id FROM table ORDER BY id", key="id", page_size=5)] == [
+            (1,),
+            (2,),
+            (3,),
+        ]
+
+    queries = _by_fingerprint(registry)
+    # a fan-out call is recorded once, as its logical query with the total of its sub-queries
+    chunked = queries[fingerprint("SELECT id FROM table WHERE id IN (1, 2, 3)")]
+    assert chunked.latency.count == 1
+    assert chunked.rows == 6
+    assert chunked.response_bytes == 2 * len(RESULT)
+    sharded = queries[fingerprint("SELECT id FROM table WHERE p = %s")]
+    assert (sharded.latency.count, sharded.rows, sharded.response_bytes) == (1, 9, 3 * len(RESULT))
+    assert queries[fingerprint("SELECT bad FROM table WHERE p = %s")].errors == {"150": 1}
+    # every page of paginate is a query
+    page = queries[fingerprint("SELECT id FROM table ORDER BY id LIMIT 5")]
+    assert (page.latency.count, page.rows) == (1, 3)
+    assert registry.snapshot().in_flight == 0
+
+
+def test_pool_wait_and_in_flight():
+    registry = MetricsRegistry()
+    registry._request_started()
+    assert registry.snapshot().in_flight == 1
+    registry._request_finished(2_000_000)
+    registry._request_started()
+    registry._request_finished(None)
+    snapshot = registry.snapshot()
+    assert snapshot.in_flight == 0
+    assert snapshot.pool_wait.count == 1
+    assert snapshot.pool_wait.sum == 0.002
+
+
+def test_reset_keeps_in_flight():
+    registry = MetricsRegistry()
+    registry._request_started()
+    registry._request_finished(2_000_000)
+    started = threading.Event()
+    finish = threading.Event()
+
+    def request():
+        registry._request_started()
+        started.set()
+        finish.wait()
+        registry._request_finished(None)
+
+    thread = threading.Thread(target=request)
+    thread.start()
+    started.wait()
+    registry._request_started()
+    registry.reset()
+    snapshot = registry.snapshot()
+    assert snapshot.in_flight == 2
+    assert snapshot.pool_wait.count == 0
+    finish.set()
+    thread.join()
+    registry._request_finished(None)
+    assert registry.snapshot().in_flight == 0
+
+
+def test_threads_are_aggregated():
+    registry = MetricsRegistry()
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, metrics=registry) as connection:
+
+        def run():
+            cursor = connection.cursor()
+            for _ in range(10):
+                cursor.execute("SELECT id FROM table")
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the shards of exited threads are retired when a new thread records
+        run()
+    assert len(registry._shards) == 1
+    (query,) = registry.snapshot().queries
+    assert query.latency.count == 50
+    assert query.rows == 150
+
+
+def test_max_label_sets():
+    registry = MetricsRegistry(max_label_sets=1)
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, metrics=registry) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM table")
+        cursor.execute("SELECT id, id FROM table")
+    assert set(_by_fingerprint(registry)) == {fingerprint("SELECT id FROM table"), "other"}
+    registry.reset()
+    assert registry.snapshot().queries == []
+
+
+def test_invalid_registry():
+    with pytest.raises(ProgrammingError):
+        MetricsRegistry(buckets=(1.0, 0.5))
+    with pytest.raises(ProgrammingError):
+        MetricsRegistry(max_label_sets=0)
+
+
+def test_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.5, 1.0))
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, metrics=registry) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM table")
+        with pytest.raises(ProgrammingError):
+            cursor.execute("SELECT bad FROM table")
+    text = prometheus_text(registry)
+    labels = f'table="table",fingerprint="{fingerprint("SELECT id FROM table")}"'
+    assert "# TYPE pinot_connect_query_duration_seconds histogram" in text
+    assert f'pinot_connect_query_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"pinot_connect_query_duration_seconds_count{{{labels}}} 1" in text
+    assert f"pinot_connect_rows_total{{{labels}}} 3" in text
+    assert f'code="150"}} 1' in text
+    assert 'pinot_connect_pool_wait_seconds_bucket{le="0.5"} 0' in text
+    assert "pinot_connect_requests_in_flight 0" in text
+    assert text.endswith("\n")
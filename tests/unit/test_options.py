@@ -1,4 +1,14 @@
+import httpx
+import pytest
+
+from pinot_connect._decoders import DECODERS
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.options import DEFAULT_CONNECTION_LIMITS
+from pinot_connect.options import DEFAULT_HTTP2_CONNECTION_LIMITS
 from pinot_connect.options import QUERY_OPTION_NOT_SET
+from pinot_connect.options import ClientOptions
+from pinot_connect.options import CompressionOptions
 from pinot_connect.options import QueryOptions
 
 
@@ -26,6 +36,7 @@ class TestQueryOptions:
             "maxServerResponseSizeBytes": QUERY_OPTION_NOT_SET,
             "maxQueryResponseSizeBytes": QUERY_OPTION_NOT_SET,
             "filteredAggregationsSkipEmptyGroup": QUERY_OPTION_NOT_SET,
+            "trace": QUERY_OPTION_NOT_SET,
         }
 
     def test_asdict_some_values_set(self):
@@ -44,3 +55,57 @@ class TestQueryOptions:
         assert "enableNullHandling=true" in kv_pair
         assert "explainPlanVerbose=false" in kv_pair
         assert kv_pair.count(";") == 2  # Ensure key-value pairs are properly separated by ';'
+
+    def test_merge_keeps_parent_options(self):
+        parent = QueryOptions(timeout_ms=5000, enable_null_handling=True)
+        merged = QueryOptions.merge(parent, QueryOptions(timeout_ms=100))
+        assert merged.timeout_ms == 100
+        assert merged.enable_null_handling is True
+        assert QueryOptions.merge(parent, QueryOptions()) == parent
+
+
+class TestClientOptions:
+    def test_http2_default_limits(self):
+        assert ClientOptions().limits is DEFAULT_CONNECTION_LIMITS
+        assert ClientOptions(http2=True).limits is DEFAULT_HTTP2_CONNECTION_LIMITS
+        limits = httpx.Limits(max_connections=2)
+        assert ClientOptions(http2=True, limits=limits).limits is limits
+
+    def test_http_version_required(self):
+        with pytest.raises(ProgrammingError, match="http1 and http2"):
+            ClientOptions(http1=False)
+
+    def test_http2_connection(self):
+        pytest.importorskip("h2")
+        client_options = ClientOptions(http1=False, http2=True)
+        with Connection.connect(host="localhost", client_options=client_options) as connection:
+            pool = connection._client._transport._pool
+            assert pool._http2 and not pool._http1
+            assert pool._max_connections == DEFAULT_HTTP2_CONNECTION_LIMITS.max_connections
+
+    def test_compression_connection(self):
+        compression = CompressionOptions(small=("gzip",))
+        with Connection.connect(host="localhost", client_options=ClientOptions(compression=compression)) as connection:
+            assert connection.compression is compression
+
+
+class TestCompressionOptions:
+    @pytest.mark.parametrize("kwargs", [{"small": ("lz4",)}, {"large": ("gzip", "snappy")}, {"large_limit": 0}])
+    def test_invalid(self, kwargs):
+        with pytest.raises(ProgrammingError):
+            CompressionOptions(**kwargs)
+
+    def test_size_class(self):
+        options = CompressionOptions(large_limit=100)
+        assert options.size_class(None) == "small"
+        assert options.size_class(99) == "small"
+        assert options.size_class(100) == "large"
+
+    def test_accept_encoding(self, monkeypatch):
+        monkeypatch.delitem(DECODERS, "zstd", raising=False)
+        monkeypatch.setitem(DECODERS, "br", lambda data: data)
+        options = CompressionOptions(small=("zstd",))
+        assert options.accept_encoding("large") == "br, gzip"
+        # encodings without an installed decoder are left out
+        assert options.accept_encoding("small") == "identity"
+        assert CompressionOptions().accept_encoding("small") == "identity"
@@ -0,0 +1,72 @@
+import datetime
+
+import pytest
+
+from pinot_connect._merge import SubQueryResult
+from pinot_connect._pagination import KeysetPaginator
+from pinot_connect.exceptions import DataError
+from pinot_connect.exceptions import NotSupportedError
+from pinot_connect.exceptions import ProgrammingError
+
+
+def _page(rows: list, columns: list | None = None) -> SubQueryResult:
+    return SubQueryResult(columns=columns or ["id", "x"], types=["INT", "INT"], rows=rows, statistics={})
+
+
+def test_pages():
+    paginator = KeysetPaginator("select id, x from t where x > 1", "id", page_size=2)
+    assert paginator.first_operation() == "select id, x from t where x > 1 ORDER BY id LIMIT 2"
+    assert paginator.next_operation(_page([[1, 2], [3, 4]])) == (
+        "select id, x from t where (x > 1) AND id > 3 ORDER BY id LIMIT 2"
+    )
+    assert paginator.next_operation(_page([[5, 6]])) is None
+
+
+def test_descending():
+    paginator = KeysetPaginator("select id from t order by id desc", "id", page_size=1)
+    assert paginator.first_operation() == "select id from t ORDER BY id DESC LIMIT 1"
+    assert paginator.next_operation(_page([[9]], ["id"])) == "select id from t WHERE id < 9 ORDER BY id DESC LIMIT 1"
+
+
+def test_escapes_key():
+    paginator = KeysetPaginator("select ts from t", "ts", page_size=1)
+    next_operation = paginator.next_operation(_page([[datetime.datetime(2024, 1, 1)]], ["ts"]))
+    assert next_operation == "select ts from t WHERE ts > '2024-01-01T00:00:00' ORDER BY ts LIMIT 1"
+
+
+def test_limit_caps_total_rows():
+    paginator = KeysetPaginator("select id, x from t limit 5", "id", page_size=2)
+    assert paginator.first_operation().endswith("LIMIT 2")
+    assert paginator.next_operation(_page([[1, 0], [2, 0]])).endswith("id > 2 ORDER BY id LIMIT 2")
+    assert paginator.next_operation(_page([[3, 0], [4, 0]])).endswith("id > 4 ORDER BY id LIMIT 1")
+    assert paginator.next_operation(_page([[5, 0]])) is None
+
+
+def test_empty_page():
+    paginator = KeysetPaginator("select id, x from t", "id", page_size=2)
+    assert paginator.next_operation(_page([])) is None
+
+
+@pytest.mark.parametrize(
+    "operation, page_size, error",
+    [
+        ("select id from t order by x", 10, ProgrammingError),
+        ("select id from t limit 5, 10", 10, NotSupportedError),
+        ("select id from t", 0, ProgrammingError),
+    ],
+)
+def test_invalid_queries(operation, page_size, error):
+    with pytest.raises(error):
+        KeysetPaginator(operation, "id", page_size)
+
+
+def test_key_must_be_selected():
+    paginator = KeysetPaginator("select x from t", "id", page_size=1)
+    with pytest.raises(ProgrammingError, match="selected"):
+        paginator.next_operation(_page([[1]], ["x"]))
+
+
+def test_null_key():
+    paginator = KeysetPaginator("select id from t", "id", page_size=1)
+    with pytest.raises(DataError):
+        paginator.next_operation(_page([[None]], ["id"]))
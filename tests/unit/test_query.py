@@ -31,6 +31,36 @@ class TestEscapeFunctions:
     def test_escape_param(self, value, expected):
         assert _escape_param("test", value) == expected
 
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ([1, 2, 3], "(1, 2, 3)"),
+            (("a", "O'Reilly"), "('a', 'O''Reilly')"),
+            (
+                [uuid.UUID("12345678-1234-5678-1234-567812345678")] * 2,
+                "('12345678-1234-5678-1234-567812345678', '12345678-1234-5678-1234-567812345678')",
+            ),
+            ([1, "a", None, True], "(1, 'a', NULL, TRUE)"),
+            ([True, False], "(TRUE, FALSE)"),
+            ([], "()"),
+        ],
+    )
+    def test_escape_sequence(self, value, expected):
+        assert _escape_param("test", value) == expected
+
+    def test_escape_array_like(self):
+        class FakeArray:
+            dtype = "int64"
+
+            def __init__(self, values):
+                self.values = values
+
+            def tolist(self):
+                return self.values
+
+        assert _escape_param("test", FakeArray([1, 2, 3])) == "(1, 2, 3)"
+        assert _escape_param("test", FakeArray(7)) == "7"
+
     def test_escape_param_invalid_type(self):
         with pytest.raises(ProgrammingError, match="Unsupported param type at param name=test"):
             _escape_param("test", object())
@@ -56,3 +86,59 @@ class TestQuery:
     def test_invalid_params(self):
         with pytest.raises(ProgrammingError, match="params must be a dict or tuple, got <class 'set'>"):
             Query("SELECT * FROM table", {1, 2, 3})
+
+    def test_chunked_dict(self):
+        query = Query("SELECT * FROM table WHERE id IN %(ids)s AND name = %(name)s", {"ids": [1, 2, 3], "name": "a"})
+        chunks = query.chunked("ids", 2)
+        assert [c.operation_with_params for c in chunks] == [
+            "SELECT * FROM table WHERE id IN (1, 2) AND name = 'a'",
+            "SELECT * FROM table WHERE id IN (3) AND name = 'a'",
+        ]
+
+    def test_chunked_tuple(self):
+        query = Query("SELECT * FROM table WHERE id IN %s", ((1, 2, 3),))
+        chunks = query.chunked(0, 3)
+        assert [c.operation_with_params for c in chunks] == ["SELECT * FROM table WHERE id IN (1, 2, 3)"]
+
+    def test_chunked_errors(self):
+        query = Query("SELECT * FROM table WHERE id IN %(ids)s", {"ids": 1})
+        with pytest.raises(ProgrammingError, match="expected a sequence"):
+            query.chunked("ids", 2)
+        with pytest.raises(ProgrammingError, match="it is not bound to the query"):
+            query.chunked("missing", 2)
+        with pytest.raises(ProgrammingError, match="chunk size must be positive"):
+            query.chunked("ids", 0)
+
+    def test_split_range(self):
+        query = Query("SELECT * FROM table WHERE ts >= %(start)s AND ts < %(end)s", {"start": 0, "end": 10})
+        assert [c.params for c in query.split_range("start", "end", 3)] == [
+            {"start": 0, "end": 3},
+            {"start": 3, "end": 6},
+            {"start": 6, "end": 10},
+        ]
+
+    def test_split_range_datetime(self):
+        start, end = datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 3)
+        query = Query("SELECT * FROM table WHERE ts >= %s AND ts < %s", (start, end))
+        assert [c.params for c in query.split_range(0, 1, 2)] == [
+            [start, datetime.datetime(2024, 1, 2)],
+            [datetime.datetime(2024, 1, 2), end],
+        ]
+
+    def test_split_range_narrow(self):
+        query = Query(
+            "SELECT * FROM table WHERE ts >= %s AND ts < %s", (datetime.date(2024, 1, 1), datetime.date(2024, 1, 2))
+        )
+        assert len(query.split_range(0, 1, 4)) == 1
+
+    @pytest.mark.parametrize(
+        "params, match",
+        [
+            ((1, 1.0), "must have the same type"),
+            ((5, 1), "must be greater than range start"),
+            (("a", "b"), "Cannot split a range of"),
+        ],
+    )
+    def test_split_range_errors(self, params, match):
+        with pytest.raises(ProgrammingError, match=match):
+            Query("SELECT * FROM table WHERE ts >= %s AND ts < %s", params).split_range(0, 1, 2)
@@ -0,0 +1,100 @@
+import httpx
+import orjson
+import pytest
+
+from pinot_connect.connection import Connection
+from pinot_connect.options import QueryOptions
+from pinot_connect.querytrace import QueryTrace
+
+TRACE_INFO = {
+    "pinot-server-0_O": orjson.dumps(
+        [
+            {"0": [{"SelectionOnlyCombineOperator Time": 12}, {"InstanceResponseOperator Time": 13}]},
+            {"1": [{"FilterOperator Time": 3}, {"ProjectionOperator Time": 5}, {"SelectionOnlyOperator Time": 7}]},
+            {"2": [{"segmentName": "table_OFFLINE_0"}, {"FilterOperator Time": 1}]},
+        ]
+    ).decode(),
+    "pinot-server-1_R": orjson.dumps(
+        [{"0": [{"InstanceResponseOperator Time": 40}, {"FilterOperator Time": 30}]}]
+    ).decode(),
+}
+STATISTICS = {
+    "traceInfo": TRACE_INFO,
+    "numSegmentsQueried": 10,
+    "numSegmentsProcessed": 8,
+    "numSegmentsMatched": 2,
+    "numSegmentsPrunedByServer": 2,
+}
+
+
+def test_parse():
+    trace = QueryTrace.parse(STATISTICS)
+    server_0, server_1 = trace.servers
+    assert (server_0.server, server_0.table_type, server_0.time_ms) == ("pinot-server-0_O", "OFFLINE", 13)
+    assert server_1.table_type == "REALTIME"
+    assert [segment.trace_id for segment in server_0.segments] == ["0", "1", "2"]
+    assert [operator.operator for operator in server_0.segments[1].operators] == [
+        "FilterOperator",
+        "ProjectionOperator",
+        "SelectionOnlyOperator",
+    ]
+    assert server_0.segments[2].segment == "table_OFFLINE_0"
+    assert server_0.segments[2].info == {"segmentName": "table_OFFLINE_0"}
+
+
+def test_slowest():
+    trace = QueryTrace.parse(STATISTICS)
+    assert [server.server for server in trace.slowest_servers(1)] == ["pinot-server-1_R"]
+    instance_response, filter_, *_ = trace.slowest_operators()
+    assert (instance_response.operator, instance_response.calls, instance_response.total_ms) == (
+        "InstanceResponseOperator",
+        2,
+        53,
+    )
+    assert (filter_.operator, filter_.calls, filter_.total_ms, filter_.max_ms, filter_.server) == (
+        "FilterOperator",
+        3,
+        34,
+        30,
+        "pinot-server-1_R",
+    )
+
+
+def test_pruning():
+    pruning = QueryTrace.parse(STATISTICS).pruning
+    assert pruning.pruned_by_server == 2
+    assert pruning.match_ratio == 0.25
+    assert pruning.pruned_ratio == pytest.approx(0.2)
+    assert QueryTrace.parse({"traceInfo": {}}).pruning is None
+
+
+def test_asdict():
+    trace = QueryTrace.parse(STATISTICS).asdict()
+    assert orjson.loads(orjson.dumps(trace))["servers"][1]["segments"][0]["operators"][0] == {
+        "operator": "InstanceResponseOperator",
+        "time_ms": 40.0,
+    }
+
+
+def test_cursor_query_trace():
+    def broker(request: httpx.Request) -> httpx.Response:
+        traced = "trace=true" in request.url.params["queryOptions"]
+        return httpx.Response(
+            200,
+            content=orjson.dumps(
+                {
+                    "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": []},
+                    "exceptions": [],
+                    "traceInfo": TRACE_INFO if traced else {},
+                    **{key: value for key, value in STATISTICS.items() if key != "traceInfo"},
+                }
+            ),
+        )
+
+    client = httpx.Client(transport=httpx.MockTransport(broker), base_url="http://broker:8099")
+    with Connection(client) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM table")
+        assert cursor.query_trace is None
+        cursor.execute("SELECT id FROM table", query_options=QueryOptions(trace=True))
+        assert len(cursor.query_trace.servers) == 2
@@ -0,0 +1,82 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pinot_connect.exceptions import OperationalError
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.ratelimit import RateLimit
+from pinot_connect.ratelimit import RateLimiter
+from pinot_connect.ratelimit import _parse_quota
+
+
+@pytest.mark.parametrize("rate, burst", [(0, None), (-1, None), (1, 0)])
+def test_invalid_rate_limit(rate, burst):
+    with pytest.raises(ProgrammingError):
+        RateLimit(rate, burst)
+
+
+@pytest.mark.parametrize("limit, capacity", [(RateLimit(10), 10), (RateLimit(0.5), 1), (RateLimit(2.5, 5), 5)])
+def test_capacity(limit, capacity):
+    assert limit.capacity == capacity
+
+
+def test_burst_then_rate():
+    limiter = RateLimiter({"t": RateLimit(rate=10, burst=2)})
+    with patch("pinot_connect.ratelimit.time.sleep") as mock_sleep:
+        limiter.acquire("t")
+        limiter.acquire("t")
+        mock_sleep.assert_not_called()
+        limiter.acquire("t")
+    assert 0.09 < mock_sleep.call_args.args[0] <= 0.1
+
+
+def test_reservations_queue_in_order():
+    limiter = RateLimiter({"t": RateLimit(rate=10, burst=1)})
+    waits = [limiter._reserve("t", None) for _ in range(3)]
+    assert waits[0] == 0
+    assert waits[1] < waits[2]
+    assert waits[2] == pytest.approx(0.2, abs=0.01)
+
+
+def test_table_type_suffix_and_unknown_tables():
+    limiter = RateLimiter({"t_OFFLINE": RateLimit(rate=1, burst=1)})
+    assert limiter.limits() == {"t": RateLimit(rate=1, burst=1)}
+    assert limiter._reserve("t_REALTIME", None) == 0
+    with pytest.raises(OperationalError):
+        limiter._reserve("t", 0.0)  # shares the bucket of t_REALTIME
+    assert limiter._reserve("other", None) == 0
+    assert limiter._reserve(None, None) == 0
+
+
+def test_timeout():
+    limiter = RateLimiter({"t": RateLimit(rate=1, burst=1)}, timeout=0.5)
+    limiter.acquire("t")
+    with pytest.raises(OperationalError, match="Rate limit of table 't' exceeded"):
+        limiter.acquire("t")
+    # a failed acquire doesn't take a token
+    limiter._buckets["t"].updated_at -= 0.5
+    limiter.acquire("t", timeout=1.0)
+
+
+def test_default_limit():
+    limiter = RateLimiter(default=RateLimit(rate=5))
+    limiter.acquire("t")
+    assert limiter.limits() == {"t": RateLimit(rate=5)}
+    limiter.set_limit("t", None)
+    assert limiter.limits() == {}
+
+
+@pytest.mark.asyncio
+async def test_acquire_async():
+    limiter = RateLimiter({"t": RateLimit(rate=50, burst=1)})
+    start = time.monotonic()
+    await limiter.acquire_async("t")
+    await limiter.acquire_async("t")
+    assert time.monotonic() - start >= 0.015
+
+
+def test_parse_quota():
+    assert _parse_quota({"OFFLINE": {"quota": {"maxQueriesPerSecond": "100.0"}}, "REALTIME": {"quota": {}}}) == 100.0
+    assert _parse_quota({"OFFLINE": {"quota": {"storage": "10G"}}}) is None
+    assert _parse_quota({}) is None
@@ -34,6 +34,14 @@ class TestBaseResultSet:
         rs = ResultSet(data, ["id", "name"], ["INT", "STRING"], None, 1, row_factory=lambda desc: lambda row: row)
         assert rs._transform_many(2) == [[1, "test"], [2, "data"]]
 
+    @pytest.mark.parametrize("n", [0, 1, 1023, 1024, 1025, 2500, 3000, "all"])
+    def test_transform_many_batches(self, n):
+        # rows are converted and made in batches, so fetches across batch boundaries must not lose or repeat rows
+        rs = ResultSet(iter([[i] for i in range(2500)]), ["id"], ["INT"], None, 1, row_factory=lambda desc: tuple)
+        expected = [(i,) for i in range(2500)][: None if n == "all" else n]
+        assert rs._transform_many(n) == expected
+        assert rs._transform_many("all") == [(i,) for i in range(len(expected), 2500)]
+
     def test_rowcount(self):
         rs = ResultSet(iter([]), [], [], 5, 1, row_factory=lambda desc: lambda row: row)
         assert rs.rowcount == 5
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+import pytest
+
+from pinot_connect.exceptions import OperationalError
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.scheduler import AsyncScheduler
+from pinot_connect.scheduler import PriorityClass
+from pinot_connect.scheduler import Scheduler
+
+
+async def _run_queued(scheduler: AsyncScheduler, priorities: list[str]) -> list[str]:
+    """Queue one request per priority behind a held slot, release it and return the order they were admitted in"""
+    order = []
+
+    async def request(priority: str):
+        async with scheduler.slot(priority):
+            order.append(priority)
+            await asyncio.sleep(0)
+
+    async with scheduler.slot():
+        tasks = [asyncio.ensure_future(request(priority)) for priority in priorities]
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_invalid_configuration():
+    with pytest.raises(ProgrammingError):
+        Scheduler(max_concurrency=0)
+    with pytest.raises(ProgrammingError):
+        Scheduler({"bulk": PriorityClass(weight=0)})
+
+
+def test_unknown_priority():
+    with pytest.raises(ProgrammingError, match="Unknown priority class 'bulk'"):
+        with Scheduler().slot("bulk"):
+            pass  # pragma: no cover
+
+
+@pytest.mark.asyncio
+async def test_weighted_fair_order():
+    scheduler = AsyncScheduler({"interactive": PriorityClass(weight=3), "bulk": PriorityClass()}, max_concurrency=1)
+    order = await _run_queued(scheduler, ["bulk"] * 4 + ["interactive"] * 4)
+    assert order[:4].count("interactive") == 3
+    assert sorted(order) == ["bulk"] * 4 + ["interactive"] * 4
+
+
+@pytest.mark.asyncio
+async def test_idle_class_does_not_bank_credit():
+    scheduler = AsyncScheduler({"bulk": PriorityClass()}, max_concurrency=1)
+    await _run_queued(scheduler, ["default"] * 10)
+    order = await _run_queued(scheduler, ["default"] * 2 + ["bulk"] * 2)
+    assert order[:2].count("bulk") == 1
+
+
+@pytest.mark.asyncio
+async def test_class_concurrency_cap():
+    scheduler = AsyncScheduler({"bulk": PriorityClass(max_concurrency=1)})
+    async with scheduler.slot("bulk"):
+        waiting = asyncio.ensure_future(scheduler.slot("bulk").__aenter__())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        async with scheduler.slot():  # other classes still get slots
+            pass
+        assert scheduler.stats()["bulk"].queued == 1
+    await waiting
+    assert scheduler.stats()["bulk"].running == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_frees_queue():
+    scheduler = AsyncScheduler(max_concurrency=1)
+    async with scheduler.slot():
+        waiting = asyncio.ensure_future(scheduler.slot().__aenter__())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+    stats = scheduler.stats()["default"]
+    assert (stats.running, stats.queued, stats.admitted) == (0, 0, 1)
+    async with scheduler.slot():
+        pass
+
+
+def test_sync_scheduler_stats():
+    scheduler = Scheduler(max_concurrency=1)
+    release = threading.Event()
+    admitted = []
+
+    def request():
+        with scheduler.slot():
+            admitted.append(threading.get_ident())
+            release.wait()
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while scheduler.stats()["default"].queued + scheduler.stats()["default"].running < 2:
+        pass
+    assert scheduler.stats()["default"].running == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+    stats = scheduler.stats()["default"]
+    assert (stats.running, stats.queued, stats.admitted) == (0, 0, 2)
+    assert stats.queue_time_max >= stats.queue_time_mean >= 0
+
+
+def test_sync_slot_timeout():
+    scheduler = Scheduler(max_concurrency=1)
+    with scheduler.slot():
+        with pytest.raises(OperationalError, match="priority class 'default' became free within 0.010s"):
+            with scheduler.slot(timeout=0.01):
+                pass  # pragma: no cover
+        assert scheduler.stats()["default"].queued == 0
+    with scheduler.slot(timeout=0):
+        assert scheduler.stats()["default"].running == 1
+
+
+@pytest.mark.asyncio
+async def test_async_slot_timeout():
+    scheduler = AsyncScheduler(max_concurrency=1)
+    async with scheduler.slot():
+        with pytest.raises(OperationalError, match="became free within 0.010s"):
+            async with scheduler.slot(timeout=0.01):
+                pass  # pragma: no cover
+        assert scheduler.stats()["default"].queued == 0
+    async with scheduler.slot(timeout=0):
+        assert scheduler.stats()["default"].running == 1
@@ -0,0 +1,159 @@
+import logging
+import threading
+from unittest import mock
+
+import httpx
+import orjson
+import pytest
+
+from pinot_connect._sql import find_table
+from pinot_connect._sql import fingerprint
+from pinot_connect._sql import normalize
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.options import QueryOptions
+from pinot_connect.slowlog import SlowQueryLog
+
+
+def _broker(request: httpx.Request) -> httpx.Response:
+    if b"bad" in request.content:
+        return httpx.Response(200, content=orjson.dumps({"exceptions": [{"errorCode": 150, "message": "bad"}]}))
+    docs_scanned = 1000 if b"big" in request.content else 10
+    return httpx.Response(
+        200,
+        content=orjson.dumps(
+            {
+                "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": [[1]]},
+                "exceptions": [],
+                "numServersQueried": 1,
+                "numServersResponded": 1,
+                "numDocsScanned": docs_scanned,
+                "timeUsedMs": 5,
+            }
+        ),
+    )
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("test_slowlog")
+    handler = logger.slow_queries = _Records()
+    logger.addHandler(handler)
+    logger.propagate = False
+    yield logger
+    logger.removeHandler(handler)
+
+
+def _logged(logger: logging.Logger) -> list[dict]:
+    return [orjson.loads(record.getMessage()) for record in logger.slow_queries.records]
+
+
+def test_slow_queries_are_logged(logger):
+    slow_query_log = SlowQueryLog(docs_scanned=100, logger=logger)
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, query_options=QueryOptions(timeout_ms=500), slow_query_log=slow_query_log) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM small")
+        cursor.execute("SELECT id FROM big WHERE id = %s", (7,), query_options=QueryOptions(use_star_tree=False))
+        slow_query_log.flush()
+    (entry,) = _logged(logger)
+    assert entry["fingerprint"] == fingerprint("SELECT id FROM big WHERE id = 7")
+    assert entry["query"] == "SELECT id FROM big WHERE id = ?"
+    assert entry["sql"] == "SELECT id FROM big WHERE id = 7"
+    assert entry["table"] == "big"
+    assert entry["exceeded"] == ["docs_scanned"]
+    assert entry["query_options"] == {"timeoutMs": 500, "useStarTree": False}
+    assert entry["statistics"]["numDocsScanned"] == 1000
+    assert entry["rows"] == 1
+    assert entry["error"] is None
+    assert logger.slow_queries.records[0].slow_query["table"] == "big"
+    slow_query_log.close()
+    assert slow_query_log._thread is None
+
+
+def test_fast_queries_are_not_normalized(logger):
+    slow_query_log = SlowQueryLog(docs_scanned=100, logger=logger)
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with mock.patch("pinot_connect._observe.normalize") as normalize, mock.patch(
+        "pinot_connect._observe.find_table", wraps=find_table
+    ) as find_table_:
+        with Connection(client, slow_query_log=slow_query_log) as connection:
+            connection.cursor().execute("SELECT id FROM small WHERE id IN %s", ([1, 2, 3],))
+    slow_query_log.close()
+    assert _logged(logger) == []
+    normalize.assert_not_called()
+    # the table is found on the operation, not on the bound sql
+    find_table_.assert_called_once_with("SELECT id FROM small WHERE id IN %s")
+
+
+def test_slow_queries_are_normalized_in_background(logger):
+    slow_query_log = SlowQueryLog(docs_scanned=100, logger=logger)
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    threads = []
+
+    def normalize_(sql: str) -> str:
+        threads.append(threading.current_thread())
+        return normalize(sql)
+
+    with mock.patch("pinot_connect._observe.normalize", side_effect=normalize_):
+        with Connection(client, slow_query_log=slow_query_log) as connection:
+            connection.cursor().execute("SELECT id FROM big WHERE id = %s", (7,))
+        slow_query_log.flush()
+    (thread,) = threads
+    assert thread is slow_query_log._thread
+    (entry,) = _logged(logger)
+    assert entry["query"] == "SELECT id FROM big WHERE id = ?"
+    slow_query_log.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_are_logged_async(logger):
+    slow_query_log = SlowQueryLog(latency=0.0, redact=True, logger=logger)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    async with AsyncConnection(client, slow_query_log=slow_query_log) as connection:
+        cursor = await connection.cursor()
+        with pytest.raises(ProgrammingError):
+            await cursor.execute("SELECT bad FROM small WHERE id = 1")
+    slow_query_log.close()
+    (entry,) = _logged(logger)
+    assert entry["sql"] is None
+    assert entry["exceeded"] == ["latency"]
+    assert entry["error"] == {"type": "ProgrammingError", "message": "[Pinot Error 150] bad", "code": 150}
+
+
+def test_redact_function(logger):
+    slow_query_log = SlowQueryLog(time_used_ms=1, redact=lambda sql: sql[:6], logger=logger)
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, slow_query_log=slow_query_log) as connection:
+        connection.cursor().execute("SELECT id FROM small")
+    slow_query_log.close()
+    (entry,) = _logged(logger)
+    assert entry["sql"] == "SELECT"
+
+
+def test_full_queue_drops(logger):
+    slow_query_log = SlowQueryLog(latency=0.0, logger=logger, max_queued=1)
+    # a stopped drain thread stands in for one that can't keep up
+    slow_query_log._thread = object()
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, slow_query_log=slow_query_log) as connection:
+        cursor = connection.cursor()
+        for _ in range(3):
+            cursor.execute("SELECT id FROM small")
+    assert slow_query_log.dropped == 2
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"latency": 1.0, "sample_rate": 0.0}, {"latency": 1.0, "max_queued": 0}])
+def test_invalid(kwargs):
+    with pytest.raises(ProgrammingError):
+        SlowQueryLog(**kwargs)
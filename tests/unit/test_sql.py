@@ -0,0 +1,185 @@
+import pytest
+
+from pinot_connect._sql import Limit
+from pinot_connect._sql import OrderByItem
+from pinot_connect._sql import SelectItem
+from pinot_connect._sql import add_predicate
+from pinot_connect._sql import find_group_by
+from pinot_connect._sql import find_limit
+from pinot_connect._sql import find_order_by
+from pinot_connect._sql import find_select_list
+from pinot_connect._sql import find_table
+from pinot_connect._sql import fingerprint
+from pinot_connect._sql import has_having
+from pinot_connect._sql import mask
+from pinot_connect._sql import normalize
+from pinot_connect._sql import remove_limit
+from pinot_connect._sql import remove_order_by
+from pinot_connect._sql import replace_limit
+from pinot_connect.exceptions import ProgrammingError
+
+
+def test_mask():
+    sql = "select count(*), 'a (b) limit 1' from t where x in (select y from z limit 5)"
+    masked = mask(sql)
+    assert len(masked) == len(sql)
+    assert masked.startswith("select count( ),")
+    assert "limit" not in masked
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select * from t", None),
+        ("select * from t limit 10", Limit(limit=10, offset=0)),
+        ("select * from t LIMIT 5, 10;", Limit(limit=10, offset=5)),
+        ("select * from t limit 10 offset 20", Limit(limit=10, offset=20)),
+        ("select * from t where a = 'limit 10'", None),
+    ],
+)
+def test_find_limit(sql, expected):
+    assert find_limit(sql) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select * from t limit 10", "select * from t LIMIT 5"),
+        ("select * from t limit 10, 20;", "select * from t LIMIT 5"),
+        ("select * from t;", "select * from t LIMIT 5"),
+    ],
+)
+def test_replace_limit(sql, expected):
+    assert replace_limit(sql, 5) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select * from t", []),
+        ("select a, b from t order by a limit 10", [OrderByItem("a", False)]),
+        (
+            'select a, b from t ORDER BY "a" DESC NULLS LAST, sum(b, 1) asc',
+            [OrderByItem('"a"', True), OrderByItem("sum(b, 1)", False)],
+        ),
+        ("select a from (select a from t order by a) limit 5", []),
+    ],
+)
+def test_find_order_by(sql, expected):
+    assert find_order_by(sql) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select a, count(*) from t group by a", ["a"]),
+        ("select a, b from t where x in (select y from u group by y) group by a, upper(b) limit 10", ["a", "upper(b)"]),
+        ("select a from t group by a having count(*) > 1 order by a", ["a"]),
+        ("select a from t", []),
+    ],
+)
+def test_find_group_by(sql, expected):
+    assert find_group_by(sql) == expected
+
+
+def test_has_having():
+    assert has_having("select a from t group by a HAVING count(*) > 1")
+    assert not has_having("select a from t where b in (select b from u group by b having count(*) > 1)")
+    assert not has_having("select 'having' from t")
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select a from t order by a desc limit 10", "select a from t limit 10"),
+        ("select a from t order by a", "select a from t"),
+        ("select a from t", "select a from t"),
+    ],
+)
+def test_remove_order_by(sql, expected):
+    assert remove_order_by(sql) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select * from t limit 10", "select * from t"),
+        ("select * from t limit 5, 10;", "select * from t"),
+        ("select * from t", "select * from t"),
+    ],
+)
+def test_remove_limit(sql, expected):
+    assert remove_limit(sql) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select * from t", "select * from t WHERE id > 5"),
+        ("select * from t;", "select * from t WHERE id > 5"),
+        ("select * from t where a = 1 or b = 2", "select * from t where (a = 1 or b = 2) AND id > 5"),
+        (
+            "select a, count(*) from t where a in (select a from u where b = 1) group by a limit 10",
+            "select a, count(*) from t where (a in (select a from u where b = 1)) AND id > 5 group by a limit 10",
+        ),
+        ("select * from t order by id", "select * from t WHERE id > 5 order by id"),
+        ("select * from t where s = 'order by'", "select * from t where (s = 'order by') AND id > 5"),
+    ],
+)
+def test_add_predicate(sql, expected):
+    assert add_predicate(sql, "id > 5") == expected
+
+
+def test_add_predicate_without_from():
+    with pytest.raises(ProgrammingError):
+        add_predicate("select 1", "id > 5")
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("select * from myTable where x = 1", "myTable"),
+        ('SELECT a FROM "my_table_OFFLINE" LIMIT 10', "my_table_OFFLINE"),
+        ("select (select 1 from inner_t) from outer_t", "outer_t"),
+        ("select * from (select * from t) sub", None),
+        ("select 1", None),
+    ],
+)
+def test_find_table(sql, expected):
+    assert find_table(sql) == expected
+
+
+def test_find_select_list():
+    sql = 'SELECT carrier, sum(x) as total, count(*) c, avg(d) "avg d", max(y), case when a then 1 else 0 end FROM t'
+    select_list = find_select_list(sql)
+    assert select_list.items == [
+        SelectItem("carrier", None),
+        SelectItem("sum(x)", "total"),
+        SelectItem("count(*)", "c"),
+        SelectItem("avg(d)", "avg d"),
+        SelectItem("max(y)", None),
+        SelectItem("case when a then 1 else 0 end", None),
+    ]
+    assert sql[select_list.start : select_list.end].strip().startswith("carrier")
+    assert find_select_list("show tables") is None
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
+        ("SELECT * FROM t WHERE id = 5 LIMIT 10", "SELECT * FROM t WHERE id = ? LIMIT ?"),
+        ("select a-5, col1 from t where x = -2.5e3", "select a-?, col1 from t where x = ?"),
+        ("SELECT * FROM t WHERE s = 'it''s' AND \"col 1\" = '1'", 'SELECT * FROM t WHERE s = ? AND "col 1" = ?'),
+        ("SELECT *\n  FROM t WHERE id IN (1, 2,3) AND c IN ('a');", "SELECT * FROM t WHERE id IN (?) AND c IN (?)"),
+    ],
+)
+def test_normalize(sql, expected):
+    assert normalize(sql) == expected
+
+
+def test_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2) LIMIT 5") == fingerprint(
+        "SELECT * FROM t WHERE id IN (3) LIMIT 9"
+    )
+    assert fingerprint("SELECT * FROM t WHERE id = 1") != fingerprint("SELECT * FROM u WHERE id = 1")
+    assert len(fingerprint("SELECT 1")) == 16
@@ -0,0 +1,99 @@
+import httpx
+import orjson
+import pytest
+
+from pinot_connect._sql import fingerprint
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.statements import StatementRegistry
+
+
+def _result(rows: int, docs_scanned: int) -> bytes:
+    return orjson.dumps(
+        {
+            "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": [[1]] * rows},
+            "exceptions": [],
+            "numServersQueried": 1,
+            "numServersResponded": 1,
+            "numDocsScanned": docs_scanned,
+            "numEntriesScannedInFilter": 2 * docs_scanned,
+            "timeUsedMs": 5,
+        }
+    )
+
+
+def _broker(request: httpx.Request) -> httpx.Response:
+    if b"bad" in request.content:
+        return httpx.Response(200, content=orjson.dumps({"exceptions": [{"errorCode": 150, "message": "bad"}]}))
+    if b"big" in request.content:
+        return httpx.Response(200, content=_result(10, 1000))
+    return httpx.Response(200, content=_result(1, 10))
+
+
+def test_statements():
+    registry = StatementRegistry()
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, statements=registry) as connection:
+        cursor = connection.cursor()
+        for i in range(5):
+            cursor.execute("SELECT id FROM small WHERE id = %s", (i,))
+        cursor.execute("SELECT id FROM big WHERE name IN %s", (("a", "b"),))
+        cursor.execute("SELECT id FROM big WHERE name IN %s", (("c",),))
+        with pytest.raises(ProgrammingError):
+            cursor.execute("SELECT bad FROM small")
+
+    by_docs = registry.snapshot(sort_by="docs_scanned")
+    big, small, bad = by_docs
+    assert big.fingerprint == fingerprint("SELECT id FROM big WHERE name IN ('a')")
+    assert big.query == "SELECT id FROM big WHERE name IN (?)"
+    assert big.table == "big"
+    assert (big.calls, big.rows, big.docs_scanned, big.entries_scanned_in_filter) == (2, 20, 2000, 4000)
+    assert big.broker_time == pytest.approx(0.01)
+    assert small.query == "SELECT id FROM small WHERE id = ?"
+    assert (small.calls, small.rows, small.docs_scanned) == (5, 5, 50)
+    assert 0 < small.min_time <= small.p50_time <= small.p99_time <= small.max_time
+    assert small.mean_time == pytest.approx(small.total_time / 5)
+    assert (bad.calls, bad.errors) == (1, 1)
+    assert [stat.fingerprint for stat in registry.snapshot(sort_by="calls", limit=1)] == [small.fingerprint]
+
+    registry.reset(small.fingerprint)
+    assert {stat.fingerprint for stat in registry.snapshot()} == {big.fingerprint, bad.fingerprint}
+    registry.reset()
+    assert registry.snapshot() == []
+
+
+@pytest.mark.asyncio
+async def test_statements_async():
+    registry = StatementRegistry()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    async with AsyncConnection(client, statements=registry) as connection:
+        cursor = await connection.cursor()
+        await cursor.execute("SELECT id FROM small")
+        await cursor.execute("SELECT id FROM small")
+    (stat,) = registry.snapshot()
+    assert stat.calls == 2
+
+
+def test_statements_are_bounded():
+    registry = StatementRegistry(max_statements=3, sample_size=4)
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, statements=registry) as connection:
+        cursor = connection.cursor()
+        for _ in range(10):
+            cursor.execute("SELECT id FROM small")
+        cursor.execute("SELECT a FROM small")
+        cursor.execute("SELECT b FROM small")
+        # the least called statement makes room for the new one
+        cursor.execute("SELECT c FROM small")
+    stats = {stat.query: stat for stat in registry.snapshot()}
+    assert set(stats) == {"SELECT id FROM small", "SELECT b FROM small", "SELECT c FROM small"}
+    assert stats["SELECT id FROM small"].calls == 10
+    assert len(registry._statements[fingerprint("SELECT id FROM small")].sample) == 4
+
+
+def test_invalid_registry():
+    with pytest.raises(ProgrammingError):
+        StatementRegistry(0)
+    with pytest.raises(ProgrammingError):
+        StatementRegistry(sample_size=0)
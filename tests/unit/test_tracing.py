@@ -0,0 +1,139 @@
+import httpx
+import orjson
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+
+from pinot_connect._sql import fingerprint
+from pinot_connect.connection import AsyncConnection
+from pinot_connect.connection import Connection
+from pinot_connect.exceptions import ProgrammingError
+from pinot_connect.tracing import QueryTracer
+
+RESULT = orjson.dumps(
+    {
+        "resultTable": {"dataSchema": {"columnNames": ["id"], "columnDataTypes": ["INT"]}, "rows": [[1], [2], [3]]},
+        "exceptions": [],
+        "numServersQueried": 1,
+        "numServersResponded": 1,
+        "numDocsScanned": 3,
+        "timeUsedMs": 4,
+        "traceInfo": {},
+    }
+)
+ERROR = orjson.dumps({"exceptions": [{"errorCode": 150, "message": "bad query"}]})
+
+
+def _broker(request: httpx.Request) -> httpx.Response:
+    if b"bad" in request.content:
+        return httpx.Response(200, content=ERROR)
+    return httpx.Response(200, content=RESULT)
+
+
+@pytest.fixture
+def exporter():
+    return InMemorySpanExporter()
+
+
+@pytest.fixture
+def tracer(exporter):
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return QueryTracer(provider)
+
+
+def _check_spans(exporter: InMemorySpanExporter) -> None:
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {
+        "pinot.execute",
+        "pinot.build_request",
+        "pinot.send",
+        "pinot.decode",
+        "pinot.result_set",
+        "pinot.fetch",
+    }
+    execute = spans["pinot.execute"]
+    for name, span in spans.items():
+        if name != "pinot.execute":
+            assert span.parent.span_id == execute.context.span_id
+    assert execute.attributes["db.query.text"] == "SELECT id FROM table WHERE id > ?"
+    assert execute.attributes["pinot.query.fingerprint"] == fingerprint("SELECT id FROM table WHERE id > 0")
+    assert execute.attributes["db.collection.name"] == "table"
+    assert execute.attributes["pinot.numDocsScanned"] == 3
+    assert execute.attributes["pinot.timeUsedMs"] == 4
+    assert "pinot.traceInfo" not in execute.attributes
+    assert spans["pinot.fetch"].attributes == {"pinot.fetch.method": "fetchall", "pinot.fetch.rows": 3}
+
+
+def test_execute_spans(tracer, exporter):
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, tracer=tracer) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM table WHERE id > %s", (0,))
+        assert cursor.fetchall() == [(1,), (2,), (3,)]
+    _check_spans(exporter)
+
+
+@pytest.mark.asyncio
+async def test_execute_spans_async(tracer, exporter):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    async with AsyncConnection(client, tracer=tracer) as connection:
+        cursor = await connection.cursor()
+        await cursor.execute("SELECT id FROM table WHERE id > %s", (0,))
+        assert await cursor.fetchall() == [(1,), (2,), (3,)]
+    _check_spans(exporter)
+
+
+def test_execute_error(tracer, exporter):
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, tracer=tracer) as connection:
+        cursor = connection.cursor()
+        with pytest.raises(ProgrammingError, match="bad query"):
+            cursor.execute("SELECT bad FROM table")
+        # fetches after a failed execute aren't attributed to it
+        assert cursor._trace_context is None
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert spans["pinot.execute"].status.status_code == StatusCode.ERROR
+    assert spans["pinot.result_set"].status.status_code == StatusCode.ERROR
+
+
+def test_fan_out_spans(tracer, exporter):
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client, tracer=tracer) as connection:
+        cursor = connection.cursor()
+        cursor.execute_chunked("SELECT id FROM table WHERE id IN %s", ([1, 2, 3],), chunk_param=0, chunk_size=2)
+        assert len(cursor.fetchall()) == 6
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {"pinot.execute", "pinot.fetch"}
+    execute = spans["pinot.execute"]
+    assert execute.attributes["db.query.text"] == "SELECT id FROM table WHERE id IN (?)"
+    assert execute.attributes["pinot.numDocsScanned"] == 6
+    assert execute.attributes["http.response.body.size"] == 2 * len(RESULT)
+    assert spans["pinot.fetch"].parent.span_id == execute.context.span_id
+
+
+@pytest.mark.asyncio
+async def test_paginate_spans(tracer, exporter):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    async with AsyncConnection(client, tracer=tracer) as connection:
+        cursor = await connection.cursor()
+        rows = [row async for row in cursor.paginate("SELECT id FROM table ORDER BY id", key="id", page_size=5)]
+        assert len(rows) == 3
+    (span,) = exporter.get_finished_spans()
+    assert span.attributes["db.query.text"] == "SELECT id FROM table ORDER BY id LIMIT ?"
+    assert span.attributes["pinot.timeUsedMs"] == 4
+
+
+def test_untraced_connection(exporter):
+    client = httpx.Client(transport=httpx.MockTransport(_broker), base_url="http://broker:8099")
+    with Connection(client) as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM table")
+        cursor.fetchmany(2)
+        assert cursor._trace_context is None
+    assert not exporter.get_finished_spans()